@@ -0,0 +1,22 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+struct AnalyseOptions {
+    std::string input = "-";   // EPD/FEN file, "-" for stdin
+    std::string output;        // result file, empty for stdout
+    int depth = 0;             // 0 for no depth limit
+    uint64_t nodes = 0;        // 0 for no node limit
+    int movetime_ms = 0;       // 0 for no time limit
+    int threads = 1;
+    int multipv = 1;           // ranked root moves per position
+    size_t hash_mb = 16;       // transposition table shared by all threads
+    bool epd_output = false;   // EPD lines instead of JSONL
+    bool resume = false;       // continue after the positions already in `output`
+};
+
+// Search every position of the input and write one result line per position,
+// in input order. Returns a process exit code.
+int run_analyse(const AnalyseOptions& options);
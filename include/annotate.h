@@ -0,0 +1,25 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+struct AnnotateOptions {
+    std::string input = "-";   // PGN file, "-" for stdin
+    std::string output;        // annotated PGN, empty for stdout
+    int depth = 0;             // per position, 0 for no depth limit
+    uint64_t nodes = 0;        // per position, 0 for no node limit
+    int movetime_ms = 0;       // per position, 0 for no time limit
+    int threads = 1;           // games annotated at the same time
+    size_t hash_mb = 64;       // transposition table per thread
+    int mistake_cp = 100;      // evaluation drop that makes a move a mistake
+    int blunder_cp = 300;      // and a blunder
+};
+
+// Search every position of every game and write the games back with an
+// evaluation comment after each move, "?" on mistakes and "??" on blunders
+// (with the engine's move), in input order. A game's positions are searched
+// from the last to the first with one transposition table, so each search
+// starts from what the searches of the later positions found. Prints each
+// game's throughput to stderr. Returns a process exit code.
+int run_annotate(const AnnotateOptions& options);
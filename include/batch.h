@@ -0,0 +1,31 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+// Positions stored as parallel arrays, one row per position:
+//   pieces    count x 64 Piece codes, square a1 = 0 ... h8 = 63
+//   side      0 white to move, 1 black to move
+//   castling  bit mask: 1 K, 2 Q, 4 k, 8 q
+//   ep        en passant target square, or -1; the square behind a pawn
+//             of the side not to move that stands on its fourth rank
+// side, castling and ep may be null, meaning white to move, no castling
+// rights and no en passant square for every row.
+struct PositionBatch {
+    const int8_t* pieces = nullptr;
+    const int8_t* side = nullptr;
+    const uint8_t* castling = nullptr;
+    const int8_t* ep = nullptr;
+    size_t count = 0;
+};
+
+// Index of the first row that can't be loaded (bad piece code or square,
+// not exactly one king per side, too many pieces of one type, an en passant
+// square without the pawn that skipped it), or -1.
+long long validate_batch(const PositionBatch& batch);
+
+// Write a side-to-move relative centipawn score for every row into out:
+// the static evaluation when depth is 0, otherwise the score of a
+// fixed-depth search. Rows are shared out between `threads` workers
+// (0 uses every hardware thread). The batch must pass validate_batch.
+void evaluate_batch(const PositionBatch& batch, int32_t* out, int depth = 0, int threads = 0);
@@ -0,0 +1,11 @@
+#pragma once
+
+struct BenchOptions {
+    int depth = 6;             // search depth per position
+    bool nnue = false;         // also run with the NNUE evaluation (needs a loaded network)
+};
+
+// Search a fixed set of positions and print nodes, time and nodes per
+// second, once with the handcrafted evaluation and, if asked, once with the
+// NNUE one. Returns a process exit code.
+int run_bench(const BenchOptions& options);
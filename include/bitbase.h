@@ -0,0 +1,25 @@
+#pragma once
+
+#include "board.h"
+#include <string>
+
+// Endgame bitbases for KQK, KRK, KPK and KBNK.
+// Each table stores one byte per position (side to move relative):
+//   0            draw (or unreachable/illegal index)
+//   1..127       side to move wins, mate in that many plies
+//   0x80 | d     side to move loses, mated in d plies
+
+// Generate every table by retrograde analysis and write them into `dir`.
+// Returns false if any file could not be written.
+bool bitbase_generate(const std::string& dir);
+
+// Memory-map every table found in `dir`. Missing tables are skipped.
+// Returns the number of tables loaded.
+int bitbase_init(const std::string& dir);
+
+// Release all mapped tables.
+void bitbase_shutdown();
+
+// Probe the position. On success `wdl` is 1 (side to move wins), 0 (draw)
+// or -1 (side to move loses) and `dtm` is the distance to mate in plies.
+bool bitbase_probe(const Board& board, int& wdl, int& dtm);
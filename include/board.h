@@ -2,24 +2,38 @@
 
 #include "move.h"
 #include "types.h"
+#include <cstdint>
 #include <string>
-#include <vector>
 
 // Forward declaration for MoveGenerator
 class MoveGenerator;
 
+// One piece change made by a move, for updating the NNUE accumulator: the
+// piece leaves `from` and/or arrives on `to` (-1 for none)
+struct DirtyPiece {
+    int8_t piece;
+    int8_t from;
+    int8_t to;
+};
+
 // Structure to hold information needed to undo a move
 // This struct is now internal to the Board's logic, not passed externally by make/unmake.
+// Field types are kept narrow so an entry packs into 40 bytes.
 struct UndoInfo {
-    Color side_to_move;
+    uint64_t key;                     // Zobrist key of the position before the move
+    int16_t halfmove_clock;
+    int16_t fullmove_number;
+    int8_t en_passant_square;
+    int8_t en_passant_capture_square; // Specific to en passant to restore the pawn
     bool white_king_castle;
     bool white_queen_castle;
     bool black_king_castle;
     bool black_queen_castle;
-    int en_passant_square;
-    int halfmove_clock;
-    int fullmove_number;
-    int en_passant_capture_square; // Specific to en passant to restore the pawn
+    Color side_to_move;
+    // Pieces changed by the move: the moved piece first, then a promoted
+    // piece, a captured piece and a castling rook
+    DirtyPiece dirty[3];
+    int8_t dirty_count;
 };
 
 struct Board {
@@ -35,17 +49,35 @@ struct Board {
     int halfmove_clock;
     int fullmove_number;
 
-    // Internal history stack for undo functionality
-    std::vector<UndoInfo> history; 
+    // Zobrist hash of the position, updated incrementally by make/unmake
+    uint64_t key;
+
+    // Piece lists: squares holding each piece type, and each square's slot in its list.
+    // Kept in sync with squares[] by make_move/unmake_move.
+    static const int MAX_PIECES_PER_TYPE = 10;
+    int piece_count[13];
+    int piece_list[13][MAX_PIECES_PER_TYPE];
+    int piece_index[64];
+
+    // Internal history stack for undo functionality (also the key history for repetitions).
+    // Fixed capacity so make_move never allocates; copies only take the used part.
+    static const int MAX_HISTORY = 1024;
+    UndoInfo history[MAX_HISTORY];
+    int history_size;
 
     Board();
+    Board(const Board& other);
+    Board& operator=(const Board& other);
 
-    void load_fen(const std::string& fen);
+    bool load_fen(const std::string& fen); // false (and an empty board) if it is malformed
     std::string print_board() const;
+    std::string to_fen() const;
 
     // Signatures remain unchanged as per your strict requirement
     bool make_move(const Move& move, Piece& captured_piece, Piece& moved_piece);
     void unmake_move(const Move& move, Piece captured_piece, Piece moved_piece);
+    bool make_move(PackedMove move, Piece& captured_piece, Piece& moved_piece);
+    void unmake_move(PackedMove move, Piece captured_piece, Piece moved_piece);
     bool is_king_in_check(Color color) const;
 
     bool has_legal_moves();
@@ -53,5 +85,27 @@ struct Board {
     std::string get_result_string();
     bool is_square_attacked(int square, Color attacking_color) const;
 
+    int king_square(Color color) const {
+        Piece king = (color == WHITE ? WK : BK);
+        return piece_count[king] ? piece_list[king][0] : -1;
+    }
+    // Rebuild the piece lists after editing squares[] directly
+    void refresh_piece_lists();
+
+    uint64_t compute_key() const;
+    // True if the position occurred before since the last irreversible move
+    bool is_repetition() const;
+    // Forget the moves before the last irreversible one, which can never be
+    // repeated or (in a replayed game) unmade, to keep room on the stack
+    void trim_history();
+
     friend class MoveGenerator;
+
+private:
+    bool make_move(int from, int to, Piece promotion, Piece& captured_piece, Piece& moved_piece);
+    void unmake_move(int from, int to, Piece captured_piece, Piece moved_piece);
+    void copy_from(const Board& other);
+    void put_piece(Piece piece, int square);
+    void remove_piece(int square);
+    void move_piece(int from, int to);
 };
\ No newline at end of file
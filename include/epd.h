@@ -0,0 +1,26 @@
+#pragma once
+
+#include <string>
+#include <utility>
+#include <vector>
+
+// One line of an EPD or FEN file
+struct EpdRecord {
+    std::string fen;  // full FEN; EPD lines get their clocks from hmvc/fmvn or "0 1"
+    std::vector<std::pair<std::string, std::string>> operations;  // opcode, operand
+
+    // Operand of the first operation with this opcode, or null
+    const std::string* find(const std::string& opcode) const;
+};
+
+// Parse "<board> <side> <castling> <ep> [<halfmove> <fullmove>] [op operand; ...]".
+// Operands keep their inner spaces and lose surrounding quotes.
+// Returns false if the four position fields are missing or malformed.
+bool parse_epd_line(const std::string& line, EpdRecord& record);
+
+// The four position fields of a FEN, as used at the start of an EPD line
+std::string fen_to_epd_position(const std::string& fen);
+
+// Text for a JSON string literal in the JSON lines output of analyse and
+// suite: quotes and backslashes escaped, control characters as spaces
+std::string json_escape(const std::string& s);
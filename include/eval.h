@@ -3,4 +3,86 @@
 #include "board.h"
 #include "types.h"
 
-int evaluate(const Board& board);
\ No newline at end of file
+#include <cstddef>
+#include <cstdint>
+
+#include <string>
+
+struct EvalCacheStats;
+
+// Evaluation for the side to move. With `stats`, cache probes and hits are
+// counted there; each searching thread keeps its own counters.
+int evaluate(const Board& board, EvalCacheStats* stats = nullptr);
+
+// Which evaluation evaluate() uses: the handcrafted terms below or the
+// NNUE network (nnue.h), which must be loaded first. Switching clears the
+// evaluation cache and must not overlap with evaluations on other threads.
+enum EvalMode {
+    EVAL_CLASSIC,
+    EVAL_NNUE
+};
+
+bool set_eval_mode(EvalMode mode);  // false if no network is loaded
+EvalMode eval_mode();
+
+// The evaluation is linear in a flat vector of integer weights (centipawns).
+// Each term owns a slice of it:
+//   piece_value           5   pawn, knight, bishop, rook, queen
+//   pst_pawn ... pst_king 64  per piece type, board square index (a1 = 0,
+//                             h8 = 63) for White, mirrored by rank for Black
+//   doubled_pawn          1   per pawn beyond the first on a file
+//   isolated_pawn         1   per file with isolated pawns
+//   rook_open_file        1   per rook on a file without pawns
+//   rook_semi_open_file   1   per rook on a file with only enemy pawns
+//   mobility              4   per empty square a knight, bishop, rook or
+//                             queen reaches
+struct EvalWeightGroup {
+    const char* name;
+    int offset;
+    int count;
+};
+
+enum EvalWeightIndex {
+    W_PIECE_VALUE = 0,
+    W_PST = W_PIECE_VALUE + 5,
+    W_DOUBLED_PAWN = W_PST + 6 * 64,
+    W_ISOLATED_PAWN,
+    W_ROOK_OPEN_FILE,
+    W_ROOK_SEMI_OPEN_FILE,
+    W_MOBILITY,
+    NUM_EVAL_WEIGHTS = W_MOBILITY + 4
+};
+
+extern const EvalWeightGroup EVAL_WEIGHT_GROUPS[];
+extern const int NUM_EVAL_WEIGHT_GROUPS;
+
+// Weights in use; the built-in defaults until a weights file is loaded.
+// Changing them clears the evaluation cache and must not overlap with
+// evaluations on other threads.
+const int* eval_weights();
+void set_eval_weights(const int* weights);
+void reset_eval_weights();
+
+// Weights file: whitespace-separated "<group name> <values...>" with
+// '#' comments. Groups that are left out keep their current values.
+bool load_eval_weights(const std::string& path, std::string& error);
+bool save_eval_weights(const std::string& path);  // "-" writes to stdout
+
+// Coefficient of every weight in a position, White's count minus Black's.
+// The White-relative evaluation is the dot product with eval_weights().
+struct EvalTrace {
+    int coefficients[NUM_EVAL_WEIGHTS];
+};
+
+void trace_evaluation(const Board& board, EvalTrace& trace);
+
+// Always-replace evaluation cache keyed by the Zobrist key.
+// Size is given in megabytes; 0 disables the cache.
+// Neither call may overlap with evaluations on other threads.
+void set_eval_cache_size(size_t mb);
+void clear_eval_cache();
+
+struct EvalCacheStats {
+    uint64_t probes = 0;
+    uint64_t hits = 0;
+};
\ No newline at end of file
@@ -0,0 +1,17 @@
+#pragma once
+
+#include <string>
+
+struct EvalTraceOptions {
+    std::string input = "-";   // labeled EPD/FEN file, "-" for stdin
+    std::string output;        // trace file, empty for stdout
+};
+
+// Write the evaluation features of every labeled position, for tuning the
+// weights (see texel_tuner.py). A position's label is its game result, as an
+// EPD "c9" or "result" operation ("1-0", "1/2-1/2", "0-1") or a "[1.0]",
+// "[0.5]" or "[0.0]" token after the FEN. Output lines are
+//   <result> <eval> <n> <index> <coefficient> ... (n pairs)
+// with the result (1, 0.5 or 0) and the evaluation from White's side, and
+// the non-zero coefficients of trace_evaluation(). Returns a process exit code.
+int run_evaltrace(const EvalTraceOptions& options);
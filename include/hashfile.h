@@ -0,0 +1,43 @@
+#pragma once
+
+#include "tt.h"
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+// Persistent hash file: search results (best move, score, depth, bound)
+// keyed by the Zobrist key, kept in a memory-mapped file so they outlive
+// the process. Searches look up the root and the positions near it before
+// searching them, and write the root and its principal variation back when
+// they finish, so an opening or game position is searched once across
+// restarts and across engine processes.
+//
+// Every slot is two words with the key stored xor-ed with the data, as in
+// the transposition table, so processes sharing the file never read a torn
+// entry. A bucket keeps its deepest results: a shallower result never
+// replaces a deeper one. A file that cannot be written is used read-only.
+// Entries come from whatever evaluation searched them; keep one file per
+// set of weights or network.
+
+struct HashFileStats {
+    uint64_t probes = 0;
+    uint64_t hits = 0;
+    uint64_t stores = 0;
+};
+
+// Map `path`, creating it with room for `mb` megabytes of entries if it
+// does not exist (an existing file keeps its size). Replaces any file
+// opened before. Returns false with a message in `error`.
+bool hashfile_open(const std::string& path, size_t mb, std::string& error);
+
+// Unmap the file. Must not overlap with searches, like hashfile_open.
+void hashfile_close();
+
+bool hashfile_enabled();
+bool hashfile_writable();
+
+bool hashfile_probe(uint64_t key, TTEntry& entry);
+void hashfile_store(uint64_t key, PackedMove move, int score, int depth, TTBound bound);
+
+// Counters since the file was opened
+HashFileStats hashfile_stats();
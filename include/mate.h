@@ -0,0 +1,86 @@
+#pragma once
+
+#include "board.h"
+
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <functional>
+#include <vector>
+
+// Mate solver: depth-first proof-number search (df-pn) for a forced mate
+// in at most N moves by the side to move (the attacker).
+//
+// Every node has a proof number (how many leaves must still be shown to be
+// mates) and a disproof number; df-pn expands the most-proving node while
+// both stay below thresholds, so it works through a single path and keeps
+// its numbers in its own hash table instead of a tree. The table is keyed
+// by the position, the attacking side and the number of attacker moves
+// left, so a proof of "mate in 3 from here" is never mistaken for "mate in
+// 2", and entries stay valid from one solve() to the next.
+//
+// For each bound n = 1, 2, ... the attacker first tries checking moves only
+// (the defender then only has evasions, which keeps the tree narrow), then
+// all moves. The first proven bound is the mate distance, and the line is
+// read back from the table: the attacker plays a move proven to mate in
+// the rest, the defender the reply that delays mate longest.
+const int MAX_MATE_MOVES = 50;
+
+struct MateLimits {
+    int max_moves = 5;          // prove mates in at most this many moves
+    uint64_t nodes = 0;         // 0 for no limit
+    int time_ms = 0;            // 0 for no limit
+    const std::atomic<bool>* stop = nullptr;  // set to abort from another thread
+    // Called when a bound is disproven: no mate in `moves` moves
+    std::function<void(int moves, uint64_t nodes, int time_ms)> on_bound;
+};
+
+struct MateResult {
+    bool found = false;
+    bool aborted = false;       // a limit stopped the search before it finished
+    bool checks_only = false;   // proven with checking moves only
+    int moves = 0;              // proven distance: mate in this many moves
+    std::vector<Move> pv;       // the mating line, attacker's move first
+    uint64_t nodes = 0;
+    int time_ms = 0;
+};
+
+class MateSolver {
+public:
+    explicit MateSolver(size_t hash_mb = 16);
+
+    void resize(size_t mb);
+    void clear();
+    MateResult solve(const Board& board, const MateLimits& limits);
+
+private:
+    struct Entry {
+        uint64_t key = 0;
+        uint32_t phi = 0;       // proof number for the side to move
+        uint32_t delta = 0;     // and its disproof number
+        uint32_t work = 0;      // nodes spent below, for replacement
+    };
+    static const int BUCKET = 4;
+
+    std::vector<Entry> table_;
+    size_t mask_ = 0;
+
+    Board board_;
+    Color attacker_ = WHITE;
+    bool checks_only_ = false;
+    bool aborted_ = false;
+    MateLimits limits_;
+    uint64_t nodes_ = 0;
+    int64_t start_ms_ = 0;
+
+    uint64_t node_key(uint64_t position_key, int remaining) const;
+    bool lookup(uint64_t key, uint32_t& phi, uint32_t& delta) const;
+    void store(uint64_t key, uint32_t phi, uint32_t delta, uint64_t work);
+    bool out_of_limits();
+    void generate(int remaining, MoveList& moves);
+    void mid(int remaining, uint32_t th_phi, uint32_t th_delta, uint32_t& phi, uint32_t& delta);
+    int prove(int remaining);
+    PackedMove losing_child(const MoveList& moves, int remaining);
+    void extract_pv(int moves, std::vector<Move>& pv);
+    int elapsed_ms() const;
+};
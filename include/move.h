@@ -1,5 +1,6 @@
 #pragma once
 #include "types.h"
+#include <cstdint>
 
 struct Move {
     int from;
@@ -8,6 +9,69 @@ struct Move {
     bool is_en_passant_capture;
 
     Move() : from(-1), to(-1), promotion(EMPTY), is_en_passant_capture(false) {}
-    Move(int f, int t, Piece promo = EMPTY, bool is_ep_cap = false) 
+    Move(int f, int t, Piece promo = EMPTY, bool is_ep_cap = false)
         : from(f), to(t), promotion(promo), is_en_passant_capture(is_ep_cap) {}
+};
+
+// Compact 16-bit move: bits 0-5 from, bits 6-11 to, bits 12-14 promotion
+// type (0 none, 1 knight, 2 bishop, 3 rook, 4 queen), bit 15 en passant.
+// The promotion colour follows from the destination rank.
+struct PackedMove {
+    uint16_t data;
+
+    PackedMove() : data(0) {}
+    PackedMove(int from, int to, Piece promo = EMPTY, bool is_ep_cap = false)
+        : data(uint16_t(from | (to << 6) | (promo_code(promo) << 12) | (is_ep_cap ? 0x8000 : 0))) {}
+    explicit PackedMove(const Move& m)
+        : PackedMove(m.from < 0 ? 0 : m.from, m.to < 0 ? 0 : m.to, m.promotion, m.is_en_passant_capture) {}
+
+    int from() const { return data & 0x3F; }
+    int to() const { return (data >> 6) & 0x3F; }
+    bool is_en_passant_capture() const { return data & 0x8000; }
+    bool is_null() const { return data == 0; }
+
+    Piece promotion() const {
+        static const Piece white_promos[5] = {EMPTY, WN, WB, WR, WQ};
+        static const Piece black_promos[5] = {EMPTY, BN, BB, BR, BQ};
+        int code = (data >> 12) & 0x7;
+        return to() >= 56 ? white_promos[code] : black_promos[code];
+    }
+
+    Move to_move() const {
+        if (is_null()) return Move();
+        return Move(from(), to(), promotion(), is_en_passant_capture());
+    }
+
+    bool operator==(PackedMove other) const { return data == other.data; }
+    bool operator!=(PackedMove other) const { return data != other.data; }
+
+private:
+    static int promo_code(Piece p) {
+        switch (p) {
+            case WN: case BN: return 1;
+            case WB: case BB: return 2;
+            case WR: case BR: return 3;
+            case WQ: case BQ: return 4;
+            default: return 0;
+        }
+    }
+};
+
+// Fixed-capacity move list used by the generator and the search
+struct MoveList {
+    static const int CAPACITY = 256;
+    PackedMove moves[CAPACITY];
+    int count = 0;
+
+    void add(int from, int to, Piece promo = EMPTY) { moves[count++] = PackedMove(from, to, promo); }
+    void push_back(PackedMove m) { moves[count++] = m; }
+    int size() const { return count; }
+    bool empty() const { return count == 0; }
+    void clear() { count = 0; }
+    PackedMove& operator[](int i) { return moves[i]; }
+    PackedMove operator[](int i) const { return moves[i]; }
+    PackedMove* begin() { return moves; }
+    PackedMove* end() { return moves + count; }
+    const PackedMove* begin() const { return moves; }
+    const PackedMove* end() const { return moves + count; }
 };
\ No newline at end of file
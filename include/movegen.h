@@ -1,6 +1,7 @@
 #pragma once
 
 #include "board.h"
+#include <cstdint>
 #include <vector>
 
 class MoveGenerator {
@@ -11,14 +12,23 @@ public:
     std::vector<Move> generate_pseudo_legal_moves();
     std::vector<Move> generate_pseudo_legal_attack_moves();
 
+    // Packed, allocation-free variants used by the search
+    void generate_legal_moves(MoveList& moves);
+    void generate_pseudo_legal_moves(MoveList& moves);
+
 private:
     Board& board;
 
-    void generate_pawn_moves(std::vector<Move>& moves);
-    void generate_knight_moves(std::vector<Move>& moves);
-    void generate_bishop_moves(std::vector<Move>& moves);
-    void generate_rook_moves(std::vector<Move>& moves);
-    void generate_queen_moves(std::vector<Move>& moves);
-    void generate_king_moves(std::vector<Move>& moves);
-    void generate_castling_moves(std::vector<Move>& moves);
+    void generate_pawn_moves(MoveList& moves);
+    void generate_knight_moves(MoveList& moves);
+    void generate_slider_moves(int sq, const int rays[4][7], MoveList& moves);
+    void generate_bishop_moves(MoveList& moves);
+    void generate_rook_moves(MoveList& moves);
+    void generate_queen_moves(MoveList& moves);
+    void generate_king_moves(MoveList& moves);
+    void generate_castling_moves(MoveList& moves);
 };
+
+// Number of leaf positions of the legal move tree `depth` plies deep
+// (perft), for checking the generator against known counts
+uint64_t perft(Board& board, int depth);
@@ -0,0 +1,45 @@
+#pragma once
+
+#include "board.h"
+
+#include <string>
+
+// Efficiently updatable neural network (NNUE) evaluation.
+//
+// Inputs are HalfKP features, one set per side ("perspective"): every
+// non-king piece gives the feature (own king square, piece kind, square),
+// where the kind is pawn..queen of the perspective's side (0-4) or of the
+// other side (5-9), and Black's squares are mirrored by rank. That is
+// 64 * 10 * 64 = 40960 features. The first layer sums the rows of the
+// active features into NNUE_HIDDEN int16 values per perspective (the
+// accumulator). Both accumulators are clipped to [0, QA], the side to
+// move's first, and a single int16 output neuron gives the score.
+//
+// make_move records the changed pieces of every move, and the accumulators
+// are updated from the previous position's by adding and removing those
+// few rows. Only a move of the perspective's own king changes every
+// feature and refreshes that accumulator from scratch.
+//
+// Network file, little-endian:
+//   char[4] "TFNN", uint32 version (1), uint32 features, uint32 hidden,
+//   int32 QA, int32 QB, int32 scale,
+//   int16 feature weights [features][hidden], int16 biases [hidden],
+//   int16 output weights [2 * hidden] (side to move first), int32 output bias
+// score (centipawns) = (output bias + sum of clipped values * weights) * scale / (QA * QB)
+// nnue_trainer.py writes such files.
+
+const int NNUE_FEATURES = 64 * 10 * 64;
+const int NNUE_HIDDEN = 256;
+
+// Load a network; it replaces the previous one. Must not overlap with
+// evaluations on other threads.
+bool nnue_load(const std::string& path, std::string& error);
+bool nnue_loaded();
+
+// Score of the loaded network, relative to the side to move
+int nnue_evaluate(const Board& board);
+
+// Instruction set of the accumulator and output code: "AVX2", "SSE2" or
+// "scalar". Chosen at compile time (-mavx2 or -march=native for AVX2;
+// -DNNUE_NO_SIMD forces the scalar code).
+const char* nnue_simd();
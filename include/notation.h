@@ -0,0 +1,21 @@
+#pragma once
+
+#include "board.h"
+#include "move.h"
+#include <string>
+
+// Convert 0–63 square index to UCI coordinate ("e4")
+std::string square_to_coord(int sq);
+
+// Convert Move to UCI string ("e7e8q"), "0000" for a null move
+std::string move_to_uci(const Move& m);
+
+// Find the legal move matching a UCI string. Returns false if there is none.
+bool move_from_uci(Board& board, const std::string& uci, Move& move);
+
+// Standard algebraic notation ("Nbd7", "exd6", "e8=Q+", "O-O") for a legal move
+std::string move_to_san(Board& board, const Move& move);
+
+// Find the legal move written in SAN (check marks and "!?" annotations are
+// optional). Returns false if there is none.
+bool move_from_san(Board& board, const std::string& san, Move& move);
@@ -0,0 +1,35 @@
+#pragma once
+
+#include <istream>
+#include <ostream>
+#include <string>
+#include <utility>
+#include <vector>
+
+// One move of a game's main line
+struct PgnMove {
+    std::string san;
+    std::string nag;           // "!", "?", "!!", "??", "!?" or "?!", empty for none
+    std::string comment;       // text of the comment after the move, empty for none
+};
+
+struct PgnGame {
+    std::vector<std::pair<std::string, std::string>> tags;  // in file order
+    std::string comment;       // before the first move
+    std::vector<PgnMove> moves;
+    std::string result = "*";
+
+    // Value of a tag, empty if it is missing
+    std::string tag(const std::string& name) const;
+    // Replace a tag's value, or add the tag at the end
+    void set_tag(const std::string& name, const std::string& value);
+    // The starting position: the FEN tag, or the standard start
+    std::string start_fen() const;
+};
+
+// Read every game of a PGN file. Comments on the main line and the glyphs
+// $1 to $6 are kept; variations and other NAGs are dropped.
+std::vector<PgnGame> read_pgn(std::istream& in);
+
+// Write a game in export format, with lines of at most 80 characters
+void write_pgn(std::ostream& out, const PgnGame& game);
@@ -1,11 +1,113 @@
 #pragma once
 
 #include "board.h"
+#include "eval.h"
 #include "move.h"
+#include "tt.h"
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <functional>
 
-int alpha_beta(Board& board, int depth, int alpha, int beta);
+// Counters gathered by the last call to find_best_move
+struct SearchStats {
+    uint64_t nodes = 0;             // alpha_beta nodes
+    uint64_t qnodes = 0;            // quiescence nodes
+    uint64_t eval_cache_probes = 0;
+    uint64_t eval_cache_hits = 0;
+    int time_ms = 0;
+    int depth = 0;                  // last fully searched depth
+    int score = 0;                  // score of that iteration, side to move relative
+
+    double eval_cache_hit_rate() const {
+        return eval_cache_probes ? double(eval_cache_hits) / eval_cache_probes : 0.0;
+    }
+};
+
+static const int MAX_PLY = 64;
+static const int MAX_MULTIPV = 32;
+
+// One ranked root move with its exact score and principal variation
+struct SearchLine {
+    int score = 0;                  // side to move relative
+    PackedMove pv[MAX_PLY];         // starts with the root move
+    int pv_length = 0;
+};
+
+// Progress reported after each completed iteration, once per line
+struct SearchIteration {
+    int depth;
+    int multipv;                    // 1 for the best line, 2 for the next...
+    int score;                      // side to move relative
+    Move best_move;                 // first move of this line
+    uint64_t nodes;                 // nodes + qnodes so far
+    int time_ms;
+    PackedMove pv[MAX_PLY];         // principal variation, starting with best_move
+    int pv_length;
+};
+
+// Mate scores are INF minus the distance to mate in plies
+static const int INF = 100000;
+
+inline bool is_mate_score(int score) {
+    return score > INF / 2 || score < -INF / 2;
+}
+
+// Moves to mate for a mate score, negative when the side to move is mated
+inline int mate_in_moves(int score) {
+    return score > 0 ? (INF - score + 1) / 2 : -(INF + score + 1) / 2;
+}
+
+// Everything one search needs besides the board. Searches on different
+// contexts can run in parallel on different threads.
+struct SearchContext {
+    PackedMove killer_moves[MAX_PLY][2];
+    int history_heuristic[64][64];
+    PackedMove pv_table[MAX_PLY][MAX_PLY];  // triangular PV, row = ply
+    int pv_table_length[MAX_PLY];
+    std::chrono::steady_clock::time_point start_time;
+    std::chrono::steady_clock::time_point limit_start;  // time_limit_ms counts from here
+    int time_limit_ms = 20000;
+    uint64_t node_limit = 0;        // nodes + qnodes, 0 for no limit
+    bool time_up_flag = false;
+    std::atomic<bool> stop_requested{false};
+    // While set, the time and node limits are ignored (pondering on the
+    // opponent's time). Clearing it applies them: the time limit counts from
+    // then on, the node limit includes the nodes searched while pondering.
+    std::atomic<bool> pondering{false};
+    TranspositionTable* tt = nullptr;       // optional, kept between searches
+    // Root moves to rank with exact scores (1 to MAX_MULTIPV). Every line
+    // is one more pass over the root moves that skips the moves already
+    // found, sharing the transposition table with the earlier passes.
+    int multipv = 1;
+    SearchStats stats;
+    EvalCacheStats eval_cache;      // this search's cache counters, copied into stats
+    SearchLine lines[MAX_MULTIPV];  // lines of the last completed iteration, best first
+    int line_count = 0;
+    std::function<void(const SearchIteration&)> on_iteration;  // optional
+
+    // Make a running search return its best move so far (thread-safe). A
+    // stop before the search starts makes it return at once; clear
+    // stop_requested to search with the context again.
+    void stop() { stop_requested = true; }
+};
+
+int alpha_beta(SearchContext& ctx, Board& board, int depth, int alpha, int beta, int ply);
+
+// Search with an explicit context
+Move find_best_move(SearchContext& ctx, Board& board, int max_depth, int time_ms);
+
+// The overloads below share one global context and are not reentrant.
 // 1) depth only, uses a default time limit
 Move find_best_move(Board& board, int max_depth);
 
 // 2) depth + time limit in milliseconds
-Move find_best_move(Board& board, int max_depth, int time_ms);
\ No newline at end of file
+Move find_best_move(Board& board, int max_depth, int time_ms);
+
+// Ask a running find_best_move to return its best move so far. Safe to call
+// from another thread. A stop before the search starts makes it return at
+// once, until clear_search_stop().
+void stop_search();
+void clear_search_stop();
+
+const SearchStats& last_search_stats();
\ No newline at end of file
@@ -0,0 +1,24 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+struct ServerOptions {
+    std::string socket_path;   // Unix domain socket; empty to listen on TCP
+    int port = 7878;           // localhost TCP port, when there is no socket path
+    int workers = 1;           // searches running at the same time
+    size_t hash_mb = 256;      // transposition table shared by all sessions
+    uint64_t max_nodes = 0;    // cap on every search, 0 for none
+    int max_movetime_ms = 10000;  // cap on every search, 0 for none
+};
+
+// Serve UCI sessions to local clients. Every connection is its own session
+// with its own position and MultiPV setting; its searches wait in one queue
+// for a fixed pool of worker threads, which share one transposition table,
+// so every client starts from what the others have searched. Each search
+// is held to the server's node and time caps. Besides UCI, a session
+// understands "metrics", answered with one line of queue and latency
+// figures. Runs until the process is killed; returns an exit code if the
+// server cannot start.
+int run_server(const ServerOptions& options);
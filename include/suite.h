@@ -0,0 +1,34 @@
+#pragma once
+
+#include <cstdint>
+#include <string>
+
+struct SuiteOptions {
+    std::string input;         // EPD file with bm and/or am operations
+    std::string output;        // per-position JSONL results, empty for none
+    std::string baseline;      // results of an earlier run to compare with
+    int depth = 0;             // 0 for no depth limit
+    uint64_t nodes = 0;        // 0 for no node limit
+    int movetime_ms = 0;       // 0 for no time limit
+    int threads = 1;
+};
+
+// Run a tactical test suite and print the solve rate and time/nodes to
+// solution, plus the differences to the baseline if one is given.
+// Returns a process exit code.
+int run_suite(const SuiteOptions& options);
+
+struct MateSuiteOptions {
+    std::string input;         // EPD file with dm operations ("mate in N")
+    std::string output;        // per-position JSONL results, empty for none
+    int max_moves = 0;         // mate bound; 0 to use each position's dm
+    uint64_t nodes = 0;        // 0 for no node limit
+    int movetime_ms = 0;       // 0 for no time limit
+    int hash_mb = 64;          // mate solver table per thread
+    int threads = 1;
+};
+
+// Run a mate puzzle suite through the mate solver and print the solve rate
+// and times, overall and per mate distance. A position is solved when a
+// mate no longer than its dm is proven. Returns a process exit code.
+int run_mate_suite(const MateSuiteOptions& options);
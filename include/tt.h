@@ -0,0 +1,56 @@
+#pragma once
+
+#include "move.h"
+
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+
+enum TTBound : uint8_t {
+    TT_NONE = 0,
+    TT_UPPER = 1,                   // score <= stored score (failed low)
+    TT_LOWER = 2,                   // score >= stored score (failed high)
+    TT_EXACT = 3,
+};
+
+struct TTEntry {
+    PackedMove move;
+    int score = 0;                  // mate scores relative to the stored position
+    int depth = 0;
+    TTBound bound = TT_NONE;
+};
+
+// Transposition table keyed by the Zobrist key. It outlives single
+// searches, so the next search (a new move, a ponder hit, the next MultiPV
+// line) starts from what the previous one learned. Every slot is two words
+// with the key stored xor-ed with the data, so concurrent probes and stores
+// from several threads never return a torn entry.
+// resize() and clear() must not overlap with searches.
+class TranspositionTable {
+public:
+    explicit TranspositionTable(size_t mb = 16) { resize(mb); }
+
+    void resize(size_t mb);
+    void clear();
+    bool probe(uint64_t key, TTEntry& entry) const;
+    void store(uint64_t key, PackedMove move, int score, int depth, TTBound bound);
+
+    size_t size_mb() const { return mb_; }
+    // Per mille of a sample of slots that are in use, as UCI's "hashfull"
+    int hashfull() const;
+
+private:
+    struct Slot {
+        std::atomic<uint64_t> check{0};     // key ^ data
+        std::atomic<uint64_t> data{0};
+    };
+    std::unique_ptr<Slot[]> slots_;
+    size_t mask_ = 0;
+    size_t mb_ = 0;
+};
+
+// Mate scores count plies from the root; the table stores them counted from
+// the position itself so they stay right when it is reached at another ply.
+int score_to_tt(int score, int ply);
+int score_from_tt(int score, int ply);
@@ -0,0 +1,38 @@
+#pragma once
+
+#include "board.h"
+#include "search.h"
+#include <cstdint>
+#include <sstream>
+#include <string>
+
+// Speak the UCI protocol on stdin/stdout until "quit" or end of input.
+// Searches run on a background thread so "stop" and "isready" are answered
+// while the engine thinks. Returns a process exit code.
+int run_uci();
+
+// The limits of a "go" command
+struct GoLimits {
+    int depth = MAX_PLY - 1;
+    uint64_t nodes = 0;         // 0 for no limit
+    int time_ms = 0;            // 0 for no limit: movetime, or a share of the clock
+    int mate = 0;               // "go mate N"
+    bool ponder = false;
+    bool infinite = false;
+};
+
+// Read the arguments of "go" for the side to move `us`
+GoLimits parse_go(std::istringstream& args, Color us);
+
+// Set up the board from the arguments of "position". Returns false with
+// the offending move in `illegal` if a move does not apply.
+bool parse_position(std::istringstream& args, Board& board, std::string& illegal);
+
+// "cp 35" or "mate -2"
+std::string score_to_uci(int score);
+
+// The "info depth ..." line for one search iteration
+std::string iteration_to_uci(const SearchIteration& it, bool multipv, int hashfull);
+
+// The "bestmove" line, with the reply from the search's PV to ponder on
+std::string bestmove_to_uci(const SearchContext& ctx, const Move& best);
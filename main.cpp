@@ -3,36 +3,326 @@
 #include "move.h"
 #include "movegen.h"
 #include "eval.h"
+#include "bitbase.h"
+#include "notation.h"
+#include "analyse.h"
+#include "annotate.h"
+#include "suite.h"
+#include "evaltrace.h"
+#include "bench.h"
+#include "nnue.h"
+#include "hashfile.h"
+#include "uci.h"
+#include "server.h"
+#include <algorithm>
 #include <iostream>
 #include <string>
 #include <vector>
 #include <sstream>
+#include <filesystem>
 
-// Convert 0–63 square index to UCI coordinate
-static std::string square_to_coord(int sq) {
-    int file = sq % 8;
-    int rank = sq / 8;
-    return std::string{char('a' + file), char('1' + rank)};
+// Bitbases live in a "bitbases" folder next to the executable
+static std::string default_bitbase_dir(const char* argv0) {
+    std::filesystem::path dir = std::filesystem::path(argv0).parent_path();
+    return (dir / "bitbases").string();
 }
 
-// Convert Move to UCI string
-static std::string move_to_uci(const Move& m) {
-    std::string u = square_to_coord(m.from) + square_to_coord(m.to);
-    if (m.promotion != EMPTY) {
-        char promo_char = 'q';
-        switch (m.promotion) {
-            case WN: case BN: promo_char = 'n'; break;
-            case WB: case BB: promo_char = 'b'; break;
-            case WR: case BR: promo_char = 'r'; break;
-            case WQ: case BQ: promo_char = 'q'; break;
-            default: break;
+// Evaluation weights are read from "eval.weights" next to the executable
+// when it exists; otherwise the built-in ones are used
+static bool load_default_weights(const char* argv0) {
+    std::filesystem::path path = std::filesystem::path(argv0).parent_path() / "eval.weights";
+    std::error_code ec;
+    if (!std::filesystem::exists(path, ec)) return true;
+    std::string error;
+    if (load_eval_weights(path.string(), error)) return true;
+    std::cerr << "Cannot load " << path.string() << ": " << error << "\n";
+    return false;
+}
+
+// "--weights <file>" anywhere in the arguments replaces the default weights
+static bool load_weights_option(int argc, char* argv[]) {
+    for (int i = 1; i + 1 < argc; ++i) {
+        if (std::string(argv[i]) != "--weights") continue;
+        std::string error;
+        if (load_eval_weights(argv[i + 1], error)) return true;
+        std::cerr << "Cannot load " << argv[i + 1] << ": " << error << "\n";
+        return false;
+    }
+    return true;
+}
+
+// "--nnue <file>" anywhere in the arguments loads a network and evaluates with it
+static bool load_nnue_option(int argc, char* argv[]) {
+    for (int i = 1; i + 1 < argc; ++i) {
+        if (std::string(argv[i]) != "--nnue") continue;
+        std::string error;
+        if (nnue_load(argv[i + 1], error)) return set_eval_mode(EVAL_NNUE);
+        std::cerr << "Cannot load " << argv[i + 1] << ": " << error << "\n";
+        return false;
+    }
+    return true;
+}
+
+// "--hash-file <file>" anywhere in the arguments keeps search results in a
+// persistent hash file, created with "--hash-file-mb" megabytes if it is new
+static bool open_hashfile_option(int argc, char* argv[]) {
+    size_t mb = 256;
+    for (int i = 1; i + 1 < argc; ++i) {
+        if (std::string(argv[i]) != "--hash-file-mb") continue;
+        try {
+            mb = std::stoul(argv[i + 1]);
+        } catch (...) {
+            std::cerr << "Invalid value for --hash-file-mb\n";
+            return false;
         }
-        u += promo_char;
     }
-    return u;
+    for (int i = 1; i + 1 < argc; ++i) {
+        if (std::string(argv[i]) != "--hash-file") continue;
+        std::string error;
+        if (hashfile_open(argv[i + 1], mb, error)) return true;
+        std::cerr << "Cannot open hash file: " << error << "\n";
+        return false;
+    }
+    return true;
+}
+
+// Options every mode accepts, read before the mode's own
+static bool is_global_option(const std::string& arg) {
+    return arg == "--weights" || arg == "--nnue" || arg == "--hash-file" || arg == "--hash-file-mb";
 }
 
 int main(int argc, char* argv[]) {
+    if (!load_default_weights(argv[0]) || !load_weights_option(argc, argv) || !load_nnue_option(argc, argv) ||
+        !open_hashfile_option(argc, argv))
+        return 1;
+
+    if (argc >= 2 && std::string(argv[1]) == "genbb") {
+        std::string dir = argc >= 3 ? argv[2] : default_bitbase_dir(argv[0]);
+        std::error_code ec;
+        std::filesystem::create_directories(dir, ec);
+        return bitbase_generate(dir) ? 0 : 1;
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "uci") {
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_uci();
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "serve") {
+        ServerOptions options;
+        for (int i = 2; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            try {
+                if (arg == "--socket" && has_value) options.socket_path = argv[++i];
+                else if (arg == "--port" && has_value) options.port = std::stoi(argv[++i]);
+                else if (arg == "--workers" && has_value) options.workers = std::stoi(argv[++i]);
+                else if (arg == "--hash" && has_value) options.hash_mb = std::stoul(argv[++i]);
+                else if (arg == "--max-nodes" && has_value) options.max_nodes = std::stoull(argv[++i]);
+                else if (arg == "--max-movetime" && has_value) options.max_movetime_ms = std::stoi(argv[++i]);
+                else if (arg == "--eval-cache-mb" && has_value) set_eval_cache_size(std::stoul(argv[++i]));
+                else if (is_global_option(arg) && has_value) ++i;
+                else {
+                    std::cerr << "Unknown option: " << arg << "\n";
+                    return 1;
+                }
+            } catch (...) {
+                std::cerr << "Invalid value for " << arg << "\n";
+                return 1;
+            }
+        }
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_server(options);
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "analyse") {
+        AnalyseOptions options;
+        for (int i = 2; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            try {
+                if (arg == "--depth" && has_value) options.depth = std::stoi(argv[++i]);
+                else if (arg == "--nodes" && has_value) options.nodes = std::stoull(argv[++i]);
+                else if (arg == "--movetime" && has_value) options.movetime_ms = std::stoi(argv[++i]);
+                else if (arg == "--threads" && has_value) options.threads = std::stoi(argv[++i]);
+                else if (arg == "--multipv" && has_value)
+                    options.multipv = std::max(1, std::min(std::stoi(argv[++i]), MAX_MULTIPV));
+                else if (arg == "--hash" && has_value) options.hash_mb = std::stoul(argv[++i]);
+                else if (arg == "--output" && has_value) options.output = argv[++i];
+                else if (arg == "--format" && has_value) options.epd_output = std::string(argv[++i]) == "epd";
+                else if (arg == "--eval-cache-mb" && has_value) set_eval_cache_size(std::stoul(argv[++i]));
+                else if (arg == "--resume") options.resume = true;
+                else if (is_global_option(arg) && has_value) ++i;
+                else if (arg[0] != '-' || arg == "-") options.input = arg;
+                else {
+                    std::cerr << "Unknown option: " << arg << "\n";
+                    return 1;
+                }
+            } catch (...) {
+                std::cerr << "Invalid value for " << arg << "\n";
+                return 1;
+            }
+        }
+        // Without any limit, search to the usual depth
+        if (!options.depth && !options.nodes && !options.movetime_ms) options.depth = 5;
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_analyse(options);
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "annotate") {
+        AnnotateOptions options;
+        for (int i = 2; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            try {
+                if (arg == "--depth" && has_value) options.depth = std::stoi(argv[++i]);
+                else if (arg == "--nodes" && has_value) options.nodes = std::stoull(argv[++i]);
+                else if (arg == "--movetime" && has_value) options.movetime_ms = std::stoi(argv[++i]);
+                else if (arg == "--threads" && has_value) options.threads = std::stoi(argv[++i]);
+                else if (arg == "--hash" && has_value) options.hash_mb = std::stoul(argv[++i]);
+                else if (arg == "--mistake" && has_value) options.mistake_cp = std::stoi(argv[++i]);
+                else if (arg == "--blunder" && has_value) options.blunder_cp = std::stoi(argv[++i]);
+                else if (arg == "--output" && has_value) options.output = argv[++i];
+                else if (arg == "--eval-cache-mb" && has_value) set_eval_cache_size(std::stoul(argv[++i]));
+                else if (is_global_option(arg) && has_value) ++i;
+                else if (arg[0] != '-' || arg == "-") options.input = arg;
+                else {
+                    std::cerr << "Unknown option: " << arg << "\n";
+                    return 1;
+                }
+            } catch (...) {
+                std::cerr << "Invalid value for " << arg << "\n";
+                return 1;
+            }
+        }
+        // Without any limit, search every position to a fixed depth
+        if (!options.depth && !options.nodes && !options.movetime_ms) options.depth = 6;
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_annotate(options);
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "evaltrace") {
+        EvalTraceOptions options;
+        for (int i = 2; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            if (arg == "--output" && has_value) options.output = argv[++i];
+            else if (is_global_option(arg) && has_value) ++i;
+            else if (arg[0] != '-' || arg == "-") options.input = arg;
+            else {
+                std::cerr << "Unknown option: " << arg << "\n";
+                return 1;
+            }
+        }
+        // Traces describe the handcrafted evaluation
+        set_eval_mode(EVAL_CLASSIC);
+        return run_evaltrace(options);
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "bench") {
+        BenchOptions options;
+        options.nnue = nnue_loaded();
+        if (argc >= 3 && argv[2][0] != '-') {
+            try {
+                options.depth = std::stoi(argv[2]);
+            } catch (...) {
+                std::cerr << "Invalid depth: " << argv[2] << "\n";
+                return 1;
+            }
+        }
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_bench(options);
+    }
+
+    if (argc >= 2 && std::string(argv[1]) == "weights") {
+        std::string path = argc >= 3 && std::string(argv[2]) != "--weights" ? argv[2] : "-";
+        if (save_eval_weights(path)) return 0;
+        std::cerr << "Cannot write " << path << "\n";
+        return 1;
+    }
+
+    if (argc >= 3 && std::string(argv[1]) == "suite") {
+        SuiteOptions options;
+        options.input = argv[2];
+        for (int i = 3; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            try {
+                if (arg == "--depth" && has_value) options.depth = std::stoi(argv[++i]);
+                else if (arg == "--nodes" && has_value) options.nodes = std::stoull(argv[++i]);
+                else if (arg == "--movetime" && has_value) options.movetime_ms = std::stoi(argv[++i]);
+                else if (arg == "--threads" && has_value) options.threads = std::stoi(argv[++i]);
+                else if (arg == "--output" && has_value) options.output = argv[++i];
+                else if (arg == "--baseline" && has_value) options.baseline = argv[++i];
+                else if (is_global_option(arg) && has_value) ++i;
+                else if (arg == "--eval-cache-mb" && has_value) set_eval_cache_size(std::stoul(argv[++i]));
+                else {
+                    std::cerr << "Unknown option: " << arg << "\n";
+                    return 1;
+                }
+            } catch (...) {
+                std::cerr << "Invalid value for " << arg << "\n";
+                return 1;
+            }
+        }
+        // Test suites are usually run at a fixed time per position
+        if (!options.depth && !options.nodes && !options.movetime_ms) options.movetime_ms = 1000;
+        bitbase_init(default_bitbase_dir(argv[0]));
+        return run_suite(options);
+    }
+
+    if (argc >= 4 && std::string(argv[1]) == "perft") {
+        // Move counts per root move ("divide"), to compare with another generator
+        Board board;
+        board.load_fen(argv[2]);
+        int depth;
+        try {
+            depth = std::stoi(argv[3]);
+        } catch (...) {
+            std::cerr << "Invalid depth: " << argv[3] << "\n";
+            return 1;
+        }
+        MoveList moves;
+        MoveGenerator(board).generate_legal_moves(moves);
+        uint64_t total = 0;
+        for (PackedMove m : moves) {
+            Piece captured, moved;
+            board.make_move(m, captured, moved);
+            uint64_t nodes = perft(board, depth - 1);
+            board.unmake_move(m, captured, moved);
+            std::cout << move_to_uci(m.to_move()) << ": " << nodes << "\n";
+            total += nodes;
+        }
+        std::cout << "\nNodes: " << (depth > 0 ? total : 1) << "\n";
+        return 0;
+    }
+
+    if (argc >= 3 && std::string(argv[1]) == "mate") {
+        MateSuiteOptions options;
+        options.input = argv[2];
+        for (int i = 3; i < argc; ++i) {
+            std::string arg = argv[i];
+            bool has_value = i + 1 < argc;
+            try {
+                if (arg == "--moves" && has_value) options.max_moves = std::stoi(argv[++i]);
+                else if (arg == "--nodes" && has_value) options.nodes = std::stoull(argv[++i]);
+                else if (arg == "--movetime" && has_value) options.movetime_ms = std::stoi(argv[++i]);
+                else if (arg == "--threads" && has_value) options.threads = std::stoi(argv[++i]);
+                else if (arg == "--hash" && has_value) options.hash_mb = std::stoi(argv[++i]);
+                else if (arg == "--output" && has_value) options.output = argv[++i];
+                else if (is_global_option(arg) && has_value) ++i;
+                else {
+                    std::cerr << "Unknown option: " << arg << "\n";
+                    return 1;
+                }
+            } catch (...) {
+                std::cerr << "Invalid value for " << arg << "\n";
+                return 1;
+            }
+        }
+        return run_mate_suite(options);
+    }
+
     if (argc >= 2) {
         std::string fen = argv[1];
         int depth = 1;
@@ -43,6 +333,18 @@ int main(int argc, char* argv[]) {
                 depth = 5;
             }
         }
+        // Optional: --eval-cache-mb <size>
+        for (int i = 3; i + 1 < argc; ++i) {
+            if (std::string(argv[i]) == "--eval-cache-mb") {
+                try {
+                    set_eval_cache_size(std::stoul(argv[i + 1]));
+                } catch (...) {
+                    std::cerr << "Invalid eval cache size: " << argv[i + 1] << "\n";
+                }
+            }
+        }
+
+        bitbase_init(default_bitbase_dir(argv[0]));
 
         Board board;
         board.load_fen(fen);
@@ -59,6 +361,10 @@ int main(int argc, char* argv[]) {
         // Find best move
         Move best = find_best_move(board, depth);
         std::cerr << "Best move: " << move_to_uci(best) << "\n";
+        const SearchStats& stats = last_search_stats();
+        std::cerr << "Nodes: " << stats.nodes << " (+" << stats.qnodes << " quiescence) in "
+                  << stats.time_ms << " ms, eval cache hits: " << stats.eval_cache_hits << "/"
+                  << stats.eval_cache_probes << " (" << int(stats.eval_cache_hit_rate() * 100) << "%)\n";
 
         // Apply the best move to get evaluation after the move
         Piece captured, moved;
@@ -74,6 +380,25 @@ int main(int argc, char* argv[]) {
         return 0;
     }
 
-    std::cerr << "Usage: chess.exe \"<FEN>\" <depth>\n";
+    std::cerr << "Usage: chess.exe \"<FEN>\" <depth> [--eval-cache-mb <size>] [--weights file] [--nnue network]\n";
+    std::cerr << "       chess.exe uci\n";
+    std::cerr << "       chess.exe genbb [bitbase_dir]\n";
+    std::cerr << "       chess.exe serve [--socket path | --port N] [--workers N] [--hash MB]\n"
+              << "                       [--max-nodes N] [--max-movetime ms]\n";
+    std::cerr << "       chess.exe analyse [file|-] [--depth N] [--nodes N] [--movetime ms] [--threads N]\n"
+              << "                         [--multipv N] [--hash MB] [--format jsonl|epd] [--output file] [--resume]\n";
+    std::cerr << "       chess.exe annotate [games.pgn|-] [--depth N] [--nodes N] [--movetime ms] [--threads N]\n"
+              << "                          [--hash MB] [--mistake cp] [--blunder cp] [--output annotated.pgn]\n";
+    std::cerr << "       chess.exe suite <file.epd> [--depth N] [--nodes N] [--movetime ms] [--threads N]\n"
+              << "                       [--output results.jsonl] [--baseline old.jsonl]\n";
+    std::cerr << "       chess.exe perft \"<FEN>\" <depth>\n";
+    std::cerr << "       chess.exe mate <file.epd> [--moves N] [--nodes N] [--movetime ms] [--threads N]\n"
+              << "                      [--hash MB] [--output results.jsonl]\n";
+    std::cerr << "       chess.exe evaltrace [labeled.epd|-] [--output trace.txt] [--weights file]\n";
+    std::cerr << "       chess.exe weights [file|-]\n";
+    std::cerr << "       chess.exe bench [depth] [--nnue network]\n";
+    std::cerr << "Every mode accepts --weights file in place of eval.weights next to the executable,\n"
+              << "--nnue network to evaluate with an NNUE network (bench runs both evaluations),\n"
+              << "and --hash-file file [--hash-file-mb MB] to keep search results across runs.\n";
     return 1;
 }
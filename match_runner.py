@@ -0,0 +1,268 @@
+"""Headless engine-vs-engine match runner with a live SPRT verdict.
+
+Plays many games between two UCI engines (by default two Tadfish builds)
+on a pool of worker processes. Every worker keeps its own pair of engine
+processes open for the whole match. Openings come from an EPD/FEN or PGN
+file and are played twice with colours swapped. Games are adjudicated by
+python-chess (mate, stalemate, repetition, 50-move rule, insufficient
+material) and the running score is reported as Elo with a 95% error bar
+plus the SPRT log-likelihood ratio.
+
+Example:
+    python match_runner.py --engine1 "./tadfish_new uci" --engine2 "./tadfish_old uci" \\
+        --games 2000 --concurrency 8 --openings openings.epd --movetime 100 --sprt 0 5
+"""
+import argparse
+import concurrent.futures
+import math
+import multiprocessing.util
+import os
+import random
+import shlex
+import sys
+import time
+
+import chess
+import chess.engine
+import chess.pgn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # Resource directory
+ENGINE_PATH = os.path.join(BASE_DIR, "tadfish.exe") # Chess engine executable path
+DEFAULT_ENGINE = f'"{ENGINE_PATH}" uci'
+
+# Engines owned by this worker process, opened once by init_worker
+worker_engines = {}
+worker_commands = {}
+worker_limit = None
+worker_max_plies = 0
+
+
+def open_engine(command):
+    """Start a UCI engine from a command line string."""
+    return chess.engine.SimpleEngine.popen_uci(shlex.split(command))
+
+
+def close_worker_engines():
+    for engine in worker_engines.values():
+        try:
+            engine.quit()
+        except Exception:
+            pass
+
+
+def init_worker(commands, limit_args, max_plies):
+    """Process pool initializer: start this worker's persistent engines."""
+    global worker_limit, worker_max_plies
+    worker_commands.update(commands)
+    for key, command in commands.items():
+        worker_engines[key] = open_engine(command)
+    worker_limit = chess.engine.Limit(**limit_args)
+    worker_max_plies = max_plies
+    # Pool workers leave through os._exit and never run atexit handlers, and
+    # engines still running then keep the worker (and the pool) from exiting
+    multiprocessing.util.Finalize(None, close_worker_engines, exitpriority=10)
+
+
+def restart_engine(key):
+    """Replace an engine process that crashed or misbehaved."""
+    try:
+        worker_engines[key].close()
+    except Exception:
+        pass
+    worker_engines[key] = open_engine(worker_commands[key])
+
+
+def play_game(game_index, opening_fen, engine1_white):
+    """Play one game and return (index, score for engine 1, reason, plies)."""
+    board = chess.Board(opening_fen)
+    players = {chess.WHITE: "engine1" if engine1_white else "engine2",
+               chess.BLACK: "engine2" if engine1_white else "engine1"}
+    plies = 0
+
+    while True:
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            if outcome.winner is None:
+                score = 0.5
+            else:
+                score = 1.0 if players[outcome.winner] == "engine1" else 0.0
+            return game_index, score, outcome.termination.name.lower(), plies
+        if plies >= worker_max_plies:
+            return game_index, 0.5, "max_plies", plies
+
+        key = players[board.turn]
+        try:
+            result = worker_engines[key].play(board, worker_limit, game=game_index)
+            move = result.move
+            if move is None or move not in board.legal_moves:
+                raise chess.engine.EngineError(f"illegal move {move}")
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError) as e:
+            # Forfeit the game and start a fresh process for the next one
+            restart_engine(key)
+            score = 0.0 if key == "engine1" else 1.0
+            return game_index, score, f"{key} error: {e}", plies
+        board.push(move)
+        plies += 1
+
+
+def load_openings(path):
+    """Read starting FENs from an EPD/FEN file or the final positions of a PGN."""
+    openings = []
+    if path.lower().endswith(".pgn"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                openings.append(game.end().board().fen())
+        return openings
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                openings.append(chess.Board(line).fen())
+            except ValueError:
+                board, _ = chess.Board.from_epd(line)
+                openings.append(board.fen())
+    return openings
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_from_elo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class MatchStats:
+    """Running W/D/L totals from engine 1's point of view."""
+    def __init__(self):
+        self.wins = self.draws = self.losses = 0
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, score):
+        if score == 1.0:
+            self.wins += 1
+        elif score == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def mean_and_variance(self):
+        n = self.games
+        mean = (self.wins + 0.5 * self.draws) / n
+        variance = (self.wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2
+                    + self.losses * mean ** 2) / n
+        return mean, variance
+
+    def elo(self):
+        """Elo difference and the half-width of its 95% confidence interval."""
+        mean, variance = self.mean_and_variance()
+        margin = 1.96 * math.sqrt(variance / self.games)
+        low = elo_from_score(mean - margin)
+        high = elo_from_score(mean + margin)
+        return elo_from_score(mean), (high - low) / 2
+
+    def llr(self, elo0, elo1):
+        """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation."""
+        mean, variance = self.mean_and_variance()
+        if variance == 0:
+            return 0.0
+        s0, s1 = score_from_elo(elo0), score_from_elo(elo1)
+        return self.games * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a headless match between two UCI engines.")
+    parser.add_argument("--engine1", default=DEFAULT_ENGINE, help="command line of the engine under test")
+    parser.add_argument("--engine2", default=DEFAULT_ENGINE, help="command line of the baseline engine")
+    parser.add_argument("--games", type=int, default=100, help="number of games (rounded up to pairs)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="games played at once")
+    parser.add_argument("--openings", help="EPD/FEN or PGN file of starting positions")
+    parser.add_argument("--seed", type=int, default=None, help="seed for shuffling the openings")
+    parser.add_argument("--depth", type=int, help="search depth per move")
+    parser.add_argument("--movetime", type=int, help="search time per move in ms")
+    parser.add_argument("--nodes", type=int, help="node limit per move")
+    parser.add_argument("--max-plies", type=int, default=400, help="adjudicate a draw after this many plies")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"),
+                        help="stop as soon as the SPRT between these Elo hypotheses concludes")
+    parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    args = parser.parse_args()
+
+    limit_args = {}
+    if args.depth:
+        limit_args["depth"] = args.depth
+    if args.movetime:
+        limit_args["time"] = args.movetime / 1000
+    if args.nodes:
+        limit_args["nodes"] = args.nodes
+    if not limit_args:
+        limit_args["time"] = 0.1
+
+    openings = load_openings(args.openings) if args.openings else [chess.STARTING_FEN]
+    if not openings:
+        sys.exit(f"No openings found in {args.openings}")
+    random.Random(args.seed).shuffle(openings)
+
+    # Each opening is played twice with the colours swapped
+    pairs = (args.games + 1) // 2
+    schedule = []
+    for pair in range(pairs):
+        fen = openings[pair % len(openings)]
+        schedule.append((2 * pair, fen, True))
+        schedule.append((2 * pair + 1, fen, False))
+
+    if args.sprt:
+        lower = math.log(args.beta / (1 - args.alpha))
+        upper = math.log((1 - args.beta) / args.alpha)
+
+    commands = {"engine1": args.engine1, "engine2": args.engine2}
+    stats = MatchStats()
+    verdict = None
+    start = time.time()
+    print(f"Playing {len(schedule)} games, {args.concurrency} at a time", flush=True)
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.concurrency, initializer=init_worker,
+            initargs=(commands, limit_args, args.max_plies)) as pool:
+        futures = [pool.submit(play_game, *game) for game in schedule]
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            game_index, score, reason, plies = future.result()
+            stats.add(score)
+            elo, margin = stats.elo()
+            line = (f"Game {game_index + 1:>5} {score:>3} ({reason}, {plies} plies) | "
+                    f"{stats.games} games +{stats.wins} ={stats.draws} -{stats.losses} | "
+                    f"Elo {elo:+.1f} ± {margin:.1f}")
+            if args.sprt:
+                llr = stats.llr(*args.sprt)
+                line += f" | LLR {llr:+.2f} [{lower:.2f}, {upper:.2f}]"
+                if llr >= upper:
+                    verdict = f"H1 accepted: engine1 is at least {args.sprt[1]:g} Elo stronger"
+                elif llr <= lower:
+                    verdict = f"H0 accepted: engine1 is not {args.sprt[1]:g} Elo stronger"
+            print(line, flush=True)
+            if verdict:
+                for f in futures:
+                    f.cancel()
+                break
+
+    elo, margin = stats.elo() if stats.games else (0.0, 0.0)
+    print(f"\nFinished {stats.games} games in {time.time() - start:.0f} s: "
+          f"+{stats.wins} ={stats.draws} -{stats.losses}, Elo {elo:+.1f} ± {margin:.1f}")
+    if args.sprt:
+        print(verdict or "SPRT inconclusive")
+
+
+if __name__ == "__main__":
+    main()
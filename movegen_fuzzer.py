@@ -0,0 +1,293 @@
+"""Randomised check of the engine's move generator against python-chess.
+
+Generates random legal positions with python-chess, half of them from
+random games (so castling rights, en passant squares and promotions come up
+the way they do in play) and half by random piece placement (odd material,
+pinned and checking pieces everywhere). For every position the engine's
+legal move set is compared with python-chess's, and then its perft count to
+--depth plies. The positions are split into shards and checked on a pool of
+worker processes, each using the engine in-process through the tadfish
+Python module.
+
+A mismatch is minimised to a small reproducer: the perft difference is
+followed down the move tree to a position whose move set differs (or to
+the move the engine plays wrongly), and then pieces, castling rights and
+the en passant square are removed one at a time while the position stays
+valid and still fails. The reproducers are written as JSONL and can be
+replayed with "./tadfish perft <fen> <depth>".
+
+Example:
+    python setup.py build_ext --inplace
+    python movegen_fuzzer.py --positions 1000000 --depth 2 --workers 8 --output mismatches.jsonl
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+import chess
+
+try:
+    import tadfish
+except ImportError:
+    tadfish = None
+
+SHARD_SIZE = 5000 # Positions per worker task
+MAX_GAME_PLIES = 300 # Random games restart after this many plies
+PLACEMENT_PIECES = (0, 20) # Range of non-king pieces in random placements
+PIECE_WEIGHTS = {chess.PAWN: 8, chess.KNIGHT: 2, chess.BISHOP: 2, chess.ROOK: 2, chess.QUEEN: 1}
+MAX_REPORTED = 20 # Mismatches printed in the summary
+
+
+def random_game_positions(rng):
+    """Endless positions along random games from the starting position."""
+    while True:
+        board = chess.Board()
+        for _ in range(MAX_GAME_PLIES):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            yield board.copy(stack=False)
+
+
+def random_placement(rng):
+    """A random valid position: two kings, some pieces, and any castling rights and en passant square that fit."""
+    kinds = list(PIECE_WEIGHTS)
+    weights = list(PIECE_WEIGHTS.values())
+    while True:
+        board = chess.Board(None)
+        squares = rng.sample(chess.SQUARES, 64)
+        board.set_piece_at(squares.pop(), chess.Piece(chess.KING, chess.WHITE))
+        board.set_piece_at(squares.pop(), chess.Piece(chess.KING, chess.BLACK))
+        for _ in range(rng.randint(*PLACEMENT_PIECES)):
+            kind = rng.choices(kinds, weights)[0]
+            square = squares.pop()
+            if kind == chess.PAWN and chess.square_rank(square) in (0, 7):
+                continue
+            board.set_piece_at(square, chess.Piece(kind, rng.random() < 0.5))
+        board.turn = rng.random() < 0.5
+
+        # Every castling right whose king and rook are at home, each with even odds
+        rights = [rook for king, rook in ((chess.E1, chess.H1), (chess.E1, chess.A1),
+                                          (chess.E8, chess.H8), (chess.E8, chess.A8))
+                  if board.piece_at(king) == chess.Piece(chess.KING, chess.square_rank(king) == 0)
+                  and board.piece_at(rook) == chess.Piece(chess.ROOK, chess.square_rank(rook) == 0)]
+        board.castling_rights = chess.SquareSet(r for r in rights if rng.random() < 0.5).mask
+
+        # An en passant square behind a pawn that could just have made a double step
+        them = not board.turn
+        ep_rank, pawn_rank = (5, 4) if board.turn == chess.WHITE else (2, 3)
+        candidates = [chess.square(f, ep_rank) for f in range(8)
+                      if board.piece_at(chess.square(f, pawn_rank)) == chess.Piece(chess.PAWN, them)
+                      and board.piece_at(chess.square(f, ep_rank)) is None
+                      and board.piece_at(chess.square(f, 2 * ep_rank - pawn_rank)) is None]
+        if candidates and rng.random() < 0.5:
+            board.ep_square = rng.choice(candidates)
+
+        if board.is_valid():
+            return board
+
+
+def reference_perft(board, depth):
+    if depth <= 1:
+        return board.legal_moves.count() if depth == 1 else 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += reference_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def position_fields(fen):
+    """The FEN without the move clocks."""
+    return " ".join(fen.split()[:4])
+
+
+def find_mismatch(board, depth):
+    """The first difference between the engine and python-chess in a position, as a dict, or None."""
+    fen = board.fen(en_passant="fen")
+    engine_board = tadfish.Board(fen)
+    expected = {move.uci() for move in board.legal_moves}
+    got = set(engine_board.legal_moves())
+    if expected != got:
+        return {"kind": "moves", "fen": fen, "missing": sorted(expected - got), "extra": sorted(got - expected)}
+
+    # A move the engine plays into another position than python-chess
+    for move in board.legal_moves:
+        board.push(move)
+        expected_fen = board.fen(en_passant="fen")
+        board.pop()
+        engine_board.push(move.uci())
+        got_fen = engine_board.fen()
+        engine_board.pop()
+        if position_fields(got_fen) != position_fields(expected_fen):
+            return {"kind": "make_move", "fen": fen, "move": move.uci(), "expected": expected_fen, "got": got_fen}
+    if position_fields(engine_board.fen()) != position_fields(fen):
+        return {"kind": "fen", "fen": fen, "got": engine_board.fen()}
+
+    for d in range(2, depth + 1):
+        expected_nodes = reference_perft(board, d)
+        got_nodes = tadfish.perft(engine_board, d)
+        if expected_nodes != got_nodes:
+            return {"kind": "perft", "fen": fen, "depth": d, "expected": expected_nodes, "got": got_nodes}
+    return None
+
+
+def descend(board, mismatch):
+    """Follows a perft mismatch down the move tree to the position where it starts."""
+    while mismatch["kind"] == "perft":
+        depth = mismatch["depth"]
+        engine_board = tadfish.Board(board.fen(en_passant="fen"))
+        child = None
+        for move in board.legal_moves:
+            board.push(move)
+            engine_board.push(move.uci())
+            differs = reference_perft(board, depth - 1) != tadfish.perft(engine_board, depth - 1)
+            engine_board.pop()
+            board.pop()
+            if differs:
+                child = move
+                break
+        child_board = board.copy(stack=False)
+        if child is not None:
+            child_board.push(child)
+            child_mismatch = find_mismatch(child_board, depth - 1)
+            if child_mismatch:
+                board, mismatch = child_board, child_mismatch
+                continue
+        # The counts only differ after the engine's own moves, not from a
+        # freshly loaded position: make_move leaves a state the FEN misses
+        return board, {"kind": "state", "fen": mismatch["fen"], "depth": depth,
+                       "move": child.uci() if child else None}
+    return board, mismatch
+
+
+def shrink(board, depth):
+    """Removes pieces, castling rights and the en passant square while the position still fails."""
+    mismatch = find_mismatch(board, depth)
+    changed = True
+    while changed:
+        changed = False
+        candidates = []
+        for square, piece in board.piece_map().items():
+            if piece.piece_type != chess.KING:
+                candidates.append(("piece", square))
+        if board.ep_square is not None:
+            candidates.append(("ep", None))
+        for rook in chess.SquareSet(board.castling_rights):
+            candidates.append(("castling", rook))
+
+        for kind, square in candidates:
+            smaller = board.copy(stack=False)
+            if kind == "piece":
+                smaller.remove_piece_at(square)
+            elif kind == "ep":
+                smaller.ep_square = None
+            else:
+                smaller.castling_rights &= ~chess.BB_SQUARES[square]
+            if not smaller.is_valid():
+                continue
+            smaller_mismatch = find_mismatch(smaller, depth)
+            if smaller_mismatch:
+                board, mismatch = smaller, smaller_mismatch
+                changed = True
+                break
+    return mismatch
+
+
+def minimise(board, mismatch, depth):
+    """A small reproducer for a mismatch found in board."""
+    board, mismatch = descend(board.copy(stack=False), mismatch)
+    if mismatch["kind"] == "state":
+        return mismatch
+    return shrink(board, max(1, mismatch.get("depth", 1))) or mismatch
+
+
+def check_shard(shard, count, depth, placement_share, seed):
+    """Checks count positions of one shard; returns the shard, count, mismatches and time."""
+    start = time.time()
+    rng = random.Random(f"{seed}/{shard}")
+    games = random_game_positions(rng)
+    mismatches = []
+    for _ in range(count):
+        board = random_placement(rng) if rng.random() < placement_share else next(games)
+        mismatch = find_mismatch(board, depth)
+        if mismatch:
+            original = board.fen()
+            mismatch = minimise(board, mismatch, depth)
+            mismatch["original"] = original
+            mismatches.append(mismatch)
+    return shard, count, mismatches, time.time() - start
+
+
+def describe(mismatch):
+    kind = mismatch["kind"]
+    if kind == "moves":
+        return f"missing {' '.join(mismatch['missing']) or '-'}, extra {' '.join(mismatch['extra']) or '-'}"
+    if kind == "make_move":
+        return f"{mismatch['move']} gives {mismatch['got']}, expected {mismatch['expected']}"
+    if kind == "perft":
+        return f"perft({mismatch['depth']}) {mismatch['got']}, expected {mismatch['expected']}"
+    if kind == "state":
+        after = f" after {mismatch['move']}" if mismatch["move"] else ""
+        return f"perft({mismatch['depth']}) differs{after} only when the engine makes the moves itself"
+    return f"FEN round trip gives {mismatch['got']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the engine's move generator with python-chess.")
+    parser.add_argument("--positions", type=int, default=100000, help="number of random positions")
+    parser.add_argument("--depth", type=int, default=2, help="perft depth compared in every position (1-3)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--placement-share", type=float, default=0.5,
+                        help="fraction of positions from random placement instead of random games")
+    parser.add_argument("--seed", type=int, default=0, help="seed; shards are reproducible from it")
+    parser.add_argument("--output", default="mismatches.jsonl", help="JSONL file for the minimised mismatches")
+    args = parser.parse_args()
+    if tadfish is None:
+        sys.exit("The tadfish module is missing: build it with 'python setup.py build_ext --inplace'")
+
+    shards = [(i, min(SHARD_SIZE, args.positions - i * SHARD_SIZE))
+              for i in range((args.positions + SHARD_SIZE - 1) // SHARD_SIZE)]
+    print(f"Checking {args.positions} positions to perft({args.depth}) in {len(shards)} shards "
+          f"on {args.workers} workers", flush=True)
+
+    checked = 0
+    mismatches = []
+    start = time.time()
+    with open(args.output, "w") as out, concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(check_shard, shard, count, args.depth, args.placement_share, args.seed)
+                   for shard, count in shards]
+        for future in concurrent.futures.as_completed(futures):
+            shard, count, found, seconds = future.result()
+            checked += count
+            for mismatch in found:
+                mismatch["shard"] = shard
+                out.write(json.dumps(mismatch) + "\n")
+            out.flush()
+            mismatches.extend(found)
+            elapsed = time.time() - start
+            print(f"Shard {shard:>4}: {count} positions in {seconds:.0f} s, {len(found)} mismatches | "
+                  f"{checked}/{args.positions} done, {checked / max(elapsed, 1e-9):.0f} positions/s, "
+                  f"{len(mismatches)} mismatches", flush=True)
+
+    print(f"\nChecked {checked} positions in {time.time() - start:.0f} s: {len(mismatches)} mismatches")
+    # Many positions usually fail the same way; show each reproducer once
+    unique = {}
+    for mismatch in mismatches:
+        unique.setdefault((mismatch["kind"], position_fields(mismatch["fen"])), mismatch)
+    for mismatch in list(unique.values())[:MAX_REPORTED]:
+        print(f"  {mismatch['fen']}: {describe(mismatch)}")
+    if len(unique) > MAX_REPORTED:
+        print(f"  ... {len(unique) - MAX_REPORTED} more in {args.output}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
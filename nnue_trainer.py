@@ -0,0 +1,333 @@
+"""Train a Tadfish NNUE network with NumPy and write it as a network file.
+
+The network is the one described in include/nnue.h: HalfKP features (own
+king square, piece, square) for both sides, a 40960 -> 256 first layer
+shared by the two perspectives, clipped to [0, 1], and one output neuron
+over the side to move's and the other side's 256 values. Training minimises
+the squared error between 1 / (1 + 10^(-eval / 400)) and a target that mixes
+the search score and the game result of each position.
+
+Training data are EPD/FEN lines with a search score ("ce", side to move
+relative, as written by "tadfish analyse --format epd") and/or a game result
+("c9" or "result" operation, or a [1.0]/[0.5]/[0.0] token). For example:
+
+    ./tadfish.exe analyse positions.epd --depth 6 --format epd --output scored.epd --threads 8
+    python nnue_trainer.py scored.epd --output tadfish.nnue --epochs 20
+    ./tadfish.exe uci --nnue tadfish.nnue      (or setoption EvalFile / UseNNUE)
+
+This is a reference trainer: the first layer's gradient is only computed
+for the rows of the features in a batch, and Adam only updates those rows.
+It is fine for a few million positions; bigger runs call for a GPU trainer
+writing the same file format.
+"""
+import argparse
+import math
+import struct
+import sys
+import time
+
+import chess
+import numpy as np
+
+NNUE_FEATURES = 64 * 10 * 64 # Must match include/nnue.h
+NNUE_HIDDEN = 256
+NETWORK_VERSION = 1
+QA = 255 # Quantisation of the first layer: 1.0 is QA
+QB = 64 # Quantisation of the output weights
+SCALE = 400 # Centipawns per unit of network output
+MAX_FEATURES = 30 # Non-king pieces per position
+PAD = NNUE_FEATURES # Feature index of unused slots, a row of zeros
+MAX_CE = 3000 # Search scores beyond this (near mates) are skipped
+MAX_W1 = 2.0 # Weight clipping keeps the quantised accumulators in int16
+MAX_W2 = 127 / QB * 2
+
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5, "[1.0]": 1.0, "[0.0]": 0.0, "[0.5]": 0.5,
+           "[1]": 1.0, "[0]": 0.0, "[1-0]": 1.0, "[0-1]": 0.0, "[1/2-1/2]": 0.5}
+
+
+def parse_epd_line(line):
+    """
+    FEN and operations (opcode, operand) of an EPD/FEN line, read the way the
+    engine's parse_epd_line reads it, or None if the line holds no position.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4 or fields[1] not in ("w", "b") or fields[0].count("/") != 7:
+        return None
+    rest = fields[4] if len(fields) > 4 else ""
+    # A FEN carries the two clocks next; anything else is EPD operations
+    clocks = rest.split(None, 2)
+    if len(clocks) >= 2 and clocks[0].isdigit() and clocks[1].isdigit():
+        fen = " ".join(fields[:4] + clocks[:2])
+        rest = clocks[2] if len(clocks) > 2 else ""
+    else:
+        fen = " ".join(fields[:4]) + " 0 1"
+
+    # Split the remainder on semicolons outside quotes
+    operations, current, quoted = [], "", False
+    for c in rest + ";":
+        if c == '"':
+            quoted = not quoted
+        if c != ";" or quoted:
+            current += c
+            continue
+        op = current.strip()
+        current = ""
+        if op:
+            opcode, _, operand = op.replace("\t", " ").partition(" ")
+            operand = operand.strip()
+            if len(operand) >= 2 and operand[0] == operand[-1] == '"':
+                operand = operand[1:-1]
+            operations.append((opcode, operand))
+    return fen, operations
+
+
+def position_result(operations):
+    """White's result from a c9 or result operation or a result token, or None (as evaltrace)."""
+    for opcode in ("c9", "result"):
+        for op, operand in operations:
+            if op == opcode:
+                return RESULTS.get(operand)
+    for op, _ in operations:
+        if op in RESULTS:
+            return RESULTS[op]
+    return None
+
+
+def position_features(board):
+    """Feature indices of the side to move and of the other side, padded to MAX_FEATURES."""
+    kings = {chess.WHITE: board.king(chess.WHITE), chess.BLACK: board.king(chess.BLACK)}
+    lists = {chess.WHITE: [], chess.BLACK: []}
+    for square, piece in board.piece_map().items():
+        if piece.piece_type == chess.KING:
+            continue
+        for perspective, orient in ((chess.WHITE, 0), (chess.BLACK, 56)):
+            kind = piece.piece_type - 1 + (0 if piece.color == perspective else 5)
+            lists[perspective].append(((kings[perspective] ^ orient) * 10 + kind) * 64 + (square ^ orient))
+    us, them = lists[board.turn], lists[not board.turn]
+    return us + [PAD] * (MAX_FEATURES - len(us)), them + [PAD] * (MAX_FEATURES - len(them))
+
+
+def read_positions(path, wdl):
+    """Feature arrays of both perspectives and the training targets (side to move's expected score)."""
+    us, them, targets = [], [], []
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            parsed = parse_epd_line(line)
+            if parsed is None:
+                skipped += 1
+                continue
+            fen, operations = parsed
+            try:
+                board = chess.Board(fen)
+            except ValueError:
+                skipped += 1
+                continue
+            if board.king(chess.WHITE) is None or board.king(chess.BLACK) is None:
+                skipped += 1
+                continue
+            if len(board.piece_map()) - 2 > MAX_FEATURES:
+                skipped += 1
+                continue
+
+            score = None
+            ce = next((operand for opcode, operand in operations if opcode == "ce"), None)
+            if ce is not None and ce.lstrip("-").isdigit() and abs(int(ce)) <= MAX_CE:
+                score = 1 / (1 + 10 ** (-int(ce) / 400))
+            result = position_result(operations)
+            if result is not None and board.turn == chess.BLACK:
+                result = 1 - result
+            if score is None and result is None:
+                skipped += 1
+                continue
+            if score is None:
+                target = result
+            elif result is None:
+                target = score
+            else:
+                target = wdl * result + (1 - wdl) * score
+
+            own, other = position_features(board)
+            us.append(own)
+            them.append(other)
+            targets.append(target)
+    if skipped:
+        print(f"Skipped {skipped} positions without a usable score or result")
+    return (np.array(us, dtype=np.int32), np.array(them, dtype=np.int32),
+            np.array(targets, dtype=np.float32))
+
+
+class Adam:
+    """Adam state for one parameter array; update_rows() touches only some rows."""
+    def __init__(self, shape, lr, betas=(0.9, 0.999)):
+        self.m = np.zeros(shape, dtype=np.float32)
+        self.v = np.zeros(shape, dtype=np.float32)
+        self.lr = lr
+        self.beta1, self.beta2 = betas
+        self.step = 0
+
+    def _delta(self, m, v):
+        m_hat = m / (1 - self.beta1 ** self.step)
+        v_hat = v / (1 - self.beta2 ** self.step)
+        return self.lr * m_hat / (np.sqrt(v_hat) + 1e-8)
+
+    def update(self, param, gradient):
+        self.step += 1
+        self.m = self.beta1 * self.m + (1 - self.beta1) * gradient
+        self.v = self.beta2 * self.v + (1 - self.beta2) * gradient ** 2
+        param -= self._delta(self.m, self.v)
+
+    def update_rows(self, param, rows, gradient):
+        self.step += 1
+        m = self.beta1 * self.m[rows] + (1 - self.beta1) * gradient
+        v = self.beta2 * self.v[rows] + (1 - self.beta2) * gradient ** 2
+        self.m[rows] = m
+        self.v[rows] = v
+        param[rows] -= self._delta(m, v)
+
+
+class Network:
+    def __init__(self, seed):
+        rng = np.random.default_rng(seed)
+        self.w1 = (rng.standard_normal((NNUE_FEATURES + 1, NNUE_HIDDEN)) * 0.01).astype(np.float32)
+        self.w1[PAD] = 0
+        self.b1 = np.full(NNUE_HIDDEN, 0.1, dtype=np.float32)
+        self.w2 = (rng.standard_normal(2 * NNUE_HIDDEN) * 0.01).astype(np.float32)
+        self.b2 = np.float32(0)
+
+    def forward(self, us, them):
+        acc_us = self.w1[us].sum(axis=1) + self.b1
+        acc_them = self.w1[them].sum(axis=1) + self.b1
+        a_us = np.clip(acc_us, 0, 1)
+        a_them = np.clip(acc_them, 0, 1)
+        output = a_us @ self.w2[:NNUE_HIDDEN] + a_them @ self.w2[NNUE_HIDDEN:] + self.b2
+        return output, (acc_us, acc_them, a_us, a_them)
+
+    def quantised_eval(self, us, them):
+        """Centipawn scores exactly as the engine computes them from the written file."""
+        w1, b1, w2, b2 = self.quantise()
+        w1 = np.vstack([w1, np.zeros((1, NNUE_HIDDEN), dtype=np.int16)]).astype(np.int64)
+        acc_us = np.clip(w1[us].sum(axis=1) + b1, 0, QA)
+        acc_them = np.clip(w1[them].sum(axis=1) + b1, 0, QA)
+        w2 = w2.astype(np.int64)
+        output = int(b2) + acc_us @ w2[:NNUE_HIDDEN] + acc_them @ w2[NNUE_HIDDEN:]
+        # C++ division truncates towards zero
+        scores = np.abs(output * SCALE) // (QA * QB) * np.sign(output)
+        return np.clip(scores, -30000, 30000)
+
+    def quantise(self):
+        w1 = np.clip(np.round(self.w1[:NNUE_FEATURES] * QA), -32767, 32767).astype(np.int16)
+        b1 = np.clip(np.round(self.b1 * QA), -32767, 32767).astype(np.int16)
+        w2 = np.clip(np.round(self.w2 * QB), -32767, 32767).astype(np.int16)
+        b2 = np.int32(round(float(self.b2) * QA * QB))
+        return w1, b1, w2, b2
+
+    def write(self, path):
+        w1, b1, w2, b2 = self.quantise()
+        with open(path, "wb") as f:
+            f.write(b"TFNN")
+            f.write(struct.pack("<3I3i", NETWORK_VERSION, NNUE_FEATURES, NNUE_HIDDEN, QA, QB, SCALE))
+            f.write(w1.astype("<i2").tobytes())
+            f.write(b1.astype("<i2").tobytes())
+            f.write(w2.astype("<i2").tobytes())
+            f.write(struct.pack("<i", int(b2)))
+
+
+def expected_score(output):
+    """Win probability of network outputs (units of SCALE centipawns)."""
+    return 1 / (1 + np.power(10.0, -output * SCALE / 400))
+
+
+def loss(network, us, them, targets, batch_size):
+    total = 0.0
+    for start in range(0, len(targets), batch_size):
+        output, _ = network.forward(us[start:start + batch_size], them[start:start + batch_size])
+        total += float(np.sum((expected_score(output) - targets[start:start + batch_size]) ** 2))
+    return total / len(targets)
+
+
+def train_batch(network, optimisers, us, them, targets):
+    output, (acc_us, acc_them, a_us, a_them) = network.forward(us, them)
+    p = expected_score(output)
+    g_out = (2 * (p - targets) * p * (1 - p) * math.log(10) * SCALE / 400 / len(targets)).astype(np.float32)
+
+    w2_us, w2_them = network.w2[:NNUE_HIDDEN], network.w2[NNUE_HIDDEN:]
+    g_w2 = np.concatenate([a_us.T @ g_out, a_them.T @ g_out])
+    g_b2 = g_out.sum()
+    g_acc_us = np.outer(g_out, w2_us) * ((acc_us > 0) & (acc_us < 1))
+    g_acc_them = np.outer(g_out, w2_them) * ((acc_them > 0) & (acc_them < 1))
+    g_b1 = g_acc_us.sum(axis=0) + g_acc_them.sum(axis=0)
+
+    # First layer: sum the gradients of every (feature, position) pair into
+    # the rows of the features that occur in the batch
+    features = np.concatenate([us.ravel(), them.ravel()])
+    values = np.concatenate([np.repeat(g_acc_us, us.shape[1], axis=0), np.repeat(g_acc_them, them.shape[1], axis=0)])
+    order = np.argsort(features, kind="stable")
+    features = features[order]
+    starts = np.flatnonzero(np.r_[True, features[1:] != features[:-1]])
+    rows = features[starts]
+    g_w1 = np.add.reduceat(values[order], starts, axis=0)
+    keep = rows != PAD
+    rows, g_w1 = rows[keep], g_w1[keep]
+
+    optimisers["w1"].update_rows(network.w1, rows, g_w1)
+    optimisers["b1"].update(network.b1, g_b1)
+    optimisers["w2"].update(network.w2, g_w2)
+    b2 = np.array([network.b2], dtype=np.float32)
+    optimisers["b2"].update(b2, np.array([g_b2], dtype=np.float32))
+    network.b2 = b2[0]
+    np.clip(network.w1, -MAX_W1, MAX_W1, out=network.w1)
+    np.clip(network.w2, -MAX_W2, MAX_W2, out=network.w2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a Tadfish NNUE network.")
+    parser.add_argument("data", help="EPD/FEN file with ce scores and/or game results")
+    parser.add_argument("--output", default="tadfish.nnue", help="network file to write")
+    parser.add_argument("--epochs", type=int, default=10, help="passes over the training positions")
+    parser.add_argument("--batch-size", type=int, default=1024, help="positions per Adam step")
+    parser.add_argument("--lr", type=float, default=1e-3, help="Adam learning rate")
+    parser.add_argument("--wdl", type=float, default=0.0,
+                        help="weight of the game result against the search score in the target (0 to 1)")
+    parser.add_argument("--holdout", type=float, default=0.05, help="fraction of positions kept out of training")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the initial weights and shuffling")
+    args = parser.parse_args()
+
+    start = time.time()
+    us, them, targets = read_positions(args.data, args.wdl)
+    if not len(targets):
+        sys.exit(f"No usable positions in {args.data}")
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(targets))
+    held = order[:int(len(targets) * args.holdout)]
+    train = order[len(held):]
+    print(f"Read {len(targets)} positions in {time.time() - start:.1f} s: "
+          f"{len(train)} for training, {len(held)} held out")
+
+    network = Network(args.seed)
+    optimisers = {"w1": Adam(network.w1.shape, args.lr), "b1": Adam(network.b1.shape, args.lr),
+                  "w2": Adam(network.w2.shape, args.lr), "b2": Adam((1,), args.lr)}
+    for epoch in range(1, args.epochs + 1):
+        start = time.time()
+        rng.shuffle(train)
+        for first in range(0, len(train), args.batch_size):
+            batch = train[first:first + args.batch_size]
+            train_batch(network, optimisers, us[batch], them[batch], targets[batch])
+        line = f"Epoch {epoch:>3}: train loss {loss(network, us[train], them[train], targets[train], 4096):.6f}"
+        if len(held):
+            line += f", holdout loss {loss(network, us[held], them[held], targets[held], 4096):.6f}"
+        print(f"{line} ({time.time() - start:.0f} s)", flush=True)
+
+    network.write(args.output)
+    if len(held):
+        # The written network is integer; check how much rounding costs
+        cp = network.quantised_eval(us[held], them[held])
+        quantised_loss = float(np.mean((1 / (1 + 10 ** (-cp / 400)) - targets[held]) ** 2))
+        print(f"Quantised holdout loss {quantised_loss:.6f}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,16 @@ import tkinter as tk
 from tkinter import messagebox
 import chess
 import os
-import pygame
-from PIL import Image, ImageTk
+from tadfish_gui import startup
+from tadfish_gui.analysis import EvalBar, LiveAnalysis
+from tadfish_gui.board_view import BoardView, load_piece_images
+from tadfish_gui.sounds import SoundBank
 
 simulation_depth = 3 # Engine search depth (display only)
-
-HIGHLIGHT_COLOR = "#5C4033"
-CHECKMATE_HIGHLIGHT_COLOR = "#FF0000"
+analysis = True # Show Tadfish's live evaluation bar and best line
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # Resource directory
-
-# Determine best resampling filter
-try:
-    RESAMPLE = Image.Resampling.LANCZOS
-except AttributeError:
-    try:
-        RESAMPLE = Image.LANCZOS
-    except AttributeError:
-        RESAMPLE = Image.BICUBIC
+ENGINE_PATH = os.path.join(BASE_DIR, "tadfish.exe") # Engine used for the analysis
 
 class ChessUI:
     """Manages the Chess UI and human player interaction."""
@@ -40,15 +32,18 @@ class ChessUI:
         self.main_container.grid_rowconfigure(2, weight=0)
         self.main_container.grid_rowconfigure(3, weight=0)
         self.main_container.grid_rowconfigure(4, weight=0)
-        self.main_container.grid_rowconfigure(5, weight=1)
+        self.main_container.grid_rowconfigure(5, weight=0)
+        self.main_container.grid_rowconfigure(6, weight=1)
 
         self.black_engine_label_board = tk.Label(self.main_container, text="Player Black",
                                                  font='Helvetica 12 italic', fg="#E0E0E0", bg="#2E343A", pady=5)
         self.black_engine_label_board.grid(row=1, column=0, pady=(0, 5))
 
         self.square_size = 80
-        self.canvas = tk.Canvas(self.main_container, width=self.square_size * 8, height=self.square_size * 8, bd=0, highlightthickness=0, bg="#2E343A")
-        self.canvas.grid(row=2, column=0)
+        board_row = tk.Frame(self.main_container, bg="#2E343A")
+        board_row.grid(row=2, column=0)
+        self.canvas = tk.Canvas(board_row, width=self.square_size * 8, height=self.square_size * 8, bd=0, highlightthickness=0, bg="#2E343A")
+        self.canvas.pack(side=tk.RIGHT)
 
         self.white_engine_label_board = tk.Label(self.main_container, text="Player White",
                                                  font='Helvetica 12 italic', fg="#E0E0E0", bg="#2E343A", pady=5)
@@ -58,11 +53,23 @@ class ChessUI:
         tk.Label(self.main_container, textvariable=self.status_var,
                  font='Helvetica 12 bold', fg="#E0E0E0", bg="#2E343A", pady=5).grid(row=4, column=0, pady=(5, 0))
 
-        try:
-            pygame.mixer.init()
-        except Exception:
-            print("Audio init failed. Sounds will not play.")
-        self.load_sounds()
+        # Live analysis: evaluation bar left of the board, best line under the status
+        self.analysis = None
+        if analysis:
+            eval_bar = EvalBar(board_row, height=self.square_size * 8)
+            eval_bar.pack(side=tk.RIGHT, padx=(0, 10))
+            self.analysis_var = tk.StringVar()
+            tk.Label(self.main_container, textvariable=self.analysis_var, font='Helvetica 10', fg="#B0B0B0",
+                     bg="#2E343A", width=80).grid(row=5, column=0, sticky="n")
+            self.analysis = LiveAnalysis(self.root, [ENGINE_PATH, "uci"], eval_bar, self.analysis_var)
+
+        self.take_back_button = tk.Button(self.main_container, text="Take Back", command=self.take_back,
+                                          bg="#4CAF50", fg="white", activebackground="#60B863", activeforeground="white",
+                                          relief=tk.RAISED, bd=3, padx=15, pady=8, font='Helvetica 11 bold', cursor="hand2")
+        self.take_back_button.grid(row=6, column=0, sticky="n", pady=(10, 0))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.sounds = SoundBank(BASE_DIR)
 
         self.board = chess.Board()
 
@@ -77,8 +84,8 @@ class ChessUI:
         self.pressed_x = 0
         self.pressed_y = 0
 
-        self.piece_images = {}
-        missing = self.load_piece_images_with_check()
+        self.piece_images, missing = load_piece_images(BASE_DIR, self.square_size)
+        self.board_view = BoardView(self.canvas, self.square_size, self.piece_images)
         if missing:
             msg = "The following piece image files failed to load:\n" + "\n".join(missing) + \
                   "\n\nEnsure these files exist in the 'images' folder next to frontend.py, with exact names."
@@ -90,136 +97,16 @@ class ChessUI:
 
         self.draw_board()
         self.update_status()
-        self.play_sound(self.sound_start)
-
-    def load_sounds(self):
-        """Loads sound files for game events."""
-        def try_load(name):
-            path = os.path.join(BASE_DIR, "audio", name)
-            if os.path.exists(path):
-                try:
-                    return pygame.mixer.Sound(path)
-                except pygame.error:
-                    return None
-            return None
-
-        self.sound_move = try_load("move-self.mp3")
-        self.sound_capture = try_load("capture.mp3")
-        self.sound_check = try_load("move-check.mp3")
-        self.sound_checkmate = try_load("checkmate.mp3")
-        self.sound_start = try_load("start.mp3")
-
-    def play_sound(self, sound_obj):
-        """Plays a given sound."""
-        if sound_obj:
-            try:
-                sound_obj.play()
-            except pygame.error:
-                pass
-
-    def load_piece_images_with_check(self):
-        """Loads chess piece images, returns list of missing files."""
-        mapping = {
-            'P': 'white-pawn.png', 'N': 'white-knight.png', 'B': 'white-bishop.png',
-            'R': 'white-rook.png', 'Q': 'white-queen.png', 'K': 'white-king.png',
-            'p': 'black-pawn.png', 'n': 'black-knight.png', 'b': 'black-bishop.png',
-            'r': 'black-rook.png', 'q': 'black-queen.png', 'k': 'black-king.png',
-        }
-        missing = []
-        for symbol, filename in mapping.items():
-            path = os.path.join(BASE_DIR, "images", filename)
-            if os.path.exists(path):
-                try:
-                    img = Image.open(path).convert("RGBA")
-                    img = img.resize((self.square_size, self.square_size), RESAMPLE)
-                    self.piece_images[symbol] = ImageTk.PhotoImage(img)
-                except Exception as e:
-                    missing.append(f"{filename} (error: {e})")
-            else:
-                missing.append(f"{filename} (not found at {path})")
-        return missing
+        self.sounds.play("start")
+        startup.report_first_frame(self.root)
+        if self.analysis:
+            self.analysis.analyse(self.board)
 
     def draw_board(self):
         """Draws the board, pieces, highlights, and checkmate."""
-        self.canvas.delete("all")
-
-        # Draw squares
-        for rank in range(8):
-            for file in range(8):
-                x1 = file * self.square_size
-                y1 = (7 - rank) * self.square_size
-                x2 = x1 + self.square_size
-                y2 = y1 + self.square_size
-                color = "#F0D9B5" if (rank + file) % 2 == 0 else "#B58863"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="")
-
-        # Highlight selected square
-        if self.selected_square is not None and not self.dragging:
-            f = chess.square_file(self.selected_square)
-            r = chess.square_rank(self.selected_square)
-            x1 = f * self.square_size
-            y1 = (7 - r) * self.square_size
-            x2 = x1 + self.square_size
-            y2 = y1 + self.square_size
-            self.canvas.create_rectangle(x1, y1, x2, y2, outline=HIGHLIGHT_COLOR, width=3)
-
-        # Draw dots for legal destinations
-        for dest in self.legal_destinations:
-            f = chess.square_file(dest)
-            r = chess.square_rank(dest)
-            cx = f * self.square_size + self.square_size/2
-            cy = (7 - r) * self.square_size + self.square_size/2
-            rad = self.square_size * 0.1
-            self.canvas.create_oval(cx-rad, cy-rad, cx+rad, cy+rad, fill=HIGHLIGHT_COLOR, outline="")
-
-        # Draw pieces (excluding dragged piece)
-        for square in chess.SQUARES:
-            if self.dragging and square == self.drag_start:
-                continue
-
-            piece = self.board.piece_at(square)
-            if piece:
-                symbol = piece.symbol()
-                img = self.piece_images.get(symbol)
-                f = chess.square_file(square)
-                r = chess.square_rank(square)
-                x = f * self.square_size + self.square_size/2
-                y = (7 - r) * self.square_size + self.square_size/2
-                if img:
-                    self.canvas.create_image(x, y, image=img)
-                else: # Fallback to Unicode
-                    uni = {'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
-                           'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'}.get(symbol, '')
-                    if uni:
-                        size = int(self.square_size * 0.6)
-                        self.canvas.create_text(x, y, text=uni, font=("Arial", size))
-
-        # Draw the dragged piece
-        if self.dragging and self.drag_piece:
-            x = self.mouse_x
-            y = self.mouse_y
-            symbol = self.drag_piece.symbol()
-            img = self.piece_images.get(symbol)
-            if img:
-                self.canvas.create_image(x, y, image=img)
-            else: # Fallback to Unicode
-                uni = {'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
-                       'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'}.get(symbol, '')
-                if uni:
-                    size = int(self.square_size * 0.6)
-                    self.canvas.create_text(x, y, text=uni, font=("Arial", size))
-
-        # Highlight king if in checkmate
-        if self.board.is_checkmate():
-            sq = self.board.king(self.board.turn)
-            if sq is not None:
-                f = chess.square_file(sq)
-                r = chess.square_rank(sq)
-                x1 = f * self.square_size + 2
-                y1 = (7 - r) * self.square_size + 2
-                x2 = x1 + self.square_size - 4
-                y2 = y1 + self.square_size - 4
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline=CHECKMATE_HIGHLIGHT_COLOR, width=4)
+        drag_pos = (self.mouse_x, self.mouse_y) if self.dragging else None
+        self.board_view.draw(self.board, self.selected_square, self.legal_destinations,
+                             self.drag_start, self.drag_piece, drag_pos)
 
     def on_press(self, event):
         """Handles mouse button press to select a piece."""
@@ -248,21 +135,19 @@ class ChessUI:
 
         if not self.dragging and (dx >= self.min_drag_distance or dy >= self.min_drag_distance):
             self.dragging = True
-
-        if self.dragging:
             self.mouse_x = event.x
             self.mouse_y = event.y
             self.draw_board()
+        elif self.dragging: # Only the dragged piece moves
+            self.mouse_x = event.x
+            self.mouse_y = event.y
+            self.board_view.move_drag(event.x, event.y)
 
     def on_release(self, event):
         """Handles mouse button release, completing a move."""
         if self.drag_start is None: return
 
-        x = min(max(event.x, 0), self.square_size * 8 - 1)
-        y = min(max(event.y, 0), self.square_size * 8 - 1)
-        file = x // self.square_size
-        rank = 7 - (y // self.square_size)
-        dest_sq = chess.square(file, rank)
+        dest_sq = self.board_view.square_at(event.x, event.y)
 
         move = None
         for m in self.board.legal_moves:
@@ -275,12 +160,9 @@ class ChessUI:
             if self.board.is_capture(move):
                 was_capture = True
             self.board.push(move)
-            if self.board.is_checkmate():
-                self.play_sound(self.sound_checkmate)
-            else:
-                self.play_sound(self.sound_capture if was_capture else self.sound_move)
-                if self.board.is_check():
-                    self.play_sound(self.sound_check)
+            self.sounds.play_move(self.board, was_capture, self.board.is_check())
+            if self.analysis:
+                self.analysis.analyse(self.board)
         else: # No legal move, re-select if valid
             piece_at_dest = self.board.piece_at(dest_sq)
             if piece_at_dest and piece_at_dest.color == self.board.turn:
@@ -288,10 +170,7 @@ class ChessUI:
                 self.legal_destinations = [m.to_square for m in self.board.legal_moves if m.from_square == dest_sq]
                 self.drag_start = dest_sq
                 self.drag_piece = piece_at_dest
-                f = chess.square_file(dest_sq)
-                r = chess.square_rank(dest_sq)
-                self.mouse_x = f * self.square_size + self.square_size / 2
-                self.mouse_y = (7 - r) * self.square_size + self.square_size / 2
+                self.mouse_x, self.mouse_y = self.board_view.square_center(dest_sq)
                 self.draw_board()
                 self.update_status()
                 return
@@ -305,6 +184,27 @@ class ChessUI:
         self.draw_board()
         self.update_status()
 
+    def take_back(self):
+        """Undoes the last move."""
+        if not self.board.move_stack:
+            return
+        self.board.pop()
+        self.dragging = False
+        self.drag_start = None
+        self.drag_piece = None
+        self.selected_square = None
+        self.legal_destinations = []
+        self.draw_board()
+        self.update_status()
+        if self.analysis:
+            self.analysis.analyse(self.board)
+
+    def on_close(self):
+        """Stops the analysis engine and closes the window."""
+        if self.analysis:
+            self.analysis.close()
+        self.root.destroy()
+
     def update_status(self):
         """Updates the game status message."""
         if self.board.is_checkmate():
@@ -2,27 +2,16 @@ import tkinter as tk
 from tkinter import messagebox
 import chess
 import os
-import subprocess
-import pygame
-from PIL import Image, ImageTk
+from tadfish_gui import EngineClient, EngineError, TkSearch, describe_info, startup
+from tadfish_gui.board_view import BoardView, load_piece_images
+from tadfish_gui.sounds import SoundBank
 
 simulation_depth = 5 # Tadfish engine search depth
-
-HIGHLIGHT_COLOR = "#5C4033"
-CHECKMATE_HIGHLIGHT_COLOR = "#FF0000"
+ponder = True # Let Tadfish think about its expected reply while the player moves
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # Resource directory
 ENGINE_PATH = os.path.join(BASE_DIR, "tadfish.exe") # Path to Tadfish engine
 
-# Determine best resampling filter
-try:
-    RESAMPLE = Image.Resampling.LANCZOS
-except AttributeError:
-    try:
-        RESAMPLE = Image.LANCZOS
-    except AttributeError:
-        RESAMPLE = Image.BICUBIC
-
 class ChessUI:
     """Manages Chess UI for Player vs. Tadfish."""
     def __init__(self, root):
@@ -60,11 +49,12 @@ class ChessUI:
         tk.Label(self.main_container, textvariable=self.status_var,
                  font='Helvetica 12 bold', fg="#E0E0E0", bg="#2E343A", pady=5).grid(row=4, column=0, pady=(5, 0))
 
-        try:
-            pygame.mixer.init()
-        except Exception:
-            print("Audio init failed. Sounds will not play.")
-        self.load_sounds()
+        self.new_game_button = tk.Button(self.main_container, text="New Game", command=self.new_game,
+                                         bg="#4CAF50", fg="white", activebackground="#60B863", activeforeground="white",
+                                         relief=tk.RAISED, bd=3, padx=15, pady=8, font='Helvetica 11 bold', cursor="hand2")
+        self.new_game_button.grid(row=5, column=0, sticky="n", pady=(10, 0))
+
+        self.sounds = SoundBank(BASE_DIR)
 
         self.board = chess.Board()
 
@@ -79,8 +69,15 @@ class ChessUI:
         self.pressed_x = 0
         self.pressed_y = 0
 
-        self.piece_images = {}
-        missing = self.load_piece_images_with_check()
+        # Persistent UCI process, started with Tadfish's first move
+        self.engine = None
+        self.engine_search = None
+        self.engine_after_id = None
+        self.ponder_move = None # Player move the running ponder search expects
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.piece_images, missing = load_piece_images(BASE_DIR, self.square_size)
+        self.board_view = BoardView(self.canvas, self.square_size, self.piece_images)
         if missing:
             msg = "The following piece image files failed to load:\n" + "\n".join(missing) + \
                   "\n\nEnsure these files exist in the 'images' folder next to frontend.py, with exact names."
@@ -92,136 +89,14 @@ class ChessUI:
 
         self.draw_board()
         self.update_status()
-        self.play_sound(self.sound_start)
-
-    def load_sounds(self):
-        """Loads sound files for game events."""
-        def try_load(name):
-            path = os.path.join(BASE_DIR, "audio", name)
-            if os.path.exists(path):
-                try:
-                    return pygame.mixer.Sound(path)
-                except pygame.error:
-                    return None
-            return None
-
-        self.sound_move = try_load("move-self.mp3")
-        self.sound_capture = try_load("capture.mp3")
-        self.sound_check = try_load("move-check.mp3")
-        self.sound_checkmate = try_load("checkmate.mp3")
-        self.sound_start = try_load("start.mp3")
-
-    def play_sound(self, sound_obj):
-        """Plays a given sound."""
-        if sound_obj:
-            try:
-                sound_obj.play()
-            except pygame.error:
-                pass
-
-    def load_piece_images_with_check(self):
-        """Loads chess piece images, returns list of missing files."""
-        mapping = {
-            'P': 'white-pawn.png', 'N': 'white-knight.png', 'B': 'white-bishop.png',
-            'R': 'white-rook.png', 'Q': 'white-queen.png', 'K': 'white-king.png',
-            'p': 'black-pawn.png', 'n': 'black-knight.png', 'b': 'black-bishop.png',
-            'r': 'black-rook.png', 'q': 'black-queen.png', 'k': 'black-king.png',
-        }
-        missing = []
-        for symbol, filename in mapping.items():
-            path = os.path.join(BASE_DIR, "images", filename)
-            if os.path.exists(path):
-                try:
-                    img = Image.open(path).convert("RGBA")
-                    img = img.resize((self.square_size, self.square_size), RESAMPLE)
-                    self.piece_images[symbol] = ImageTk.PhotoImage(img)
-                except Exception as e:
-                    missing.append(f"{filename} (error: {e})")
-            else:
-                missing.append(f"{filename} (not found at {path})")
-        return missing
+        self.sounds.play("start")
+        startup.report_first_frame(self.root)
 
     def draw_board(self):
         """Draws the board, pieces, highlights, and checkmate."""
-        self.canvas.delete("all")
-
-        # Draw squares
-        for rank in range(8):
-            for file in range(8):
-                x1 = file * self.square_size
-                y1 = (7 - rank) * self.square_size
-                x2 = x1 + self.square_size
-                y2 = y1 + self.square_size
-                color = "#F0D9B5" if (rank + file) % 2 == 0 else "#B58863"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="")
-
-        # Highlight selected square
-        if self.selected_square is not None and not self.dragging:
-            f = chess.square_file(self.selected_square)
-            r = chess.square_rank(self.selected_square)
-            x1 = f * self.square_size
-            y1 = (7 - r) * self.square_size
-            x2 = x1 + self.square_size
-            y2 = y1 + self.square_size
-            self.canvas.create_rectangle(x1, y1, x2, y2, outline=HIGHLIGHT_COLOR, width=3)
-
-        # Draw dots for legal destinations
-        for dest in self.legal_destinations:
-            f = chess.square_file(dest)
-            r = chess.square_rank(dest)
-            cx = f * self.square_size + self.square_size/2
-            cy = (7 - r) * self.square_size + self.square_size/2
-            rad = self.square_size * 0.1
-            self.canvas.create_oval(cx-rad, cy-rad, cx+rad, cy+rad, fill=HIGHLIGHT_COLOR, outline="")
-
-        # Draw pieces (excluding dragged piece)
-        for square in chess.SQUARES:
-            if self.dragging and square == self.drag_start:
-                continue
-
-            piece = self.board.piece_at(square)
-            if piece:
-                symbol = piece.symbol()
-                img = self.piece_images.get(symbol)
-                f = chess.square_file(square)
-                r = chess.square_rank(square)
-                x = f * self.square_size + self.square_size/2
-                y = (7 - r) * self.square_size + self.square_size/2
-                if img:
-                    self.canvas.create_image(x, y, image=img)
-                else: # Fallback to Unicode
-                    uni = {'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
-                           'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'}.get(symbol, '')
-                    if uni:
-                        size = int(self.square_size * 0.6)
-                        self.canvas.create_text(x, y, text=uni, font=("Arial", size))
-
-        # Draw the dragged piece
-        if self.dragging and self.drag_piece:
-            x = self.mouse_x
-            y = self.mouse_y
-            symbol = self.drag_piece.symbol()
-            img = self.piece_images.get(symbol)
-            if img:
-                self.canvas.create_image(x, y, image=img)
-            else: # Fallback to Unicode
-                uni = {'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
-                       'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'}.get(symbol, '')
-                if uni:
-                    size = int(self.square_size * 0.6)
-                    self.canvas.create_text(x, y, text=uni, font=("Arial", size))
-
-        # Highlight king if in checkmate
-        if self.board.is_checkmate():
-            sq = self.board.king(self.board.turn)
-            if sq is not None:
-                f = chess.square_file(sq)
-                r = chess.square_rank(sq)
-                x1 = f * self.square_size + 2
-                y1 = (7 - r) * self.square_size + 2
-                x2 = x1 + self.square_size - 4
-                y2 = y1 + self.square_size - 4
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline=CHECKMATE_HIGHLIGHT_COLOR, width=4)
+        drag_pos = (self.mouse_x, self.mouse_y) if self.dragging else None
+        self.board_view.draw(self.board, self.selected_square, self.legal_destinations,
+                             self.drag_start, self.drag_piece, drag_pos)
 
     def on_press(self, event):
         """Handles mouse press for piece selection (player only)."""
@@ -252,21 +127,19 @@ class ChessUI:
 
         if not self.dragging and (dx >= self.min_drag_distance or dy >= self.min_drag_distance):
             self.dragging = True
-
-        if self.dragging:
             self.mouse_x = event.x
             self.mouse_y = event.y
             self.draw_board()
+        elif self.dragging: # Only the dragged piece moves
+            self.mouse_x = event.x
+            self.mouse_y = event.y
+            self.board_view.move_drag(event.x, event.y)
 
     def on_release(self, event):
         """Handles mouse release to complete a move."""
         if self.drag_start is None: return
 
-        x = min(max(event.x, 0), self.square_size * 8 - 1)
-        y = min(max(event.y, 0), self.square_size * 8 - 1)
-        file = x // self.square_size
-        rank = 7 - (y // self.square_size)
-        dest_sq = chess.square(file, rank)
+        dest_sq = self.board_view.square_at(event.x, event.y)
 
         move = None
         for m in self.board.legal_moves:
@@ -280,18 +153,16 @@ class ChessUI:
                 was_capture = True
             self.board.push(move)
 
-            # Play sound based on move type
-            if self.board.is_checkmate():
-                self.play_sound(self.sound_checkmate)
-            else:
-                self.play_sound(self.sound_capture if was_capture else self.sound_move)
-                if self.board.is_check():
-                    self.play_sound(self.sound_check)
+            self.sounds.play_move(self.board, was_capture, self.board.is_check())
 
             self.update_status()
 
-            if not self.board.is_game_over() and self.board.turn == chess.BLACK:
-                self.root.after(500, self.make_tadfish_move)
+            if self.ponder_move is not None and move == self.ponder_move:
+                self.ponder_hit()
+            else:
+                self.cancel_engine_move()
+                if not self.board.is_game_over() and self.board.turn == chess.BLACK:
+                    self.engine_after_id = self.root.after(500, self.make_tadfish_move)
         else: # No legal move, try to re-select
             piece_at_dest = self.board.piece_at(dest_sq)
             if piece_at_dest and piece_at_dest.color == self.board.turn:
@@ -299,10 +170,7 @@ class ChessUI:
                 self.legal_destinations = [m.to_square for m in self.board.legal_moves if m.from_square == dest_sq]
                 self.drag_start = dest_sq
                 self.drag_piece = piece_at_dest
-                f = chess.square_file(dest_sq)
-                r = chess.square_rank(dest_sq)
-                self.mouse_x = f * self.square_size + self.square_size / 2
-                self.mouse_y = (7 - r) * self.square_size + self.square_size / 2
+                self.mouse_x, self.mouse_y = self.board_view.square_center(dest_sq)
                 self.draw_board()
                 self.update_status()
                 return
@@ -317,52 +185,81 @@ class ChessUI:
         self.update_status()
 
     def make_tadfish_move(self):
-        """Requests and applies a move from Tadfish engine."""
-        if self.board.is_game_over():
+        """Starts a Tadfish search in the background; the UI keeps running meanwhile."""
+        self.engine_after_id = None
+        if self.board.is_game_over() or self.board.turn != chess.BLACK:
             self.update_status()
             return
 
-        fen = self.board.fen()
-        move_str = ""
-
         try:
-            result = subprocess.run(
-                [ENGINE_PATH, fen, str(simulation_depth)],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=30
-            )
-
-            output_parts = result.stdout.strip().split()
-            if not output_parts:
-                raise ValueError("Tadfish engine returned empty output.")
-
-            move_str = output_parts[0]
-            print(f"Tadfish move: {move_str}")
-            move = chess.Move.from_uci(move_str)
-
+            if self.engine is None:
+                self.engine = EngineClient([ENGINE_PATH, "uci"], "Tadfish")
+            moves = [m.uci() for m in self.board.move_stack]
+            self.engine_search = TkSearch(self.root, self.engine, moves,
+                                          on_done=self.apply_tadfish_move,
+                                          on_error=self.on_engine_error,
+                                          on_info=self.show_engine_info,
+                                          depth=simulation_depth)
         except FileNotFoundError:
             messagebox.showerror("Engine Error", f"Tadfish engine executable not found at {ENGINE_PATH}.\n"
-                                                 "Please ensure 'chess.exe' exists and is executable.")
+                                                 "Please ensure 'tadfish.exe' exists and is executable.")
             self.update_status()
             return
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Engine Error", f"Tadfish engine returned an error: {e.stderr.strip()}.\n"
-                                                 "Check engine path and arguments.")
-            self.update_status()
+        except (EngineError, OSError) as e:
+            self.on_engine_error(e)
             return
-        except subprocess.TimeoutExpired:
-            messagebox.showerror("Engine Error", "Tadfish engine did not respond in time.")
-            self.update_status()
+        self.status_var.set("Tadfish is thinking...")
+
+    def start_pondering(self):
+        """Searches the player's expected reply (from Tadfish's last bestmove) on the player's time."""
+        if not ponder or self.engine is None or self.board.is_game_over():
+            return
+        try:
+            expected = chess.Move.from_uci(self.engine.ponder_move or "")
+        except ValueError:
             return
+        if expected not in self.board.legal_moves:
+            return
+
+        moves = [m.uci() for m in self.board.move_stack] + [expected.uci()]
+        try:
+            self.engine_search = TkSearch(self.root, self.engine, moves,
+                                          on_done=self.apply_tadfish_move,
+                                          on_error=self.on_engine_error,
+                                          ponder=True, depth=simulation_depth)
+        except EngineError:
+            return # Not worth a dialog; the next real search restarts the engine
+        self.ponder_move = expected
+
+    def ponder_hit(self):
+        """The player played the expected move: the ponder search goes on as Tadfish's real search."""
+        self.ponder_move = None
+        self.engine_search.on_info = self.show_engine_info
+        self.engine_search.ponderhit()
+        self.status_var.set("Tadfish is thinking...")
+
+    def show_engine_info(self, info):
+        """Shows Tadfish's latest search progress in the status line."""
+        text = describe_info(info, white_to_move=False)
+        if text:
+            self.status_var.set(f"Tadfish is thinking: {text}")
+
+    def on_engine_error(self, error):
+        """Reports a crashed or timed out engine; the client restarts it for the next move."""
+        self.engine_search = None
+        self.ponder_move = None
+        messagebox.showerror("Engine Error", f"Tadfish engine stopped responding: {error}")
+        self.update_status()
+
+    def apply_tadfish_move(self, move_str):
+        """Plays the move Tadfish answered with."""
+        self.engine_search = None
+        print(f"Tadfish move: {move_str}")
+        try:
+            move = chess.Move.from_uci(move_str or "")
         except ValueError as e:
             messagebox.showerror("Engine Output Error", f"Failed to parse Tadfish engine output: {e}.\n"
-                                                         f"Output: '{result.stdout.strip()}'")
-            self.update_status()
-            return
-        except Exception as e:
-            messagebox.showerror("Unexpected Engine Error", f"An unexpected error occurred with Tadfish: {e}")
+                                                         f"Output: '{move_str}'")
             self.update_status()
             return
 
@@ -375,20 +272,51 @@ class ChessUI:
             self.draw_board()
             self.update_status()
 
-            # Play sound
-            if self.board.is_checkmate():
-                self.play_sound(self.sound_checkmate)
-            elif gives_check:
-                self.play_sound(self.sound_check)
-            elif is_capture:
-                self.play_sound(self.sound_capture)
-            else:
-                self.play_sound(self.sound_move)
+            self.sounds.play_move(self.board, is_capture, gives_check)
+            self.start_pondering()
         else:
             messagebox.showerror("Invalid Move", f"Tadfish returned an illegal move: {move_str} for current board state.\n"
                                                  "Game stopped.")
             self.update_status()
 
+    def cancel_engine_move(self):
+        """Drops a scheduled or running Tadfish search, including a ponder search."""
+        self.ponder_move = None
+        if self.engine_after_id:
+            self.root.after_cancel(self.engine_after_id)
+            self.engine_after_id = None
+        if self.engine_search:
+            self.engine_search.cancel()
+            self.engine_search = None
+
+    def new_game(self):
+        """Resets the board, cancelling Tadfish's search if it is thinking."""
+        self.cancel_engine_move()
+        if self.engine is not None:
+            try:
+                self.engine.new_game()
+            except EngineError:
+                self.engine.quit()
+                self.engine = None
+
+        self.board = chess.Board()
+        self.dragging = False
+        self.drag_start = None
+        self.drag_piece = None
+        self.selected_square = None
+        self.legal_destinations = []
+        self.draw_board()
+        self.update_status()
+        self.sounds.play("start")
+
+    def on_close(self):
+        """Stops Tadfish and shuts its process down."""
+        self.cancel_engine_move()
+        if self.engine is not None:
+            print(self.engine.metrics_summary())
+            self.engine.quit()
+        self.root.destroy()
+
     def update_status(self):
         """Updates the game status message."""
         if self.board.is_checkmate():
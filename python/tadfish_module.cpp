@@ -0,0 +1,554 @@
+// tadfish_module.cpp
+// In-process Python bindings for the engine (CPython C API, no extra dependencies).
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include "board.h"
+#include "movegen.h"
+#include "eval.h"
+#include "nnue.h"
+#include "search.h"
+#include "bitbase.h"
+#include "notation.h"
+#include "batch.h"
+#include <cstring>
+#include <mutex>
+#include <new>
+#include <shared_mutex>
+#include <string>
+#include <vector>
+
+static const char* START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1";
+
+// The search keeps its state in globals, so only one search runs at a time
+static std::mutex search_mutex;
+
+// Evaluation state (cache, weights, network, bitbases) is read without the
+// GIL by searches and batches, which hold this shared; whatever changes it
+// holds it exclusively. Both are only ever taken with the GIL released.
+static std::shared_mutex eval_mutex;
+
+// Everything unmake_move needs to take back a pushed move
+struct PushedMove {
+    Move move;
+    Piece captured;
+    Piece moved;
+};
+
+static PyObject* move_list_to_python(const MoveList& moves) {
+    PyObject* list = PyList_New(moves.size());
+    if (!list) return NULL;
+    for (int i = 0; i < moves.size(); ++i) {
+        PyObject* item = PyUnicode_FromString(move_to_uci(moves[i].to_move()).c_str());
+        if (!item) {
+            Py_DECREF(list);
+            return NULL;
+        }
+        PyList_SET_ITEM(list, i, item);
+    }
+    return list;
+}
+
+// ---------------------------------------------------------------- Board
+
+struct BoardObject {
+    PyObject_HEAD
+    Board* board;
+    std::vector<PushedMove>* stack;
+};
+
+static PyTypeObject BoardType = {PyVarObject_HEAD_INIT(NULL, 0)};
+
+static PyObject* board_new(PyTypeObject* type, PyObject*, PyObject*) {
+    BoardObject* self = (BoardObject*)type->tp_alloc(type, 0);
+    if (!self) return NULL;
+    self->board = new (std::nothrow) Board();
+    self->stack = new (std::nothrow) std::vector<PushedMove>();
+    if (!self->board || !self->stack) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+    return (PyObject*)self;
+}
+
+static void board_dealloc(BoardObject* self) {
+    delete self->board;
+    delete self->stack;
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static int board_init(BoardObject* self, PyObject* args, PyObject* kwds) {
+    static const char* kwlist[] = {"fen", NULL};
+    const char* fen = START_FEN;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|s", (char**)kwlist, &fen)) return -1;
+    self->stack->clear();
+    if (!self->board->load_fen(fen)) {
+        PyErr_Format(PyExc_ValueError, "invalid FEN: %s", fen);
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject* board_set_fen(BoardObject* self, PyObject* args) {
+    const char* fen;
+    if (!PyArg_ParseTuple(args, "s", &fen)) return NULL;
+    // Parse into a copy so a bad FEN leaves the board as it was
+    Board* position = new (std::nothrow) Board();
+    if (!position) return PyErr_NoMemory();
+    bool valid = position->load_fen(fen);
+    if (valid) {
+        *self->board = *position;
+        self->stack->clear();
+    }
+    delete position;
+    if (!valid) {
+        PyErr_Format(PyExc_ValueError, "invalid FEN: %s", fen);
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject* board_fen(BoardObject* self, PyObject*) {
+    return PyUnicode_FromString(self->board->to_fen().c_str());
+}
+
+static PyObject* board_push(BoardObject* self, PyObject* args) {
+    const char* uci;
+    if (!PyArg_ParseTuple(args, "s", &uci)) return NULL;
+    PushedMove pushed;
+    if (!move_from_uci(*self->board, uci, pushed.move)) {
+        PyErr_Format(PyExc_ValueError, "illegal move: %s", uci);
+        return NULL;
+    }
+    if (!self->board->make_move(pushed.move, pushed.captured, pushed.moved)) {
+        PyErr_SetString(PyExc_RuntimeError, "move history is full");
+        return NULL;
+    }
+    self->stack->push_back(pushed);
+    Py_RETURN_NONE;
+}
+
+static PyObject* board_pop(BoardObject* self, PyObject*) {
+    if (self->stack->empty()) {
+        PyErr_SetString(PyExc_IndexError, "pop from empty move stack");
+        return NULL;
+    }
+    PushedMove pushed = self->stack->back();
+    self->stack->pop_back();
+    self->board->unmake_move(pushed.move, pushed.captured, pushed.moved);
+    return PyUnicode_FromString(move_to_uci(pushed.move).c_str());
+}
+
+static PyObject* board_legal_moves(BoardObject* self, PyObject*) {
+    MoveGenerator gen(*self->board);
+    MoveList moves;
+    gen.generate_legal_moves(moves);
+    return move_list_to_python(moves);
+}
+
+static PyObject* board_is_check(BoardObject* self, PyObject*) {
+    return PyBool_FromLong(self->board->is_king_in_check(self->board->side_to_move));
+}
+
+static PyObject* board_is_game_over(BoardObject* self, PyObject*) {
+    return PyBool_FromLong(self->board->is_game_over());
+}
+
+static PyObject* board_result(BoardObject* self, PyObject*) {
+    return PyUnicode_FromString(self->board->get_result_string().c_str());
+}
+
+static PyObject* board_copy(BoardObject* self, PyObject*) {
+    BoardObject* other = (BoardObject*)board_new(Py_TYPE(self), NULL, NULL);
+    if (!other) return NULL;
+    *other->board = *self->board;
+    *other->stack = *self->stack;
+    return (PyObject*)other;
+}
+
+static PyObject* board_str(BoardObject* self) {
+    return PyUnicode_FromString(self->board->print_board().c_str());
+}
+
+static PyObject* board_repr(BoardObject* self) {
+    return PyUnicode_FromFormat("Board('%s')", self->board->to_fen().c_str());
+}
+
+static PyObject* board_get_turn(BoardObject* self, void*) {
+    return PyLong_FromLong(self->board->side_to_move);
+}
+
+static PyObject* board_get_key(BoardObject* self, void*) {
+    return PyLong_FromUnsignedLongLong(self->board->key);
+}
+
+static PyMethodDef board_methods[] = {
+    {"set_fen", (PyCFunction)board_set_fen, METH_VARARGS, "Load a position from FEN and clear the move stack (ValueError if it is malformed)."},
+    {"fen", (PyCFunction)board_fen, METH_NOARGS, "Return the position as a FEN string."},
+    {"push", (PyCFunction)board_push, METH_VARARGS, "Play a legal move given in UCI notation."},
+    {"pop", (PyCFunction)board_pop, METH_NOARGS, "Take back the last pushed move and return it."},
+    {"legal_moves", (PyCFunction)board_legal_moves, METH_NOARGS, "Return the legal moves in UCI notation."},
+    {"is_check", (PyCFunction)board_is_check, METH_NOARGS, "True if the side to move is in check."},
+    {"is_game_over", (PyCFunction)board_is_game_over, METH_NOARGS, "True on checkmate or stalemate."},
+    {"result", (PyCFunction)board_result, METH_NOARGS, "Result string: 1-0, 0-1, 1/2-1/2 or *."},
+    {"copy", (PyCFunction)board_copy, METH_NOARGS, "Return an independent copy of the board."},
+    {NULL}
+};
+
+static PyGetSetDef board_getset[] = {
+    {"turn", (getter)board_get_turn, NULL, "Side to move (WHITE or BLACK).", NULL},
+    {"key", (getter)board_get_key, NULL, "Zobrist key of the position.", NULL},
+    {NULL}
+};
+
+// ---------------------------------------------------------------- MoveGenerator
+
+struct MoveGeneratorObject {
+    PyObject_HEAD
+    BoardObject* board;
+};
+
+static PyTypeObject MoveGeneratorType = {PyVarObject_HEAD_INIT(NULL, 0)};
+
+static int movegen_init(MoveGeneratorObject* self, PyObject* args, PyObject*) {
+    PyObject* board;
+    if (!PyArg_ParseTuple(args, "O!", &BoardType, &board)) return -1;
+    Py_INCREF(board);
+    Py_XSETREF(self->board, (BoardObject*)board);
+    return 0;
+}
+
+static void movegen_dealloc(MoveGeneratorObject* self) {
+    Py_XDECREF(self->board);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static PyObject* movegen_generate(MoveGeneratorObject* self, bool legal) {
+    if (!self->board) {
+        PyErr_SetString(PyExc_RuntimeError, "MoveGenerator is not initialised");
+        return NULL;
+    }
+    MoveGenerator gen(*self->board->board);
+    MoveList moves;
+    if (legal) gen.generate_legal_moves(moves);
+    else gen.generate_pseudo_legal_moves(moves);
+    return move_list_to_python(moves);
+}
+
+static PyObject* movegen_legal(MoveGeneratorObject* self, PyObject*) {
+    return movegen_generate(self, true);
+}
+
+static PyObject* movegen_pseudo_legal(MoveGeneratorObject* self, PyObject*) {
+    return movegen_generate(self, false);
+}
+
+static PyMethodDef movegen_methods[] = {
+    {"generate_legal_moves", (PyCFunction)movegen_legal, METH_NOARGS, "Legal moves in UCI notation."},
+    {"generate_pseudo_legal_moves", (PyCFunction)movegen_pseudo_legal, METH_NOARGS, "Pseudo-legal moves in UCI notation."},
+    {NULL}
+};
+
+// ---------------------------------------------------------------- Module functions
+
+static PyObject* py_evaluate(PyObject*, PyObject* args) {
+    PyObject* board;
+    if (!PyArg_ParseTuple(args, "O!", &BoardType, &board)) return NULL;
+    Board* position = new (std::nothrow) Board(*((BoardObject*)board)->board);
+    if (!position) return PyErr_NoMemory();
+    int score;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::shared_lock<std::shared_mutex> lock(eval_mutex);
+        score = evaluate(*position);
+    }
+    Py_END_ALLOW_THREADS
+    delete position;
+    return PyLong_FromLong(score);
+}
+
+static PyObject* py_find_best_move(PyObject*, PyObject* args, PyObject* kwds) {
+    static const char* kwlist[] = {"board", "depth", "time_ms", NULL};
+    PyObject* board;
+    int depth;
+    int time_ms = 20000;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!i|i", (char**)kwlist, &BoardType, &board, &depth, &time_ms))
+        return NULL;
+    // Search a private copy so other Python threads may keep using the board
+    Board* position = new (std::nothrow) Board(*((BoardObject*)board)->board);
+    if (!position) return PyErr_NoMemory();
+    // Cleared while this thread still holds the GIL, so a stop() from another
+    // thread once this call has started is never lost
+    clear_search_stop();
+    Move best;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::lock_guard<std::mutex> lock(search_mutex);
+        std::shared_lock<std::shared_mutex> eval_lock(eval_mutex);
+        best = find_best_move(*position, depth, time_ms);
+    }
+    Py_END_ALLOW_THREADS
+    delete position;
+    if (best.from < 0) Py_RETURN_NONE;
+    return PyUnicode_FromString(move_to_uci(best).c_str());
+}
+
+static PyObject* py_perft(PyObject*, PyObject* args) {
+    PyObject* board;
+    int depth;
+    if (!PyArg_ParseTuple(args, "O!i", &BoardType, &board, &depth)) return NULL;
+    Board* position = new (std::nothrow) Board(*((BoardObject*)board)->board);
+    if (!position) return PyErr_NoMemory();
+    uint64_t nodes;
+    Py_BEGIN_ALLOW_THREADS
+    nodes = perft(*position, depth);
+    Py_END_ALLOW_THREADS
+    delete position;
+    return PyLong_FromUnsignedLongLong(nodes);
+}
+
+static PyObject* py_stop(PyObject*, PyObject*) {
+    stop_search();
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_last_search_stats(PyObject*, PyObject*) {
+    SearchStats stats;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::lock_guard<std::mutex> lock(search_mutex);
+        stats = last_search_stats();
+    }
+    Py_END_ALLOW_THREADS
+    return Py_BuildValue("{s:K,s:K,s:K,s:K,s:i,s:i,s:i}",
+                         "nodes", (unsigned long long)stats.nodes,
+                         "qnodes", (unsigned long long)stats.qnodes,
+                         "eval_cache_probes", (unsigned long long)stats.eval_cache_probes,
+                         "eval_cache_hits", (unsigned long long)stats.eval_cache_hits,
+                         "time_ms", stats.time_ms,
+                         "depth", stats.depth,
+                         "score", stats.score);
+}
+
+static PyObject* py_init_bitbases(PyObject*, PyObject* args) {
+    const char* dir;
+    if (!PyArg_ParseTuple(args, "s", &dir)) return NULL;
+    int loaded;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::unique_lock<std::shared_mutex> lock(eval_mutex);
+        loaded = bitbase_init(dir);
+    }
+    Py_END_ALLOW_THREADS
+    return PyLong_FromLong(loaded);
+}
+
+static PyObject* py_set_eval_cache_size(PyObject*, PyObject* args) {
+    unsigned long mb;
+    if (!PyArg_ParseTuple(args, "k", &mb)) return NULL;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::unique_lock<std::shared_mutex> lock(eval_mutex);
+        set_eval_cache_size(mb);
+    }
+    Py_END_ALLOW_THREADS
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_load_eval_weights(PyObject*, PyObject* args) {
+    const char* path;
+    if (!PyArg_ParseTuple(args, "s", &path)) return NULL;
+    std::string error;
+    bool loaded;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::unique_lock<std::shared_mutex> lock(eval_mutex);
+        loaded = load_eval_weights(path, error);
+    }
+    Py_END_ALLOW_THREADS
+    if (!loaded) {
+        PyErr_SetString(PyExc_ValueError, error.c_str());
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_load_nnue(PyObject*, PyObject* args) {
+    const char* path;
+    if (!PyArg_ParseTuple(args, "s", &path)) return NULL;
+    std::string error;
+    bool loaded;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::unique_lock<std::shared_mutex> lock(eval_mutex);
+        loaded = nnue_load(path, error);
+        if (loaded) clear_eval_cache();
+    }
+    Py_END_ALLOW_THREADS
+    if (!loaded) {
+        PyErr_SetString(PyExc_ValueError, error.c_str());
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_use_nnue(PyObject*, PyObject* args) {
+    int enable;
+    if (!PyArg_ParseTuple(args, "p", &enable)) return NULL;
+    bool changed;
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::unique_lock<std::shared_mutex> lock(eval_mutex);
+        changed = set_eval_mode(enable ? EVAL_NNUE : EVAL_CLASSIC);
+    }
+    Py_END_ALLOW_THREADS
+    if (!changed) {
+        PyErr_SetString(PyExc_RuntimeError, "no NNUE network loaded");
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+// Get a C-contiguous buffer of native integers with the given item size
+// (int8 or int32), or set a TypeError
+static bool get_buffer(PyObject* obj, Py_buffer* view, Py_ssize_t itemsize, bool writable, const char* name) {
+    int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | (writable ? PyBUF_WRITABLE : 0);
+    if (PyObject_GetBuffer(obj, view, flags) < 0) return false;
+    const char* format = view->format ? view->format : "B";
+    if (*format == '@' || *format == '=' || (*format == '<' && PY_LITTLE_ENDIAN)) ++format;
+    bool integer = format[0] != '\0' && format[1] == '\0' && strchr(itemsize == 1 ? "bB" : "il", format[0]);
+    if (view->itemsize != itemsize || !integer) {
+        PyErr_Format(PyExc_TypeError, "%s must be an int%zd buffer", name, itemsize * 8);
+        PyBuffer_Release(view);
+        return false;
+    }
+    return true;
+}
+
+static PyObject* py_evaluate_batch(PyObject*, PyObject* args, PyObject* kwds) {
+    static const char* kwlist[] = {"pieces", "out", "side", "castling", "ep", "depth", "threads", NULL};
+    PyObject* objs[5] = {NULL, NULL, Py_None, Py_None, Py_None};
+    int depth = 0;
+    int threads = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|OOOii", (char**)kwlist,
+                                     &objs[0], &objs[1], &objs[2], &objs[3], &objs[4], &depth, &threads))
+        return NULL;
+
+    // pieces, out, side, castling, ep
+    static const char* names[5] = {"pieces", "out", "side", "castling", "ep"};
+    Py_buffer views[5];
+    bool held[5] = {false, false, false, false, false};
+    PyObject* result = NULL;
+    Py_ssize_t count = 0;
+    PositionBatch batch;
+    long long bad_row;
+
+    for (int i = 0; i < 5; ++i) {
+        if (objs[i] == Py_None) continue;
+        if (!get_buffer(objs[i], &views[i], i == 1 ? 4 : 1, i == 1, names[i])) goto done;
+        held[i] = true;
+    }
+    if (views[0].len % 64 != 0) {
+        PyErr_SetString(PyExc_ValueError, "pieces must hold 64 squares per position");
+        goto done;
+    }
+    count = views[0].len / 64;
+    for (int i = 1; i < 5; ++i) {
+        if (held[i] && views[i].len / views[i].itemsize != count) {
+            PyErr_Format(PyExc_ValueError, "%s must have one entry per position (%zd)", names[i], count);
+            goto done;
+        }
+    }
+
+    batch.pieces = (const int8_t*)views[0].buf;
+    batch.side = held[2] ? (const int8_t*)views[2].buf : nullptr;
+    batch.castling = held[3] ? (const uint8_t*)views[3].buf : nullptr;
+    batch.ep = held[4] ? (const int8_t*)views[4].buf : nullptr;
+    batch.count = (size_t)count;
+
+    Py_BEGIN_ALLOW_THREADS
+    bad_row = validate_batch(batch);
+    if (bad_row < 0) {
+        std::shared_lock<std::shared_mutex> lock(eval_mutex);
+        evaluate_batch(batch, (int32_t*)views[1].buf, depth, threads);
+    }
+    Py_END_ALLOW_THREADS
+    if (bad_row >= 0) {
+        PyErr_Format(PyExc_ValueError, "position %lld is not a valid board", bad_row);
+        goto done;
+    }
+    result = Py_None;
+    Py_INCREF(result);
+
+done:
+    for (int i = 0; i < 5; ++i) {
+        if (held[i]) PyBuffer_Release(&views[i]);
+    }
+    return result;
+}
+
+static PyMethodDef module_methods[] = {
+    {"evaluate", py_evaluate, METH_VARARGS, "evaluate(board) -> centipawn score for the side to move."},
+    {"find_best_move", (PyCFunction)(void (*)(void))py_find_best_move, METH_VARARGS | METH_KEYWORDS,
+     "find_best_move(board, depth, time_ms=20000) -> UCI move or None.\n"
+     "Releases the GIL while searching; stop() ends the search early."},
+    {"evaluate_batch", (PyCFunction)(void (*)(void))py_evaluate_batch, METH_VARARGS | METH_KEYWORDS,
+     "evaluate_batch(pieces, out, side=None, castling=None, ep=None, depth=0, threads=0)\n"
+     "Score many positions without copying them. pieces is an (N, 64) int8 buffer of piece\n"
+     "codes, out an (N,) int32 buffer that receives side-to-move relative scores: the static\n"
+     "evaluation, or a fixed-depth search when depth > 0. side (0/1), castling (KQkq bits\n"
+     "1/2/4/8) and ep (square or -1) are optional (N,) int8 buffers."},
+    {"perft", py_perft, METH_VARARGS, "perft(board, depth) -> number of legal move sequences of that many plies."},
+    {"stop", py_stop, METH_NOARGS, "Stop the running search, which then returns its best move so far."},
+    {"last_search_stats", py_last_search_stats, METH_NOARGS, "Counters from the last completed search."},
+    {"init_bitbases", py_init_bitbases, METH_VARARGS, "Memory-map the endgame bitbases in a folder."},
+    {"set_eval_cache_size", py_set_eval_cache_size, METH_VARARGS, "Resize the evaluation cache (MB, 0 disables)."},
+    {"load_eval_weights", py_load_eval_weights, METH_VARARGS, "Load evaluation weights from a weights file."},
+    {"load_nnue", py_load_nnue, METH_VARARGS, "Load an NNUE network file."},
+    {"use_nnue", py_use_nnue, METH_VARARGS, "Evaluate with the loaded NNUE network (True) or the handcrafted terms."},
+    {NULL}
+};
+
+static PyModuleDef tadfish_module = {
+    PyModuleDef_HEAD_INIT, "tadfish", "In-process bindings for the Tadfish chess engine.", -1, module_methods
+};
+
+PyMODINIT_FUNC PyInit_tadfish(void) {
+    BoardType.tp_name = "tadfish.Board";
+    BoardType.tp_doc = "Board(fen=START_FEN): a chess position with a move stack.";
+    BoardType.tp_basicsize = sizeof(BoardObject);
+    BoardType.tp_flags = Py_TPFLAGS_DEFAULT;
+    BoardType.tp_new = board_new;
+    BoardType.tp_init = (initproc)board_init;
+    BoardType.tp_dealloc = (destructor)board_dealloc;
+    BoardType.tp_str = (reprfunc)board_str;
+    BoardType.tp_repr = (reprfunc)board_repr;
+    BoardType.tp_methods = board_methods;
+    BoardType.tp_getset = board_getset;
+
+    MoveGeneratorType.tp_name = "tadfish.MoveGenerator";
+    MoveGeneratorType.tp_doc = "MoveGenerator(board): move generation for a Board.";
+    MoveGeneratorType.tp_basicsize = sizeof(MoveGeneratorObject);
+    MoveGeneratorType.tp_flags = Py_TPFLAGS_DEFAULT;
+    MoveGeneratorType.tp_new = PyType_GenericNew;
+    MoveGeneratorType.tp_init = (initproc)movegen_init;
+    MoveGeneratorType.tp_dealloc = (destructor)movegen_dealloc;
+    MoveGeneratorType.tp_methods = movegen_methods;
+
+    if (PyType_Ready(&BoardType) < 0 || PyType_Ready(&MoveGeneratorType) < 0) return NULL;
+
+    PyObject* module = PyModule_Create(&tadfish_module);
+    if (!module) return NULL;
+    Py_INCREF(&BoardType);
+    Py_INCREF(&MoveGeneratorType);
+    if (PyModule_AddObject(module, "Board", (PyObject*)&BoardType) < 0 ||
+        PyModule_AddObject(module, "MoveGenerator", (PyObject*)&MoveGeneratorType) < 0 ||
+        PyModule_AddIntConstant(module, "WHITE", WHITE) < 0 ||
+        PyModule_AddIntConstant(module, "BLACK", BLACK) < 0 ||
+        PyModule_AddIntConstant(module, "EMPTY", EMPTY) < 0 ||
+        PyModule_AddStringConstant(module, "START_FEN", START_FEN) < 0) {
+        Py_DECREF(module);
+        return NULL;
+    }
+    return module;
+}
@@ -0,0 +1,19 @@
+# Build the in-process Python module:  python setup.py build_ext --inplace
+import glob
+import sys
+from setuptools import setup, Extension
+
+if sys.platform == "win32":
+    compile_args = ["/std:c++17", "/O2", "/EHsc"]
+else:
+    compile_args = ["-std=c++17", "-O2"]
+
+tadfish = Extension(
+    "tadfish",
+    sources=sorted(glob.glob("src/*.cpp")) + ["python/tadfish_module.cpp"],
+    include_dirs=["include"],
+    extra_compile_args=compile_args,
+    language="c++",
+)
+
+setup(name="tadfish", version="2.2", ext_modules=[tadfish])
@@ -0,0 +1,230 @@
+// analyse.cpp
+#include "analyse.h"
+#include "board.h"
+#include "epd.h"
+#include "notation.h"
+#include "search.h"
+#include "tt.h"
+#include <algorithm>
+#include <climits>
+#include <condition_variable>
+#include <deque>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <thread>
+#include <vector>
+
+// Positions a worker may run ahead of the oldest unwritten one, per thread
+static const size_t WINDOW_PER_THREAD = 64;
+
+static bool is_position_line(const std::string& line) {
+    size_t first = line.find_first_not_of(" \t\r\n");
+    return first != std::string::npos && line[first] != '#';
+}
+
+static std::string error_result(const AnalyseOptions& options, size_t index, const std::string& line) {
+    if (options.epd_output) return line;
+    std::ostringstream out;
+    out << "{\"index\":" << index << ",\"input\":\"" << json_escape(line)
+        << "\",\"error\":\"invalid position\"}";
+    return out.str();
+}
+
+static std::string analyse_position(SearchContext& ctx, const AnalyseOptions& options,
+                                    size_t index, const std::string& line) {
+    EpdRecord record;
+    if (!parse_epd_line(line, record)) return error_result(options, index, line);
+    Board board;
+    board.load_fen(record.fen);
+    if (board.piece_count[WK] != 1 || board.piece_count[BK] != 1) return error_result(options, index, line);
+
+    ctx.node_limit = options.nodes;
+    ctx.multipv = options.multipv;
+    int depth = options.depth > 0 ? options.depth : MAX_PLY - 1;
+    int time_ms = options.movetime_ms > 0 ? options.movetime_ms : INT_MAX;
+    Move best = find_best_move(ctx, board, depth, time_ms);
+    const SearchStats& stats = ctx.stats;
+    uint64_t nodes = stats.nodes + stats.qnodes;
+    bool has_move = best.from >= 0;
+    std::string san = has_move ? move_to_san(board, best) : "";
+
+    std::ostringstream out;
+    if (options.epd_output) {
+        out << fen_to_epd_position(record.fen);
+        if (has_move) out << " bm " << san << ";";
+        if (is_mate_score(stats.score)) out << " dm " << mate_in_moves(stats.score) << ";";
+        else out << " ce " << stats.score << ";";
+        out << " acd " << stats.depth << "; acn " << nodes << "; acs " << stats.time_ms / 1000 << ";";
+        for (const auto& op : record.operations) {
+            const std::string& code = op.first;
+            if (code == "bm" || code == "ce" || code == "dm" || code == "acd" || code == "acn" || code == "acs")
+                continue;
+            out << " " << code;
+            if (!op.second.empty()) {
+                bool quote = op.second.find(' ') != std::string::npos || code == "id" || code[0] == 'c';
+                out << " " << (quote ? "\"" + op.second + "\"" : op.second);
+            }
+            out << ";";
+        }
+    } else {
+        out << "{\"index\":" << index << ",\"fen\":\"" << record.fen << "\"";
+        if (const std::string* id = record.find("id")) out << ",\"id\":\"" << json_escape(*id) << "\"";
+        if (has_move) out << ",\"bestmove\":\"" << move_to_uci(best) << "\",\"san\":\"" << san << "\"";
+        else out << ",\"bestmove\":null";
+        if (is_mate_score(stats.score)) out << ",\"mate\":" << mate_in_moves(stats.score);
+        else out << ",\"cp\":" << stats.score;
+        if (options.multipv > 1) {
+            out << ",\"lines\":[";
+            for (int i = 0; i < ctx.line_count; ++i) {
+                const SearchLine& pv = ctx.lines[i];
+                Move move = pv.pv[0].to_move();
+                out << (i ? "," : "") << "{\"move\":\"" << move_to_uci(move) << "\",\"san\":\""
+                    << move_to_san(board, move) << "\"";
+                if (is_mate_score(pv.score)) out << ",\"mate\":" << mate_in_moves(pv.score);
+                else out << ",\"cp\":" << pv.score;
+                out << ",\"pv\":\"";
+                for (int j = 0; j < pv.pv_length; ++j) out << (j ? " " : "") << move_to_uci(pv.pv[j].to_move());
+                out << "\"}";
+            }
+            out << "]";
+        }
+        out << ",\"depth\":" << stats.depth << ",\"nodes\":" << nodes << ",\"time_ms\":" << stats.time_ms << "}";
+    }
+    return out.str();
+}
+
+// Count the complete lines of a previous run's output and cut off a partly
+// written last line, so the run can carry on where it stopped.
+static bool prepare_resume(const std::string& path, size_t& done) {
+    done = 0;
+    std::ifstream in(path, std::ios::binary);
+    if (!in) return true;  // nothing written yet
+    std::uintmax_t complete_bytes = 0;
+    std::uintmax_t bytes = 0;
+    char c;
+    while (in.get(c)) {
+        bytes++;
+        if (c == '\n') {
+            done++;
+            complete_bytes = bytes;
+        }
+    }
+    in.close();
+    if (complete_bytes != bytes) {
+        std::error_code ec;
+        std::filesystem::resize_file(path, complete_bytes, ec);
+        if (ec) return false;
+    }
+    return true;
+}
+
+int run_analyse(const AnalyseOptions& options) {
+    std::ifstream file_in;
+    std::istream* in = &std::cin;
+    if (options.input != "-") {
+        file_in.open(options.input);
+        if (!file_in) {
+            std::cerr << "Cannot open " << options.input << "\n";
+            return 1;
+        }
+        in = &file_in;
+    }
+
+    size_t skip = 0;
+    if (options.resume) {
+        if (options.output.empty()) {
+            std::cerr << "--resume needs --output\n";
+            return 1;
+        }
+        if (!prepare_resume(options.output, skip)) {
+            std::cerr << "Cannot truncate " << options.output << "\n";
+            return 1;
+        }
+        std::cerr << "Resuming after " << skip << " positions\n";
+    }
+
+    std::ofstream file_out;
+    std::ostream* out = &std::cout;
+    if (!options.output.empty()) {
+        file_out.open(options.output, options.resume ? std::ios::app : std::ios::trunc);
+        if (!file_out) {
+            std::cerr << "Cannot write " << options.output << "\n";
+            return 1;
+        }
+        out = &file_out;
+    }
+
+    struct Job {
+        size_t index;
+        std::string line;
+    };
+    std::mutex mutex;
+    std::condition_variable job_ready, window_free;
+    std::deque<Job> jobs;
+    bool input_done = false;
+    std::map<size_t, std::string> finished;
+    size_t next_to_write = skip;
+
+    int threads = std::max(1, options.threads);
+    size_t window = WINDOW_PER_THREAD * threads;
+
+    TranspositionTable tt(options.hash_mb);
+    auto worker = [&]() {
+        std::unique_ptr<SearchContext> ctx(new SearchContext());
+        ctx->tt = &tt;
+        for (;;) {
+            Job job;
+            {
+                std::unique_lock<std::mutex> lock(mutex);
+                job_ready.wait(lock, [&] { return !jobs.empty() || input_done; });
+                if (jobs.empty()) return;
+                job = std::move(jobs.front());
+                jobs.pop_front();
+            }
+            std::string result = analyse_position(*ctx, options, job.index, job.line);
+
+            // Write every result that is now next in input order
+            std::lock_guard<std::mutex> lock(mutex);
+            finished[job.index] = std::move(result);
+            for (auto it = finished.begin(); it != finished.end() && it->first == next_to_write;
+                 it = finished.erase(it)) {
+                *out << it->second << "\n";
+                next_to_write++;
+            }
+            out->flush();
+            window_free.notify_one();
+        }
+    };
+
+    std::vector<std::thread> pool;
+    for (int i = 0; i < threads; ++i) pool.emplace_back(worker);
+
+    std::string line;
+    size_t index = 0;
+    while (std::getline(*in, line)) {
+        if (!line.empty() && line.back() == '\r') line.pop_back();
+        if (!is_position_line(line)) continue;
+        if (index < skip) {
+            index++;
+            continue;
+        }
+        std::unique_lock<std::mutex> lock(mutex);
+        window_free.wait(lock, [&] { return index - next_to_write < window; });
+        jobs.push_back({index++, line});
+        job_ready.notify_one();
+    }
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        input_done = true;
+    }
+    job_ready.notify_all();
+    for (auto& t : pool) t.join();
+
+    std::cerr << "Analysed " << (index > skip ? index - skip : 0) << " positions\n";
+    return 0;
+}
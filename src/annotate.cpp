@@ -0,0 +1,217 @@
+// annotate.cpp
+#include "annotate.h"
+#include "board.h"
+#include "notation.h"
+#include "pgn.h"
+#include "search.h"
+#include "tt.h"
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <climits>
+#include <cstdio>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <thread>
+#include <vector>
+
+// Scores beyond this count as won: a mate in 5 instead of a mate in 2 is
+// no mistake, and neither is giving back a piece in a won position
+static const int EVAL_CLAMP_CP = 1000;
+
+struct GameResult {
+    PgnGame game;
+    int positions = 0;
+    uint64_t nodes = 0;
+    int time_ms = 0;
+    int mistakes[2] = {0, 0};  // per colour
+    int blunders[2] = {0, 0};
+    std::string error;         // why the annotation stops early, if it does
+};
+
+// Each thread annotates its games with its own search state and table
+struct AnnotateWorker {
+    TranspositionTable tt;
+    std::unique_ptr<SearchContext> ctx{new SearchContext()};
+    explicit AnnotateWorker(size_t hash_mb) : tt(hash_mb) { ctx->tt = &tt; }
+};
+
+// "[%eval 0.35]" style value, from white's point of view
+static std::string eval_to_pgn(int white_score) {
+    if (is_mate_score(white_score)) return "#" + std::to_string(mate_in_moves(white_score));
+    char text[16];
+    snprintf(text, sizeof(text), "%.2f", white_score / 100.0);
+    return text;
+}
+
+static int clamp_eval(int score) {
+    return std::max(-EVAL_CLAMP_CP, std::min(score, EVAL_CLAMP_CP));
+}
+
+static void add_comment(PgnMove& move, const std::string& text) {
+    move.comment += (move.comment.empty() ? "" : " ") + text;
+}
+
+static void annotate_game(AnnotateWorker& worker, const AnnotateOptions& options, GameResult& result) {
+    auto start = std::chrono::steady_clock::now();
+    PgnGame& game = result.game;
+    Board board;
+    board.load_fen(game.start_fen());
+
+    // Play the game to its end, then walk back through it
+    struct Played { Move move; Piece captured, moved; };
+    std::vector<Played> played;
+    for (const PgnMove& pgn_move : game.moves) {
+        Played p;
+        if (!move_from_san(board, pgn_move.san, p.move) || !board.make_move(p.move, p.captured, p.moved)) {
+            result.error = "illegal move " + pgn_move.san + " at ply " + std::to_string(played.size() + 1);
+            break;
+        }
+        played.push_back(p);
+    }
+
+    // Scores and best moves of positions 0..n, side to move relative
+    size_t n = played.size();
+    std::vector<int> scores(n + 1);
+    std::vector<Move> best(n + 1);
+    std::vector<bool> game_over(n + 1);
+    int depth = options.depth > 0 ? options.depth : MAX_PLY - 1;
+    int time_ms = options.movetime_ms > 0 ? options.movetime_ms : INT_MAX;
+    SearchContext& ctx = *worker.ctx;
+    for (size_t i = n + 1; i-- > 0;) {
+        if (i < n) board.unmake_move(played[i].move, played[i].captured, played[i].moved);
+        Board position = board;
+        ctx.stop_requested = false;
+        ctx.node_limit = options.nodes;
+        best[i] = find_best_move(ctx, position, depth, time_ms);
+        scores[i] = ctx.stats.score;
+        game_over[i] = best[i].from < 0;
+        result.nodes += ctx.stats.nodes + ctx.stats.qnodes;
+        result.positions++;
+    }
+
+    // The board is back at the start; judge every move by how much worse
+    // the position is for its player than after the engine's move
+    for (size_t i = 0; i < n; ++i) {
+        PgnMove& move = game.moves[i];
+        Color us = board.side_to_move;
+        int drop = clamp_eval(scores[i]) + clamp_eval(scores[i + 1]);
+        std::string best_san = game_over[i] ? "" : move_to_san(board, best[i]);
+        int white_after = board.side_to_move == WHITE ? -scores[i + 1] : scores[i + 1];
+        if (!game_over[i + 1]) add_comment(move, "[%eval " + eval_to_pgn(white_after) + "]");
+
+        if (PackedMove(best[i]) != PackedMove(played[i].move) && drop >= options.mistake_cp) {
+            bool blunder = drop >= options.blunder_cp;
+            (blunder ? result.blunders : result.mistakes)[us]++;
+            move.nag = blunder ? "??" : "?";
+            int white_best = us == WHITE ? scores[i] : -scores[i];
+            add_comment(move, std::string(blunder ? "Blunder." : "Mistake.") + " " + best_san + " was best (" +
+                                  eval_to_pgn(white_best) + ").");
+        }
+        board.make_move(played[i].move, played[i].captured, played[i].moved);
+    }
+
+    std::ostringstream summary;
+    summary << "Tadfish";
+    if (options.depth > 0) summary << " depth " << options.depth;
+    if (options.nodes > 0) summary << " nodes " << options.nodes;
+    if (options.movetime_ms > 0) summary << " movetime " << options.movetime_ms;
+    game.set_tag("Annotator", summary.str());
+    std::ostringstream counts;
+    counts << "Blunders: white " << result.blunders[WHITE] << ", black " << result.blunders[BLACK]
+           << ". Mistakes: white " << result.mistakes[WHITE] << ", black " << result.mistakes[BLACK] << ".";
+    game.comment = counts.str() + (game.comment.empty() ? "" : " " + game.comment);
+    result.time_ms = int(std::chrono::duration_cast<std::chrono::milliseconds>(
+        std::chrono::steady_clock::now() - start).count());
+}
+
+static std::string game_name(const PgnGame& game, size_t index) {
+    std::string white = game.tag("White"), black = game.tag("Black");
+    std::string name = "Game " + std::to_string(index + 1);
+    if (!white.empty() || !black.empty()) name += " (" + white + " - " + black + ")";
+    return name;
+}
+
+int run_annotate(const AnnotateOptions& options) {
+    std::vector<PgnGame> games;
+    if (options.input == "-") {
+        games = read_pgn(std::cin);
+    } else {
+        std::ifstream in(options.input);
+        if (!in) {
+            std::cerr << "Cannot open " << options.input << "\n";
+            return 1;
+        }
+        games = read_pgn(in);
+    }
+
+    std::ofstream file_out;
+    std::ostream* out = &std::cout;
+    if (!options.output.empty()) {
+        file_out.open(options.output);
+        if (!file_out) {
+            std::cerr << "Cannot write " << options.output << "\n";
+            return 1;
+        }
+        out = &file_out;
+    }
+
+    // Games are handed out in order and written in order as soon as every
+    // earlier game is done
+    std::vector<GameResult> results(games.size());
+    std::vector<bool> done(games.size());
+    std::mutex mutex;
+    size_t next_to_write = 0;
+    std::atomic<size_t> next(0);
+    auto start = std::chrono::steady_clock::now();
+    auto worker = [&]() {
+        AnnotateWorker state(options.hash_mb);
+        for (size_t i = next++; i < games.size(); i = next++) {
+            GameResult& result = results[i];
+            result.game = std::move(games[i]);
+            annotate_game(state, options, result);
+
+            std::lock_guard<std::mutex> lock(mutex);
+            double seconds = std::max(result.time_ms, 1) / 1000.0;
+            char rate[64];
+            snprintf(rate, sizeof(rate), "%.1f s (%.1f positions/s, %llu nps)", seconds,
+                     result.positions / seconds, (unsigned long long)(result.nodes / seconds));
+            std::cerr << game_name(result.game, i) << ": " << result.positions << " positions in " << rate
+                      << ", blunders " << result.blunders[WHITE] + result.blunders[BLACK] << ", mistakes "
+                      << result.mistakes[WHITE] + result.mistakes[BLACK];
+            if (!result.error.empty()) std::cerr << " (stopped at " << result.error << ")";
+            std::cerr << "\n";
+            done[i] = true;
+            for (; next_to_write < results.size() && done[next_to_write]; ++next_to_write) {
+                write_pgn(*out, results[next_to_write].game);
+                results[next_to_write].game = PgnGame();
+            }
+            out->flush();
+        }
+    };
+    int threads = std::max(1, std::min<int>(options.threads, (int)games.size()));
+    std::vector<std::thread> pool;
+    for (int i = 1; i < threads; ++i) pool.emplace_back(worker);
+    worker();
+    for (auto& t : pool) t.join();
+
+    int positions = 0, blunders = 0, mistakes = 0;
+    uint64_t nodes = 0;
+    for (const GameResult& result : results) {
+        positions += result.positions;
+        nodes += result.nodes;
+        blunders += result.blunders[WHITE] + result.blunders[BLACK];
+        mistakes += result.mistakes[WHITE] + result.mistakes[BLACK];
+    }
+    double seconds = std::max<double>(std::chrono::duration_cast<std::chrono::milliseconds>(
+                                          std::chrono::steady_clock::now() - start).count(), 1) / 1000.0;
+    char rate[80];
+    snprintf(rate, sizeof(rate), "%.1f s (%.2f games/min, %.1f positions/s)", seconds,
+             results.size() * 60 / seconds, positions / seconds);
+    std::cerr << "Annotated " << results.size() << " games, " << positions << " positions in " << rate
+              << ", blunders " << blunders << ", mistakes " << mistakes << "\n";
+    return 0;
+}
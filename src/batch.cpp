@@ -0,0 +1,89 @@
+// batch.cpp
+#include "batch.h"
+#include "board.h"
+#include "eval.h"
+#include "search.h"
+#include <algorithm>
+#include <atomic>
+#include <climits>
+#include <memory>
+#include <thread>
+#include <vector>
+
+// Rows a worker claims at a time
+static const size_t CHUNK_ROWS = 256;
+
+long long validate_batch(const PositionBatch& batch) {
+    for (size_t row = 0; row < batch.count; ++row) {
+        const int8_t* pieces = batch.pieces + row * 64;
+        int counts[13] = {0};
+        bool ok = true;
+        for (int sq = 0; sq < 64 && ok; ++sq) {
+            int p = pieces[sq];
+            if (p < EMPTY || p > BK) ok = false;
+            else if (p != EMPTY && ++counts[p] > Board::MAX_PIECES_PER_TYPE) ok = false;
+        }
+        if (ok && (counts[WK] != 1 || counts[BK] != 1)) ok = false;
+        if (ok && batch.side && batch.side[row] != WHITE && batch.side[row] != BLACK) ok = false;
+        if (ok && batch.ep && batch.ep[row] != -1) {
+            // The square a pawn of the side not to move just skipped
+            int ep = batch.ep[row];
+            Color side = batch.side ? Color(batch.side[row]) : WHITE;
+            if (side == WHITE) ok = ep >= 40 && ep < 48 && pieces[ep - 8] == BP;
+            else ok = ep >= 16 && ep < 24 && pieces[ep + 8] == WP;
+            ok = ok && pieces[ep] == EMPTY;
+        }
+        if (!ok) return (long long)row;
+    }
+    return -1;
+}
+
+static void load_row(const PositionBatch& batch, size_t row, Board& board) {
+    const int8_t* pieces = batch.pieces + row * 64;
+    for (int sq = 0; sq < 64; ++sq) board.squares[sq] = Piece(pieces[sq]);
+    board.side_to_move = batch.side ? Color(batch.side[row]) : WHITE;
+    uint8_t castling = batch.castling ? batch.castling[row] : 0;
+    board.white_king_castle = castling & 1;
+    board.white_queen_castle = castling & 2;
+    board.black_king_castle = castling & 4;
+    board.black_queen_castle = castling & 8;
+    board.en_passant_square = batch.ep ? batch.ep[row] : -1;
+    board.halfmove_clock = 0;
+    board.fullmove_number = 1;
+    board.history_size = 0;
+    board.refresh_piece_lists();
+    board.key = board.compute_key();
+}
+
+void evaluate_batch(const PositionBatch& batch, int32_t* out, int depth, int threads) {
+    if (batch.count == 0) return;
+    if (threads <= 0) threads = std::max(1u, std::thread::hardware_concurrency());
+    size_t chunks = (batch.count + CHUNK_ROWS - 1) / CHUNK_ROWS;
+    threads = (int)std::min<size_t>(threads, chunks);
+
+    std::atomic<size_t> next_chunk(0);
+    auto worker = [&]() {
+        Board board;
+        std::unique_ptr<SearchContext> ctx;
+        if (depth > 0) ctx.reset(new SearchContext());
+        for (;;) {
+            size_t chunk = next_chunk.fetch_add(1);
+            if (chunk >= chunks) break;
+            size_t end = std::min(batch.count, (chunk + 1) * CHUNK_ROWS);
+            for (size_t row = chunk * CHUNK_ROWS; row < end; ++row) {
+                load_row(batch, row, board);
+                if (depth > 0) {
+                    find_best_move(*ctx, board, depth, INT_MAX);
+                    out[row] = ctx->stats.score;
+                } else {
+                    out[row] = evaluate(board);
+                }
+            }
+        }
+    };
+
+    std::vector<std::thread> pool;
+    for (int i = 1; i < threads; ++i) pool.emplace_back(worker);
+    worker();
+    for (auto& t : pool) t.join();
+}
@@ -0,0 +1,77 @@
+// bench.cpp
+#include "bench.h"
+#include "board.h"
+#include "eval.h"
+#include "nnue.h"
+#include "search.h"
+#include "tt.h"
+#include <algorithm>
+#include <cstdio>
+#include <iostream>
+#include <memory>
+
+// Opening, middlegame and endgame positions
+static const char* BENCH_FENS[] = {
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 12",
+    "2r2rk1/pp1bqppp/2n1pn2/3p4/3P4/2PBPN2/P1Q2PPP/R1B2RK1 b - - 3 13",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "6k1/5pp1/p3p2p/1p1pP3/2qP4/P1P3QP/5PP1/6K1 w - - 0 30",
+    "8/8/4kpp1/3p1b2/p6P/2B5/6P1/6K1 b - - 1 40",
+    "r1bqk2r/pp1n1ppp/2pbpn2/3p4/2PP4/2NBPN2/PP3PPP/R1BQK2R w KQkq - 2 7",
+};
+
+struct BenchTotals {
+    uint64_t nodes = 0;
+    int time_ms = 0;
+};
+
+static BenchTotals bench_eval(const BenchOptions& options) {
+    BenchTotals totals;
+    TranspositionTable tt(16);
+    std::unique_ptr<SearchContext> ctx(new SearchContext());
+    ctx->tt = &tt;
+    for (const char* fen : BENCH_FENS) {
+        Board board;
+        board.load_fen(fen);
+        tt.clear();
+        clear_eval_cache();
+        ctx->stop_requested = false;
+        find_best_move(*ctx, board, options.depth, 1000000);
+        totals.nodes += ctx->stats.nodes + ctx->stats.qnodes;
+        totals.time_ms += ctx->stats.time_ms;
+    }
+    return totals;
+}
+
+static void print_totals(const char* name, const BenchTotals& totals) {
+    uint64_t nps = totals.nodes * 1000 / std::max(1, totals.time_ms);
+    std::printf("%-8s %12llu nodes %8d ms %10llu nps\n", name, (unsigned long long)totals.nodes, totals.time_ms,
+                (unsigned long long)nps);
+}
+
+int run_bench(const BenchOptions& options) {
+    if (options.nnue && !nnue_loaded()) {
+        std::cerr << "No NNUE network loaded\n";
+        return 1;
+    }
+    int positions = int(sizeof(BENCH_FENS) / sizeof(BENCH_FENS[0]));
+    std::printf("Bench: %d positions at depth %d\n", positions, options.depth);
+
+    EvalMode previous = eval_mode();
+    set_eval_mode(EVAL_CLASSIC);
+    BenchTotals classic = bench_eval(options);
+    print_totals("classic", classic);
+    if (options.nnue) {
+        set_eval_mode(EVAL_NNUE);
+        BenchTotals nnue = bench_eval(options);
+        print_totals("nnue", nnue);
+        std::printf("NNUE code: %s\n", nnue_simd());
+    }
+    set_eval_mode(previous);
+    std::fflush(stdout);
+    return 0;
+}
@@ -0,0 +1,629 @@
+// bitbase.cpp
+#include "bitbase.h"
+#include "precomputed_moves.h"
+#include <algorithm>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <vector>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+using namespace std;
+
+namespace {
+
+const char BB_MAGIC[4] = {'T', 'F', 'B', 'B'};
+const uint32_t BB_VERSION = 1;
+
+struct BitbaseHeader {
+    char magic[4];
+    uint32_t version;
+    uint32_t entries;
+    uint32_t reserved;
+};
+
+// The strong side is always stored as white; `pieces` is its non-king material.
+struct BitbaseSpec {
+    const char* name;
+    int piece_count;
+    Piece pieces[2];
+    bool has_pawn;
+};
+
+// Order matters for generation: KPK promotes into KQK and KRK.
+const BitbaseSpec SPECS[] = {
+    {"KQK",  1, {WQ, EMPTY}, false},
+    {"KRK",  1, {WR, EMPTY}, false},
+    {"KPK",  1, {WP, EMPTY}, true},
+    {"KBNK", 2, {WB, WN},    false},
+};
+const int NUM_SPECS = sizeof(SPECS) / sizeof(SPECS[0]);
+const int SPEC_KQK = 0;
+const int SPEC_KRK = 1;
+
+// Canonical white king squares (a1-d1-d4 triangle) for pawnless tables
+const int TRIANGLE[10] = {A1, B1, C1, D1, B2, C2, D2, C3, D3, D4};
+
+// Position inside a table, strong side = white
+struct BBPos {
+    int stm;    // 0 = strong side to move, 1 = weak side to move
+    int wk;
+    int bk;
+    int sq[2];  // squares of spec.pieces
+};
+
+struct MappedTable {
+    const uint8_t* data = nullptr;  // first entry, past the header
+    uint32_t entries = 0;
+    void* base = nullptr;
+    size_t length = 0;
+#ifdef _WIN32
+    HANDLE file = INVALID_HANDLE_VALUE;
+    HANDLE mapping = nullptr;
+#endif
+};
+
+MappedTable tables[NUM_SPECS];
+
+int triangle_index(int sq) {
+    for (int i = 0; i < 10; ++i)
+        if (TRIANGLE[i] == sq) return i;
+    return -1;
+}
+
+bool king_adjacent(int a, int b) {
+    int dr = abs(a / 8 - b / 8);
+    int df = abs(a % 8 - b % 8);
+    return max(dr, df) == 1;
+}
+
+// Symmetry bits: 1 = mirror files, 2 = mirror ranks, 4 = transpose
+int transform_square(int sq, int t) {
+    if (t & 1) sq ^= 7;
+    if (t & 2) sq ^= 56;
+    if (t & 4) sq = ((sq & 7) << 3) | (sq >> 3);
+    return sq;
+}
+
+uint32_t table_size(const BitbaseSpec& spec) {
+    uint32_t size = 2u * (spec.has_pawn ? 32u : 10u) * 64u;
+    for (int i = 0; i < spec.piece_count; ++i) size *= 64u;
+    return size;
+}
+
+// Index of a position whose white king already sits in the canonical region
+uint32_t raw_index(const BitbaseSpec& spec, const BBPos& pos) {
+    uint32_t slots = spec.has_pawn ? 32u : 10u;
+    uint32_t wk_slot = spec.has_pawn ? (pos.wk / 8) * 4 + pos.wk % 8 : triangle_index(pos.wk);
+    uint32_t idx = pos.stm * slots + wk_slot;
+    idx = idx * 64 + pos.bk;
+    for (int i = 0; i < spec.piece_count; ++i) idx = idx * 64 + pos.sq[i];
+    return idx;
+}
+
+BBPos transformed(const BitbaseSpec& spec, const BBPos& pos, int t) {
+    BBPos out = pos;
+    out.wk = transform_square(pos.wk, t);
+    out.bk = transform_square(pos.bk, t);
+    for (int i = 0; i < spec.piece_count; ++i) out.sq[i] = transform_square(pos.sq[i], t);
+    return out;
+}
+
+// Canonical index: the smallest index over every symmetry that puts the white
+// king in the canonical region, so equivalent positions share one entry.
+uint32_t bitbase_index(const BitbaseSpec& spec, const BBPos& pos) {
+    if (spec.has_pawn) {
+        return raw_index(spec, transformed(spec, pos, (pos.wk % 8 > 3) ? 1 : 0));
+    }
+    uint32_t best = UINT32_MAX;
+    for (int t = 0; t < 8; ++t) {
+        if (triangle_index(transform_square(pos.wk, t)) < 0) continue;
+        best = min(best, raw_index(spec, transformed(spec, pos, t)));
+    }
+    return best;
+}
+
+BBPos decode_index(const BitbaseSpec& spec, uint32_t idx) {
+    BBPos pos;
+    for (int i = spec.piece_count - 1; i >= 0; --i) {
+        pos.sq[i] = idx % 64;
+        idx /= 64;
+    }
+    pos.bk = idx % 64;
+    idx /= 64;
+    uint32_t slots = spec.has_pawn ? 32u : 10u;
+    uint32_t wk_slot = idx % slots;
+    pos.stm = idx / slots;
+    pos.wk = spec.has_pawn ? (wk_slot / 4) * 8 + wk_slot % 4 : TRIANGLE[wk_slot];
+    return pos;
+}
+
+// Is `sq` occupied by white material (ignoring piece `skip`)?
+bool white_occupies(const BitbaseSpec& spec, const BBPos& pos, int sq, int skip = -1) {
+    if (sq == pos.wk) return true;
+    for (int i = 0; i < spec.piece_count; ++i)
+        if (i != skip && pos.sq[i] == sq) return true;
+    return false;
+}
+
+int white_piece_at(const BitbaseSpec& spec, const BBPos& pos, int sq) {
+    for (int i = 0; i < spec.piece_count; ++i)
+        if (pos.sq[i] == sq) return i;
+    return -1;
+}
+
+bool ray_attacks(const BitbaseSpec& spec, const BBPos& pos, const int rays[4][7], int target, int skip) {
+    for (int d = 0; d < 4; ++d) {
+        for (int i = 0; i < 7 && rays[d][i] != -1; ++i) {
+            int t = rays[d][i];
+            if (t == target) return true;
+            if (white_occupies(spec, pos, t, skip)) break;
+        }
+    }
+    return false;
+}
+
+// Does white attack `target`? The black king is treated as off the board so
+// it never blocks a ray against its own destination square.
+bool white_attacks(const BitbaseSpec& spec, const BBPos& pos, int target, int skip = -1) {
+    if (king_adjacent(pos.wk, target)) return true;
+    for (int i = 0; i < spec.piece_count; ++i) {
+        if (i == skip) continue;
+        int s = pos.sq[i];
+        switch (spec.pieces[i]) {
+            case WP:
+                if ((s % 8 > 0 && s + 7 == target) || (s % 8 < 7 && s + 9 == target)) return true;
+                break;
+            case WN:
+                for (int j = 0; j < 8 && KNIGHT_MOVES[s][j] != -1; ++j)
+                    if (KNIGHT_MOVES[s][j] == target) return true;
+                break;
+            case WB:
+                if (ray_attacks(spec, pos, BISHOP_MOVES[s], target, skip)) return true;
+                break;
+            case WR:
+                if (ray_attacks(spec, pos, ROOK_MOVES[s], target, skip)) return true;
+                break;
+            case WQ:
+                if (ray_attacks(spec, pos, BISHOP_MOVES[s], target, skip)) return true;
+                if (ray_attacks(spec, pos, ROOK_MOVES[s], target, skip)) return true;
+                break;
+            default:
+                break;
+        }
+    }
+    return false;
+}
+
+bool is_valid(const BitbaseSpec& spec, const BBPos& pos) {
+    if (pos.wk == pos.bk || king_adjacent(pos.wk, pos.bk)) return false;
+    for (int i = 0; i < spec.piece_count; ++i) {
+        int s = pos.sq[i];
+        if (s == pos.wk || s == pos.bk) return false;
+        for (int j = 0; j < i; ++j)
+            if (pos.sq[j] == s) return false;
+        if (spec.pieces[i] == WP && (s / 8 == 0 || s / 8 == 7)) return false;
+    }
+    // The side not to move cannot be in check
+    if (pos.stm == 0 && white_attacks(spec, pos, pos.bk)) return false;
+    return true;
+}
+
+void king_targets(int sq, vector<int>& out) {
+    out.clear();
+    int rank = sq / 8, file = sq % 8;
+    for (int dr = -1; dr <= 1; ++dr) {
+        for (int df = -1; df <= 1; ++df) {
+            if (dr == 0 && df == 0) continue;
+            int r = rank + dr, f = file + df;
+            if (r < 0 || r > 7 || f < 0 || f > 7) continue;
+            out.push_back(r * 8 + f);
+        }
+    }
+}
+
+enum : uint8_t { S_UNKNOWN, S_INVALID, S_DRAW, S_WIN, S_LOSS };
+
+struct Generator {
+    const BitbaseSpec& spec;
+    const vector<vector<uint8_t>>& solved;
+    uint32_t size;
+    vector<uint8_t> state;
+    vector<uint8_t> dtm;
+    vector<vector<uint32_t>> buckets;
+    vector<int> targets;
+
+    Generator(const BitbaseSpec& s, const vector<vector<uint8_t>>& done)
+        : spec(s), solved(done), size(table_size(s)), state(size, S_UNKNOWN), dtm(size, 0) {}
+
+    void push(size_t level, uint32_t idx) {
+        if (buckets.size() <= level) buckets.resize(level + 1);
+        buckets[level].push_back(idx);
+    }
+
+    // Black to move and every legal king move walks into a position already known as a white win
+    bool all_moves_lose(const BBPos& pos) {
+        vector<int> moves;
+        king_targets(pos.bk, moves);
+        for (int t : moves) {
+            if (white_occupies(spec, pos, t)) continue; // captures make the position a draw, handled at init
+            if (white_attacks(spec, pos, t)) continue;
+            BBPos next = pos;
+            next.bk = t;
+            next.stm = 0;
+            if (state[bitbase_index(spec, next)] != S_WIN) return false;
+        }
+        return true;
+    }
+
+    void classify_initial() {
+        for (uint32_t idx = 0; idx < size; ++idx) {
+            BBPos pos = decode_index(spec, idx);
+            if (bitbase_index(spec, pos) != idx || !is_valid(spec, pos)) {
+                state[idx] = S_INVALID;
+                continue;
+            }
+            if (pos.stm == 1) {
+                king_targets(pos.bk, targets);
+                int moves = 0;
+                bool escape = false;
+                for (int t : targets) {
+                    int captured = white_piece_at(spec, pos, t);
+                    if (t == pos.wk) continue;
+                    if (white_attacks(spec, pos, t, captured)) continue;
+                    if (captured >= 0) escape = true; // every capture leaves a drawn ending
+                    else moves++;
+                }
+                if (escape) {
+                    state[idx] = S_DRAW;
+                } else if (moves == 0) {
+                    if (white_attacks(spec, pos, pos.bk)) {
+                        state[idx] = S_LOSS;
+                        push(0, idx);
+                    } else {
+                        state[idx] = S_DRAW;
+                    }
+                }
+            } else if (spec.has_pawn) {
+                seed_promotions(pos, idx);
+            }
+        }
+    }
+
+    // White pawn promotions leave this table; look the result up in KQK/KRK
+    void seed_promotions(const BBPos& pos, uint32_t idx) {
+        int from = pos.sq[0];
+        int to = from + 8;
+        if (from / 8 != 6 || to == pos.wk || to == pos.bk) return;
+        for (int spec_id : {SPEC_KQK, SPEC_KRK}) {
+            const BitbaseSpec& target = SPECS[spec_id];
+            BBPos next = pos;
+            next.sq[0] = to;
+            next.stm = 1;
+            uint8_t v = solved[spec_id][bitbase_index(target, next)];
+            if (v & 0x80) push((v & 0x7F) + 1, idx);
+        }
+    }
+
+    void propagate() {
+        for (size_t level = 0; level < buckets.size(); ++level) {
+            for (size_t k = 0; k < buckets[level].size(); ++k) {
+                uint32_t idx = buckets[level][k];
+                BBPos pos = decode_index(spec, idx);
+                if (pos.stm == 0) {
+                    if (state[idx] != S_UNKNOWN) continue; // already won faster
+                    state[idx] = S_WIN;
+                    dtm[idx] = level;
+                    retract_black(pos, level);
+                } else {
+                    dtm[idx] = level;
+                    retract_white(pos, level);
+                }
+            }
+        }
+    }
+
+    // Black king un-moves into a win for white: the predecessor is lost
+    // once every one of its moves is a white win.
+    void retract_black(const BBPos& pos, size_t level) {
+        vector<int> moves;
+        king_targets(pos.bk, moves);
+        for (int t : moves) {
+            if (t == pos.wk || white_occupies(spec, pos, t)) continue;
+            BBPos prev = pos;
+            prev.bk = t;
+            prev.stm = 1;
+            uint32_t pidx = bitbase_index(spec, prev);
+            if (state[pidx] != S_UNKNOWN) continue;
+            if (all_moves_lose(prev)) {
+                state[pidx] = S_LOSS;
+                push(level + 1, pidx);
+            }
+        }
+    }
+
+    void queue_white_predecessor(const BBPos& prev, size_t level) {
+        uint32_t pidx = bitbase_index(spec, prev);
+        if (state[pidx] == S_UNKNOWN) push(level + 1, pidx);
+    }
+
+    bool empty_square(const BBPos& pos, int sq) {
+        return sq != pos.bk && !white_occupies(spec, pos, sq);
+    }
+
+    void retract_slider(const BBPos& pos, int piece, const int rays[64][4][7], size_t level) {
+        int from = pos.sq[piece];
+        for (int d = 0; d < 4; ++d) {
+            for (int i = 0; i < 7 && rays[from][d][i] != -1; ++i) {
+                int t = rays[from][d][i];
+                if (!empty_square(pos, t)) break;
+                BBPos prev = pos;
+                prev.sq[piece] = t;
+                prev.stm = 0;
+                queue_white_predecessor(prev, level);
+            }
+        }
+    }
+
+    // Every white un-move into a lost black position is a white win one ply later
+    void retract_white(const BBPos& pos, size_t level) {
+        vector<int> moves;
+        king_targets(pos.wk, moves);
+        for (int t : moves) {
+            if (!empty_square(pos, t)) continue;
+            BBPos prev = pos;
+            prev.wk = t;
+            prev.stm = 0;
+            queue_white_predecessor(prev, level);
+        }
+        for (int i = 0; i < spec.piece_count; ++i) {
+            int from = pos.sq[i];
+            switch (spec.pieces[i]) {
+                case WP: {
+                    BBPos prev = pos;
+                    prev.stm = 0;
+                    if (from / 8 >= 2 && empty_square(pos, from - 8)) {
+                        prev.sq[i] = from - 8;
+                        queue_white_predecessor(prev, level);
+                        if (from / 8 == 3 && empty_square(pos, from - 16)) {
+                            prev.sq[i] = from - 16;
+                            queue_white_predecessor(prev, level);
+                        }
+                    }
+                    break;
+                }
+                case WN:
+                    for (int j = 0; j < 8 && KNIGHT_MOVES[from][j] != -1; ++j) {
+                        int t = KNIGHT_MOVES[from][j];
+                        if (!empty_square(pos, t)) continue;
+                        BBPos prev = pos;
+                        prev.sq[i] = t;
+                        prev.stm = 0;
+                        queue_white_predecessor(prev, level);
+                    }
+                    break;
+                case WB:
+                    retract_slider(pos, i, BISHOP_MOVES, level);
+                    break;
+                case WR:
+                    retract_slider(pos, i, ROOK_MOVES, level);
+                    break;
+                case WQ:
+                    retract_slider(pos, i, BISHOP_MOVES, level);
+                    retract_slider(pos, i, ROOK_MOVES, level);
+                    break;
+                default:
+                    break;
+            }
+        }
+    }
+
+    vector<uint8_t> encode() const {
+        vector<uint8_t> out(size, 0);
+        for (uint32_t idx = 0; idx < size; ++idx) {
+            if (state[idx] == S_WIN) out[idx] = dtm[idx];
+            else if (state[idx] == S_LOSS) out[idx] = 0x80 | dtm[idx];
+        }
+        return out;
+    }
+};
+
+bool write_table(const string& path, const vector<uint8_t>& data) {
+    FILE* f = fopen(path.c_str(), "wb");
+    if (!f) return false;
+    BitbaseHeader header;
+    memcpy(header.magic, BB_MAGIC, 4);
+    header.version = BB_VERSION;
+    header.entries = data.size();
+    header.reserved = 0;
+    bool ok = fwrite(&header, sizeof(header), 1, f) == 1
+           && fwrite(data.data(), 1, data.size(), f) == data.size();
+    return fclose(f) == 0 && ok;
+}
+
+void unmap_table(MappedTable& table) {
+    if (!table.base) return;
+#ifdef _WIN32
+    UnmapViewOfFile(table.base);
+    CloseHandle(table.mapping);
+    CloseHandle(table.file);
+#else
+    munmap(table.base, table.length);
+#endif
+    table = MappedTable();
+}
+
+bool map_table(const string& path, const BitbaseSpec& spec, MappedTable& table) {
+#ifdef _WIN32
+    HANDLE file = CreateFileA(path.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr,
+                              OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+    if (file == INVALID_HANDLE_VALUE) return false;
+    LARGE_INTEGER file_size;
+    GetFileSizeEx(file, &file_size);
+    HANDLE mapping = CreateFileMappingA(file, nullptr, PAGE_READONLY, 0, 0, nullptr);
+    void* base = mapping ? MapViewOfFile(mapping, FILE_MAP_READ, 0, 0, 0) : nullptr;
+    if (!base) {
+        if (mapping) CloseHandle(mapping);
+        CloseHandle(file);
+        return false;
+    }
+    table.file = file;
+    table.mapping = mapping;
+    size_t length = file_size.QuadPart;
+#else
+    int fd = open(path.c_str(), O_RDONLY);
+    if (fd < 0) return false;
+    struct stat st;
+    if (fstat(fd, &st) != 0 || st.st_size < (off_t)sizeof(BitbaseHeader)) {
+        close(fd);
+        return false;
+    }
+    size_t length = st.st_size;
+    void* base = mmap(nullptr, length, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (base == MAP_FAILED) return false;
+#endif
+    table.base = base;
+    table.length = length;
+
+    const BitbaseHeader* header = static_cast<const BitbaseHeader*>(base);
+    if (length < sizeof(BitbaseHeader) || memcmp(header->magic, BB_MAGIC, 4) != 0
+        || header->version != BB_VERSION || header->entries != table_size(spec)
+        || length < sizeof(BitbaseHeader) + header->entries) {
+        cerr << "WARNING: Ignoring malformed bitbase " << path << endl;
+        unmap_table(table);
+        return false;
+    }
+    table.entries = header->entries;
+    table.data = static_cast<const uint8_t*>(base) + sizeof(BitbaseHeader);
+    return true;
+}
+
+// White-equivalent piece type (colour stripped)
+Piece as_white(Piece p) {
+    return (p >= BP && p <= BK) ? Piece(p - 6) : p;
+}
+
+} // namespace
+
+bool bitbase_generate(const string& dir) {
+    vector<vector<uint8_t>> solved(NUM_SPECS);
+    bool ok = true;
+    for (int i = 0; i < NUM_SPECS; ++i) {
+        Generator gen(SPECS[i], solved);
+        gen.classify_initial();
+        gen.propagate();
+        solved[i] = gen.encode();
+
+        int longest = 0;
+        for (uint8_t v : solved[i]) if (v & 0x80) longest = max(longest, v & 0x7F);
+        string path = dir + "/" + SPECS[i].name + ".bb";
+        if (!write_table(path, solved[i])) {
+            cerr << "ERROR: Cannot write " << path << endl;
+            ok = false;
+            continue;
+        }
+        cerr << SPECS[i].name << ": " << solved[i].size() << " entries, longest mate "
+             << longest << " plies -> " << path << endl;
+    }
+    return ok;
+}
+
+int bitbase_init(const string& dir) {
+    bitbase_shutdown();
+    int loaded = 0;
+    for (int i = 0; i < NUM_SPECS; ++i) {
+        if (map_table(dir + "/" + SPECS[i].name + ".bb", SPECS[i], tables[i])) loaded++;
+    }
+    return loaded;
+}
+
+void bitbase_shutdown() {
+    for (int i = 0; i < NUM_SPECS; ++i) unmap_table(tables[i]);
+}
+
+bool bitbase_probe(const Board& board, int& wdl, int& dtm) {
+    // At most four men are covered; count them from the piece lists first
+    int men = 0;
+    for (int p = WP; p <= BK; ++p) men += board.piece_count[p];
+    if (men > 4) return false;
+
+    int white_sq[2], black_sq[2];
+    Piece white_pc[2], black_pc[2];
+    int white_n = 0, black_n = 0;
+    int wk = board.king_square(WHITE), bk = board.king_square(BLACK);
+    for (int p = WP; p <= BQ; ++p) {
+        if (p == WK) continue;
+        for (int i = 0; i < board.piece_count[p]; ++i) {
+            if (p < WK) {
+                if (white_n == 2) return false;
+                white_sq[white_n] = board.piece_list[p][i];
+                white_pc[white_n++] = Piece(p);
+            } else {
+                if (black_n == 2) return false;
+                black_sq[black_n] = board.piece_list[p][i];
+                black_pc[black_n++] = Piece(p);
+            }
+        }
+    }
+    if (wk < 0 || bk < 0) return false;
+    if (white_n > 0 && black_n > 0) return false;
+
+    // Lone kings, or a lone minor piece, cannot mate
+    int strong_n = white_n + black_n;
+    Piece first = as_white(white_n ? white_pc[0] : (black_n ? black_pc[0] : EMPTY));
+    if (strong_n == 0 || (strong_n == 1 && (first == WN || first == WB))) {
+        wdl = 0;
+        dtm = 0;
+        return true;
+    }
+
+    bool strong_white = white_n > 0;
+    if (strong_white ? (board.white_king_castle || board.white_queen_castle)
+                     : (board.black_king_castle || board.black_queen_castle))
+        return false;
+
+    // Map onto the white-strong layout, flipping ranks when black is strong
+    int flip = strong_white ? 0 : 56;
+    const int* sqs = strong_white ? white_sq : black_sq;
+    const Piece* pcs = strong_white ? white_pc : black_pc;
+    BBPos pos;
+    pos.wk = (strong_white ? wk : bk) ^ flip;
+    pos.bk = (strong_white ? bk : wk) ^ flip;
+    pos.stm = ((board.side_to_move == WHITE) == strong_white) ? 0 : 1;
+
+    for (int i = 0; i < NUM_SPECS; ++i) {
+        const BitbaseSpec& spec = SPECS[i];
+        if (spec.piece_count != strong_n || !tables[i].data) continue;
+        bool match = true;
+        for (int j = 0; j < strong_n && match; ++j) {
+            // Place each piece in the slot of the matching spec type
+            int slot = -1;
+            for (int k = 0; k < spec.piece_count; ++k)
+                if (spec.pieces[k] == as_white(pcs[j])) slot = k;
+            if (slot < 0) match = false;
+            else pos.sq[slot] = sqs[j] ^ flip;
+        }
+        if (!match) continue;
+        if (strong_n == 2 && as_white(pcs[0]) == as_white(pcs[1])) continue;
+
+        uint32_t idx = bitbase_index(spec, pos);
+        if (idx >= tables[i].entries) return false;
+        uint8_t v = tables[i].data[idx];
+        if (v == 0) { wdl = 0; dtm = 0; }
+        else if (v & 0x80) { wdl = -1; dtm = v & 0x7F; }
+        else { wdl = 1; dtm = v; }
+        return true;
+    }
+    return false;
+}
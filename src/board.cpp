@@ -1,12 +1,58 @@
 #include "board.h"
 #include "move.h"
 #include "movegen.h" // Assuming movegen.h defines MoveGenerator
+#include "precomputed_moves.h"
 #include <sstream>
 #include <iostream>
 #include <cctype>
+#include <algorithm>
 
 using namespace std;
 
+// Zobrist keys, generated once from a fixed seed so hashes are reproducible
+struct ZobristKeys {
+    uint64_t piece[13][64];
+    uint64_t castling[4]; // WK, WQ, BK, BQ
+    uint64_t en_passant[8];
+    uint64_t side;
+
+    ZobristKeys() {
+        uint64_t seed = 0x9E3779B97F4A7C15ULL;
+        auto next = [&seed]() {
+            // splitmix64
+            uint64_t z = (seed += 0x9E3779B97F4A7C15ULL);
+            z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+            z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+            return z ^ (z >> 31);
+        };
+        for (int p = 0; p < 13; ++p)
+            for (int sq = 0; sq < 64; ++sq)
+                piece[p][sq] = (p == EMPTY) ? 0 : next();
+        for (auto& k : castling) k = next();
+        for (auto& k : en_passant) k = next();
+        side = next();
+    }
+};
+
+static const ZobristKeys& zobrist() {
+    static const ZobristKeys keys;
+    return keys;
+}
+
+static uint64_t castling_key(bool wk, bool wq, bool bk, bool bq) {
+    const ZobristKeys& z = zobrist();
+    uint64_t k = 0;
+    if (wk) k ^= z.castling[0];
+    if (wq) k ^= z.castling[1];
+    if (bk) k ^= z.castling[2];
+    if (bq) k ^= z.castling[3];
+    return k;
+}
+
+static uint64_t en_passant_key(int square) {
+    return square < 0 ? 0 : zobrist().en_passant[square % 8];
+}
+
 Board::Board() {
     side_to_move = WHITE;
     white_king_castle = white_queen_castle = true;
@@ -14,13 +60,44 @@ Board::Board() {
     en_passant_square = -1;
     halfmove_clock = 0;
     fullmove_number = 1;
-    // history is default-constructed (empty)
+    history_size = 0;
 
     for (int i = 0; i < 64; ++i)
         squares[i] = EMPTY;
+    refresh_piece_lists();
+    key = compute_key();
 }
 
-void Board::load_fen(const string& fen) {
+Board::Board(const Board& other) {
+    copy_from(other);
+}
+
+Board& Board::operator=(const Board& other) {
+    if (this != &other) copy_from(other);
+    return *this;
+}
+
+// Member-wise copy that only takes the used part of the history stack.
+// Keep in sync with the fields declared in board.h.
+void Board::copy_from(const Board& other) {
+    copy(other.squares, other.squares + 64, squares);
+    side_to_move = other.side_to_move;
+    white_king_castle = other.white_king_castle;
+    white_queen_castle = other.white_queen_castle;
+    black_king_castle = other.black_king_castle;
+    black_queen_castle = other.black_queen_castle;
+    en_passant_square = other.en_passant_square;
+    halfmove_clock = other.halfmove_clock;
+    fullmove_number = other.fullmove_number;
+    key = other.key;
+    copy(other.piece_count, other.piece_count + 13, piece_count);
+    copy(&other.piece_list[0][0], &other.piece_list[0][0] + 13 * MAX_PIECES_PER_TYPE, &piece_list[0][0]);
+    copy(other.piece_index, other.piece_index + 64, piece_index);
+    history_size = other.history_size;
+    copy(other.history, other.history + other.history_size, history);
+}
+
+bool Board::load_fen(const string& fen) {
     // Reset board state
     for (int i = 0; i < 64; ++i) squares[i] = EMPTY;
     side_to_move = WHITE;
@@ -29,13 +106,15 @@ void Board::load_fen(const string& fen) {
     en_passant_square = -1;
     halfmove_clock = 0;
     fullmove_number = 1;
-    history.clear(); // Clear history on FEN load
+    history_size = 0; // Clear history on FEN load
 
     istringstream iss(fen);
     string board_part, turn, castling, en_passant, halfmove, fullmove;
     if (!(iss >> board_part >> turn >> castling >> en_passant >> halfmove >> fullmove)) {
         cerr << "ERROR: Invalid FEN: " << fen << endl;
-        return;
+        refresh_piece_lists();
+        key = compute_key();
+        return false;
     }
 #ifdef DEBUG
     cerr << "DEBUG load_fen input: \"" << fen << "\"" << endl;
@@ -48,9 +127,11 @@ void Board::load_fen(const string& fen) {
 #endif
 
     int rank = 0, file = 0;
+    bool valid = turn == "w" || turn == "b";
     // Parse piece placement
     for (char c : board_part) {
         if (c == '/') {
+            valid = valid && file == 8;
             rank++;
             file = 0;
             continue;
@@ -58,6 +139,7 @@ void Board::load_fen(const string& fen) {
         if (isdigit(c)) {
             file += c - '0';
         } else {
+            valid = valid && string("pnbrqkPNBRQK").find(c) != string::npos;
             if (file >= 0 && file < 8 && rank >= 0 && rank < 8) {
                 int index = (7 - rank) * 8 + file;
                 Piece p = EMPTY;
@@ -76,6 +158,13 @@ void Board::load_fen(const string& fen) {
             file++;
         }
     }
+    if (!valid || rank != 7 || file != 8) {
+        cerr << "ERROR: Invalid FEN: " << fen << endl;
+        for (int i = 0; i < 64; ++i) squares[i] = EMPTY;
+        refresh_piece_lists();
+        key = compute_key();
+        return false;
+    }
 
     // Side to move
     side_to_move = (turn == "w" ? WHITE : BLACK);
@@ -114,6 +203,37 @@ void Board::load_fen(const string& fen) {
     } catch (...) {
         fullmove_number = 1;
     }
+
+    refresh_piece_lists();
+    key = compute_key();
+    return true;
+}
+
+uint64_t Board::compute_key() const {
+    const ZobristKeys& z = zobrist();
+    uint64_t k = 0;
+    for (int sq = 0; sq < 64; ++sq) k ^= z.piece[squares[sq]][sq];
+    k ^= castling_key(white_king_castle, white_queen_castle, black_king_castle, black_queen_castle);
+    k ^= en_passant_key(en_passant_square);
+    if (side_to_move == BLACK) k ^= z.side;
+    return k;
+}
+
+bool Board::is_repetition() const {
+    // Only positions since the last capture or pawn move can repeat,
+    // and only those with the same side to move.
+    int limit = min(halfmove_clock, history_size);
+    for (int i = 2; i <= limit; i += 2) {
+        if (history[history_size - i].key == key) return true;
+    }
+    return false;
+}
+
+void Board::trim_history() {
+    // From 100 plies on the game is drawn anyway
+    int keep = min(min(halfmove_clock, 100), history_size);
+    copy(history + history_size - keep, history + history_size, history);
+    history_size = keep;
 }
 
 string Board::print_board() const {
@@ -146,7 +266,64 @@ string Board::print_board() const {
     return ss.str();
 }
 
+string Board::to_fen() const {
+    static const char symbols[] = ".PNBRQKpnbrqk";
+    stringstream ss;
+    for (int rank = 7; rank >= 0; --rank) {
+        int empty = 0;
+        for (int file = 0; file < 8; ++file) {
+            Piece p = squares[rank * 8 + file];
+            if (p == EMPTY) {
+                empty++;
+                continue;
+            }
+            if (empty) ss << empty;
+            empty = 0;
+            ss << symbols[p];
+        }
+        if (empty) ss << empty;
+        if (rank > 0) ss << '/';
+    }
+    ss << (side_to_move == WHITE ? " w " : " b ");
+    string castling;
+    if (white_king_castle) castling += 'K';
+    if (white_queen_castle) castling += 'Q';
+    if (black_king_castle) castling += 'k';
+    if (black_queen_castle) castling += 'q';
+    ss << (castling.empty() ? "-" : castling) << ' ';
+    if (en_passant_square >= 0) {
+        ss << char('a' + en_passant_square % 8) << char('1' + en_passant_square / 8);
+    } else {
+        ss << '-';
+    }
+    ss << ' ' << halfmove_clock << ' ' << fullmove_number;
+    return ss.str();
+}
+
 bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piece) {
+    return make_move(move.from, move.to, move.promotion, captured_piece, moved_piece);
+}
+
+bool Board::make_move(PackedMove move, Piece& captured_piece, Piece& moved_piece) {
+    return make_move(move.from(), move.to(), move.promotion(), captured_piece, moved_piece);
+}
+
+void Board::unmake_move(const Move& move, Piece captured_piece, Piece moved_piece) {
+    unmake_move(move.from, move.to, captured_piece, moved_piece);
+}
+
+void Board::unmake_move(PackedMove move, Piece captured_piece, Piece moved_piece) {
+    unmake_move(move.from(), move.to(), captured_piece, moved_piece);
+}
+
+bool Board::make_move(int from, int to, Piece promotion, Piece& captured_piece, Piece& moved_piece) {
+    // Ensure valid squares and room on the history stack
+    if (from < 0 || from >= 64 || to < 0 || to >= 64) return false;
+    if (history_size == MAX_HISTORY) {
+        cerr << "ERROR: Cannot make move, history is full." << endl;
+        return false;
+    }
+
     // 1. Save current state to history for undo
     UndoInfo undo_info;
     undo_info.side_to_move = side_to_move;
@@ -158,16 +335,15 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
     undo_info.halfmove_clock = halfmove_clock;
     undo_info.fullmove_number = fullmove_number;
     undo_info.en_passant_capture_square = -1; // Default, will be set if it's an EP capture
+    undo_info.key = key;
 
-    int from = move.from;
-    int to   = move.to;
-
-    // Ensure valid squares
-    if (from < 0 || from >= 64 || to < 0 || to >= 64) return false;
+    const ZobristKeys& z = zobrist();
 
     // Get the piece that is moving
     moved_piece = squares[from];
     captured_piece = squares[to]; // Assume target square is captured piece by default
+    if (moved_piece == EMPTY) return false;
+    key ^= z.piece[captured_piece][to];
 
     // 2. Handle specific move types before updating main board squares
     // Handle EN PASSANT capture
@@ -175,18 +351,21 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
     // and that empty square is the current en_passant_square target.
     // The captured pawn is NOT on the 'to' square, but behind it.
     bool is_en_passant_capture = false;
-    if ((moved_piece == WP && from/8 == 4 && to == en_passant_square) ||
-        (moved_piece == BP && from/8 == 3 && to == en_passant_square))
+    if (to == en_passant_square && from % 8 != to % 8 &&
+        ((moved_piece == WP && from/8 == 4 && squares[to - 8] == BP) ||
+         (moved_piece == BP && from/8 == 3 && squares[to + 8] == WP)))
     {
         if (squares[to] == EMPTY) { // Confirm it's a move to an empty square
             is_en_passant_capture = true;
             if (side_to_move == WHITE) {
                 captured_piece = BP; // White captures Black pawn
-                squares[to - 8] = EMPTY; // Remove the captured pawn from its square
+                remove_piece(to - 8); // Remove the captured pawn from its square
+                key ^= z.piece[BP][to - 8];
                 undo_info.en_passant_capture_square = to - 8; // Store its original square for undo
             } else {
                 captured_piece = WP; // Black captures White pawn
-                squares[to + 8] = EMPTY; // Remove the captured pawn
+                remove_piece(to + 8); // Remove the captured pawn
+                key ^= z.piece[WP][to + 8];
                 undo_info.en_passant_capture_square = to + 8; // Store its original square for undo
             }
         }
@@ -200,13 +379,29 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
         halfmove_clock++;
     }
 
+    // Record the piece changes for the NNUE accumulator
+    undo_info.dirty_count = 0;
+    auto dirty = [&undo_info](Piece piece, int piece_from, int piece_to) {
+        undo_info.dirty[undo_info.dirty_count++] = {int8_t(piece), int8_t(piece_from), int8_t(piece_to)};
+    };
+    if (promotion != EMPTY) {
+        dirty(moved_piece, from, -1);
+        dirty(promotion, -1, to);
+    } else {
+        dirty(moved_piece, from, to);
+    }
+    if (captured_piece != EMPTY)
+        dirty(captured_piece, is_en_passant_capture ? undo_info.en_passant_capture_square : to, -1);
+
     // Move piece (or promote)
-    if (move.promotion != EMPTY) {
-        squares[to] = move.promotion;
+    if (squares[to] != EMPTY) remove_piece(to);
+    if (promotion != EMPTY) {
+        remove_piece(from);
+        put_piece(promotion, to);
     } else {
-        squares[to] = moved_piece;
+        move_piece(from, to);
     }
-    squares[from] = EMPTY;
+    key ^= z.piece[moved_piece][from] ^ z.piece[squares[to]][to];
 
     // Update en passant square for next turn
     // A new en passant square is set ONLY if a pawn moves two squares forward
@@ -217,6 +412,7 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
     } else {
         en_passant_square = -1; // No en passant target otherwise
     }
+    key ^= en_passant_key(undo_info.en_passant_square) ^ en_passant_key(en_passant_square);
 
     // Update castling rights
     // If King moves, revoke all castling rights for that side
@@ -233,24 +429,31 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
     if (from == A1 || to == A1) white_queen_castle = false;
     if (from == H8 || to == H8) black_king_castle = false;
     if (from == A8 || to == A8) black_queen_castle = false;
+    key ^= castling_key(undo_info.white_king_castle, undo_info.white_queen_castle,
+                        undo_info.black_king_castle, undo_info.black_queen_castle)
+         ^ castling_key(white_king_castle, white_queen_castle, black_king_castle, black_queen_castle);
 
 
     // Handle CASTLING move (king moves two squares)
     if (moved_piece == WK && from == E1) {
         if (to == G1) { // White King-side
-            squares[F1] = WR; // Move rook
-            squares[H1] = EMPTY;
+            move_piece(H1, F1); // Move rook
+            key ^= z.piece[WR][H1] ^ z.piece[WR][F1];
+            dirty(WR, H1, F1);
         } else if (to == C1) { // White Queen-side
-            squares[D1] = WR; // Move rook
-            squares[A1] = EMPTY;
+            move_piece(A1, D1); // Move rook
+            key ^= z.piece[WR][A1] ^ z.piece[WR][D1];
+            dirty(WR, A1, D1);
         }
     } else if (moved_piece == BK && from == E8) {
         if (to == G8) { // Black King-side
-            squares[F8] = BR; // Move rook
-            squares[H8] = EMPTY;
+            move_piece(H8, F8); // Move rook
+            key ^= z.piece[BR][H8] ^ z.piece[BR][F8];
+            dirty(BR, H8, F8);
         } else if (to == C8) { // Black Queen-side
-            squares[D8] = BR; // Move rook
-            squares[A8] = EMPTY;
+            move_piece(A8, D8); // Move rook
+            key ^= z.piece[BR][A8] ^ z.piece[BR][D8];
+            dirty(BR, A8, D8);
         }
     }
 
@@ -261,22 +464,22 @@ bool Board::make_move(const Move& move, Piece& captured_piece, Piece& moved_piec
 
     // Flip side to move
     side_to_move = (side_to_move == WHITE ? BLACK : WHITE);
+    key ^= z.side;
 
     // Push the saved state onto the history stack
-    history.push_back(undo_info);
+    history[history_size++] = undo_info;
 
     return true; // Move was made successfully
 }
 
-void Board::unmake_move(const Move& move, Piece captured_piece, Piece moved_piece) {
-    if (history.empty()) {
+void Board::unmake_move(int from, int to, Piece captured_piece, Piece moved_piece) {
+    if (history_size == 0) {
         cerr << "ERROR: Cannot unmake move, history is empty." << endl;
         return;
     }
 
     // 1. Pop the last saved state from history
-    UndoInfo undo_info = history.back();
-    history.pop_back();
+    const UndoInfo& undo_info = history[--history_size];
 
     // 2. Restore all board state variables from undo_info
     side_to_move = undo_info.side_to_move;
@@ -287,79 +490,83 @@ void Board::unmake_move(const Move& move, Piece captured_piece, Piece moved_piec
     black_queen_castle = undo_info.black_queen_castle;
     halfmove_clock = undo_info.halfmove_clock;
     fullmove_number = undo_info.fullmove_number;
-
-    int from = move.from;
-    int to   = move.to;
+    key = undo_info.key;
 
     // Restore pieces to their positions BEFORE the move
-    // This will restore the moved piece to 'from' and captured piece to 'to'
-    squares[from] = moved_piece; // The piece that moved goes back to 'from'
-    squares[to]   = captured_piece; // The captured piece (or EMPTY) goes back to 'to'
+    // This will restore the moved piece (a pawn, for promotions) to 'from'
+    // and the captured piece (or nothing) to 'to'
+    remove_piece(to);
+    put_piece(moved_piece, from);
+    if (captured_piece != EMPTY && undo_info.en_passant_capture_square == -1) {
+        put_piece(captured_piece, to);
+    }
 
     if (moved_piece == WK && from == E1) {
         if (to == G1) { // King-side castling
-            squares[H1] = WR; // Restore rook to H1
-            squares[F1] = EMPTY; // Empty rook's landing square (F1)
+            move_piece(F1, H1); // Restore rook to H1
         } else if (to == C1) { // Queen-side castling
-            squares[A1] = WR; // Restore rook to A1
-            squares[D1] = EMPTY; // Empty rook's landing square (D1)
+            move_piece(D1, A1); // Restore rook to A1
         }
     } else if (moved_piece == BK && from == E8) {
         if (to == G8) { // King-side castling
-            squares[H8] = BR;
-            squares[F8] = EMPTY;
+            move_piece(F8, H8);
         } else if (to == C8) { // Queen-side castling
-            squares[A8] = BR;
-            squares[D8] = EMPTY;
+            move_piece(D8, A8);
         }
     }
 
     // Undo EN PASSANT capture
     // If it was an en passant capture, the captured pawn was NOT on the 'to' square.
     // It was on the square saved in undo_info.en_passant_capture_square.
-    // The 'to' square where the capturing pawn landed should be made EMPTY.
     if (undo_info.en_passant_capture_square != -1) { // This means it was an en passant capture
-        // The square where the capturing pawn landed ('to') should now be empty
-        squares[to] = EMPTY;
         // Restore the captured pawn to its actual original square
-        if (moved_piece == WP) { // White pawn captured black pawn
-            squares[undo_info.en_passant_capture_square] = BP;
-        } else { // Black pawn captured white pawn
-            squares[undo_info.en_passant_capture_square] = WP;
-        }
-    }
-
-    if (move.promotion != EMPTY) {
-        squares[from] = (side_to_move == WHITE ? WP : BP); // Restore the pawn to its 'from' square
-        squares[to] = captured_piece; // Restore captured piece (or EMPTY) to 'to' square
+        put_piece(moved_piece == WP ? BP : WP, undo_info.en_passant_capture_square);
     }
 }
 
-bool Board::is_king_in_check(Color color) const {
-    Piece king_piece = (color == WHITE ? WK : BK);
-    int king_sq = -1;
-    for (int i = 0; i < 64; ++i) {
-        if (squares[i] == king_piece) {
-            king_sq = i;
-            break;
-        }
-    }
-    if (king_sq < 0) return false; // Should not happen in a valid game
+void Board::put_piece(Piece piece, int square) {
+    squares[square] = piece;
+    piece_index[square] = piece_count[piece];
+    piece_list[piece][piece_count[piece]++] = square;
+}
 
-    // Create a temporary board for move generation
-    // This copy is necessary because MoveGenerator needs a non-const Board reference
-    // to potentially generate pseudo-legal moves (which might temporarily modify board state for checks).
-    Board temp_board_for_check_gen = *this;
-    temp_board_for_check_gen.side_to_move = (color == WHITE ? BLACK : WHITE);
+void Board::remove_piece(int square) {
+    Piece piece = squares[square];
+    // Fill the hole with the last entry of the list
+    int last = piece_list[piece][--piece_count[piece]];
+    piece_list[piece][piece_index[square]] = last;
+    piece_index[last] = piece_index[square];
+    squares[square] = EMPTY;
+}
 
-    MoveGenerator gen(temp_board_for_check_gen);
-    auto moves = gen.generate_pseudo_legal_moves();
+void Board::move_piece(int from, int to) {
+    Piece piece = squares[from];
+    piece_list[piece][piece_index[from]] = to;
+    piece_index[to] = piece_index[from];
+    squares[to] = piece;
+    squares[from] = EMPTY;
+}
 
-    for (auto& m : moves) {
-        // If any of the opponent's pseudo-legal moves attacks the king square
-        if (m.to == king_sq) return true;
+void Board::refresh_piece_lists() {
+    for (int p = 0; p < 13; ++p) piece_count[p] = 0;
+    for (int sq = 0; sq < 64; ++sq) {
+        Piece p = squares[sq];
+        piece_index[sq] = -1;
+        if (p == EMPTY) continue;
+        if (piece_count[p] == MAX_PIECES_PER_TYPE) {
+            cerr << "ERROR: Too many pieces of one type, ignoring square " << sq << endl;
+            squares[sq] = EMPTY;
+            continue;
+        }
+        piece_index[sq] = piece_count[p];
+        piece_list[p][piece_count[p]++] = sq;
     }
-    return false;
+}
+
+bool Board::is_king_in_check(Color color) const {
+    int king_sq = king_square(color);
+    if (king_sq < 0) return false; // Should not happen in a valid game
+    return is_square_attacked(king_sq, color == WHITE ? BLACK : WHITE);
 }
 
 bool Board::has_legal_moves() {
@@ -389,75 +596,50 @@ string Board::get_result_string() {
 }
 
 bool Board::is_square_attacked(int square, Color attacker) const {
-    int rank = square / 8;
     int file = square % 8;
-
-    // Direction offsets
-    const int knight_offsets[] = {-17, -15, -10, -6, 6, 10, 15, 17};
-    const int king_offsets[] = {-9, -8, -7, -1, 1, 7, 8, 9};
-
-    // Pawn attacks
-    if (attacker == WHITE) {
-        if (square >= 9 && squares[square - 9] == WP && (square % 8 != 0)) return true;
-        if (square >= 7 && squares[square - 7] == WP && (square % 8 != 7)) return true;
-    } else {
-        if (square <= 55 && squares[square + 7] == BP && (square % 8 != 0)) return true;
-        if (square <= 55 && squares[square + 9] == BP && (square % 8 != 7)) return true;
+    bool white = (attacker == WHITE);
+
+    // Pawn attacks: look one rank behind the square from the attacker's side
+    Piece pawn = white ? WP : BP;
+    int behind = white ? square - 8 : square + 8;
+    if (behind >= 0 && behind < 64) {
+        if (file > 0 && squares[behind - 1] == pawn) return true;
+        if (file < 7 && squares[behind + 1] == pawn) return true;
     }
 
     // Knight attacks
-    for (int offset : knight_offsets) {
-        int to = square + offset;
-        if (to < 0 || to >= 64) continue;
-        Piece p = squares[to];
-        if ((attacker == WHITE && p == WN) || (attacker == BLACK && p == BN)) return true;
+    Piece knight = white ? WN : BN;
+    for (int i = 0; i < 8 && KNIGHT_MOVES[square][i] != -1; ++i) {
+        if (squares[KNIGHT_MOVES[square][i]] == knight) return true;
     }
 
     // King attacks
-    for (int offset : king_offsets) {
-        int to = square + offset;
-        if (to < 0 || to >= 64) continue;
-        int dr = abs((to / 8) - rank);
-        int df = abs((to % 8) - file);
-        if (dr > 1 || df > 1) continue;
-        Piece p = squares[to];
-        if ((attacker == WHITE && p == WK) || (attacker == BLACK && p == BK)) return true;
-    }
+    int king_sq = king_square(attacker);
+    if (king_sq >= 0 && abs(king_sq / 8 - square / 8) <= 1 && abs(king_sq % 8 - file) <= 1 && king_sq != square)
+        return true;
 
     // Sliding pieces: Rooks / Queens (horizontal + vertical)
-    const int rook_dirs[] = {-8, -1, 1, 8};
-    for (int dir : rook_dirs) {
-        int to = square;
-        while (true) {
-            to += dir;
-            if (to < 0 || to >= 64) break;
-            int r = to / 8, f = to % 8;
-            if (abs(r - rank) > 7 || abs(f - file) > 7) break;
-            Piece p = squares[to];
+    Piece rook = white ? WR : BR;
+    Piece queen = white ? WQ : BQ;
+    for (int d = 0; d < 4; ++d) {
+        for (int i = 0; i < 7 && ROOK_MOVES[square][d][i] != -1; ++i) {
+            Piece p = squares[ROOK_MOVES[square][d][i]];
             if (p == EMPTY) continue;
-            if (attacker == WHITE && (p == WR || p == WQ)) return true;
-            if (attacker == BLACK && (p == BR || p == BQ)) return true;
+            if (p == rook || p == queen) return true;
             break;
         }
     }
 
     // Sliding pieces: Bishops / Queens (diagonals)
-    const int bishop_dirs[] = {-9, -7, 7, 9};
-    for (int dir : bishop_dirs) {
-        int to = square;
-        while (true) {
-            to += dir;
-            if (to < 0 || to >= 64) break;
-            int r = to / 8, f = to % 8;
-            if (abs(r - rank) > 7 || abs(f - file) > 7 || abs(r - rank) != abs(f - file)) break;
-            Piece p = squares[to];
+    Piece bishop = white ? WB : BB;
+    for (int d = 0; d < 4; ++d) {
+        for (int i = 0; i < 7 && BISHOP_MOVES[square][d][i] != -1; ++i) {
+            Piece p = squares[BISHOP_MOVES[square][d][i]];
             if (p == EMPTY) continue;
-            if (attacker == WHITE && (p == WB || p == WQ)) return true;
-            if (attacker == BLACK && (p == BB || p == BQ)) return true;
+            if (p == bishop || p == queen) return true;
             break;
         }
     }
 
     return false;
 }
-
@@ -0,0 +1,99 @@
+// epd.cpp
+#include "epd.h"
+#include <algorithm>
+#include <cctype>
+#include <iterator>
+#include <sstream>
+
+const std::string* EpdRecord::find(const std::string& opcode) const {
+    for (const auto& op : operations) {
+        if (op.first == opcode) return &op.second;
+    }
+    return nullptr;
+}
+
+static std::string trim(const std::string& s) {
+    size_t begin = s.find_first_not_of(" \t\r\n");
+    if (begin == std::string::npos) return "";
+    size_t end = s.find_last_not_of(" \t\r\n");
+    return s.substr(begin, end - begin + 1);
+}
+
+static bool is_number(const std::string& s) {
+    if (s.empty()) return false;
+    for (char c : s) {
+        if (!isdigit((unsigned char)c)) return false;
+    }
+    return true;
+}
+
+bool parse_epd_line(const std::string& line, EpdRecord& record) {
+    record.fen.clear();
+    record.operations.clear();
+
+    std::istringstream iss(line);
+    std::string board, side, castling, ep;
+    if (!(iss >> board >> side >> castling >> ep)) return false;
+    if (side != "w" && side != "b") return false;
+    if (std::count(board.begin(), board.end(), '/') != 7) return false;
+
+    // A FEN carries the two clocks next; anything else is EPD operations
+    std::string halfmove = "0", fullmove = "1";
+    std::streampos after_position = iss.tellg();
+    std::string a, b;
+    if (iss >> a >> b && is_number(a) && is_number(b)) {
+        halfmove = a;
+        fullmove = b;
+    } else {
+        iss.clear();
+        iss.seekg(after_position);
+    }
+
+    // Split the remainder on semicolons outside quotes
+    std::string rest((std::istreambuf_iterator<char>(iss)), std::istreambuf_iterator<char>());
+    std::string current;
+    bool quoted = false;
+    auto flush_operation = [&]() {
+        std::string op = trim(current);
+        current.clear();
+        if (op.empty()) return;
+        size_t space = op.find_first_of(" \t");
+        std::string opcode = op.substr(0, space);
+        std::string operand = space == std::string::npos ? "" : trim(op.substr(space));
+        if (operand.size() >= 2 && operand.front() == '"' && operand.back() == '"') {
+            operand = operand.substr(1, operand.size() - 2);
+        }
+        record.operations.push_back({opcode, operand});
+    };
+    for (char c : rest) {
+        if (c == '"') quoted = !quoted;
+        if (c == ';' && !quoted) flush_operation();
+        else current += c;
+    }
+    flush_operation();
+
+    if (const std::string* hmvc = record.find("hmvc")) {
+        if (is_number(*hmvc)) halfmove = *hmvc;
+    }
+    if (const std::string* fmvn = record.find("fmvn")) {
+        if (is_number(*fmvn)) fullmove = *fmvn;
+    }
+    record.fen = board + " " + side + " " + castling + " " + ep + " " + halfmove + " " + fullmove;
+    return true;
+}
+
+std::string fen_to_epd_position(const std::string& fen) {
+    std::istringstream iss(fen);
+    std::string board, side, castling, ep;
+    iss >> board >> side >> castling >> ep;
+    return board + " " + side + " " + castling + " " + ep;
+}
+
+std::string json_escape(const std::string& s) {
+    std::string out;
+    for (char c : s) {
+        if (c == '"' || c == '\\') out += '\\';
+        out += ((unsigned char)c < 0x20) ? ' ' : c;
+    }
+    return out;
+}
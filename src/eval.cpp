@@ -1,15 +1,58 @@
 #include "eval.h"
+#include "nnue.h"
 #include "pst.h"
 #include "board.h"
 #include "types.h"
+#include <algorithm>
 #include <array>
+#include <atomic>
 #include <cmath>
+#include <cstring>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <sstream>
 
-const int PAWN_VALUE   = 100;
-const int KNIGHT_VALUE = 320;
-const int BISHOP_VALUE = 330;
-const int ROOK_VALUE   = 500;
-const int QUEEN_VALUE  = 900;
+const EvalWeightGroup EVAL_WEIGHT_GROUPS[] = {
+    {"piece_value", W_PIECE_VALUE, 5},
+    {"pst_pawn", W_PST + 0 * 64, 64},
+    {"pst_knight", W_PST + 1 * 64, 64},
+    {"pst_bishop", W_PST + 2 * 64, 64},
+    {"pst_rook", W_PST + 3 * 64, 64},
+    {"pst_queen", W_PST + 4 * 64, 64},
+    {"pst_king", W_PST + 5 * 64, 64},
+    {"doubled_pawn", W_DOUBLED_PAWN, 1},
+    {"isolated_pawn", W_ISOLATED_PAWN, 1},
+    {"rook_open_file", W_ROOK_OPEN_FILE, 1},
+    {"rook_semi_open_file", W_ROOK_SEMI_OPEN_FILE, 1},
+    {"mobility", W_MOBILITY, 4},
+};
+const int NUM_EVAL_WEIGHT_GROUPS = sizeof(EVAL_WEIGHT_GROUPS) / sizeof(EVAL_WEIGHT_GROUPS[0]);
+
+// Built-in weights: the hand-set values of the original evaluation
+static std::array<int, NUM_EVAL_WEIGHTS> default_weights() {
+    std::array<int, NUM_EVAL_WEIGHTS> w{};
+    const int piece_values[5] = {100, 320, 330, 500, 900};
+    const int* tables[6] = {pawn_table, knight_table, bishop_table, rook_table, queen_table, king_table};
+    std::copy(piece_values, piece_values + 5, w.begin() + W_PIECE_VALUE);
+    for (int t = 0; t < 6; ++t) std::copy(tables[t], tables[t] + 64, w.begin() + W_PST + t * 64);
+    w[W_DOUBLED_PAWN] = -10;
+    w[W_ISOLATED_PAWN] = -15;
+    w[W_ROOK_OPEN_FILE] = 15;
+    w[W_ROOK_SEMI_OPEN_FILE] = 10;
+    const int mobility[4] = {4, 2, 2, 1};
+    std::copy(mobility, mobility + 4, w.begin() + W_MOBILITY);
+    return w;
+}
+
+static std::array<int, NUM_EVAL_WEIGHTS> weights = default_weights();
+
+// Index of a piece's type among pawn..king, or -1
+static int piece_type_index(Piece p) {
+    if (p >= WP && p <= WK) return p - WP;
+    if (p >= BP && p <= BK) return p - BP;
+    return -1;
+}
 
 // Helper: Detect color of a piece
 Color piece_color(Piece p) {
@@ -18,78 +61,52 @@ Color piece_color(Piece p) {
     return WHITE; // default fallback
 }
 
-// Helper: Get piece material value
-int piece_value(Piece p) {
-    switch (p) {
-        case WP: case BP: return PAWN_VALUE;
-        case WN: case BN: return KNIGHT_VALUE;
-        case WB: case BB: return BISHOP_VALUE;
-        case WR: case BR: return ROOK_VALUE;
-        case WQ: case BQ: return QUEEN_VALUE;
-        default: return 0;
-    }
-}
-
-// Simple mobility estimator: count attacks (pseudo-mobility)
-int mobility_score(const Board& board, Color side) {
+// Simple mobility estimator: count attacks (pseudo-mobility). Adds the
+// number of empty squares reached per piece type (knight, bishop, rook,
+// queen) to counts.
+static void mobility_counts(const Board& board, Color side, int counts[4]) {
     static const int knight_offsets[8] = { 17, 15, 10, 6, -17, -15, -10, -6 };
     static const int bishop_dirs[4] = { 9, 7, -9, -7 };
     static const int rook_dirs[4] = { 8, -8, 1, -1 };
     static const int queen_dirs[8] = { 8, -8, 1, -1, 9, 7, -9, -7 };
 
-    int score = 0;
-
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY || piece_color(p) != side) continue;
-
-        switch (p) {
-            case WN: case BN:
-                for (int off : knight_offsets) {
-                    int t = sq + off;
-                    if (t >= 0 && t < 64 && board.squares[t] == EMPTY)
-                        score += 4;
-                }
-                break;
-            case WB: case BB:
-                for (int dir : bishop_dirs) {
-                    int t = sq + dir;
-                    while (t >= 0 && t < 64 && board.squares[t] == EMPTY) {
-                        score += 2;
-                        t += dir;
-                    }
-                }
-                break;
-            case WR: case BR:
-                for (int dir : rook_dirs) {
-                    int t = sq + dir;
-                    while (t >= 0 && t < 64 && board.squares[t] == EMPTY) {
-                        score += 2;
-                        t += dir;
-                    }
-                }
-                break;
-            case WQ: case BQ:
-                for (int dir : queen_dirs) {
-                    int t = sq + dir;
-                    while (t >= 0 && t < 64 && board.squares[t] == EMPTY) {
-                        score += 1;
-                        t += dir;
-                    }
-                }
-                break;
-            case WK: case BK:
-                score += 0; // King mobility not counted
-                break;
-            default:
-                break;
+    auto ray_count = [&board](int sq, const int* dirs, int n_dirs) {
+        int count = 0;
+        for (int k = 0; k < n_dirs; ++k) {
+            int dir = dirs[k];
+            int t = sq + dir;
+            while (t >= 0 && t < 64 && board.squares[t] == EMPTY) {
+                count++;
+                t += dir;
+            }
+        }
+        return count;
+    };
+
+    Piece knight = (side == WHITE) ? WN : BN;
+    Piece bishop = (side == WHITE) ? WB : BB;
+    Piece rook = (side == WHITE) ? WR : BR;
+    Piece queen = (side == WHITE) ? WQ : BQ;
+
+    for (int i = 0; i < board.piece_count[knight]; ++i) {
+        int sq = board.piece_list[knight][i];
+        for (int off : knight_offsets) {
+            int t = sq + off;
+            if (t >= 0 && t < 64 && board.squares[t] == EMPTY)
+                counts[0]++;
         }
     }
-    return score;
+    for (int i = 0; i < board.piece_count[bishop]; ++i)
+        counts[1] += ray_count(board.piece_list[bishop][i], bishop_dirs, 4);
+    for (int i = 0; i < board.piece_count[rook]; ++i)
+        counts[2] += ray_count(board.piece_list[rook][i], rook_dirs, 4);
+    for (int i = 0; i < board.piece_count[queen]; ++i)
+        counts[3] += ray_count(board.piece_list[queen][i], queen_dirs, 8);
+    // King mobility not counted
 }
 
-// Check if file is open/semi-open for rook bonus
-int rook_file_bonus(const Board& board, int file, Color color) {
+// Check if file is open/semi-open for rook bonus: the weight index, or -1
+static int rook_file_term(const Board& board, int file, Color color) {
     bool has_own_pawn = false, has_enemy_pawn = false;
     for (int rank = 0; rank < 8; ++rank) {
         Piece p = board.squares[rank * 8 + file];
@@ -98,76 +115,253 @@ int rook_file_bonus(const Board& board, int file, Color color) {
         if ((p == WP && color == BLACK) || (p == BP && color == WHITE)) has_enemy_pawn = true;
     }
 
-    if (!has_own_pawn && !has_enemy_pawn) return 15;       // open file
-    if (!has_own_pawn && has_enemy_pawn) return 10;        // semi-open
-    return 0;
+    if (!has_own_pawn && !has_enemy_pawn) return W_ROOK_OPEN_FILE;
+    if (!has_own_pawn && has_enemy_pawn) return W_ROOK_SEMI_OPEN_FILE;
+    return -1;
 }
 
-// Pawn structure: doubled pawn penalty, isolated penalty
-int pawn_structure_penalty(const Board& board, Color side) {
+// Pawn structure: number of doubled pawns and of files with isolated pawns
+static void pawn_structure_counts(const Board& board, Color side, int& doubled, int& isolated) {
     std::array<int, 8> file_counts = {0};
 
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if ((side == WHITE && p == WP) || (side == BLACK && p == BP)) {
-            int file = sq % 8;
-            file_counts[file]++;
-        }
+    Piece pawn = (side == WHITE) ? WP : BP;
+    for (int i = 0; i < board.piece_count[pawn]; ++i) {
+        file_counts[board.piece_list[pawn][i] % 8]++;
     }
 
-    int penalty = 0;
+    doubled = isolated = 0;
     for (int f = 0; f < 8; ++f) {
-        if (file_counts[f] > 1) penalty -= 10 * (file_counts[f] - 1); // doubled
+        if (file_counts[f] > 1) doubled += file_counts[f] - 1;
         if (file_counts[f] > 0 && (f == 0 || f == 7 || (file_counts[f - 1] == 0 && file_counts[f + 1] == 0)))
-            penalty -= 15; // isolated
+            isolated++;
     }
-
-    return penalty;
 }
 
-int evaluate(const Board& board) {
-    int score = 0;
-
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY) continue;
-
+// Walk every evaluation term and hand terms.add(weight index, White-minus-
+// Black count) the result. Scoring and tracing share this code, so the
+// trace always matches the evaluation.
+template <typename Terms>
+static void evaluate_terms(const Board& board, Terms& terms) {
+    for (int pt = WP; pt <= BK; ++pt) {
+        Piece p = Piece(pt);
+        int type = piece_type_index(p);
         Color color = piece_color(p);
-        int base = piece_value(p);
-
-        // PST bonus: use pawn_table, knight_table, etc.
-        int pst_bonus = 0;
-        int mirrored_sq = (color == WHITE) ? sq : ((7 - (sq / 8)) * 8 + (sq % 8));
-        switch (p) {
-            case WP: case BP: pst_bonus = pawn_table[mirrored_sq]; break;
-            case WN: case BN: pst_bonus = knight_table[mirrored_sq]; break;
-            case WB: case BB: pst_bonus = bishop_table[mirrored_sq]; break;
-            case WR: case BR: pst_bonus = rook_table[mirrored_sq]; break;
-            case WQ: case BQ: pst_bonus = queen_table[mirrored_sq]; break;
-            case WK: case BK: pst_bonus = king_table[mirrored_sq]; break;
-            default: break;
-        }
+        int sign = (color == WHITE) ? 1 : -1;
+        for (int i = 0; i < board.piece_count[p]; ++i) {
+            int sq = board.piece_list[p][i];
 
-        int piece_score = base + pst_bonus;
-        score += (color == WHITE) ? piece_score : -piece_score;
+            // Material and PST bonus
+            int mirrored_sq = (color == WHITE) ? sq : ((7 - (sq / 8)) * 8 + (sq % 8));
+            if (type < 5) terms.add(W_PIECE_VALUE + type, sign);
+            terms.add(W_PST + type * 64 + mirrored_sq, sign);
 
-        // Rook open/semi-open file
-        if (p == WR || p == BR) {
-            int file = sq % 8;
-            int bonus = rook_file_bonus(board, file, color);
-            score += (color == WHITE) ? bonus : -bonus;
+            // Rook open/semi-open file
+            if (p == WR || p == BR) {
+                int term = rook_file_term(board, sq % 8, color);
+                if (term >= 0) terms.add(term, sign);
+            }
         }
     }
 
     // Add pawn structure and mobility
-    score += pawn_structure_penalty(board, WHITE);
-    score -= pawn_structure_penalty(board, BLACK);
-    score += mobility_score(board, WHITE);
-    score -= mobility_score(board, BLACK);
+    int white_doubled, white_isolated, black_doubled, black_isolated;
+    pawn_structure_counts(board, WHITE, white_doubled, white_isolated);
+    pawn_structure_counts(board, BLACK, black_doubled, black_isolated);
+    terms.add(W_DOUBLED_PAWN, white_doubled - black_doubled);
+    terms.add(W_ISOLATED_PAWN, white_isolated - black_isolated);
+    int white_mobility[4] = {0}, black_mobility[4] = {0};
+    mobility_counts(board, WHITE, white_mobility);
+    mobility_counts(board, BLACK, black_mobility);
+    for (int k = 0; k < 4; ++k) terms.add(W_MOBILITY + k, white_mobility[k] - black_mobility[k]);
+}
+
+struct ScoreTerms {
+    const int* w;
+    int score;
+    void add(int index, int count) { score += w[index] * count; }
+};
+
+struct TraceTerms {
+    EvalTrace& trace;
+    void add(int index, int count) { trace.coefficients[index] += count; }
+};
 
-    // avoiding repitition
-    score += board.halfmove_clock%2;
+static int evaluate_uncached(const Board& board) {
+    ScoreTerms terms{weights.data(), 0};
+    evaluate_terms(board, terms);
 
     // Flip if black to move
-    return (board.side_to_move == WHITE) ? score : -score;
+    return (board.side_to_move == WHITE) ? terms.score : -terms.score;
+}
+
+void trace_evaluation(const Board& board, EvalTrace& trace) {
+    std::memset(trace.coefficients, 0, sizeof(trace.coefficients));
+    TraceTerms terms{trace};
+    evaluate_terms(board, terms);
+}
+
+static EvalMode active_mode = EVAL_CLASSIC;
+
+bool set_eval_mode(EvalMode new_mode) {
+    if (new_mode == EVAL_NNUE && !nnue_loaded()) return false;
+    active_mode = new_mode;
+    clear_eval_cache();
+    return true;
+}
+
+EvalMode eval_mode() {
+    return active_mode;
+}
+
+// The network only knows positions with both kings
+static int evaluate_position(const Board& board) {
+    if (active_mode == EVAL_NNUE && board.piece_count[WK] == 1 && board.piece_count[BK] == 1)
+        return nnue_evaluate(board);
+    return evaluate_uncached(board);
+}
+
+const int* eval_weights() {
+    return weights.data();
+}
+
+void set_eval_weights(const int* w) {
+    std::copy(w, w + NUM_EVAL_WEIGHTS, weights.begin());
+    clear_eval_cache();
+}
+
+void reset_eval_weights() {
+    std::array<int, NUM_EVAL_WEIGHTS> w = default_weights();
+    set_eval_weights(w.data());
+}
+
+bool load_eval_weights(const std::string& path, std::string& error) {
+    std::ifstream in(path);
+    if (!in) {
+        error = "cannot open " + path;
+        return false;
+    }
+    std::stringstream text;
+    std::string line;
+    while (std::getline(in, line)) text << line.substr(0, line.find('#')) << "\n";
+
+    std::array<int, NUM_EVAL_WEIGHTS> w = weights;
+    std::string token;
+    const EvalWeightGroup* group = nullptr;
+    int filled = 0;
+    auto group_done = [&]() {
+        if (group && filled != group->count) {
+            error = std::string(group->name) + " needs " + std::to_string(group->count) + " values, got " +
+                    std::to_string(filled);
+            return false;
+        }
+        return true;
+    };
+    while (text >> token) {
+        const EvalWeightGroup* named = nullptr;
+        for (int g = 0; g < NUM_EVAL_WEIGHT_GROUPS; ++g)
+            if (token == EVAL_WEIGHT_GROUPS[g].name) named = &EVAL_WEIGHT_GROUPS[g];
+        if (named) {
+            if (!group_done()) return false;
+            group = named;
+            filled = 0;
+            continue;
+        }
+        if (!group) {
+            error = "unknown weight group " + token;
+            return false;
+        }
+        if (filled == group->count) {
+            error = "too many values in " + std::string(group->name);
+            return false;
+        }
+        try {
+            size_t used;
+            w[group->offset + filled] = std::stoi(token, &used);
+            if (used != token.size()) throw std::invalid_argument(token);
+        } catch (...) {
+            error = "invalid value " + token + " in " + group->name;
+            return false;
+        }
+        filled++;
+    }
+    if (!group_done()) return false;
+    set_eval_weights(w.data());
+    return true;
+}
+
+bool save_eval_weights(const std::string& path) {
+    std::ofstream file;
+    std::ostream* out = &std::cout;
+    if (path != "-") {
+        file.open(path);
+        if (!file) return false;
+        out = &file;
+    }
+    *out << "# Tadfish evaluation weights (centipawns), see eval.h for the terms.\n"
+         << "# PSTs list squares a1..h8 for White (mirrored for Black), one rank per line.\n";
+    for (int g = 0; g < NUM_EVAL_WEIGHT_GROUPS; ++g) {
+        const EvalWeightGroup& group = EVAL_WEIGHT_GROUPS[g];
+        *out << group.name;
+        for (int i = 0; i < group.count; ++i) {
+            if (group.count == 64 && i % 8 == 0) *out << "\n   ";
+            *out << " " << weights[group.offset + i];
+        }
+        *out << "\n";
+    }
+    return bool(*out);
+}
+
+// Each entry packs the upper 48 key bits with the 16-bit score into one word,
+// so a probe is a single load and a torn entry can never pass the key check.
+static const size_t DEFAULT_EVAL_CACHE_MB = 8;
+static std::unique_ptr<std::atomic<uint64_t>[]> eval_cache;
+static size_t eval_cache_mask = 0;
+static bool eval_cache_ready = false;
+
+void set_eval_cache_size(size_t mb) {
+    eval_cache_ready = true;
+    eval_cache_mask = 0;
+    eval_cache.reset();
+    if (mb == 0) return;
+
+    // Round down to a power of two so the index is a mask
+    size_t entries = 1;
+    while (entries * 2 * sizeof(uint64_t) <= mb * 1024 * 1024) entries *= 2;
+    eval_cache.reset(new std::atomic<uint64_t>[entries]);
+    eval_cache_mask = entries - 1;
+    clear_eval_cache();
+}
+
+void clear_eval_cache() {
+    if (!eval_cache) return;
+    for (size_t i = 0; i <= eval_cache_mask; ++i) eval_cache[i].store(0, std::memory_order_relaxed);
+}
+
+// Allocate the default cache on first use. A function-local static keeps
+// this safe when the first evaluations come from several threads at once.
+static void ensure_eval_cache() {
+    static const bool initialised = [] {
+        if (!eval_cache_ready) set_eval_cache_size(DEFAULT_EVAL_CACHE_MB);
+        return true;
+    }();
+    (void)initialised;
+}
+
+int evaluate(const Board& board, EvalCacheStats* stats) {
+    ensure_eval_cache();
+    if (!eval_cache) return evaluate_position(board);
+
+    const uint64_t key_bits = board.key & ~0xFFFFULL;
+    std::atomic<uint64_t>& slot = eval_cache[board.key & eval_cache_mask];
+    uint64_t entry = slot.load(std::memory_order_relaxed);
+    if (stats) stats->probes++;
+    if ((entry & ~0xFFFFULL) == key_bits) {
+        if (stats) stats->hits++;
+        return (int16_t)(entry & 0xFFFF);
+    }
+
+    int score = evaluate_position(board);
+    if (score >= INT16_MIN && score <= INT16_MAX)
+        slot.store(key_bits | (uint16_t)score, std::memory_order_relaxed);
+    return score;
 }
@@ -0,0 +1,99 @@
+// evaltrace.cpp
+#include "evaltrace.h"
+#include "board.h"
+#include "epd.h"
+#include "eval.h"
+#include <fstream>
+#include <iostream>
+#include <sstream>
+
+// Game result from White's side as written in the output, or null
+static const char* parse_result(const std::string& text) {
+    if (text == "1-0" || text == "[1.0]" || text == "[1-0]" || text == "[1]") return "1";
+    if (text == "0-1" || text == "[0.0]" || text == "[0-1]" || text == "[0]") return "0";
+    if (text == "1/2-1/2" || text == "[0.5]" || text == "[1/2-1/2]") return "0.5";
+    return nullptr;
+}
+
+static const char* position_result(const EpdRecord& record) {
+    for (const char* opcode : {"c9", "result"}) {
+        if (const std::string* operand = record.find(opcode)) return parse_result(*operand);
+    }
+    for (const auto& op : record.operations) {
+        if (const char* result = parse_result(op.first)) return result;
+    }
+    return nullptr;
+}
+
+int run_evaltrace(const EvalTraceOptions& options) {
+    std::ifstream file_in;
+    std::istream* in = &std::cin;
+    if (options.input != "-") {
+        file_in.open(options.input);
+        if (!file_in) {
+            std::cerr << "Cannot open " << options.input << "\n";
+            return 1;
+        }
+        in = &file_in;
+    }
+
+    std::ofstream file_out;
+    std::ostream* out = &std::cout;
+    if (!options.output.empty()) {
+        file_out.open(options.output);
+        if (!file_out) {
+            std::cerr << "Cannot write " << options.output << "\n";
+            return 1;
+        }
+        out = &file_out;
+    }
+
+    *out << "# tadfish evaltrace: result eval n (index coefficient)*n, " << NUM_EVAL_WEIGHTS << " weights\n";
+
+    EvalTrace trace;
+    Board board;
+    std::string line;
+    size_t traced = 0, unlabeled = 0, invalid = 0;
+    std::ostringstream row;
+    while (std::getline(*in, line)) {
+        if (!line.empty() && line.back() == '\r') line.pop_back();
+        size_t first = line.find_first_not_of(" \t");
+        if (first == std::string::npos || line[first] == '#') continue;
+
+        EpdRecord record;
+        if (!parse_epd_line(line, record)) {
+            invalid++;
+            continue;
+        }
+        const char* result = position_result(record);
+        if (!result) {
+            unlabeled++;
+            continue;
+        }
+        board.load_fen(record.fen);
+        if (board.piece_count[WK] != 1 || board.piece_count[BK] != 1) {
+            invalid++;
+            continue;
+        }
+
+        trace_evaluation(board, trace);
+        int eval = evaluate(board);
+        if (board.side_to_move == BLACK) eval = -eval;
+        int n = 0;
+        row.str("");
+        for (int i = 0; i < NUM_EVAL_WEIGHTS; ++i) {
+            int coefficient = trace.coefficients[i];
+            if (coefficient == 0) continue;
+            row << ' ' << i << ' ' << coefficient;
+            n++;
+        }
+        *out << result << ' ' << eval << ' ' << n << row.str() << '\n';
+        traced++;
+    }
+
+    std::cerr << "Traced " << traced << " positions";
+    if (unlabeled) std::cerr << ", skipped " << unlabeled << " without a result";
+    if (invalid) std::cerr << ", " << invalid << " invalid";
+    std::cerr << "\n";
+    return 0;
+}
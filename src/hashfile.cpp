@@ -0,0 +1,235 @@
+// hashfile.cpp
+#include "hashfile.h"
+#include <algorithm>
+#include <atomic>
+#include <cstring>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+static const char HF_MAGIC[4] = {'T', 'F', 'H', 'F'};
+static const uint32_t HF_VERSION = 2;     // 2: mate scores without the per-ply offset
+static const size_t HEADER_SIZE = 64;   // entries start on a cache line
+static const int BUCKET = 4;            // slots per bucket, two words each
+
+struct HashFileHeader {
+    char magic[4];
+    uint32_t version;
+    uint64_t buckets;                   // a power of two
+};
+
+// Lock-free 64-bit atomics are plain words in memory, so they work on a
+// mapping shared with other processes
+static_assert(std::atomic<uint64_t>::is_always_lock_free, "hash file needs lock-free 64-bit atomics");
+
+static void* base = nullptr;
+static size_t length = 0;
+static std::atomic<uint64_t>* words = nullptr;  // check, data, check, data...
+static size_t mask = 0;
+static bool writable = false;
+static std::atomic<uint64_t> probes{0}, hits{0}, stores{0};
+#ifdef _WIN32
+static HANDLE file_handle = INVALID_HANDLE_VALUE;
+static HANDLE mapping_handle = nullptr;
+#endif
+
+// data layout as in the transposition table: bits 0-15 move, 16-47 score,
+// 48-55 depth, 56-57 bound
+static uint64_t pack(PackedMove move, int score, int depth, TTBound bound) {
+    return uint64_t(move.data) | (uint64_t(uint32_t(score)) << 16) |
+           (uint64_t(uint8_t(depth)) << 48) | (uint64_t(bound) << 56);
+}
+
+static int depth_of(uint64_t data) { return int8_t(uint8_t(data >> 48)); }
+
+static size_t file_size_for(size_t buckets) {
+    return HEADER_SIZE + buckets * BUCKET * 2 * sizeof(uint64_t);
+}
+
+void hashfile_close() {
+    if (!base) return;
+#ifdef _WIN32
+    UnmapViewOfFile(base);
+    CloseHandle(mapping_handle);
+    CloseHandle(file_handle);
+    mapping_handle = nullptr;
+    file_handle = INVALID_HANDLE_VALUE;
+#else
+    munmap(base, length);
+#endif
+    base = nullptr;
+    words = nullptr;
+    length = 0;
+    mask = 0;
+    writable = false;
+}
+
+bool hashfile_open(const std::string& path, size_t mb, std::string& error) {
+    hashfile_close();
+    // Round down to a power of two of buckets so the index is a mask
+    size_t buckets = 1;
+    while (file_size_for(buckets * 2) - HEADER_SIZE <= std::max<size_t>(mb, 1) * 1024 * 1024) buckets *= 2;
+
+#ifdef _WIN32
+    writable = true;
+    HANDLE file = CreateFileA(path.c_str(), GENERIC_READ | GENERIC_WRITE, FILE_SHARE_READ | FILE_SHARE_WRITE,
+                              nullptr, OPEN_ALWAYS, FILE_ATTRIBUTE_NORMAL, nullptr);
+    if (file == INVALID_HANDLE_VALUE) {
+        writable = false;
+        file = CreateFileA(path.c_str(), GENERIC_READ, FILE_SHARE_READ | FILE_SHARE_WRITE, nullptr,
+                           OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+    }
+    if (file == INVALID_HANDLE_VALUE) {
+        error = "cannot open " + path;
+        return false;
+    }
+    LARGE_INTEGER size;
+    GetFileSizeEx(file, &size);
+    bool created = size.QuadPart == 0;
+    if (created && writable) {
+        size.QuadPart = file_size_for(buckets);
+        SetFilePointerEx(file, size, nullptr, FILE_BEGIN);
+        SetEndOfFile(file);
+    }
+    HANDLE mapping = CreateFileMappingA(file, nullptr, writable ? PAGE_READWRITE : PAGE_READONLY, 0, 0, nullptr);
+    void* view = mapping ? MapViewOfFile(mapping, writable ? FILE_MAP_WRITE : FILE_MAP_READ, 0, 0, 0) : nullptr;
+    if (!view) {
+        if (mapping) CloseHandle(mapping);
+        CloseHandle(file);
+        error = "cannot map " + path;
+        return false;
+    }
+    file_handle = file;
+    mapping_handle = mapping;
+    base = view;
+    length = size_t(size.QuadPart);
+    if (created && writable) {
+        HashFileHeader* header = static_cast<HashFileHeader*>(base);
+        memcpy(header->magic, HF_MAGIC, 4);
+        header->version = HF_VERSION;
+        header->buckets = buckets;
+    }
+#else
+    writable = true;
+    int fd = open(path.c_str(), O_RDWR | O_CREAT, 0644);
+    if (fd < 0) {
+        writable = false;
+        fd = open(path.c_str(), O_RDONLY);
+    }
+    if (fd < 0) {
+        error = "cannot open " + path;
+        return false;
+    }
+    // Processes starting together must not both initialise a new file
+    flock(fd, LOCK_EX);
+    struct stat st;
+    bool created = fstat(fd, &st) == 0 && st.st_size == 0;
+    if (created && writable && ftruncate(fd, file_size_for(buckets)) != 0) {
+        flock(fd, LOCK_UN);
+        close(fd);
+        error = "cannot resize " + path;
+        return false;
+    }
+    fstat(fd, &st);
+    void* view = mmap(nullptr, st.st_size, writable ? PROT_READ | PROT_WRITE : PROT_READ, MAP_SHARED, fd, 0);
+    if (view != MAP_FAILED && created && writable) {
+        HashFileHeader* header = static_cast<HashFileHeader*>(view);
+        memcpy(header->magic, HF_MAGIC, 4);
+        header->version = HF_VERSION;
+        header->buckets = buckets;
+    }
+    flock(fd, LOCK_UN);
+    close(fd);
+    if (view == MAP_FAILED) {
+        error = "cannot map " + path;
+        return false;
+    }
+    base = view;
+    length = st.st_size;
+#endif
+
+    const HashFileHeader* header = static_cast<const HashFileHeader*>(base);
+    if (length < HEADER_SIZE || memcmp(header->magic, HF_MAGIC, 4) != 0 || header->version != HF_VERSION ||
+        header->buckets == 0 || (header->buckets & (header->buckets - 1)) != 0 ||
+        length < file_size_for(header->buckets)) {
+        hashfile_close();
+        error = path + " is not a hash file";
+        return false;
+    }
+    mask = header->buckets - 1;
+    words = reinterpret_cast<std::atomic<uint64_t>*>(static_cast<char*>(base) + HEADER_SIZE);
+    probes = hits = stores = 0;
+    return true;
+}
+
+bool hashfile_enabled() { return words != nullptr; }
+
+bool hashfile_writable() { return words != nullptr && writable; }
+
+bool hashfile_probe(uint64_t key, TTEntry& entry) {
+    if (!words) return false;
+    probes.fetch_add(1, std::memory_order_relaxed);
+    const std::atomic<uint64_t>* bucket = words + (key & mask) * BUCKET * 2;
+    for (int i = 0; i < BUCKET; ++i) {
+        uint64_t check = bucket[2 * i].load(std::memory_order_relaxed);
+        uint64_t data = bucket[2 * i + 1].load(std::memory_order_relaxed);
+        if (data == 0 || (check ^ data) != key) continue;
+        entry.move.data = uint16_t(data & 0xFFFF);
+        entry.score = int32_t(uint32_t(data >> 16));
+        entry.depth = depth_of(data);
+        entry.bound = TTBound((data >> 56) & 0x3);
+        hits.fetch_add(1, std::memory_order_relaxed);
+        return true;
+    }
+    return false;
+}
+
+void hashfile_store(uint64_t key, PackedMove move, int score, int depth, TTBound bound) {
+    if (!words || !writable) return;
+    std::atomic<uint64_t>* bucket = words + (key & mask) * BUCKET * 2;
+    // The position's own slot if it has one, otherwise the shallowest slot;
+    // either is only replaced by a result at least as deep
+    int slot = -1, slot_depth = 0;
+    bool found = false;
+    for (int i = 0; i < BUCKET; ++i) {
+        uint64_t check = bucket[2 * i].load(std::memory_order_relaxed);
+        uint64_t data = bucket[2 * i + 1].load(std::memory_order_relaxed);
+        int d = data ? depth_of(data) : -1;
+        if (data && (check ^ data) == key) {
+            if (depth < d || (depth == d && bound != TT_EXACT && TTBound((data >> 56) & 0x3) == TT_EXACT)) return;
+            if (move.is_null()) move.data = uint16_t(data & 0xFFFF);
+            slot = i;
+            found = true;
+            break;
+        }
+        if (slot < 0 || d < slot_depth) {
+            slot = i;
+            slot_depth = d;
+        }
+    }
+    if (!found && depth < slot_depth) return;
+
+    uint64_t data = pack(move, score, depth, bound);
+    // Leave pages another process only reads clean when nothing changes
+    if (bucket[2 * slot + 1].load(std::memory_order_relaxed) == data &&
+        bucket[2 * slot].load(std::memory_order_relaxed) == (key ^ data))
+        return;
+    bucket[2 * slot + 1].store(data, std::memory_order_relaxed);
+    bucket[2 * slot].store(key ^ data, std::memory_order_relaxed);
+    stores.fetch_add(1, std::memory_order_relaxed);
+}
+
+HashFileStats hashfile_stats() {
+    HashFileStats stats;
+    stats.probes = probes.load(std::memory_order_relaxed);
+    stats.hits = hits.load(std::memory_order_relaxed);
+    stats.stores = stores.load(std::memory_order_relaxed);
+    return stats;
+}
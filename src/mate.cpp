@@ -0,0 +1,287 @@
+// mate.cpp
+#include "mate.h"
+#include "movegen.h"
+#include <algorithm>
+#include <chrono>
+
+// Proof and disproof numbers saturate here; a node with phi == 0 is won
+// for the side to move, one with delta == 0 lost
+static const uint32_t PN_INF = 1u << 30;
+static const uint64_t CHECKS_ONLY_KEY = 0x9E3779B97F4A7C15ULL;
+static const uint64_t BLACK_ATTACKS_KEY = 0xD1B54A32D192ED03ULL;
+static const uint64_t LIMIT_CHECK_INTERVAL = 4096;
+
+static int64_t now_ms() {
+    using namespace std::chrono;
+    return duration_cast<milliseconds>(steady_clock::now().time_since_epoch()).count();
+}
+
+static uint64_t splitmix64(uint64_t x) {
+    x += 0x9E3779B97F4A7C15ULL;
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+// The attacker's generator: legal moves that give check
+static void generate_checks(Board& board, MoveList& checks) {
+    MoveList pseudo;
+    MoveGenerator(board).generate_pseudo_legal_moves(pseudo);
+    checks.clear();
+    Color us = board.side_to_move;
+    Color them = us == WHITE ? BLACK : WHITE;
+    for (PackedMove m : pseudo) {
+        Piece captured, moved;
+        if (!board.make_move(m, captured, moved)) continue;
+        if (!board.is_king_in_check(us) && board.is_king_in_check(them)) checks.push_back(m);
+        board.unmake_move(m, captured, moved);
+    }
+}
+
+MateSolver::MateSolver(size_t hash_mb) { resize(hash_mb); }
+
+void MateSolver::resize(size_t mb) {
+    // Round down to a power of two of buckets so the index is a mask
+    size_t buckets = 1;
+    while (buckets * 2 * BUCKET * sizeof(Entry) <= std::max<size_t>(mb, 1) * 1024 * 1024) buckets *= 2;
+    table_.assign(buckets * BUCKET, Entry());
+    mask_ = buckets - 1;
+}
+
+void MateSolver::clear() {
+    std::fill(table_.begin(), table_.end(), Entry());
+}
+
+uint64_t MateSolver::node_key(uint64_t position_key, int remaining) const {
+    // The same position is won for the side to move when it attacks and
+    // lost when it defends, so the attacker is part of the key
+    return position_key ^ splitmix64(remaining) ^ (checks_only_ ? CHECKS_ONLY_KEY : 0) ^
+           (attacker_ == BLACK ? BLACK_ATTACKS_KEY : 0);
+}
+
+// Unknown nodes start at phi = delta = 1
+bool MateSolver::lookup(uint64_t key, uint32_t& phi, uint32_t& delta) const {
+    const Entry* bucket = &table_[(key & mask_) * BUCKET];
+    for (int i = 0; i < BUCKET; ++i) {
+        if (bucket[i].key == key) {
+            phi = bucket[i].phi;
+            delta = bucket[i].delta;
+            return true;
+        }
+    }
+    phi = delta = 1;
+    return false;
+}
+
+// Replaces the entry with the least work below it. A node's work adds up
+// over all its searches, so the roots of big subtrees stay in the table.
+void MateSolver::store(uint64_t key, uint32_t phi, uint32_t delta, uint64_t work) {
+    Entry* bucket = &table_[(key & mask_) * BUCKET];
+    Entry* slot = nullptr;
+    for (int i = 0; i < BUCKET; ++i) {
+        if (bucket[i].key == key) {
+            slot = &bucket[i];
+            work += slot->work;
+            break;
+        }
+        if (!slot || bucket[i].work < slot->work) slot = &bucket[i];
+    }
+    slot->key = key;
+    slot->phi = phi;
+    slot->delta = delta;
+    slot->work = uint32_t(std::min<uint64_t>(work, UINT32_MAX));
+}
+
+int MateSolver::elapsed_ms() const { return int(now_ms() - start_ms_); }
+
+bool MateSolver::out_of_limits() {
+    if (aborted_) return true;
+    if (limits_.nodes && nodes_ >= limits_.nodes) aborted_ = true;
+    if (nodes_ % LIMIT_CHECK_INTERVAL == 0) {
+        if (limits_.stop && limits_.stop->load(std::memory_order_relaxed)) aborted_ = true;
+        if (limits_.time_ms > 0 && elapsed_ms() >= limits_.time_ms) aborted_ = true;
+    }
+    return aborted_;
+}
+
+// Moves of the side to move, `remaining` attacker moves left
+void MateSolver::generate(int remaining, MoveList& moves) {
+    moves.clear();
+    if (board_.side_to_move == attacker_) {
+        if (remaining == 0) return;
+        if (checks_only_) generate_checks(board_, moves);
+        else MoveGenerator(board_).generate_legal_moves(moves);
+    } else {
+        MoveGenerator(board_).generate_legal_moves(moves);
+    }
+}
+
+// Multiple iterative deepening: search the current node until its phi or
+// delta reaches the threshold, leaving both in phi/delta and the table.
+// In phi/delta form a node's phi is the least delta of its children and
+// its delta the sum of their phis, for both sides alike.
+void MateSolver::mid(int remaining, uint32_t th_phi, uint32_t th_delta, uint32_t& phi, uint32_t& delta) {
+    bool attacker = board_.side_to_move == attacker_;
+    uint64_t key = node_key(board_.key, remaining);
+    if (lookup(key, phi, delta) && (phi >= th_phi || delta >= th_delta)) return;
+    if (out_of_limits()) return;
+    nodes_++;
+    uint64_t start_nodes = nodes_;
+
+    MoveList moves;
+    generate(remaining, moves);
+    if (moves.empty() || (!attacker && remaining == 0)) {
+        // The attacker has failed if it is out of moves (or checks), and
+        // wins if the defender is mated; stalemate and running out of
+        // attacker moves with the defender still free to move are failures
+        bool to_move_wins = !attacker && !(moves.empty() && board_.is_king_in_check(board_.side_to_move));
+        phi = to_move_wins ? 0 : PN_INF;
+        delta = to_move_wins ? PN_INF : 0;
+        store(key, phi, delta, 1);
+        return;
+    }
+
+    int child_remaining = attacker ? remaining - 1 : remaining;
+    uint64_t child_keys[MoveList::CAPACITY];
+    for (int i = 0; i < moves.size(); ++i) {
+        Piece captured, moved;
+        board_.make_move(moves[i], captured, moved);
+        child_keys[i] = node_key(board_.key, child_remaining);
+        board_.unmake_move(moves[i], captured, moved);
+    }
+
+    while (true) {
+        uint32_t min_delta = PN_INF, second_delta = PN_INF, best_phi = 0;
+        uint64_t sum_phi = 0;
+        int best = 0;
+        for (int i = 0; i < moves.size(); ++i) {
+            uint32_t child_phi, child_delta;
+            lookup(child_keys[i], child_phi, child_delta);
+            sum_phi += child_phi;
+            if (child_delta < min_delta) {
+                second_delta = min_delta;
+                min_delta = child_delta;
+                best_phi = child_phi;
+                best = i;
+            } else if (child_delta < second_delta) {
+                second_delta = child_delta;
+            }
+        }
+        phi = min_delta;
+        delta = uint32_t(std::min<uint64_t>(sum_phi, PN_INF));
+        if (phi >= th_phi || delta >= th_delta || aborted_) break;
+
+        // The 1 + epsilon trick: let the child run a little past the second
+        // best, so the search does not keep switching between the two
+        uint32_t child_th_phi = uint32_t(std::min<uint64_t>(uint64_t(th_delta) - delta + best_phi, PN_INF));
+        uint32_t child_th_delta = uint32_t(std::min<uint64_t>(th_phi, uint64_t(second_delta) + second_delta / 4 + 1));
+        Piece captured, moved;
+        board_.make_move(moves[best], captured, moved);
+        uint32_t child_phi, child_delta;
+        mid(child_remaining, child_th_phi, child_th_delta, child_phi, child_delta);
+        board_.unmake_move(moves[best], captured, moved);
+    }
+    store(key, phi, delta, nodes_ - start_nodes + 1);
+}
+
+// 1 if the attacker mates within `remaining` moves from the current
+// position, -1 if it cannot, 0 if a limit stopped the search first
+int MateSolver::prove(int remaining) {
+    uint32_t phi, delta;
+    mid(remaining, PN_INF, PN_INF, phi, delta);
+    bool attacker = board_.side_to_move == attacker_;
+    if ((attacker ? phi : delta) == 0) return 1;
+    if ((attacker ? delta : phi) == 0) return -1;
+    return 0;
+}
+
+// A move after which the side to move has lost (delta == 0), with
+// `remaining` attacker moves left after it, or a null move if there is
+// none or a limit stopped the search. The table usually knows the answer;
+// otherwise the candidates are searched in order of their delta.
+PackedMove MateSolver::losing_child(const MoveList& moves, int remaining) {
+    std::pair<uint32_t, PackedMove> order[MoveList::CAPACITY];
+    for (int i = 0; i < moves.size(); ++i) {
+        Piece captured, moved;
+        board_.make_move(moves[i], captured, moved);
+        uint32_t phi, delta;
+        lookup(node_key(board_.key, remaining), phi, delta);
+        board_.unmake_move(moves[i], captured, moved);
+        order[i] = {delta, moves[i]};
+    }
+    std::stable_sort(order, order + moves.size(),
+                     [](const std::pair<uint32_t, PackedMove>& a, const std::pair<uint32_t, PackedMove>& b) {
+                         return a.first < b.first;
+                     });
+    for (int i = 0; i < moves.size() && !aborted_; ++i) {
+        Piece captured, moved;
+        board_.make_move(order[i].second, captured, moved);
+        uint32_t phi, delta;
+        mid(remaining, PN_INF, PN_INF, phi, delta);
+        board_.unmake_move(order[i].second, captured, moved);
+        if (delta == 0) return order[i].second;
+    }
+    return PackedMove();
+}
+
+// The line of a proven shortest mate in `moves`: the attacker plays a move
+// that mates in one move less, the defender a reply after which there is
+// no mate in one move less (one exists, as the mate is the shortest), which
+// is the reply that delays mate longest. Stops early at a limit.
+void MateSolver::extract_pv(int moves, std::vector<Move>& pv) {
+    while (moves > 0) {
+        MoveList list;
+        generate(moves, list);
+        PackedMove mating = losing_child(list, moves - 1);
+        if (mating.is_null()) return;
+        Piece captured, moved;
+        board_.make_move(mating, captured, moved);
+        pv.push_back(mating.to_move());
+
+        moves--;
+        generate(moves, list);
+        if (list.empty()) return;  // mate
+        PackedMove reply = losing_child(list, moves - 1);
+        if (reply.is_null()) return;
+        board_.make_move(reply, captured, moved);
+        pv.push_back(reply.to_move());
+    }
+}
+
+MateResult MateSolver::solve(const Board& board, const MateLimits& limits) {
+    board_ = board;
+    attacker_ = board.side_to_move;
+    limits_ = limits;
+    nodes_ = 0;
+    aborted_ = false;
+    start_ms_ = now_ms();
+
+    MateResult result;
+    int max_moves = std::max(1, std::min(limits.max_moves, MAX_MATE_MOVES));
+    for (int n = 1; n <= max_moves && !result.found && !aborted_; ++n) {
+        for (bool checks_only : {true, false}) {
+            checks_only_ = checks_only;
+            int proof = prove(n);
+            if (proof == 0) break;
+            if (proof > 0) {
+                result.found = true;
+                result.moves = n;
+                result.checks_only = checks_only;
+                break;
+            }
+        }
+        if (!result.found && !aborted_ && limits.on_bound) limits.on_bound(n, nodes_, elapsed_ms());
+    }
+    result.aborted = aborted_;
+    if (result.found) {
+        // The line only needs the table; do not let a limit cut it short
+        limits_.nodes = 0;
+        limits_.time_ms = 0;
+        limits_.stop = nullptr;
+        aborted_ = false;
+        extract_pv(result.moves, result.pv);
+    }
+    result.nodes = nodes_;
+    result.time_ms = elapsed_ms();
+    return result;
+}
@@ -6,11 +6,32 @@ using namespace std;
 
 MoveGenerator::MoveGenerator(Board& b) : board(b) {}
 
+// Convert a packed list for callers that still work with Move
+static std::vector<Move> to_move_vector(const MoveList& list) {
+    std::vector<Move> moves;
+    moves.reserve(list.size());
+    for (PackedMove m : list) moves.push_back(m.to_move());
+    return moves;
+}
+
 std::vector<Move> MoveGenerator::generate_legal_moves() {
-    std::vector<Move> pseudo = generate_pseudo_legal_moves();
-    std::vector<Move> legal;
+    MoveList legal;
+    generate_legal_moves(legal);
+    return to_move_vector(legal);
+}
 
-    for (const Move& m : pseudo) {
+std::vector<Move> MoveGenerator::generate_pseudo_legal_moves() {
+    MoveList moves;
+    generate_pseudo_legal_moves(moves);
+    return to_move_vector(moves);
+}
+
+void MoveGenerator::generate_legal_moves(MoveList& legal) {
+    MoveList pseudo;
+    generate_pseudo_legal_moves(pseudo);
+    legal.clear();
+
+    for (PackedMove m : pseudo) {
         Piece captured, moved;
         Color us = board.side_to_move;
 
@@ -22,12 +43,10 @@ std::vector<Move> MoveGenerator::generate_legal_moves() {
 
         board.unmake_move(m, captured, moved);
     }
-
-    return legal;
 }
 
-std::vector<Move> MoveGenerator::generate_pseudo_legal_moves() {
-    std::vector<Move> moves;
+void MoveGenerator::generate_pseudo_legal_moves(MoveList& moves) {
+    moves.clear();
 
     generate_pawn_moves(moves);
     generate_knight_moves(moves);
@@ -36,11 +55,9 @@ std::vector<Move> MoveGenerator::generate_pseudo_legal_moves() {
     generate_queen_moves(moves);
     generate_king_moves(moves);
     generate_castling_moves(moves);
-
-    return moves;
 }
 
-void MoveGenerator::generate_pawn_moves(std::vector<Move>& moves) {
+void MoveGenerator::generate_pawn_moves(MoveList& moves) {
     int direction = board.side_to_move == WHITE ? 8 : -8;
     int start_rank = board.side_to_move == WHITE ? 1 : 6;
     int promotion_rank = board.side_to_move == WHITE ? 7 : 0;
@@ -50,10 +67,8 @@ void MoveGenerator::generate_pawn_moves(std::vector<Move>& moves) {
     int their_max = board.side_to_move == WHITE ? BK : WK;
     Color us = board.side_to_move;
 
-    for (int sq = 0; sq < 64; ++sq) {
-        if (board.squares[sq] != our_pawn)
-            continue;
-
+    for (int n = 0; n < board.piece_count[our_pawn]; ++n) {
+        int sq = board.piece_list[our_pawn][n];
         int file = sq % 8;
         int rank = sq / 8;
 
@@ -61,18 +76,18 @@ void MoveGenerator::generate_pawn_moves(std::vector<Move>& moves) {
         if (one_step >= 0 && one_step < 64 && board.squares[one_step] == EMPTY) {
             int dest_rank = one_step / 8;
             if (dest_rank == promotion_rank) {
-                moves.emplace_back(sq, one_step, us == WHITE ? WQ : BQ);
-                moves.emplace_back(sq, one_step, us == WHITE ? WR : BR);
-                moves.emplace_back(sq, one_step, us == WHITE ? WB : BB);
-                moves.emplace_back(sq, one_step, us == WHITE ? WN : BN);
+                moves.add(sq, one_step, us == WHITE ? WQ : BQ);
+                moves.add(sq, one_step, us == WHITE ? WR : BR);
+                moves.add(sq, one_step, us == WHITE ? WB : BB);
+                moves.add(sq, one_step, us == WHITE ? WN : BN);
             } else {
-                moves.emplace_back(sq, one_step);
+                moves.add(sq, one_step);
             }
 
             if (rank == start_rank) {
                 int two_step = sq + 2 * direction;
                 if (board.squares[two_step] == EMPTY)
-                    moves.emplace_back(sq, two_step);
+                    moves.add(sq, two_step);
             }
         }
 
@@ -86,118 +101,100 @@ void MoveGenerator::generate_pawn_moves(std::vector<Move>& moves) {
             if (tp >= their_min && tp <= their_max) {
                 int dest_rank = target / 8;
                 if (dest_rank == promotion_rank) {
-                    moves.emplace_back(sq, target, us == WHITE ? WQ : BQ);
-                    moves.emplace_back(sq, target, us == WHITE ? WR : BR);
-                    moves.emplace_back(sq, target, us == WHITE ? WB : BB);
-                    moves.emplace_back(sq, target, us == WHITE ? WN : BN);
+                    moves.add(sq, target, us == WHITE ? WQ : BQ);
+                    moves.add(sq, target, us == WHITE ? WR : BR);
+                    moves.add(sq, target, us == WHITE ? WB : BB);
+                    moves.add(sq, target, us == WHITE ? WN : BN);
                 } else {
-                    moves.emplace_back(sq, target);
+                    moves.add(sq, target);
                 }
+            } else if (target == board.en_passant_square && tp == EMPTY &&
+                       board.squares[target - direction] == (us == WHITE ? BP : WP)) {
+                moves.push_back(PackedMove(sq, target, EMPTY, true));
             }
         }
     }
 }
 
-void MoveGenerator::generate_knight_moves(std::vector<Move>& moves) {
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY || (board.side_to_move == WHITE && p >= BP) || (board.side_to_move == BLACK && p <= WK))
-            continue;
-        if ((p != WN && p != BN))
-            continue;
+void MoveGenerator::generate_knight_moves(MoveList& moves) {
+    Piece knight = board.side_to_move == WHITE ? WN : BN;
+    for (int n = 0; n < board.piece_count[knight]; ++n) {
+        int sq = board.piece_list[knight][n];
 
         for (int i = 0; i < 8 && KNIGHT_MOVES[sq][i] != -1; ++i) {
             int target = KNIGHT_MOVES[sq][i];
             Piece tp = board.squares[target];
             if (tp == EMPTY || ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK))) {
-                moves.emplace_back(sq, target);
+                moves.add(sq, target);
             }
         }
     }
 }
 
-void MoveGenerator::generate_bishop_moves(std::vector<Move>& moves) {
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY || (board.side_to_move == WHITE && p >= BP) || (board.side_to_move == BLACK && p <= WK))
-            continue;
-        if ((p != WB && p != BB) && (p != WQ && p != BQ))
-            continue;
-
-        for (int d = 0; d < 4; ++d) {
-            for (int i = 0; i < 7 && BISHOP_MOVES[sq][d][i] != -1; ++i) {
-                int target = BISHOP_MOVES[sq][d][i];
-                Piece tp = board.squares[target];
-                if (tp == EMPTY) {
-                    moves.emplace_back(sq, target);
-                } else {
-                    if ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK)) {
-                        moves.emplace_back(sq, target);
-                    }
-                    break;
+void MoveGenerator::generate_slider_moves(int sq, const int rays[4][7], MoveList& moves) {
+    for (int d = 0; d < 4; ++d) {
+        for (int i = 0; i < 7 && rays[d][i] != -1; ++i) {
+            int target = rays[d][i];
+            Piece tp = board.squares[target];
+            if (tp == EMPTY) {
+                moves.add(sq, target);
+            } else {
+                if ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK)) {
+                    moves.add(sq, target);
                 }
+                break;
             }
         }
     }
 }
 
-void MoveGenerator::generate_rook_moves(std::vector<Move>& moves) {
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY || (board.side_to_move == WHITE && p >= BP) || (board.side_to_move == BLACK && p <= WK))
-            continue;
-        if ((p != WR && p != BR) && (p != WQ && p != BQ))
-            continue;
-
-        for (int d = 0; d < 4; ++d) {
-            for (int i = 0; i < 7 && ROOK_MOVES[sq][d][i] != -1; ++i) {
-                int target = ROOK_MOVES[sq][d][i];
-                Piece tp = board.squares[target];
-                if (tp == EMPTY) {
-                    moves.emplace_back(sq, target);
-                } else {
-                    if ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK)) {
-                        moves.emplace_back(sq, target);
-                    }
-                    break;
-                }
-            }
-        }
+void MoveGenerator::generate_bishop_moves(MoveList& moves) {
+    Piece bishop = board.side_to_move == WHITE ? WB : BB;
+    for (int n = 0; n < board.piece_count[bishop]; ++n) {
+        int sq = board.piece_list[bishop][n];
+        generate_slider_moves(sq, BISHOP_MOVES[sq], moves);
     }
 }
 
-void MoveGenerator::generate_queen_moves(std::vector<Move>& moves) {
-    generate_bishop_moves(moves);
-    generate_rook_moves(moves);
+void MoveGenerator::generate_rook_moves(MoveList& moves) {
+    Piece rook = board.side_to_move == WHITE ? WR : BR;
+    for (int n = 0; n < board.piece_count[rook]; ++n) {
+        int sq = board.piece_list[rook][n];
+        generate_slider_moves(sq, ROOK_MOVES[sq], moves);
+    }
 }
 
-void MoveGenerator::generate_king_moves(std::vector<Move>& moves) {
+void MoveGenerator::generate_queen_moves(MoveList& moves) {
+    Piece queen = board.side_to_move == WHITE ? WQ : BQ;
+    for (int n = 0; n < board.piece_count[queen]; ++n) {
+        int sq = board.piece_list[queen][n];
+        generate_slider_moves(sq, BISHOP_MOVES[sq], moves);
+        generate_slider_moves(sq, ROOK_MOVES[sq], moves);
+    }
+}
+
+void MoveGenerator::generate_king_moves(MoveList& moves) {
     static const int offsets[8] = {8, -8, 1, -1, 9, -9, 7, -7};
 
-    for (int sq = 0; sq < 64; ++sq) {
-        Piece p = board.squares[sq];
-        if (p == EMPTY || (board.side_to_move == WHITE && p >= BP) || (board.side_to_move == BLACK && p <= WK))
-            continue;
-        if ((p != WK && p != BK))
-            continue;
+    int sq = board.king_square(board.side_to_move);
+    if (sq < 0) return;
 
-        int rank = sq / 8, file = sq % 8;
-        for (int offset : offsets) {
-            int target = sq + offset;
-            if (target < 0 || target >= 64) continue;
-            int trank = target / 8;
-            int tfile = target % 8;
-            if (abs(trank - rank) > 1 || abs(tfile - file) > 1) continue;
+    int rank = sq / 8, file = sq % 8;
+    for (int offset : offsets) {
+        int target = sq + offset;
+        if (target < 0 || target >= 64) continue;
+        int trank = target / 8;
+        int tfile = target % 8;
+        if (abs(trank - rank) > 1 || abs(tfile - file) > 1) continue;
 
-            Piece tp = board.squares[target];
-            if (tp == EMPTY || ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK))) {
-                moves.emplace_back(sq, target);
-            }
+        Piece tp = board.squares[target];
+        if (tp == EMPTY || ((board.side_to_move == WHITE && tp >= BP) || (board.side_to_move == BLACK && tp <= WK))) {
+            moves.add(sq, target);
         }
     }
 }
 
-void MoveGenerator::generate_castling_moves(std::vector<Move>& moves) {
+void MoveGenerator::generate_castling_moves(MoveList& moves) {
     Color us = board.side_to_move;
     Color opp = (us == WHITE ? BLACK : WHITE);
 
@@ -212,7 +209,7 @@ void MoveGenerator::generate_castling_moves(std::vector<Move>& moves) {
             && !board.is_square_attacked(F1, opp)
             && !board.is_square_attacked(G1, opp))
         {
-            moves.emplace_back(E1, G1);
+            moves.add(E1, G1);
         }
         if (board.white_queen_castle
             && board.squares[E1] == WK
@@ -224,7 +221,7 @@ void MoveGenerator::generate_castling_moves(std::vector<Move>& moves) {
             && !board.is_square_attacked(D1, opp)
             && !board.is_square_attacked(C1, opp))
         {
-            moves.emplace_back(E1, C1);
+            moves.add(E1, C1);
         }
     } else {
         if (board.black_king_castle
@@ -236,7 +233,7 @@ void MoveGenerator::generate_castling_moves(std::vector<Move>& moves) {
             && !board.is_square_attacked(F8, opp)
             && !board.is_square_attacked(G8, opp))
         {
-            moves.emplace_back(E8, G8);
+            moves.add(E8, G8);
         }
         if (board.black_queen_castle
             && board.squares[E8] == BK
@@ -248,14 +245,14 @@ void MoveGenerator::generate_castling_moves(std::vector<Move>& moves) {
             && !board.is_square_attacked(D8, opp)
             && !board.is_square_attacked(C8, opp))
         {
-            moves.emplace_back(E8, C8);
+            moves.add(E8, C8);
         }
     }
 }
 
 
 std::vector<Move> MoveGenerator::generate_pseudo_legal_attack_moves() {
-    std::vector<Move> moves;
+    MoveList moves;
 
     generate_pawn_moves(moves);
     generate_knight_moves(moves);
@@ -265,5 +262,19 @@ std::vector<Move> MoveGenerator::generate_pseudo_legal_attack_moves() {
     generate_king_moves(moves);
     // !DO NOT CALL generate_castling_moves(moves) here! (stack overflow)
 
-    return moves;
+    return to_move_vector(moves);
+}
+
+uint64_t perft(Board& board, int depth) {
+    MoveList moves;
+    MoveGenerator(board).generate_legal_moves(moves);
+    if (depth <= 1) return depth == 1 ? moves.size() : 1;
+    uint64_t nodes = 0;
+    for (PackedMove m : moves) {
+        Piece captured, moved;
+        board.make_move(m, captured, moved);
+        nodes += perft(board, depth - 1);
+        board.unmake_move(m, captured, moved);
+    }
+    return nodes;
 }
\ No newline at end of file
@@ -0,0 +1,300 @@
+// nnue.cpp
+#include "nnue.h"
+#include <algorithm>
+#include <atomic>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
+#include <memory>
+
+#if !defined(NNUE_NO_SIMD) && defined(__AVX2__)
+#include <immintrin.h>
+#define NNUE_AVX2
+#elif !defined(NNUE_NO_SIMD) && (defined(__SSE2__) || defined(_M_X64))
+#include <emmintrin.h>
+#define NNUE_SSE2
+#endif
+
+static const uint32_t NETWORK_VERSION = 1;
+// Moves an accumulator is carried forward before a refresh is cheaper
+static const int MAX_UPDATE_MOVES = 8;
+// Scores stay clear of the mate range
+static const int MAX_NNUE_SCORE = 30000;
+
+struct alignas(64) FeatureRow {
+    int16_t values[NNUE_HIDDEN];
+};
+
+struct Network {
+    std::unique_ptr<FeatureRow[]> weights;  // [NNUE_FEATURES]
+    FeatureRow biases;
+    alignas(64) int16_t output_weights[2 * NNUE_HIDDEN];
+    int32_t output_bias = 0;
+    int32_t qa = 0;
+    int32_t qb = 0;
+    int32_t scale = 0;
+};
+
+static std::unique_ptr<Network> network;
+// Bumped by every load, so threads drop accumulators of the old network
+static std::atomic<uint32_t> network_generation{0};
+
+// Accumulators of the positions on a board's path, indexed by the length of
+// its move history. Each entry remembers the Zobrist key it was computed
+// for, so boards that are copied, reloaded or taken back just find entries
+// that do not match and recompute them.
+struct alignas(64) Accumulator {
+    int16_t values[2][NNUE_HIDDEN];  // per perspective (WHITE, BLACK)
+    uint64_t key;
+    bool computed[2];
+};
+
+struct AccumulatorStack {
+    std::unique_ptr<Accumulator[]> entries{new Accumulator[Board::MAX_HISTORY + 1]};
+    uint32_t generation = ~0u;
+};
+
+static thread_local std::unique_ptr<AccumulatorStack> thread_stack;
+
+static int piece_type_index(int piece) {
+    return piece >= BP ? piece - BP : piece - WP;
+}
+
+static Color color_of(int piece) {
+    return piece >= BP ? BLACK : WHITE;
+}
+
+static bool is_king(int piece) {
+    return piece == WK || piece == BK;
+}
+
+static int feature_index(Color perspective, int king_sq, int piece, int sq) {
+    int orient = perspective == WHITE ? 0 : 56;
+    int kind = piece_type_index(piece) + (color_of(piece) == perspective ? 0 : 5);
+    return ((king_sq ^ orient) * 10 + kind) * 64 + (sq ^ orient);
+}
+
+// dst = src + the rows of added - the rows of removed
+static void update_accumulator(const int16_t* src, int16_t* dst, const int* added, int added_count,
+                               const int* removed, int removed_count) {
+    const FeatureRow* rows = network->weights.get();
+#if defined(NNUE_AVX2)
+    for (int i = 0; i < NNUE_HIDDEN; i += 16) {
+        __m256i v = _mm256_load_si256((const __m256i*)(src + i));
+        for (int k = 0; k < added_count; ++k)
+            v = _mm256_add_epi16(v, _mm256_load_si256((const __m256i*)(rows[added[k]].values + i)));
+        for (int k = 0; k < removed_count; ++k)
+            v = _mm256_sub_epi16(v, _mm256_load_si256((const __m256i*)(rows[removed[k]].values + i)));
+        _mm256_store_si256((__m256i*)(dst + i), v);
+    }
+#elif defined(NNUE_SSE2)
+    for (int i = 0; i < NNUE_HIDDEN; i += 8) {
+        __m128i v = _mm_load_si128((const __m128i*)(src + i));
+        for (int k = 0; k < added_count; ++k)
+            v = _mm_add_epi16(v, _mm_load_si128((const __m128i*)(rows[added[k]].values + i)));
+        for (int k = 0; k < removed_count; ++k)
+            v = _mm_sub_epi16(v, _mm_load_si128((const __m128i*)(rows[removed[k]].values + i)));
+        _mm_store_si128((__m128i*)(dst + i), v);
+    }
+#else
+    for (int i = 0; i < NNUE_HIDDEN; ++i) {
+        int16_t v = src[i];
+        for (int k = 0; k < added_count; ++k) v += rows[added[k]].values[i];
+        for (int k = 0; k < removed_count; ++k) v -= rows[removed[k]].values[i];
+        dst[i] = v;
+    }
+#endif
+}
+
+// Sum of clamp(values, 0, QA) * weights
+static int32_t clipped_dot(const int16_t* values, const int16_t* weights) {
+#if defined(NNUE_AVX2)
+    const __m256i zero = _mm256_setzero_si256();
+    const __m256i qa = _mm256_set1_epi16(int16_t(network->qa));
+    __m256i sum = _mm256_setzero_si256();
+    for (int i = 0; i < NNUE_HIDDEN; i += 16) {
+        __m256i v = _mm256_load_si256((const __m256i*)(values + i));
+        v = _mm256_min_epi16(_mm256_max_epi16(v, zero), qa);
+        sum = _mm256_add_epi32(sum, _mm256_madd_epi16(v, _mm256_load_si256((const __m256i*)(weights + i))));
+    }
+    __m128i half = _mm_add_epi32(_mm256_castsi256_si128(sum), _mm256_extracti128_si256(sum, 1));
+    half = _mm_add_epi32(half, _mm_shuffle_epi32(half, 0x4E));
+    half = _mm_add_epi32(half, _mm_shuffle_epi32(half, 0xB1));
+    return _mm_cvtsi128_si32(half);
+#elif defined(NNUE_SSE2)
+    const __m128i zero = _mm_setzero_si128();
+    const __m128i qa = _mm_set1_epi16(int16_t(network->qa));
+    __m128i sum = _mm_setzero_si128();
+    for (int i = 0; i < NNUE_HIDDEN; i += 8) {
+        __m128i v = _mm_load_si128((const __m128i*)(values + i));
+        v = _mm_min_epi16(_mm_max_epi16(v, zero), qa);
+        sum = _mm_add_epi32(sum, _mm_madd_epi16(v, _mm_load_si128((const __m128i*)(weights + i))));
+    }
+    sum = _mm_add_epi32(sum, _mm_shuffle_epi32(sum, 0x4E));
+    sum = _mm_add_epi32(sum, _mm_shuffle_epi32(sum, 0xB1));
+    return _mm_cvtsi128_si32(sum);
+#else
+    int32_t sum = 0;
+    for (int i = 0; i < NNUE_HIDDEN; ++i)
+        sum += int32_t(std::min<int>(std::max<int>(values[i], 0), network->qa)) * weights[i];
+    return sum;
+#endif
+}
+
+static void refresh_accumulator(const Board& board, Color perspective, int16_t* values) {
+    int king_sq = board.king_square(perspective);
+    int added[32];
+    int count = 0;
+    std::memcpy(values, network->biases.values, sizeof(network->biases.values));
+    for (int piece = WP; piece <= BK; ++piece) {
+        if (is_king(piece)) continue;
+        for (int i = 0; i < board.piece_count[piece]; ++i) {
+            added[count++] = feature_index(perspective, king_sq, piece, board.piece_list[piece][i]);
+            if (count == 32) {
+                update_accumulator(values, values, added, count, nullptr, 0);
+                count = 0;
+            }
+        }
+    }
+    update_accumulator(values, values, added, count, nullptr, 0);
+}
+
+static void claim(Accumulator& entry, uint64_t key) {
+    if (entry.key == key) return;
+    entry.key = key;
+    entry.computed[WHITE] = entry.computed[BLACK] = false;
+}
+
+// Make the accumulator of the board's current position valid for one
+// perspective, carrying the nearest computed one on the board's path
+// forward move by move
+static void compute_accumulator(const Board& board, Accumulator* stack, Color perspective) {
+    int top = board.history_size;
+    Accumulator& current = stack[top];
+    claim(current, board.key);
+    if (current.computed[perspective]) return;
+
+    Piece own_king = perspective == WHITE ? WK : BK;
+    int base = -1;
+    for (int i = top - 1; i >= 0 && top - i <= MAX_UPDATE_MOVES; --i) {
+        const UndoInfo& move = board.history[i];
+        if (move.dirty[0].piece == own_king) break;  // every feature changed
+        if (stack[i].key == move.key && stack[i].computed[perspective]) {
+            base = i;
+            break;
+        }
+    }
+    if (base < 0) {
+        refresh_accumulator(board, perspective, current.values[perspective]);
+        current.computed[perspective] = true;
+        return;
+    }
+
+    // The own king stayed put since base, so its square is the current one
+    int king_sq = board.king_square(perspective);
+    for (int i = base; i < top; ++i) {
+        const UndoInfo& move = board.history[i];
+        Accumulator& next = stack[i + 1];
+        claim(next, i + 1 < top ? board.history[i + 1].key : board.key);
+        int added[3], removed[3];
+        int added_count = 0, removed_count = 0;
+        for (int k = 0; k < move.dirty_count; ++k) {
+            const DirtyPiece& d = move.dirty[k];
+            if (is_king(d.piece)) continue;
+            if (d.from >= 0) removed[removed_count++] = feature_index(perspective, king_sq, d.piece, d.from);
+            if (d.to >= 0) added[added_count++] = feature_index(perspective, king_sq, d.piece, d.to);
+        }
+        update_accumulator(stack[i].values[perspective], next.values[perspective], added, added_count,
+                           removed, removed_count);
+        next.computed[perspective] = true;
+    }
+}
+
+int nnue_evaluate(const Board& board) {
+    if (!thread_stack) thread_stack.reset(new AccumulatorStack());
+    Accumulator* stack = thread_stack->entries.get();
+    uint32_t generation = network_generation.load(std::memory_order_relaxed);
+    if (thread_stack->generation != generation) {
+        for (int i = 0; i <= Board::MAX_HISTORY; ++i) {
+            stack[i].key = 0;
+            stack[i].computed[WHITE] = stack[i].computed[BLACK] = false;
+        }
+        thread_stack->generation = generation;
+    }
+
+    compute_accumulator(board, stack, WHITE);
+    compute_accumulator(board, stack, BLACK);
+    const Accumulator& acc = stack[board.history_size];
+    Color us = board.side_to_move;
+    Color them = us == WHITE ? BLACK : WHITE;
+    int64_t output = int64_t(network->output_bias) + clipped_dot(acc.values[us], network->output_weights) +
+                     clipped_dot(acc.values[them], network->output_weights + NNUE_HIDDEN);
+    int64_t score = output * network->scale / (int64_t(network->qa) * network->qb);
+    return int(std::max<int64_t>(-MAX_NNUE_SCORE, std::min<int64_t>(MAX_NNUE_SCORE, score)));
+}
+
+template <typename T>
+static bool read_values(std::istream& in, T* values, size_t count) {
+    // The file is little-endian, as are the machines this builds for
+    in.read(reinterpret_cast<char*>(values), std::streamsize(count * sizeof(T)));
+    return bool(in);
+}
+
+bool nnue_load(const std::string& path, std::string& error) {
+    std::ifstream in(path, std::ios::binary);
+    if (!in) {
+        error = "cannot open " + path;
+        return false;
+    }
+    char magic[4];
+    uint32_t header[3];
+    int32_t scales[3];
+    if (!read_values(in, magic, 4) || std::memcmp(magic, "TFNN", 4) != 0 || !read_values(in, header, 3) ||
+        !read_values(in, scales, 3)) {
+        error = path + " is not a Tadfish network";
+        return false;
+    }
+    if (header[0] != NETWORK_VERSION) {
+        error = path + " has network version " + std::to_string(header[0]) + ", expected " +
+                std::to_string(NETWORK_VERSION);
+        return false;
+    }
+    if (header[1] != uint32_t(NNUE_FEATURES) || header[2] != uint32_t(NNUE_HIDDEN)) {
+        error = path + " has " + std::to_string(header[1]) + " features and " + std::to_string(header[2]) +
+                " hidden units, expected " + std::to_string(NNUE_FEATURES) + " and " + std::to_string(NNUE_HIDDEN);
+        return false;
+    }
+    if (scales[0] <= 0 || scales[0] > INT16_MAX || scales[1] <= 0 || scales[2] <= 0) {
+        error = path + " has invalid scales";
+        return false;
+    }
+
+    std::unique_ptr<Network> net(new Network());
+    net->qa = scales[0];
+    net->qb = scales[1];
+    net->scale = scales[2];
+    net->weights.reset(new FeatureRow[NNUE_FEATURES]);
+    if (!read_values(in, &net->weights[0].values[0], size_t(NNUE_FEATURES) * NNUE_HIDDEN) ||
+        !read_values(in, net->biases.values, NNUE_HIDDEN) ||
+        !read_values(in, net->output_weights, 2 * NNUE_HIDDEN) || !read_values(in, &net->output_bias, 1)) {
+        error = path + " is truncated";
+        return false;
+    }
+    network = std::move(net);
+    network_generation.fetch_add(1, std::memory_order_relaxed);
+    return true;
+}
+
+bool nnue_loaded() {
+    return network != nullptr;
+}
+
+const char* nnue_simd() {
+#if defined(NNUE_AVX2)
+    return "AVX2";
+#elif defined(NNUE_SSE2)
+    return "SSE2";
+#else
+    return "scalar";
+#endif
+}
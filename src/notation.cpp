@@ -0,0 +1,130 @@
+// notation.cpp
+#include "notation.h"
+#include "movegen.h"
+
+std::string square_to_coord(int sq) {
+    int file = sq % 8;
+    int rank = sq / 8;
+    return std::string{char('a' + file), char('1' + rank)};
+}
+
+static char promotion_char(Piece p) {
+    switch (p) {
+        case WN: case BN: return 'n';
+        case WB: case BB: return 'b';
+        case WR: case BR: return 'r';
+        default: return 'q';
+    }
+}
+
+std::string move_to_uci(const Move& m) {
+    if (m.from < 0 || m.to < 0) return "0000";
+    std::string u = square_to_coord(m.from) + square_to_coord(m.to);
+    if (m.promotion != EMPTY) u += promotion_char(m.promotion);
+    return u;
+}
+
+bool move_from_uci(Board& board, const std::string& uci, Move& move) {
+    if (uci.size() < 4 || uci.size() > 5) return false;
+    MoveGenerator gen(board);
+    MoveList legal;
+    gen.generate_legal_moves(legal);
+    for (PackedMove m : legal) {
+        Move candidate = m.to_move();
+        if (move_to_uci(candidate) == uci) {
+            move = candidate;
+            return true;
+        }
+    }
+    return false;
+}
+
+static char piece_letter(Piece p) {
+    switch (p) {
+        case WN: case BN: return 'N';
+        case WB: case BB: return 'B';
+        case WR: case BR: return 'R';
+        case WQ: case BQ: return 'Q';
+        case WK: case BK: return 'K';
+        default: return 0;
+    }
+}
+
+std::string move_to_san(Board& board, const Move& move) {
+    if (move.from < 0 || move.to < 0) return "--";
+    Piece piece = board.squares[move.from];
+    bool is_pawn = (piece == WP || piece == BP);
+    bool is_king = (piece == WK || piece == BK);
+    std::string san;
+
+    if (is_king && move.to - move.from == 2) {
+        san = "O-O";
+    } else if (is_king && move.from - move.to == 2) {
+        san = "O-O-O";
+    } else {
+        bool capture = board.squares[move.to] != EMPTY || (is_pawn && move.from % 8 != move.to % 8);
+        if (is_pawn) {
+            if (capture) san += char('a' + move.from % 8);
+        } else {
+            san += piece_letter(piece);
+            // Disambiguate from other pieces of the same type reaching the same square
+            MoveGenerator gen(board);
+            MoveList legal;
+            gen.generate_legal_moves(legal);
+            bool clash = false, same_file = false, same_rank = false;
+            for (PackedMove m : legal) {
+                if (m.to() != move.to || m.from() == move.from || board.squares[m.from()] != piece) continue;
+                clash = true;
+                if (m.from() % 8 == move.from % 8) same_file = true;
+                if (m.from() / 8 == move.from / 8) same_rank = true;
+            }
+            if (clash) {
+                if (!same_file) san += char('a' + move.from % 8);
+                else if (!same_rank) san += char('1' + move.from / 8);
+                else san += square_to_coord(move.from);
+            }
+        }
+        if (capture) san += 'x';
+        san += square_to_coord(move.to);
+        if (move.promotion != EMPTY) {
+            san += '=';
+            san += piece_letter(move.promotion);
+        }
+    }
+
+    // Check and mate suffixes
+    Piece captured, moved;
+    if (board.make_move(move, captured, moved)) {
+        if (board.is_king_in_check(board.side_to_move)) {
+            san += board.has_legal_moves() ? '+' : '#';
+        }
+        board.unmake_move(move, captured, moved);
+    }
+    return san;
+}
+
+// SAN without check marks and annotation glyphs
+static std::string strip_san(const std::string& san) {
+    std::string out;
+    for (char c : san) {
+        if (c == '+' || c == '#' || c == '!' || c == '?') continue;
+        out += (c == '0') ? 'O' : c;  // "0-0" is a common spelling of "O-O"
+    }
+    return out;
+}
+
+bool move_from_san(Board& board, const std::string& san, Move& move) {
+    std::string wanted = strip_san(san);
+    if (wanted.empty()) return false;
+    MoveGenerator gen(board);
+    MoveList legal;
+    gen.generate_legal_moves(legal);
+    for (PackedMove m : legal) {
+        Move candidate = m.to_move();
+        if (strip_san(move_to_san(board, candidate)) == wanted) {
+            move = candidate;
+            return true;
+        }
+    }
+    return false;
+}
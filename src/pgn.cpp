@@ -0,0 +1,226 @@
+// pgn.cpp
+#include "pgn.h"
+#include <cctype>
+#include <cstdlib>
+#include <iterator>
+#include <sstream>
+
+static const char* START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1";
+static const char* GLYPHS[] = {"", "!", "?", "!!", "??", "!?", "?!"};  // $0 to $6
+static const size_t LINE_WIDTH = 80;
+
+std::string PgnGame::tag(const std::string& name) const {
+    for (const auto& t : tags) {
+        if (t.first == name) return t.second;
+    }
+    return "";
+}
+
+void PgnGame::set_tag(const std::string& name, const std::string& value) {
+    for (auto& t : tags) {
+        if (t.first == name) {
+            t.second = value;
+            return;
+        }
+    }
+    tags.emplace_back(name, value);
+}
+
+std::string PgnGame::start_fen() const {
+    std::string fen = tag("FEN");
+    return fen.empty() ? START_FEN : fen;
+}
+
+static bool is_result(const std::string& token) {
+    return token == "1-0" || token == "0-1" || token == "1/2-1/2" || token == "*";
+}
+
+static bool is_glyph(const std::string& s) {
+    for (int i = 1; i <= 6; ++i) {
+        if (s == GLYPHS[i]) return true;
+    }
+    return false;
+}
+
+// Comment text on one line, without surrounding spaces
+static std::string collapse_spaces(const std::string& s) {
+    std::string out;
+    bool space = false;
+    for (char c : s) {
+        if (isspace((unsigned char)c)) {
+            space = !out.empty();
+            continue;
+        }
+        if (space) out += ' ';
+        out += c;
+        space = false;
+    }
+    return out;
+}
+
+std::vector<PgnGame> read_pgn(std::istream& in) {
+    std::string text((std::istreambuf_iterator<char>(in)), std::istreambuf_iterator<char>());
+    std::vector<PgnGame> games;
+    PgnGame game;
+    bool started = false;       // `game` has a tag, comment or move
+    int variation_depth = 0;
+    auto finish = [&]() {
+        if (started) games.push_back(std::move(game));
+        game = PgnGame();
+        started = false;
+        variation_depth = 0;
+    };
+
+    size_t i = 0, n = text.size();
+    while (i < n) {
+        char c = text[i];
+        if (c == '%' && (i == 0 || text[i - 1] == '\n')) {
+            // Escape line
+            i = text.find('\n', i);
+            if (i == std::string::npos) break;
+            continue;
+        }
+        if (isspace((unsigned char)c)) {
+            ++i;
+        } else if (c == ';') {
+            i = text.find('\n', i);
+            if (i == std::string::npos) break;
+        } else if (c == '{') {
+            size_t end = text.find('}', i + 1);
+            if (end == std::string::npos) end = n;
+            if (variation_depth == 0) {
+                std::string& target = game.moves.empty() ? game.comment : game.moves.back().comment;
+                std::string comment = collapse_spaces(text.substr(i + 1, end - i - 1));
+                if (!comment.empty()) target += (target.empty() ? "" : " ") + comment;
+                started = true;
+            }
+            i = end + 1;
+        } else if (c == '(') {
+            variation_depth++;
+            ++i;
+        } else if (c == ')') {
+            if (variation_depth > 0) variation_depth--;
+            ++i;
+        } else if (c == '[' && variation_depth == 0) {
+            // A tag after the moves of a game without a result starts the next one
+            if (!game.moves.empty()) finish();
+            size_t end = i + 1;
+            while (end < n && isspace((unsigned char)text[end])) ++end;
+            size_t name_start = end;
+            while (end < n && (isalnum((unsigned char)text[end]) || text[end] == '_')) ++end;
+            std::string name = text.substr(name_start, end - name_start);
+            std::string value;
+            end = text.find('"', end);
+            if (end != std::string::npos) {
+                for (++end; end < n && text[end] != '"'; ++end) {
+                    if (text[end] == '\\' && end + 1 < n) ++end;
+                    value += text[end];
+                }
+            }
+            end = end == std::string::npos ? n : text.find(']', end);
+            if (!name.empty()) game.tags.emplace_back(name, value);
+            started = true;
+            i = end == std::string::npos ? n : end + 1;
+        } else {
+            size_t end = i;
+            while (end < n && !isspace((unsigned char)text[end]) && std::string("{}();[").find(text[end]) == std::string::npos)
+                ++end;
+            std::string token = text.substr(i, end - i);
+            i = end;
+            if (variation_depth > 0) continue;
+            if (token[0] == '$') {
+                int nag = atoi(token.c_str() + 1);
+                if (nag >= 1 && nag <= 6 && !game.moves.empty()) game.moves.back().nag = GLYPHS[nag];
+                continue;
+            }
+            if (is_result(token)) {
+                game.result = token;
+                started = true;
+                finish();
+                continue;
+            }
+            // Move numbers, "12." or "12...", possibly run into the move
+            size_t digits = 0;
+            while (digits < token.size() && isdigit((unsigned char)token[digits])) ++digits;
+            if (digits == token.size()) continue;
+            if (digits > 0 && token[digits] == '.') {
+                size_t move_start = token.find_first_not_of('.', digits);
+                if (move_start == std::string::npos) continue;
+                token = token.substr(move_start);
+            }
+            PgnMove move;
+            size_t glyph = token.find_first_of("!?");
+            if (glyph != std::string::npos) {
+                if (is_glyph(token.substr(glyph))) move.nag = token.substr(glyph);
+                token = token.substr(0, glyph);
+            }
+            if (token.empty()) continue;
+            move.san = token;
+            game.moves.push_back(move);
+            started = true;
+        }
+    }
+    finish();
+    return games;
+}
+
+static std::string escape_tag(const std::string& value) {
+    std::string out;
+    for (char c : value) {
+        if (c == '"' || c == '\\') out += '\\';
+        out += c;
+    }
+    return out;
+}
+
+void write_pgn(std::ostream& out, const PgnGame& game) {
+    for (const auto& t : game.tags) out << "[" << t.first << " \"" << escape_tag(t.second) << "\"]\n";
+    out << "\n";
+
+    // Units a line never breaks inside: a move with its number, and a word
+    // or "[%command ...]" of a comment
+    std::vector<std::string> units;
+    auto add_comment = [&](const std::string& comment) {
+        std::string text = "{" + comment + "}", unit;
+        int brackets = 0;
+        for (char c : text) {
+            if (c == ' ' && brackets == 0) {
+                if (!unit.empty()) units.push_back(unit);
+                unit.clear();
+                continue;
+            }
+            if (c == '[') brackets++;
+            if (c == ']' && brackets > 0) brackets--;
+            unit += c;
+        }
+        units.push_back(unit);
+    };
+    if (!game.comment.empty()) add_comment(game.comment);
+    std::istringstream fen(game.start_fen());
+    std::string field, side;
+    int number = 1;
+    fen >> field >> side >> field >> field >> field >> number;
+    bool white = side != "b";
+    bool show_number = true;    // black's moves need "N..." after a comment
+    for (const PgnMove& move : game.moves) {
+        std::string unit = move.san + move.nag;
+        if (white) unit = std::to_string(number) + ". " + unit;
+        else if (show_number) unit = std::to_string(number) + "... " + unit;
+        units.push_back(unit);
+        show_number = !move.comment.empty();
+        if (show_number) add_comment(move.comment);
+        if (!white) number++;
+        white = !white;
+    }
+    units.push_back(game.result);
+
+    std::string line;
+    for (const std::string& unit : units) {
+        if (!line.empty() && line.size() + 1 + unit.size() > LINE_WIDTH) {
+            out << line << "\n";
+            line.clear();
+        }
+        line += (line.empty() ? "" : " ") + unit;
+    }
+    out << line << "\n\n";
+}
@@ -2,31 +2,32 @@
 #include "search.h"
 #include "eval.h"
 #include "movegen.h"
+#include "bitbase.h"
+#include "hashfile.h"
 #include <limits>
 #include <chrono>
 #include <algorithm>
 #include <cstring>
 #include <future>
+#include <atomic>
 
-const int INF = 100000;
-static std::chrono::steady_clock::time_point start_time;
-static int time_limit_ms = 20000;
-static bool time_up_flag = false;
+// Positions this close to the root are looked up in the hash file when the
+// transposition table does not know them
+static const int HASHFILE_MAX_PLY = 2;
+// Shallower results are not worth a write to the hash file
+static const int HASHFILE_MIN_DEPTH = 4;
 
-// Move ordering heuristics
-static const int MAX_PLY = 64;
-static Move killer_moves[MAX_PLY][2];
-static int history_heuristic[64][64];
+// Context used by the calls that don't pass one
+static SearchContext default_context;
 
-inline void record_killer(const Move& move, int ply) {
-    if (killer_moves[ply][0].from == move.from && killer_moves[ply][0].to == move.to) return;
-    if (killer_moves[ply][1].from == move.from && killer_moves[ply][1].to == move.to) return;
-    killer_moves[ply][1] = killer_moves[ply][0];
-    killer_moves[ply][0] = move;
+inline void record_killer(SearchContext& ctx, PackedMove move, int ply) {
+    if (ctx.killer_moves[ply][0] == move || ctx.killer_moves[ply][1] == move) return;
+    ctx.killer_moves[ply][1] = ctx.killer_moves[ply][0];
+    ctx.killer_moves[ply][0] = move;
 }
 
-inline void record_history(const Move& move, int depth) {
-    history_heuristic[move.from][move.to] += depth * depth;
+inline void record_history(SearchContext& ctx, PackedMove move, int depth) {
+    ctx.history_heuristic[move.from()][move.to()] += depth * depth;
 }
 
 int piece_value_for_mvv(Piece p) {
@@ -40,52 +41,95 @@ int piece_value_for_mvv(Piece p) {
     }
 }
 
-int score_capture(const Board& board, const Move& move) {
-    int victim = piece_value_for_mvv(board.squares[move.to]);
-    int attacker = piece_value_for_mvv(board.squares[move.from]);
+int score_capture(const Board& board, PackedMove move) {
+    int victim = piece_value_for_mvv(board.squares[move.to()]);
+    int attacker = piece_value_for_mvv(board.squares[move.from()]);
     return victim * 100 - attacker;
 }
 
 struct ScoredMove {
-    Move move;
+    PackedMove move;
     int score;
 };
 
-inline bool is_time_up() {
+inline bool is_time_up(SearchContext& ctx) {
+    if (ctx.stop_requested.load(std::memory_order_relaxed)) return true;
     auto now = std::chrono::steady_clock::now();
-    int elapsed = std::chrono::duration_cast<std::chrono::milliseconds>(now - start_time).count();
-    return elapsed >= time_limit_ms;
+    // While pondering the time limit's start moves along, so after ponderhit
+    // it counts from the last check before it
+    if (ctx.pondering.load(std::memory_order_relaxed)) {
+        ctx.limit_start = now;
+        return false;
+    }
+    if (ctx.node_limit && ctx.stats.nodes + ctx.stats.qnodes >= ctx.node_limit) return true;
+    int elapsed = std::chrono::duration_cast<std::chrono::milliseconds>(now - ctx.limit_start).count();
+    return elapsed >= ctx.time_limit_ms;
+}
+
+// Exact score from the endgame bitbases, mate distances measured from the root
+inline bool probe_bitbase_score(const Board& board, int ply, int& score) {
+    int wdl, dtm;
+    if (!bitbase_probe(board, wdl, dtm)) return false;
+    if (wdl > 0) score = INF - ply - dtm;
+    else if (wdl < 0) score = -INF + ply + dtm;
+    else score = 0;
+    return true;
 }
 
-int quiescence(Board& board, int alpha, int beta, int ply) {
+// Pick the root move straight from the bitbases when the root and every reply
+// resolve there: the fastest win, or the longest resistance when lost.
+static bool bitbase_root_move(Board& board, const MoveList& moves, PackedMove& best_move) {
+    int wdl, dtm;
+    if (!bitbase_probe(board, wdl, dtm)) return false;
+    int best_score = -INF - 1;
+    for (PackedMove m : moves) {
+        Piece cap, mov;
+        if (!board.make_move(m, cap, mov)) continue;
+        int score;
+        bool hit = probe_bitbase_score(board, 1, score);
+        board.unmake_move(m, cap, mov);
+        if (!hit) return false;
+        if (-score > best_score) {
+            best_score = -score;
+            best_move = m;
+        }
+    }
+    return best_score > -INF - 1;
+}
+
+int quiescence(SearchContext& ctx, Board& board, int alpha, int beta, int ply) {
+    ctx.stats.qnodes++;
+    int bb_score;
+    if (probe_bitbase_score(board, ply, bb_score)) return bb_score;
     // If terminal and checkmate in quiescence, return mate score
-    MoveGenerator gen_term(board);
-    auto legal_term = gen_term.generate_legal_moves();
-    if (legal_term.empty()) {
+    MoveGenerator gen(board);
+    MoveList moves_all;
+    gen.generate_legal_moves(moves_all);
+    if (moves_all.empty()) {
         if (board.is_king_in_check(board.side_to_move)) {
             return -INF + ply;
         } else {
             return 0;
         }
     }
-    int stand_pat = evaluate(board);
+    int stand_pat = evaluate(board, &ctx.eval_cache);
     if (stand_pat >= beta) return beta;
     if (alpha < stand_pat) alpha = stand_pat;
-    MoveGenerator gen(board);
-    auto moves_all = gen.generate_legal_moves();
-    std::vector<ScoredMove> captures;
-    for (auto& m : moves_all) {
-        if (board.squares[m.to] != EMPTY) {
+    ScoredMove captures[MoveList::CAPACITY];
+    int capture_count = 0;
+    for (PackedMove m : moves_all) {
+        if (board.squares[m.to()] != EMPTY) {
             int sc = score_capture(board, m) + 10000;
-            captures.push_back({m, sc});
+            captures[capture_count++] = {m, sc};
         }
     }
-    std::sort(captures.begin(), captures.end(), [](auto& a, auto& b){ return a.score > b.score; });
-    for (auto& sm : captures) {
-        if (is_time_up()) break;
+    std::sort(captures, captures + capture_count, [](auto& a, auto& b){ return a.score > b.score; });
+    for (int i = 0; i < capture_count; ++i) {
+        const ScoredMove& sm = captures[i];
+        if (is_time_up(ctx)) break;
         Piece cap, mov;
         board.make_move(sm.move, cap, mov);
-        int score = -quiescence(board, -beta, -alpha, ply+1);
+        int score = -quiescence(ctx, board, -beta, -alpha, ply+1);
         board.unmake_move(sm.move, cap, mov);
         if (score >= beta) return beta;
         if (score > alpha) alpha = score;
@@ -93,14 +137,50 @@ int quiescence(Board& board, int alpha, int beta, int ply) {
     return alpha;
 }
 
-int alpha_beta(Board& board, int depth, int alpha, int beta, int ply) {
-    if (time_up_flag || is_time_up()) {
-        time_up_flag = true;
-        return evaluate(board);
+// The PV at ply becomes move followed by the PV found one ply deeper
+inline void update_pv(SearchContext& ctx, PackedMove move, int ply) {
+    ctx.pv_table[ply][0] = move;
+    int child_length = ply + 1 < MAX_PLY ? ctx.pv_table_length[ply + 1] : 0;
+    if (child_length > MAX_PLY - 1 - ply) child_length = MAX_PLY - 1 - ply;
+    for (int i = 0; i < child_length; ++i) ctx.pv_table[ply][i + 1] = ctx.pv_table[ply + 1][i];
+    ctx.pv_table_length[ply] = child_length + 1;
+}
+
+int alpha_beta(SearchContext& ctx, Board& board, int depth, int alpha, int beta, int ply) {
+    ctx.stats.nodes++;
+    ctx.pv_table_length[ply] = 0;
+    if (ctx.time_up_flag || is_time_up(ctx)) {
+        ctx.time_up_flag = true;
+        return evaluate(board, &ctx.eval_cache);
+    }
+    // Draw by repetition inside the tree or by the 50-move rule
+    if (board.halfmove_clock >= 100 || board.is_repetition()) return 0;
+    int bb_score;
+    if (probe_bitbase_score(board, ply, bb_score)) return bb_score;
+    if (depth <= 0) return quiescence(ctx, board, alpha, beta, ply);
+    // Transposition table: a deep enough result ends the node, otherwise its
+    // move is tried first
+    PackedMove tt_move;
+    TTEntry entry;
+    if ((ctx.tt && ctx.tt->probe(board.key, entry)) ||
+        (ply <= HASHFILE_MAX_PLY && hashfile_probe(board.key, entry))) {
+        tt_move = entry.move;
+        int tt_score = score_from_tt(entry.score, ply);
+        if (entry.depth >= depth &&
+            (entry.bound == TT_EXACT ||
+             (entry.bound == TT_LOWER && tt_score >= beta) ||
+             (entry.bound == TT_UPPER && tt_score <= alpha))) {
+            if (entry.bound == TT_EXACT && !tt_move.is_null()) {
+                ctx.pv_table[ply][0] = tt_move;
+                ctx.pv_table_length[ply] = 1;
+            }
+            return tt_score;
+        }
     }
-    if (depth <= 0) return quiescence(board, alpha, beta, ply);
+    const int alpha_orig = alpha;
     MoveGenerator gen(board);
-    auto moves = gen.generate_legal_moves();
+    MoveList moves;
+    gen.generate_legal_moves(moves);
     if (moves.empty()) {
         if (board.is_king_in_check(board.side_to_move)) {
             return -INF + ply; // mate
@@ -109,87 +189,287 @@ int alpha_beta(Board& board, int depth, int alpha, int beta, int ply) {
         }
     }
     // Move ordering
-    std::vector<ScoredMove> scored_moves;
-    scored_moves.reserve(moves.size());
-    for (auto& m : moves) {
+    ScoredMove scored_moves[MoveList::CAPACITY];
+    int scored_count = 0;
+    for (PackedMove m : moves) {
         int sc = 0;
-        if (board.squares[m.to] != EMPTY) {
+        if (m == tt_move) {
+            sc = 1000000;
+        } else if (board.squares[m.to()] != EMPTY) {
             sc = score_capture(board, m) + 100000;
         } else {
-            if (killer_moves[ply][0].from == m.from && killer_moves[ply][0].to == m.to) sc = 90000;
-            else if (killer_moves[ply][1].from == m.from && killer_moves[ply][1].to == m.to) sc = 80000;
-            else sc = history_heuristic[m.from][m.to];
+            if (ctx.killer_moves[ply][0] == m) sc = 90000;
+            else if (ctx.killer_moves[ply][1] == m) sc = 80000;
+            else sc = ctx.history_heuristic[m.from()][m.to()];
         }
-        scored_moves.push_back({m, sc});
+        scored_moves[scored_count++] = {m, sc};
     }
-    std::sort(scored_moves.begin(), scored_moves.end(), [](auto& a, auto& b){ return a.score > b.score; });
+    std::sort(scored_moves, scored_moves + scored_count, [](auto& a, auto& b){ return a.score > b.score; });
     int best = -INF;
-    for (auto& sm : scored_moves) {
-        if (time_up_flag || is_time_up()) { time_up_flag = true; break; }
-        Move m = sm.move;
+    PackedMove best_move;
+    for (int i = 0; i < scored_count; ++i) {
+        if (ctx.time_up_flag || is_time_up(ctx)) { ctx.time_up_flag = true; break; }
+        PackedMove m = scored_moves[i].move;
         Piece cap, mov;
         if (!board.make_move(m, cap, mov)) continue;
-        int score = -alpha_beta(board, depth-1, -beta, -alpha, ply+1);
-        // Adjust mate distance: prefer faster mate
-        if (score > INF/2) score -= 1;
-        if (score < -INF/2) score += 1;
+        int score = -alpha_beta(ctx, board, depth-1, -beta, -alpha, ply+1);
         board.unmake_move(m, cap, mov);
         if (score > best) best = score;
         if (score > alpha) {
             alpha = score;
-            if (board.squares[m.to] == EMPTY) {
-                record_killer(m, ply);
-                record_history(m, depth);
+            best_move = m;
+            update_pv(ctx, m, ply);
+            if (board.squares[m.to()] == EMPTY) {
+                record_killer(ctx, m, ply);
+                record_history(ctx, m, depth);
             }
         }
         if (alpha >= beta) break;
     }
+    // Results of an interrupted search are incomplete and not stored
+    if (ctx.tt && !ctx.time_up_flag) {
+        TTBound bound = best <= alpha_orig ? TT_UPPER : best >= beta ? TT_LOWER : TT_EXACT;
+        ctx.tt->store(board.key, best_move, score_to_tt(best, ply), depth, bound);
+    }
     return best;
 }
 
-Move find_best_move(Board& board, int max_depth, int time_ms) {
-    start_time = std::chrono::steady_clock::now();
-    time_limit_ms = time_ms;
-    time_up_flag = false;
+// Where the PV was cut short by a table hit, continue it with the table's
+// moves for as long as they are legal, up to the searched depth
+static void extend_pv_from_tt(SearchContext& ctx, Board& board, SearchLine& line, int depth) {
+    if (!ctx.tt) return;
+    struct Played { PackedMove move; Piece cap, mov; };
+    Played played[MAX_PLY];
+    int count = 0;
+    for (int i = 0; i < line.pv_length; ++i) {
+        Played& p = played[count];
+        if (!board.make_move(line.pv[i], p.cap, p.mov)) break;
+        p.move = line.pv[i];
+        ++count;
+    }
+    TTEntry entry;
+    while (count == line.pv_length && line.pv_length < depth && ctx.tt->probe(board.key, entry) &&
+           !entry.move.is_null()) {
+        MoveGenerator gen(board);
+        MoveList moves;
+        gen.generate_legal_moves(moves);
+        if (std::find(moves.begin(), moves.end(), entry.move) == moves.end()) break;
+        Played& p = played[count];
+        if (!board.make_move(entry.move, p.cap, p.mov)) break;
+        p.move = entry.move;
+        line.pv[line.pv_length++] = entry.move;
+        ++count;
+    }
+    while (count > 0) {
+        Played& p = played[--count];
+        board.unmake_move(p.move, p.cap, p.mov);
+    }
+}
+
+// Copy the hash file's line from the current position into the table, so
+// the search and extend_pv_from_tt pick it up
+static void seed_tt_from_hashfile(SearchContext& ctx, Board& board, int depth) {
+    if (!ctx.tt) return;
+    struct Played { PackedMove move; Piece cap, mov; };
+    Played played[MAX_PLY];
+    int count = 0;
+    TTEntry entry;
+    while (count < depth && count < MAX_PLY && hashfile_probe(board.key, entry) && !entry.move.is_null()) {
+        ctx.tt->store(board.key, entry.move, entry.score, entry.depth, entry.bound);
+        MoveGenerator gen(board);
+        MoveList moves;
+        gen.generate_legal_moves(moves);
+        if (std::find(moves.begin(), moves.end(), entry.move) == moves.end()) break;
+        Played& p = played[count];
+        if (!board.make_move(entry.move, p.cap, p.mov)) break;
+        p.move = entry.move;
+        ++count;
+    }
+    while (count > 0) {
+        Played& p = played[--count];
+        board.unmake_move(p.move, p.cap, p.mov);
+    }
+}
+
+// Write the root result and the table's entries along the best line to the
+// hash file
+static void write_hashfile(SearchContext& ctx, Board& board) {
+    if (!hashfile_writable() || !ctx.line_count || ctx.stats.depth < HASHFILE_MIN_DEPTH) return;
+    const SearchLine& line = ctx.lines[0];
+    hashfile_store(board.key, line.pv[0], line.score, ctx.stats.depth, TT_EXACT);
+    if (!ctx.tt) return;
+    struct Played { PackedMove move; Piece cap, mov; };
+    Played played[MAX_PLY];
+    int count = 0;
+    TTEntry entry;
+    for (int i = 0; i < line.pv_length; ++i) {
+        Played& p = played[count];
+        if (!board.make_move(line.pv[i], p.cap, p.mov)) break;
+        p.move = line.pv[i];
+        ++count;
+        if (!ctx.tt->probe(board.key, entry) || entry.depth < HASHFILE_MIN_DEPTH) break;
+        hashfile_store(board.key, entry.move, entry.score, entry.depth, entry.bound);
+    }
+    while (count > 0) {
+        Played& p = played[--count];
+        board.unmake_move(p.move, p.cap, p.mov);
+    }
+}
+
+static void report_iteration(SearchContext& ctx, int line_index) {
+    if (!ctx.on_iteration) return;
+    const SearchLine& line = ctx.lines[line_index];
+    SearchIteration info;
+    info.depth = ctx.stats.depth;
+    info.multipv = line_index + 1;
+    info.score = line.score;
+    info.best_move = line.pv[0].to_move();
+    info.nodes = ctx.stats.nodes + ctx.stats.qnodes;
+    info.time_ms = std::chrono::duration_cast<std::chrono::milliseconds>(
+        std::chrono::steady_clock::now() - ctx.start_time).count();
+    info.pv_length = line.pv_length;
+    std::copy(line.pv, line.pv + line.pv_length, info.pv);
+    ctx.on_iteration(info);
+}
+
+// One pass over the root moves not in `skip`. Each move is searched with
+// the best score so far as the window's lower bound, so only the best one
+// gets an exact score; that one goes into `line`. Returns false when the
+// search ran out of time before the pass completed.
+static bool search_root_pass(SearchContext& ctx, Board& board, const MoveList& moves,
+                             const PackedMove* skip, int skip_count, int depth, SearchLine& line) {
+    int alpha = -INF;
+    line.score = -INF;
+    line.pv_length = 0;
+    for (PackedMove m : moves) {
+        if (std::find(skip, skip + skip_count, m) != skip + skip_count) continue;
+        if (ctx.time_up_flag || is_time_up(ctx)) { ctx.time_up_flag = true; break; }
+        Piece cap, mov;
+        if (!board.make_move(m, cap, mov)) continue;
+        int score = -alpha_beta(ctx, board, depth-1, -INF, -alpha, 1);
+        board.unmake_move(m, cap, mov);
+        if (score > line.score) {
+            line.score = score;
+            line.pv[0] = m;
+            line.pv_length = 1 + std::min(ctx.pv_table_length[1], MAX_PLY - 1);
+            std::copy(ctx.pv_table[1], ctx.pv_table[1] + line.pv_length - 1, line.pv + 1);
+        }
+        if (score > alpha) alpha = score;
+    }
+    return !ctx.time_up_flag && line.pv_length > 0;
+}
+
+static Move search_root(SearchContext& ctx, Board& board, int max_depth) {
     for (int i = 0; i < MAX_PLY; ++i) {
-        killer_moves[i][0] = Move(-1,-1);
-        killer_moves[i][1] = Move(-1,-1);
+        ctx.killer_moves[i][0] = PackedMove();
+        ctx.killer_moves[i][1] = PackedMove();
     }
-    memset(history_heuristic, 0, sizeof(history_heuristic));
+    memset(ctx.history_heuristic, 0, sizeof(ctx.history_heuristic));
+    ctx.line_count = 0;
     MoveGenerator root_gen(board);
-    auto root_moves = root_gen.generate_legal_moves();
-    if (root_moves.empty()) return Move();
-    Move best_move = root_moves[0];
-    int best_score = -INF;
-    for (int depth = 1; depth <= max_depth; ++depth) {
-        if (is_time_up()) break;
-        MoveGenerator gen(board);
-        auto moves = gen.generate_legal_moves();
-        if (moves.empty()) break;
-        int alpha = -INF, beta = INF;
-        int current_best_score = -INF;
-        Move current_best_move = best_move;
-        for (auto& m : moves) {
-            if (time_up_flag || is_time_up()) { time_up_flag = true; break; }
-            Piece cap, mov;
-            if (!board.make_move(m, cap, mov)) continue;
-            int score = -alpha_beta(board, depth-1, -INF, INF, 1);
-            // Adjust mate distance
-            if (score > INF/2) score -= 1;
-            if (score < -INF/2) score += 1;
-            board.unmake_move(m, cap, mov);
-            if (score > current_best_score) {
-                current_best_score = score;
-                current_best_move = m;
-            }
-            if (score > alpha) alpha = score;
+    MoveList root_moves;
+    root_gen.generate_legal_moves(root_moves);
+    if (root_moves.empty()) {
+        ctx.stats.score = board.is_king_in_check(board.side_to_move) ? -INF : 0;
+        return Move();
+    }
+    PackedMove best_move = root_moves[0];
+    if (bitbase_root_move(board, root_moves, best_move)) {
+        probe_bitbase_score(board, 0, ctx.stats.score);
+        ctx.lines[0].score = ctx.stats.score;
+        ctx.lines[0].pv[0] = best_move;
+        ctx.lines[0].pv_length = 1;
+        ctx.line_count = 1;
+        report_iteration(ctx, 0);
+        return best_move.to_move();
+    }
+    int line_target = std::max(1, std::min({ctx.multipv, MAX_MULTIPV, root_moves.size()}));
+    // A result from the hash file stands for the iterations up to its depth:
+    // the search answers with it or continues from the next depth
+    int start_depth = 1;
+    TTEntry cached;
+    if (hashfile_probe(board.key, cached) && !cached.move.is_null() &&
+        std::find(root_moves.begin(), root_moves.end(), cached.move) != root_moves.end()) {
+        seed_tt_from_hashfile(ctx, board, cached.depth);
+        if (cached.bound == TT_EXACT && line_target == 1 && cached.depth > 0) {
+            best_move = cached.move;
+            ctx.lines[0].score = cached.score;
+            ctx.lines[0].pv[0] = cached.move;
+            ctx.lines[0].pv_length = 1;
+            ctx.line_count = 1;
+            ctx.stats.score = cached.score;
+            ctx.stats.depth = cached.depth;
+            extend_pv_from_tt(ctx, board, ctx.lines[0], cached.depth);
+            report_iteration(ctx, 0);
+            start_depth = cached.depth + 1;
         }
-        if (!time_up_flag) {
-            best_score = current_best_score;
-            best_move = current_best_move;
+    }
+    SearchLine lines[MAX_MULTIPV];
+    for (int depth = start_depth; depth <= max_depth; ++depth) {
+        if (is_time_up(ctx)) break;
+        // The previous iteration's lines first, in their order: with the
+        // best score known early, the other root moves are refuted cheaply
+        MoveList moves;
+        for (int i = 0; i < ctx.line_count; ++i) moves.push_back(ctx.lines[i].pv[0]);
+        for (PackedMove m : root_moves)
+            if (std::find(moves.begin(), moves.end(), m) == moves.end()) moves.push_back(m);
+
+        PackedMove found[MAX_MULTIPV];
+        int found_count = 0;
+        while (found_count < line_target &&
+               search_root_pass(ctx, board, moves, found, found_count, depth, lines[found_count])) {
+            found[found_count] = lines[found_count].pv[0];
+            ++found_count;
+        }
+        if (ctx.time_up_flag) break;
+
+        std::copy(lines, lines + found_count, ctx.lines);
+        ctx.line_count = found_count;
+        best_move = ctx.lines[0].pv[0];
+        ctx.stats.score = ctx.lines[0].score;
+        ctx.stats.depth = depth;
+        for (int i = 0; i < found_count; ++i) {
+            extend_pv_from_tt(ctx, board, ctx.lines[i], depth);
+            report_iteration(ctx, i);
         }
     }
-    return best_move;
+    return best_move.to_move();
+}
+
+static void finish_stats(SearchContext& ctx) {
+    ctx.stats.eval_cache_probes = ctx.eval_cache.probes;
+    ctx.stats.eval_cache_hits = ctx.eval_cache.hits;
+    ctx.stats.time_ms = std::chrono::duration_cast<std::chrono::milliseconds>(
+        std::chrono::steady_clock::now() - ctx.start_time).count();
+}
+
+Move find_best_move(SearchContext& ctx, Board& board, int max_depth, int time_ms) {
+    ctx.start_time = std::chrono::steady_clock::now();
+    ctx.limit_start = ctx.start_time;
+    ctx.time_limit_ms = time_ms;
+    ctx.time_up_flag = false;
+    ctx.stats = SearchStats();
+    ctx.eval_cache = EvalCacheStats();
+    Move best = search_root(ctx, board, max_depth);
+    finish_stats(ctx);
+    write_hashfile(ctx, board);
+    return best;
+}
+
+Move find_best_move(Board& board, int max_depth, int time_ms) {
+    return find_best_move(default_context, board, max_depth, time_ms);
+}
+
+void stop_search() {
+    default_context.stop();
+}
+
+void clear_search_stop() {
+    default_context.stop_requested = false;
+}
+
+const SearchStats& last_search_stats() {
+    return default_context.stats;
 }
 
 Move find_best_move(Board& board, int max_depth) {
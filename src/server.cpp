@@ -0,0 +1,401 @@
+// server.cpp
+#include "server.h"
+#include "board.h"
+#include "notation.h"
+#include "search.h"
+#include "tt.h"
+#include "uci.h"
+#include <algorithm>
+#include <chrono>
+#include <climits>
+#include <condition_variable>
+#include <deque>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <thread>
+#include <vector>
+
+#ifdef _WIN32
+#include <winsock2.h>
+#include <ws2tcpip.h>
+#pragma comment(lib, "ws2_32")
+typedef SOCKET socket_t;
+static void close_socket(socket_t s) { closesocket(s); }
+#else
+#include <arpa/inet.h>
+#include <netinet/in.h>
+#include <signal.h>
+#include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/un.h>
+#include <unistd.h>
+typedef int socket_t;
+static const socket_t INVALID_SOCKET = -1;
+static void close_socket(socket_t s) { close(s); }
+#endif
+
+#ifndef MSG_NOSIGNAL
+#define MSG_NOSIGNAL 0
+#endif
+
+static const char* START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1";
+static const size_t LATENCY_WINDOW = 1024;  // latest searches the percentiles cover
+static const size_t MAX_LINE = 64 * 1024;   // longer command lines drop the connection
+
+typedef std::chrono::steady_clock Clock;
+
+static int ms_since(Clock::time_point start) {
+    return int(std::chrono::duration_cast<std::chrono::milliseconds>(Clock::now() - start).count());
+}
+
+static int percentile(std::vector<int> values, double p) {
+    if (values.empty()) return 0;
+    size_t k = std::min(values.size() - 1, size_t(p * values.size()));
+    std::nth_element(values.begin(), values.begin() + k, values.end());
+    return values[k];
+}
+
+// One client connection. Its searches run on the workers, which write to
+// it too, so it is shared between the session thread and them.
+struct Session {
+    socket_t socket;
+    int id;
+    Board board;
+    int multipv = 1;
+
+    std::mutex write_mutex;
+    bool closed = false;        // the client is gone; drop further output
+
+    // Search state, guarded by `mutex`: a session has at most one search,
+    // waiting in the queue or running on a worker
+    std::mutex mutex;
+    std::condition_variable idle;
+    bool searching = false;
+    bool stop_pending = false;  // stopped before a worker picked it up
+    SearchContext* running = nullptr;
+
+    Session(socket_t s, int session_id) : socket(s), id(session_id) { board.load_fen(START_FEN); }
+
+    void send(const std::string& line) {
+        std::lock_guard<std::mutex> lock(write_mutex);
+        if (closed) return;
+        std::string data = line + "\n";
+        size_t sent = 0;
+        while (sent < data.size()) {
+            int n = ::send(socket, data.data() + sent, int(data.size() - sent), MSG_NOSIGNAL);
+            if (n <= 0) {
+                closed = true;
+                return;
+            }
+            sent += n;
+        }
+    }
+};
+
+struct Job {
+    std::shared_ptr<Session> session;
+    Board board;
+    GoLimits limits;
+    int multipv;
+    Clock::time_point received;
+};
+
+class Server {
+public:
+    explicit Server(const ServerOptions& options) : options_(options), tt_(options.hash_mb) {}
+
+    void start_workers() {
+        for (int i = 0; i < std::max(1, options_.workers); ++i) std::thread(&Server::worker, this).detach();
+    }
+
+    void serve(socket_t client) {
+        std::shared_ptr<Session> session;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            session = std::make_shared<Session>(client, ++connections_);
+            sessions_++;
+        }
+        std::cerr << "Session " << session->id << " connected\n";
+
+        std::string buffer;
+        char chunk[4096];
+        bool quit = false;
+        while (!quit) {
+            int n = recv(client, chunk, sizeof(chunk), 0);
+            if (n <= 0) break;
+            buffer.append(chunk, n);
+            size_t end;
+            while (!quit && (end = buffer.find('\n')) != std::string::npos) {
+                std::string line = buffer.substr(0, end);
+                buffer.erase(0, end + 1);
+                if (!line.empty() && line.back() == '\r') line.pop_back();
+                quit = !handle(session, line);
+            }
+            if (buffer.size() > MAX_LINE) break;
+        }
+
+        stop_search(*session);
+        {
+            std::lock_guard<std::mutex> lock(session->write_mutex);
+            session->closed = true;
+            close_socket(client);
+        }
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            sessions_--;
+        }
+        std::cerr << "Session " << session->id << " closed\n";
+    }
+
+private:
+    ServerOptions options_;
+    TranspositionTable tt_;
+
+    std::mutex mutex_;
+    std::condition_variable job_ready_;
+    std::deque<Job> queue_;
+    // Metrics, guarded by mutex_
+    int connections_ = 0;
+    int sessions_ = 0;
+    int active_ = 0;
+    size_t peak_queue_ = 0;
+    uint64_t searches_ = 0;
+    uint64_t nodes_ = 0;
+    uint64_t search_ms_ = 0;
+    std::deque<int> waits_;     // ms in the queue
+    std::deque<int> latencies_; // ms from "go" to "bestmove"
+    Clock::time_point started_ = Clock::now();
+
+    // Returns false when the session ends
+    bool handle(const std::shared_ptr<Session>& session, const std::string& line) {
+        std::istringstream args(line);
+        std::string command;
+        args >> command;
+        if (command == "uci") {
+            session->send("id name Tadfish");
+            session->send("id author Shiven Lohia");
+            session->send("option name MultiPV type spin default 1 min 1 max " + std::to_string(MAX_MULTIPV));
+            session->send("uciok");
+        } else if (command == "isready") {
+            session->send("readyok");
+        } else if (command == "setoption") {
+            // Only MultiPV is per session; the table, weights and network
+            // are the server's and set on its command line
+            std::string token, name, value;
+            while (args >> token) {
+                if (token == "name") args >> name;
+                else if (token == "value") args >> value;
+            }
+            if (name == "MultiPV") {
+                stop_search(*session);
+                try {
+                    session->multipv = std::max(1, std::min(std::stoi(value), MAX_MULTIPV));
+                } catch (...) {
+                    session->send("info string invalid MultiPV value " + value);
+                }
+            }
+        } else if (command == "ucinewgame") {
+            // The shared table is kept: it holds the other sessions' work
+            stop_search(*session);
+        } else if (command == "position") {
+            stop_search(*session);
+            std::string illegal;
+            if (!parse_position(args, session->board, illegal))
+                session->send("info string illegal move " + illegal);
+        } else if (command == "go") {
+            stop_search(*session);
+            go(session, args);
+        } else if (command == "stop") {
+            stop_search(*session);
+        } else if (command == "metrics") {
+            session->send(metrics());
+        } else if (command == "quit") {
+            return false;
+        }
+        return true;
+    }
+
+    void go(const std::shared_ptr<Session>& session, std::istringstream& args) {
+        Job job;
+        job.session = session;
+        job.board = session->board;
+        job.limits = parse_go(args, session->board.side_to_move);
+        job.multipv = session->multipv;
+        job.received = Clock::now();
+        {
+            std::lock_guard<std::mutex> lock(session->mutex);
+            session->searching = true;
+            session->stop_pending = false;
+        }
+        std::lock_guard<std::mutex> lock(mutex_);
+        queue_.push_back(std::move(job));
+        peak_queue_ = std::max(peak_queue_, queue_.size());
+        job_ready_.notify_one();
+    }
+
+    // Stop the session's search, queued or running, and wait for its bestmove
+    void stop_search(Session& session) {
+        std::unique_lock<std::mutex> lock(session.mutex);
+        if (!session.searching) return;
+        if (session.running) session.running->stop();
+        else session.stop_pending = true;
+        session.idle.wait(lock, [&] { return !session.searching; });
+    }
+
+    void worker() {
+        std::unique_ptr<SearchContext> ctx(new SearchContext());
+        ctx->tt = &tt_;
+        for (;;) {
+            Job job;
+            {
+                std::unique_lock<std::mutex> lock(mutex_);
+                job_ready_.wait(lock, [&] { return !queue_.empty(); });
+                job = std::move(queue_.front());
+                queue_.pop_front();
+                active_++;
+            }
+            Session& session = *job.session;
+            int waited = ms_since(job.received);
+
+            // A search stopped while it waited returns a legal move at once
+            {
+                std::lock_guard<std::mutex> lock(session.mutex);
+                ctx->stop_requested = session.stop_pending;
+                session.running = ctx.get();
+            }
+            // The client's own time limit counts from "go", the server's
+            // cap from the start of the search; there is no pondering, so
+            // "go ponder" and "go infinite" end at the caps too
+            int time_ms = INT_MAX;
+            if (job.limits.time_ms > 0) time_ms = std::max(1, job.limits.time_ms - waited);
+            if (options_.max_movetime_ms > 0) time_ms = std::min(time_ms, options_.max_movetime_ms);
+            uint64_t nodes = job.limits.nodes;
+            if (options_.max_nodes && (!nodes || nodes > options_.max_nodes)) nodes = options_.max_nodes;
+            ctx->node_limit = nodes;
+            ctx->pondering = false;
+            ctx->multipv = job.multipv;
+            ctx->on_iteration = [&](const SearchIteration& it) {
+                session.send(iteration_to_uci(it, ctx->multipv > 1, tt_.hashfull()));
+            };
+
+            Move best = find_best_move(*ctx, job.board, job.limits.depth, time_ms);
+            ctx->on_iteration = nullptr;
+            {
+                std::lock_guard<std::mutex> lock(session.mutex);
+                session.running = nullptr;
+            }
+            // Counted before bestmove, so a "metrics" sent after it includes
+            // this search
+            {
+                std::lock_guard<std::mutex> lock(mutex_);
+                active_--;
+                searches_++;
+                nodes_ += ctx->stats.nodes + ctx->stats.qnodes;
+                search_ms_ += ctx->stats.time_ms;
+                waits_.push_back(waited);
+                latencies_.push_back(ms_since(job.received));
+                if (waits_.size() > LATENCY_WINDOW) waits_.pop_front();
+                if (latencies_.size() > LATENCY_WINDOW) latencies_.pop_front();
+            }
+            session.send(bestmove_to_uci(*ctx, best));
+            {
+                std::lock_guard<std::mutex> lock(session.mutex);
+                session.searching = false;
+            }
+            session.idle.notify_all();
+        }
+    }
+
+    std::string metrics() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        std::vector<int> waits(waits_.begin(), waits_.end());
+        std::vector<int> latencies(latencies_.begin(), latencies_.end());
+        std::ostringstream out;
+        out << "metrics uptime " << ms_since(started_) / 1000 << " sessions " << sessions_ << " connections "
+            << connections_ << " workers " << std::max(1, options_.workers) << " active " << active_
+            << " queue " << queue_.size() << " peak_queue " << peak_queue_ << " searches " << searches_
+            << " nodes " << nodes_ << " nps " << nodes_ * 1000 / std::max<uint64_t>(1, search_ms_)
+            << " hashfull " << tt_.hashfull();
+        for (double p : {0.5, 0.95, 0.99}) out << " wait_p" << int(p * 100) << " " << percentile(waits, p);
+        for (double p : {0.5, 0.95, 0.99}) out << " latency_p" << int(p * 100) << " " << percentile(latencies, p);
+        return out.str();
+    }
+};
+
+static socket_t listen_socket(const ServerOptions& options, std::string& address) {
+    socket_t s = INVALID_SOCKET;
+    if (!options.socket_path.empty()) {
+#ifdef _WIN32
+        std::cerr << "Unix sockets are not supported on Windows, use --port\n";
+        return INVALID_SOCKET;
+#else
+        sockaddr_un addr = {};
+        addr.sun_family = AF_UNIX;
+        if (options.socket_path.size() >= sizeof(addr.sun_path)) {
+            std::cerr << "Socket path too long: " << options.socket_path << "\n";
+            return INVALID_SOCKET;
+        }
+        options.socket_path.copy(addr.sun_path, options.socket_path.size());
+        // A socket left behind by a server that was killed
+        struct stat st;
+        if (stat(options.socket_path.c_str(), &st) == 0 && S_ISSOCK(st.st_mode)) unlink(options.socket_path.c_str());
+        s = socket(AF_UNIX, SOCK_STREAM, 0);
+        if (s == INVALID_SOCKET || bind(s, (sockaddr*)&addr, sizeof(addr)) != 0) {
+            std::cerr << "Cannot listen on " << options.socket_path << "\n";
+            if (s != INVALID_SOCKET) close_socket(s);
+            return INVALID_SOCKET;
+        }
+        address = options.socket_path;
+#endif
+    } else {
+        // Local clients only: the server has no authentication
+        sockaddr_in addr = {};
+        addr.sin_family = AF_INET;
+        addr.sin_addr.s_addr = htonl(INADDR_LOOPBACK);
+        addr.sin_port = htons(uint16_t(options.port));
+        s = socket(AF_INET, SOCK_STREAM, 0);
+        int reuse = 1;
+        if (s != INVALID_SOCKET) setsockopt(s, SOL_SOCKET, SO_REUSEADDR, (const char*)&reuse, sizeof(reuse));
+        if (s == INVALID_SOCKET || bind(s, (sockaddr*)&addr, sizeof(addr)) != 0) {
+            std::cerr << "Cannot listen on 127.0.0.1:" << options.port << "\n";
+            if (s != INVALID_SOCKET) close_socket(s);
+            return INVALID_SOCKET;
+        }
+        address = "127.0.0.1:" + std::to_string(options.port);
+    }
+    if (listen(s, SOMAXCONN) != 0) {
+        std::cerr << "Cannot listen on " << address << "\n";
+        close_socket(s);
+        return INVALID_SOCKET;
+    }
+    return s;
+}
+
+int run_server(const ServerOptions& options) {
+#ifdef _WIN32
+    WSADATA wsa;
+    if (WSAStartup(MAKEWORD(2, 2), &wsa) != 0) {
+        std::cerr << "Cannot start Winsock\n";
+        return 1;
+    }
+#else
+    // A client that disconnects mid-search must not kill the server
+    signal(SIGPIPE, SIG_IGN);
+#endif
+    std::string address;
+    socket_t listener = listen_socket(options, address);
+    if (listener == INVALID_SOCKET) return 1;
+
+    // Sessions and workers live as long as the process
+    Server* server = new Server(options);
+    server->start_workers();
+    std::cerr << "Serving UCI on " << address << " with " << std::max(1, options.workers) << " workers, "
+              << options.hash_mb << " MB hash\n";
+    for (;;) {
+        socket_t client = accept(listener, nullptr, nullptr);
+        if (client == INVALID_SOCKET) continue;
+        std::thread(&Server::serve, server, client).detach();
+    }
+}
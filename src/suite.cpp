@@ -0,0 +1,436 @@
+// suite.cpp
+#include "suite.h"
+#include "board.h"
+#include "epd.h"
+#include "mate.h"
+#include "notation.h"
+#include "search.h"
+#include <algorithm>
+#include <atomic>
+#include <climits>
+#include <cstdio>
+#include <fstream>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <sstream>
+#include <thread>
+#include <vector>
+
+struct SuiteResult {
+    std::string id;
+    std::string fen;
+    std::string expected;      // "bm ..." or "am ..." as given in the suite
+    std::string error;         // set when the position could not be run
+    std::string move;          // final best move, SAN
+    bool solved = false;
+    int depth = 0;
+    uint64_t nodes = 0;
+    int time_ms = 0;
+    // First iteration whose best move was correct, -1 if none was
+    int found_depth = -1;
+    uint64_t found_nodes = 0;
+    int found_time_ms = 0;
+};
+
+// Parse a space-separated SAN move list
+static bool parse_move_list(Board& board, const std::string& text, std::vector<Move>& moves) {
+    std::istringstream iss(text);
+    std::string san;
+    while (iss >> san) {
+        Move m;
+        if (!move_from_san(board, san, m)) return false;
+        moves.push_back(m);
+    }
+    return !moves.empty();
+}
+
+static bool contains(const std::vector<Move>& moves, const Move& m) {
+    for (const Move& x : moves) {
+        if (x.from == m.from && x.to == m.to && x.promotion == m.promotion) return true;
+    }
+    return false;
+}
+
+static void run_position(SearchContext& ctx, const SuiteOptions& options,
+                         const std::string& line, size_t index, SuiteResult& result) {
+    result.id = "#" + std::to_string(index + 1);
+    EpdRecord record;
+    if (!parse_epd_line(line, record)) {
+        result.error = "invalid EPD";
+        return;
+    }
+    result.fen = record.fen;
+    if (const std::string* id = record.find("id")) result.id = *id;
+
+    Board board;
+    board.load_fen(record.fen);
+    if (board.piece_count[WK] != 1 || board.piece_count[BK] != 1) {
+        result.error = "invalid position";
+        return;
+    }
+    std::vector<Move> best_moves, avoid_moves;
+    const std::string* bm = record.find("bm");
+    const std::string* am = record.find("am");
+    if (!bm && !am) {
+        result.error = "no bm or am";
+        return;
+    }
+    if ((bm && !parse_move_list(board, *bm, best_moves)) || (am && !parse_move_list(board, *am, avoid_moves))) {
+        result.error = "illegal bm/am move";
+        return;
+    }
+    result.expected = bm ? "bm " + *bm : "";
+    if (am) result.expected += (bm ? "; am " : "am ") + *am;
+
+    auto is_correct = [&](const Move& m) {
+        if (m.from < 0) return false;
+        if (!best_moves.empty() && !contains(best_moves, m)) return false;
+        return !contains(avoid_moves, m);
+    };
+    ctx.node_limit = options.nodes;
+    ctx.on_iteration = [&](const SearchIteration& it) {
+        if (result.found_depth < 0 && is_correct(it.best_move)) {
+            result.found_depth = it.depth;
+            result.found_nodes = it.nodes;
+            result.found_time_ms = it.time_ms;
+        }
+    };
+    int depth = options.depth > 0 ? options.depth : MAX_PLY - 1;
+    int time_ms = options.movetime_ms > 0 ? options.movetime_ms : INT_MAX;
+    Move best = find_best_move(ctx, board, depth, time_ms);
+    ctx.on_iteration = nullptr;
+
+    result.move = best.from >= 0 ? move_to_san(board, best) : "--";
+    result.solved = is_correct(best);
+    if (result.solved && result.found_depth < 0) {
+        // Cut off before the first iteration finished
+        result.found_depth = 0;
+        result.found_nodes = ctx.stats.nodes + ctx.stats.qnodes;
+        result.found_time_ms = ctx.stats.time_ms;
+    }
+    result.depth = ctx.stats.depth;
+    result.nodes = ctx.stats.nodes + ctx.stats.qnodes;
+    result.time_ms = ctx.stats.time_ms;
+}
+
+static std::string to_json(const SuiteResult& r, size_t index) {
+    std::ostringstream out;
+    out << "{\"index\":" << index << ",\"id\":\"" << json_escape(r.id) << "\"";
+    if (!r.error.empty()) {
+        out << ",\"error\":\"" << r.error << "\"}";
+        return out.str();
+    }
+    out << ",\"fen\":\"" << r.fen << "\",\"expected\":\"" << json_escape(r.expected)
+        << "\",\"move\":\"" << r.move << "\",\"solved\":" << (r.solved ? "true" : "false")
+        << ",\"depth\":" << r.depth << ",\"nodes\":" << r.nodes << ",\"time_ms\":" << r.time_ms
+        << ",\"found_depth\":" << r.found_depth << ",\"found_nodes\":" << r.found_nodes
+        << ",\"found_time_ms\":" << r.found_time_ms << "}";
+    return out.str();
+}
+
+// Raw value of a top-level field in one of our own JSONL lines
+static std::string json_field(const std::string& line, const std::string& key) {
+    std::string tag = "\"" + key + "\":";
+    size_t pos = line.find(tag);
+    if (pos == std::string::npos) return "";
+    pos += tag.size();
+    if (pos < line.size() && line[pos] == '"') {
+        std::string value;
+        for (size_t i = pos + 1; i < line.size() && line[i] != '"'; ++i) {
+            if (line[i] == '\\' && i + 1 < line.size()) ++i;
+            value += line[i];
+        }
+        return value;
+    }
+    size_t end = line.find_first_of(",}", pos);
+    return line.substr(pos, end - pos);
+}
+
+struct BaselineEntry {
+    bool solved;
+    int found_time_ms;
+    uint64_t found_nodes;
+};
+
+static void print_baseline_diff(const std::vector<SuiteResult>& results, const std::string& path) {
+    std::ifstream in(path);
+    if (!in) {
+        std::cerr << "Cannot open baseline " << path << "\n";
+        return;
+    }
+    std::map<std::string, BaselineEntry> baseline;
+    std::string line;
+    while (std::getline(in, line)) {
+        if (line.empty() || !json_field(line, "error").empty()) continue;
+        BaselineEntry e;
+        e.solved = json_field(line, "solved") == "true";
+        e.found_time_ms = std::atoi(json_field(line, "found_time_ms").c_str());
+        e.found_nodes = std::strtoull(json_field(line, "found_nodes").c_str(), nullptr, 10);
+        baseline[json_field(line, "id")] = e;
+    }
+
+    int compared = 0, base_solved = 0, gained = 0, lost = 0, both = 0;
+    double time_ratio_sum = 0;
+    std::ostringstream changes;
+    for (const SuiteResult& r : results) {
+        if (!r.error.empty()) continue;
+        auto it = baseline.find(r.id);
+        if (it == baseline.end()) continue;
+        const BaselineEntry& b = it->second;
+        compared++;
+        if (b.solved) base_solved++;
+        if (r.solved && !b.solved) {
+            gained++;
+            changes << "  + " << r.id << " now solved (" << r.move << ")\n";
+        } else if (!r.solved && b.solved) {
+            lost++;
+            changes << "  - " << r.id << " no longer solved (" << r.move << ", wanted " << r.expected << ")\n";
+        } else if (r.solved && b.solved) {
+            both++;
+            time_ratio_sum += double(r.found_time_ms + 1) / (b.found_time_ms + 1);
+        }
+    }
+    int solved = 0;
+    for (const SuiteResult& r : results) solved += r.solved;
+    std::cout << "\nBaseline " << path << ": " << compared << " positions in common\n";
+    std::cout << changes.str();
+    std::cout << "Solved " << base_solved << " -> " << solved << " (+" << gained << " -" << lost << ")";
+    if (both) {
+        char buf[64];
+        std::snprintf(buf, sizeof(buf), "%.2f", time_ratio_sum / both);
+        std::cout << ", time-to-solution on positions solved by both: x" << buf << " of baseline";
+    }
+    std::cout << "\n";
+}
+
+// The EPD lines of a suite file, without blank and comment lines
+static bool read_suite_lines(const std::string& path, std::vector<std::string>& lines) {
+    std::ifstream in(path);
+    if (!in) {
+        std::cerr << "Cannot open " << path << "\n";
+        return false;
+    }
+    std::string line;
+    while (std::getline(in, line)) {
+        if (!line.empty() && line.back() == '\r') line.pop_back();
+        size_t first = line.find_first_not_of(" \t");
+        if (first == std::string::npos || line[first] == '#') continue;
+        lines.push_back(line);
+    }
+    return true;
+}
+
+// Call run(*state, i) for every line index on `threads` threads, each
+// with its own state from make_state()
+template<typename MakeState, typename Run>
+static void run_parallel(size_t count, int threads, MakeState make_state, Run run) {
+    std::atomic<size_t> next(0);
+    auto worker = [&]() {
+        auto state = make_state();
+        for (size_t i = next++; i < count; i = next++) run(*state, i);
+    };
+    threads = std::max(1, std::min<int>(threads, (int)count));
+    std::vector<std::thread> pool;
+    for (int i = 1; i < threads; ++i) pool.emplace_back(worker);
+    worker();
+    for (auto& t : pool) t.join();
+}
+
+int run_suite(const SuiteOptions& options) {
+    std::vector<std::string> lines;
+    if (!read_suite_lines(options.input, lines)) return 1;
+
+    std::vector<SuiteResult> results(lines.size());
+    auto make_context = [] { return std::unique_ptr<SearchContext>(new SearchContext()); };
+    run_parallel(lines.size(), options.threads, make_context, [&](SearchContext& ctx, size_t i) {
+        run_position(ctx, options, lines[i], i, results[i]);
+    });
+
+    std::ofstream out;
+    if (!options.output.empty()) {
+        out.open(options.output);
+        if (!out) std::cerr << "Cannot write " << options.output << "\n";
+    }
+
+    int total = 0, solved = 0;
+    double found_time_sum = 0, found_nodes_sum = 0;
+    for (size_t i = 0; i < results.size(); ++i) {
+        const SuiteResult& r = results[i];
+        if (out) out << to_json(r, i) << "\n";
+        if (!r.error.empty()) {
+            std::cout << r.id << ": skipped, " << r.error << "\n";
+            continue;
+        }
+        total++;
+        std::cout << r.id << ": " << (r.solved ? "solved " : "FAILED ") << r.move << " (" << r.expected << ")";
+        if (r.solved) {
+            solved++;
+            found_time_sum += r.found_time_ms;
+            found_nodes_sum += r.found_nodes;
+            std::cout << " found at depth " << r.found_depth << ", " << r.found_time_ms << " ms, "
+                      << r.found_nodes << " nodes";
+        }
+        std::cout << "\n";
+    }
+
+    char buf[160];
+    std::snprintf(buf, sizeof(buf), "\nSolved %d/%d (%.1f%%)", solved, total, total ? 100.0 * solved / total : 0.0);
+    std::cout << buf;
+    if (solved) {
+        std::snprintf(buf, sizeof(buf), ", mean time-to-solution %.0f ms, mean nodes-to-solution %.0f",
+                      found_time_sum / solved, found_nodes_sum / solved);
+        std::cout << buf;
+    }
+    std::cout << "\n";
+
+    if (!options.baseline.empty()) print_baseline_diff(results, options.baseline);
+    return 0;
+}
+
+struct MateSuiteResult {
+    std::string id;
+    std::string fen;
+    std::string error;         // set when the position could not be run
+    int dm = 0;                // expected mate distance, 0 if not given
+    int bound = 0;             // mate bound searched
+    bool found = false;
+    bool solved = false;
+    bool checks_only = false;
+    int moves = 0;             // proven mate distance
+    std::string pv;            // SAN
+    uint64_t nodes = 0;
+    int time_ms = 0;
+};
+
+static void run_mate_position(MateSolver& solver, const MateSuiteOptions& options,
+                              const std::string& line, size_t index, MateSuiteResult& result) {
+    result.id = "#" + std::to_string(index + 1);
+    EpdRecord record;
+    if (!parse_epd_line(line, record)) {
+        result.error = "invalid EPD";
+        return;
+    }
+    result.fen = record.fen;
+    if (const std::string* id = record.find("id")) result.id = *id;
+
+    Board board;
+    board.load_fen(record.fen);
+    if (board.piece_count[WK] != 1 || board.piece_count[BK] != 1) {
+        result.error = "invalid position";
+        return;
+    }
+    if (const std::string* dm = record.find("dm")) result.dm = std::atoi(dm->c_str());
+    result.bound = options.max_moves > 0 ? options.max_moves : result.dm;
+    if (result.bound <= 0) {
+        result.error = "no dm";
+        return;
+    }
+
+    MateLimits limits;
+    limits.max_moves = result.bound;
+    limits.nodes = options.nodes;
+    limits.time_ms = options.movetime_ms;
+    MateResult mate = solver.solve(board, limits);
+    result.found = mate.found;
+    result.solved = mate.found && (result.dm <= 0 || mate.moves <= result.dm);
+    result.checks_only = mate.checks_only;
+    result.moves = mate.moves;
+    result.nodes = mate.nodes;
+    result.time_ms = mate.time_ms;
+    for (const Move& m : mate.pv) {
+        Piece captured, moved;
+        result.pv += (result.pv.empty() ? "" : " ") + move_to_san(board, m);
+        board.make_move(m, captured, moved);
+    }
+}
+
+static std::string to_json(const MateSuiteResult& r, size_t index) {
+    std::ostringstream out;
+    out << "{\"index\":" << index << ",\"id\":\"" << json_escape(r.id) << "\"";
+    if (!r.error.empty()) {
+        out << ",\"error\":\"" << r.error << "\"}";
+        return out.str();
+    }
+    out << ",\"fen\":\"" << r.fen << "\",\"dm\":" << r.dm << ",\"bound\":" << r.bound
+        << ",\"solved\":" << (r.solved ? "true" : "false") << ",\"mate\":" << r.moves
+        << ",\"checks_only\":" << (r.checks_only ? "true" : "false") << ",\"pv\":\"" << r.pv
+        << "\",\"nodes\":" << r.nodes << ",\"time_ms\":" << r.time_ms << "}";
+    return out.str();
+}
+
+struct MateSuiteTotals {
+    int total = 0;
+    int solved = 0;
+    double time_sum = 0;
+    double nodes_sum = 0;
+};
+
+static std::string totals_text(const MateSuiteTotals& t) {
+    char buf[160];
+    std::snprintf(buf, sizeof(buf), "%d/%d (%.1f%%)", t.solved, t.total, t.total ? 100.0 * t.solved / t.total : 0.0);
+    std::string text = buf;
+    if (t.solved) {
+        std::snprintf(buf, sizeof(buf), ", mean %.0f ms, %.0f nodes", t.time_sum / t.solved, t.nodes_sum / t.solved);
+        text += buf;
+    }
+    return text;
+}
+
+int run_mate_suite(const MateSuiteOptions& options) {
+    std::vector<std::string> lines;
+    if (!read_suite_lines(options.input, lines)) return 1;
+
+    // One solver per thread, each with its own table
+    std::vector<MateSuiteResult> results(lines.size());
+    auto make_solver = [&] { return std::unique_ptr<MateSolver>(new MateSolver(options.hash_mb)); };
+    run_parallel(lines.size(), options.threads, make_solver, [&](MateSolver& solver, size_t i) {
+        run_mate_position(solver, options, lines[i], i, results[i]);
+    });
+
+    std::ofstream out;
+    if (!options.output.empty()) {
+        out.open(options.output);
+        if (!out) std::cerr << "Cannot write " << options.output << "\n";
+    }
+
+    MateSuiteTotals all;
+    std::map<int, MateSuiteTotals> by_distance;
+    int shorter = 0, checks_only = 0;
+    for (size_t i = 0; i < results.size(); ++i) {
+        const MateSuiteResult& r = results[i];
+        if (out) out << to_json(r, i) << "\n";
+        if (!r.error.empty()) {
+            std::cout << r.id << ": skipped, " << r.error << "\n";
+            continue;
+        }
+        MateSuiteTotals& group = by_distance[r.dm];
+        all.total++;
+        group.total++;
+        std::cout << r.id << ": ";
+        if (r.found) std::cout << (r.solved ? "solved " : "FAILED ") << "mate in " << r.moves << " " << r.pv;
+        else std::cout << "FAILED no mate in " << r.bound;
+        if (r.dm > 0) std::cout << " (dm " << r.dm << ")";
+        std::cout << ", " << r.time_ms << " ms, " << r.nodes << " nodes\n";
+        if (!r.solved) continue;
+        for (MateSuiteTotals* t : {&all, &group}) {
+            t->solved++;
+            t->time_sum += r.time_ms;
+            t->nodes_sum += r.nodes;
+        }
+        if (r.dm > 0 && r.moves < r.dm) shorter++;
+        if (r.checks_only) checks_only++;
+    }
+
+    std::cout << "\nSolved " << totals_text(all) << "\n";
+    for (const auto& entry : by_distance) {
+        std::cout << "  " << (entry.first > 0 ? "dm " + std::to_string(entry.first) : std::string("no dm"))
+                  << ": " << totals_text(entry.second) << "\n";
+    }
+    if (all.solved) {
+        std::cout << checks_only << " solved with checks only";
+        if (shorter) std::cout << ", " << shorter << " with a shorter mate than dm";
+        std::cout << "\n";
+    }
+    return 0;
+}
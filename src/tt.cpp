@@ -0,0 +1,81 @@
+// tt.cpp
+#include "tt.h"
+#include "search.h"
+
+// data layout: bits 0-15 move, 16-47 score, 48-55 depth, 56-57 bound
+static uint64_t pack(PackedMove move, int score, int depth, TTBound bound) {
+    return uint64_t(move.data) | (uint64_t(uint32_t(score)) << 16) |
+           (uint64_t(uint8_t(depth)) << 48) | (uint64_t(bound) << 56);
+}
+
+void TranspositionTable::resize(size_t mb) {
+    slots_.reset();
+    mask_ = 0;
+    mb_ = mb;
+    if (mb == 0) return;
+
+    // Round down to a power of two so the index is a mask
+    size_t entries = 1;
+    while (entries * 2 * sizeof(Slot) <= mb * 1024 * 1024) entries *= 2;
+    slots_.reset(new Slot[entries]);
+    mask_ = entries - 1;
+}
+
+void TranspositionTable::clear() {
+    if (!slots_) return;
+    for (size_t i = 0; i <= mask_; ++i) {
+        slots_[i].check.store(0, std::memory_order_relaxed);
+        slots_[i].data.store(0, std::memory_order_relaxed);
+    }
+}
+
+bool TranspositionTable::probe(uint64_t key, TTEntry& entry) const {
+    if (!slots_) return false;
+    const Slot& slot = slots_[key & mask_];
+    uint64_t data = slot.data.load(std::memory_order_relaxed);
+    uint64_t check = slot.check.load(std::memory_order_relaxed);
+    if (data == 0 || (check ^ data) != key) return false;
+    entry.move.data = uint16_t(data & 0xFFFF);
+    entry.score = int32_t(uint32_t(data >> 16));
+    entry.depth = int8_t(uint8_t(data >> 48));
+    entry.bound = TTBound((data >> 56) & 0x3);
+    return true;
+}
+
+void TranspositionTable::store(uint64_t key, PackedMove move, int score, int depth, TTBound bound) {
+    if (!slots_) return;
+    Slot& slot = slots_[key & mask_];
+    uint64_t old_data = slot.data.load(std::memory_order_relaxed);
+    uint64_t old_check = slot.check.load(std::memory_order_relaxed);
+    // Deeper results for the same position survive shallower ones; anything
+    // else is replaced
+    if (old_data && (old_check ^ old_data) == key) {
+        int old_depth = int8_t(uint8_t(old_data >> 48));
+        if (depth < old_depth && bound != TT_EXACT) return;
+        if (move.is_null()) move.data = uint16_t(old_data & 0xFFFF);
+    }
+    uint64_t data = pack(move, score, depth, bound);
+    slot.data.store(data, std::memory_order_relaxed);
+    slot.check.store(key ^ data, std::memory_order_relaxed);
+}
+
+int TranspositionTable::hashfull() const {
+    if (!slots_) return 0;
+    size_t sample = mask_ + 1 < 1000 ? mask_ + 1 : 1000;
+    size_t used = 0;
+    for (size_t i = 0; i < sample; ++i)
+        if (slots_[i].data.load(std::memory_order_relaxed)) ++used;
+    return int(used * 1000 / sample);
+}
+
+int score_to_tt(int score, int ply) {
+    if (score > INF / 2) return score + ply;
+    if (score < -INF / 2) return score - ply;
+    return score;
+}
+
+int score_from_tt(int score, int ply) {
+    if (score > INF / 2) return score - ply;
+    if (score < -INF / 2) return score + ply;
+    return score;
+}
@@ -0,0 +1,328 @@
+// uci.cpp
+#include "uci.h"
+#include "board.h"
+#include "eval.h"
+#include "hashfile.h"
+#include "mate.h"
+#include "nnue.h"
+#include "notation.h"
+#include "search.h"
+#include "tt.h"
+#include <algorithm>
+#include <climits>
+#include <condition_variable>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <thread>
+
+static const char* START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1";
+static const int DEFAULT_EVAL_CACHE_MB = 8;
+static const int DEFAULT_HASH_MB = 16;
+static const int MATE_HASH_MB = 64;
+static const int NEW_HASH_FILE_MB = 256;
+
+// Lines from the search thread and the command loop must not interleave
+static std::mutex output_mutex;
+
+static void send(const std::string& line) {
+    std::lock_guard<std::mutex> lock(output_mutex);
+    std::cout << line << "\n" << std::flush;
+}
+
+std::string score_to_uci(int score) {
+    if (is_mate_score(score)) return "mate " + std::to_string(mate_in_moves(score));
+    return "cp " + std::to_string(score);
+}
+
+std::string iteration_to_uci(const SearchIteration& it, bool multipv, int hashfull) {
+    uint64_t nps = it.nodes * 1000 / std::max(1, it.time_ms);
+    std::string pv;
+    for (int i = 0; i < it.pv_length; ++i) pv += (i ? " " : "") + move_to_uci(it.pv[i].to_move());
+    if (pv.empty()) pv = move_to_uci(it.best_move);
+    return "info depth " + std::to_string(it.depth) + (multipv ? " multipv " + std::to_string(it.multipv) : "") +
+           " score " + score_to_uci(it.score) + " nodes " + std::to_string(it.nodes) + " nps " +
+           std::to_string(nps) + " time " + std::to_string(it.time_ms) + " hashfull " +
+           std::to_string(hashfull) + " pv " + pv;
+}
+
+std::string bestmove_to_uci(const SearchContext& ctx, const Move& best) {
+    std::string line = "bestmove " + move_to_uci(best);
+    const SearchLine& pv = ctx.lines[0];
+    if (ctx.line_count && pv.pv_length >= 2 && pv.pv[0] == PackedMove(best))
+        line += " ponder " + move_to_uci(pv.pv[1].to_move());
+    return line;
+}
+
+GoLimits parse_go(std::istringstream& args, Color us) {
+    GoLimits limits;
+    int movetime = 0, movestogo = 0;
+    int time_left[2] = {-1, -1}, increment[2] = {0, 0};
+    std::string token;
+    while (args >> token) {
+        if (token == "ponder") limits.ponder = true;
+        else if (token == "infinite") limits.infinite = true;
+        else if (token == "depth") args >> limits.depth;
+        else if (token == "nodes") args >> limits.nodes;
+        else if (token == "movetime") args >> movetime;
+        else if (token == "wtime") args >> time_left[WHITE];
+        else if (token == "btime") args >> time_left[BLACK];
+        else if (token == "winc") args >> increment[WHITE];
+        else if (token == "binc") args >> increment[BLACK];
+        else if (token == "movestogo") args >> movestogo;
+        else if (token == "mate") args >> limits.mate;
+    }
+    limits.depth = std::max(1, std::min(limits.depth, MAX_PLY - 1));
+
+    if (movetime > 0) {
+        limits.time_ms = movetime;
+    } else if (time_left[us] >= 0) {
+        // Spend an even share of the clock plus most of the increment,
+        // keeping a little in reserve for communication overhead
+        int moves = movestogo > 0 ? movestogo : 30;
+        limits.time_ms = time_left[us] / moves + increment[us] * 3 / 4;
+        limits.time_ms = std::max(10, std::min(limits.time_ms, time_left[us] - 50));
+    }
+    return limits;
+}
+
+bool parse_position(std::istringstream& args, Board& board, std::string& illegal) {
+    std::string token;
+    args >> token;
+    if (token == "startpos") {
+        board.load_fen(START_FEN);
+        args >> token;  // "moves", if any
+    } else if (token == "fen") {
+        std::string fen, part;
+        while (args >> part && part != "moves") fen += (fen.empty() ? "" : " ") + part;
+        board.load_fen(fen);
+    } else {
+        return true;
+    }
+    std::string uci;
+    while (args >> uci) {
+        Move move;
+        Piece captured, moved;
+        if (!move_from_uci(board, uci, move) || !board.make_move(move, captured, moved)) {
+            illegal = uci;
+            return false;
+        }
+        // Long games would otherwise fill the undo stack
+        board.trim_history();
+    }
+    return true;
+}
+
+struct UciEngine {
+    Board board;
+    TranspositionTable tt{DEFAULT_HASH_MB};
+    std::unique_ptr<SearchContext> ctx{new SearchContext()};
+    std::unique_ptr<MateSolver> mate_solver;  // created by the first "go mate"
+    std::thread search_thread;
+    // A ponder or infinite search that finishes early (a forced mate, the
+    // maximum depth) holds its bestmove until "ponderhit" or "stop", as the
+    // protocol requires
+    std::mutex ponder_mutex;
+    std::condition_variable ponder_done;
+    bool infinite = false;
+
+    UciEngine() { ctx->tt = &tt; }
+
+    void stop_search() {
+        if (!search_thread.joinable()) return;
+        {
+            std::lock_guard<std::mutex> lock(ponder_mutex);
+            ctx->stop();
+        }
+        ponder_done.notify_all();
+        search_thread.join();
+    }
+
+    // The opponent played the expected move: keep searching, now on our clock
+    void ponderhit() {
+        {
+            std::lock_guard<std::mutex> lock(ponder_mutex);
+            ctx->pondering = false;
+        }
+        ponder_done.notify_all();
+    }
+
+    void set_position(std::istringstream& args) {
+        std::string illegal;
+        if (!parse_position(args, board, illegal)) send("info string illegal move " + illegal);
+    }
+
+    void go(std::istringstream& args) {
+        GoLimits limits = parse_go(args, board.side_to_move);
+        int depth = limits.depth, mate = limits.mate;
+        int time_ms = limits.time_ms > 0 ? limits.time_ms : INT_MAX;
+        uint64_t nodes = limits.nodes;
+
+        // The position after "go ponder" already contains the expected
+        // move; the time limit only starts to count at "ponderhit"
+        ctx->node_limit = nodes;
+        ctx->stop_requested = false;
+        ctx->pondering = limits.ponder;
+        infinite = limits.infinite;
+        search_thread = std::thread([this, depth, time_ms, nodes, mate]() {
+            Board position = board;
+            Move best = mate > 0 ? solve_mate(position, mate, depth, time_ms, nodes)
+                                 : find_best_move(*ctx, position, depth, time_ms);
+            {
+                std::unique_lock<std::mutex> lock(ponder_mutex);
+                ponder_done.wait(lock, [this] {
+                    return (!ctx->pondering && !infinite) || ctx->stop_requested;
+                });
+            }
+            send(bestmove_to_uci(*ctx, best));
+        });
+    }
+
+    // "go mate N": prove a mate with the mate solver. Without one, the
+    // move comes from a normal search of at most 2N plies in the time left.
+    Move solve_mate(Board& position, int moves, int depth, int time_ms, uint64_t nodes) {
+        if (!mate_solver) mate_solver.reset(new MateSolver(MATE_HASH_MB));
+        MateLimits limits;
+        limits.max_moves = moves;
+        limits.nodes = nodes;
+        limits.time_ms = time_ms == INT_MAX ? 0 : time_ms;
+        limits.stop = &ctx->stop_requested;
+        limits.on_bound = [](int n, uint64_t searched, int ms) {
+            send("info depth " + std::to_string(2 * n - 1) + " nodes " + std::to_string(searched) + " time " +
+                 std::to_string(ms) + " string no mate in " + std::to_string(n));
+        };
+        MateResult result = mate_solver->solve(position, limits);
+        if (result.found && !result.pv.empty()) {
+            std::string pv;
+            for (const Move& m : result.pv) pv += (pv.empty() ? "" : " ") + move_to_uci(m);
+            uint64_t nps = result.nodes * 1000 / std::max(1, result.time_ms);
+            send("info depth " + std::to_string(2 * result.moves - 1) + " score mate " +
+                 std::to_string(result.moves) + " nodes " + std::to_string(result.nodes) + " nps " +
+                 std::to_string(nps) + " time " + std::to_string(result.time_ms) + " pv " + pv);
+            return result.pv[0];
+        }
+        send(result.aborted ? "info string mate search stopped" : "info string no mate in " + std::to_string(moves));
+        // After a "stop" this returns at once with a legal move
+        int time_left = time_ms == INT_MAX ? INT_MAX : std::max(1, time_ms - result.time_ms);
+        return find_best_move(*ctx, position, std::min(depth, 2 * moves), time_left);
+    }
+};
+
+int run_uci() {
+    std::unique_ptr<UciEngine> engine(new UciEngine());
+    engine->board.load_fen(START_FEN);
+    engine->ctx->on_iteration = [&engine](const SearchIteration& it) {
+        send(iteration_to_uci(it, engine->ctx->multipv > 1, engine->tt.hashfull()));
+    };
+
+    std::string line;
+    while (std::getline(std::cin, line)) {
+        std::istringstream args(line);
+        std::string command;
+        args >> command;
+        if (command == "uci") {
+            send("id name Tadfish");
+            send("id author Shiven Lohia");
+            send("option name EvalCache type spin default " + std::to_string(DEFAULT_EVAL_CACHE_MB) +
+                 " min 0 max 1024");
+            send("option name Hash type spin default " + std::to_string(DEFAULT_HASH_MB) + " min 0 max 4096");
+            send("option name Ponder type check default false");
+            send("option name MultiPV type spin default 1 min 1 max " + std::to_string(MAX_MULTIPV));
+            send("option name EvalWeights type string default <empty>");
+            send("option name EvalFile type string default <empty>");
+            send("option name UseNNUE type check default false");
+            send("option name HashFile type string default <empty>");
+            send("uciok");
+        } else if (command == "isready") {
+            send("readyok");
+        } else if (command == "setoption") {
+            // The name runs up to "value" and the value to the end of the
+            // line, so both may contain spaces (file paths)
+            std::string token, name, value;
+            while (args >> token && token != "value") {
+                if (token != "name") name += (name.empty() ? "" : " ") + token;
+            }
+            std::getline(args >> std::ws, value);
+            value.erase(value.find_last_not_of(" \t\r") + 1);
+            // Scores searched with the previous evaluation must not be reused
+            auto evaluation_changed = [&engine]() {
+                engine->tt.clear();
+                if (hashfile_enabled())
+                    send("info string the hash file keeps results of the previous evaluation");
+            };
+            if (name == "EvalCache") {
+                engine->stop_search();
+                try {
+                    set_eval_cache_size(std::stoul(value));
+                } catch (...) {
+                    send("info string invalid EvalCache value " + value);
+                }
+            } else if (name == "MultiPV") {
+                engine->stop_search();
+                try {
+                    engine->ctx->multipv = std::max(1, std::min(std::stoi(value), MAX_MULTIPV));
+                } catch (...) {
+                    send("info string invalid MultiPV value " + value);
+                }
+            } else if (name == "EvalWeights") {
+                engine->stop_search();
+                std::string error;
+                if (value.empty() || value == "<empty>") reset_eval_weights();
+                else if (!load_eval_weights(value, error)) send("info string " + error);
+                evaluation_changed();
+            } else if (name == "EvalFile") {
+                engine->stop_search();
+                std::string error;
+                if (value.empty() || value == "<empty>") {
+                } else if (!nnue_load(value, error)) {
+                    send("info string " + error);
+                } else {
+                    clear_eval_cache();
+                    if (eval_mode() == EVAL_NNUE) evaluation_changed();
+                    send("info string NNUE network " + value + " loaded (" + nnue_simd() + ")");
+                }
+            } else if (name == "UseNNUE") {
+                engine->stop_search();
+                EvalMode mode = value == "true" ? EVAL_NNUE : EVAL_CLASSIC;
+                if (mode != eval_mode()) {
+                    if (set_eval_mode(mode)) evaluation_changed();
+                    else send("info string UseNNUE needs a network, set EvalFile first");
+                }
+            } else if (name == "HashFile") {
+                engine->stop_search();
+                std::string error;
+                if (value.empty() || value == "<empty>") hashfile_close();
+                else if (!hashfile_open(value, NEW_HASH_FILE_MB, error)) send("info string " + error);
+                else if (!hashfile_writable()) send("info string hash file " + value + " is read-only");
+            } else if (name == "Hash") {
+                engine->stop_search();
+                try {
+                    engine->tt.resize(std::stoul(value));
+                } catch (...) {
+                    send("info string invalid Hash value " + value);
+                }
+            }
+        } else if (command == "ucinewgame") {
+            engine->stop_search();
+            clear_eval_cache();
+            engine->tt.clear();
+            if (engine->mate_solver) engine->mate_solver->clear();
+        } else if (command == "position") {
+            engine->stop_search();
+            engine->set_position(args);
+        } else if (command == "go") {
+            engine->stop_search();
+            engine->go(args);
+        } else if (command == "ponderhit") {
+            engine->ponderhit();
+        } else if (command == "stop") {
+            engine->stop_search();
+        } else if (command == "quit") {
+            break;
+        }
+    }
+    engine->stop_search();
+    return 0;
+}
@@ -0,0 +1,8 @@
+"""Shared code of the Tadfish GUIs.
+
+The engine client is exported here. The board view (PIL) and sounds
+(pygame) live in tadfish_gui.board_view and tadfish_gui.sounds, so scripts
+that only talk to engines do not need those libraries.
+"""
+from .engine import (EngineClient, EngineError, EnginePool, LatencyStats, TkSearch,
+                     describe_info, parse_info)
@@ -0,0 +1,194 @@
+"""Live engine analysis for the GUIs: an evaluation bar and the best line.
+
+LiveAnalysis keeps one engine process analysing the shown position with
+"go infinite". Every board change stops that search and starts a new one on
+the same process, so the engine's tables stay warm and a restart costs two
+commands. Restarts are rate-limited to one per ANALYSIS_RESTART_MS, and the
+bar and line are redrawn at most once per ANALYSIS_REDRAW_MS however fast
+the engine reports.
+"""
+import time
+import tkinter as tk
+import chess
+from .engine import EngineClient, EngineError, TkSearch
+
+ANALYSIS_RESTART_MS = 150 # Minimum time between two analysis restarts
+ANALYSIS_REDRAW_MS = 100 # Minimum time between two redraws of the bar and line
+EVAL_BAR_SCALE = 400 # Centipawns at which White owns about 90% of the bar
+PV_SHOWN = 8 # Moves of the best line shown
+
+
+def white_share(info, white_to_move):
+    """Fraction of the evaluation bar (0 to 1) that is White's for an info dict, or None without a score."""
+    sign = 1 if white_to_move else -1
+    if "score_mate" in info:
+        mate = sign * info["score_mate"]
+        return 1.0 if mate > 0 else 0.0
+    if "score_cp" in info:
+        cp = max(-10000, min(10000, sign * info["score_cp"]))
+        return 1 / (1 + 10 ** (-cp / EVAL_BAR_SCALE))
+    return None
+
+
+def score_text(info, white_to_move):
+    """The score from White's point of view, as "+0.35" or "M3"/"-M2"."""
+    sign = 1 if white_to_move else -1
+    if "score_mate" in info:
+        mate = sign * info["score_mate"]
+        return f"M{mate}" if mate > 0 else f"-M{-mate}"
+    if "score_cp" in info:
+        return f"{sign * info['score_cp'] / 100:+.2f}"
+    return ""
+
+
+def pv_san(board, pv, limit=PV_SHOWN):
+    """The first moves of a UCI principal variation in SAN, stopping at the first illegal one."""
+    board = board.copy(stack=False)
+    parts = []
+    for uci in pv[:limit]:
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            break
+        if move not in board.legal_moves:
+            break
+        if board.turn == chess.WHITE:
+            parts.append(f"{board.fullmove_number}.")
+        elif not parts:
+            parts.append(f"{board.fullmove_number}...")
+        parts.append(board.san(move))
+        board.push(move)
+    return " ".join(parts)
+
+
+class EvalBar(tk.Canvas):
+    """Vertical evaluation bar, White's share at the bottom, with the score printed on it."""
+    def __init__(self, parent, height, width=28, **kwargs):
+        super().__init__(parent, width=width, height=height, bd=0, highlightthickness=0, bg="#404040", **kwargs)
+        self.bar_height = height
+        self.bar_width = width
+        self.white_item = self.create_rectangle(0, height / 2, width, height, fill="#F0F0F0", outline="")
+        self.create_line(0, height / 2, width, height / 2, fill="#808080")
+        self.text_item = self.create_text(width / 2, height - 10, text="", font=("Helvetica", 8, "bold"))
+        self.shown = None
+
+    def set_value(self, share, text):
+        """Shows White's share (0 to 1) and the score text; unchanged values cost nothing."""
+        if (share, text) == self.shown:
+            return
+        self.shown = (share, text)
+        top = self.bar_height * (1 - share)
+        self.coords(self.white_item, 0, top, self.bar_width, self.bar_height)
+        # The score sits on the side that is ahead
+        if share >= 0.5:
+            self.coords(self.text_item, self.bar_width / 2, self.bar_height - 10)
+            self.itemconfigure(self.text_item, text=text, fill="#303030")
+        else:
+            self.coords(self.text_item, self.bar_width / 2, 10)
+            self.itemconfigure(self.text_item, text=text, fill="#F0F0F0")
+
+
+class LiveAnalysis:
+    """
+    Analyses whatever position analyse() was last given and shows the
+    result on an EvalBar and in a StringVar (depth and best line). The
+    engine is started with the first position and kept until close().
+    """
+    def __init__(self, root, command, bar, line_var, name="Tadfish"):
+        self.root = root
+        self.command = command
+        self.name = name
+        self.bar = bar
+        self.line_var = line_var
+        self.engine = None
+        self.search = None
+        self.board = None # Position being analysed
+        self._pending = None # Position waiting for the next restart
+        self._restart_id = None
+        self._last_restart = 0.0
+        self._latest = None # Newest info dict not drawn yet
+        self._redraw_id = None
+        self._last_redraw = 0.0
+
+    def analyse(self, board):
+        """Start analysing board (a chess.Board) instead of the previous position."""
+        self._pending = board.copy()
+        if self._restart_id is None:
+            # Right away once Tk is idle (after the current redraw), unless a
+            # restart happened just now
+            wait_ms = int(ANALYSIS_RESTART_MS - (time.perf_counter() - self._last_restart) * 1000)
+            if wait_ms > 0:
+                self._restart_id = self.root.after(wait_ms, self._restart)
+            else:
+                self._restart_id = self.root.after_idle(self._restart)
+
+    def _restart(self):
+        self._restart_id = None
+        board, self._pending = self._pending, None
+        if board is None:
+            return
+        self._last_restart = time.perf_counter()
+        self._cancel_search()
+        self.board = board
+        self._latest = None
+
+        outcome = board.outcome()
+        if outcome is not None:
+            share = 0.5 if outcome.winner is None else float(outcome.winner == chess.WHITE)
+            self.bar.set_value(share, outcome.result())
+            self.line_var.set("Game over")
+            return
+
+        root_board = board.root()
+        fen = None if root_board.fen() == chess.STARTING_FEN else root_board.fen()
+        try:
+            if self.engine is None:
+                self.engine = EngineClient(self.command, self.name, timeout=None)
+            self.search = TkSearch(self.root, self.engine, [m.uci() for m in board.move_stack], fen=fen,
+                                   on_done=lambda move: None, on_error=self._on_error, on_info=self._on_info)
+        except (EngineError, OSError) as e:
+            self._on_error(e)
+            return
+        self.line_var.set("Analysing...")
+
+    def _on_info(self, info):
+        if "pv" not in info or white_share(info, self.board.turn == chess.WHITE) is None:
+            return
+        self._latest = info
+        if self._redraw_id is None:
+            wait_ms = ANALYSIS_REDRAW_MS - (time.perf_counter() - self._last_redraw) * 1000
+            self._redraw_id = self.root.after(max(0, int(wait_ms)), self._redraw)
+
+    def _redraw(self):
+        self._redraw_id = None
+        info, self._latest = self._latest, None
+        if info is None or self.search is None:
+            return
+        self._last_redraw = time.perf_counter()
+        white_to_move = self.board.turn == chess.WHITE
+        self.bar.set_value(white_share(info, white_to_move), score_text(info, white_to_move))
+        self.line_var.set(f"depth {info.get('depth', '?')}  {score_text(info, white_to_move)}  "
+                          f"{pv_san(self.board, info['pv'])}")
+
+    def _on_error(self, error):
+        self.search = None
+        self.line_var.set(f"Analysis unavailable: {error}")
+
+    def _cancel_search(self):
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+        if self._redraw_id is not None:
+            self.root.after_cancel(self._redraw_id)
+            self._redraw_id = None
+
+    def close(self):
+        """Stop analysing and shut the engine down."""
+        if self._restart_id is not None:
+            self.root.after_cancel(self._restart_id)
+            self._restart_id = None
+        self._cancel_search()
+        if self.engine is not None:
+            print(self.engine.metrics_summary())
+            self.engine.quit()
+            self.engine = None
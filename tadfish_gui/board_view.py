@@ -0,0 +1,291 @@
+"""Chess board drawing shared by the GUIs."""
+import atexit
+import json
+import os
+import time
+import tkinter as tk
+import chess
+from . import startup
+from .engine import LatencyStats
+
+LIGHT_SQUARE_COLOR = "#F0D9B5"
+DARK_SQUARE_COLOR = "#B58863"
+HIGHLIGHT_COLOR = "#5C4033"
+CHECKMATE_HIGHLIGHT_COLOR = "#FF0000"
+
+FRAME_STATS_ENV = "TADFISH_FRAME_STATS" # Set to 1 to measure and print redraw times
+SPRITE_CACHE_DIR = ".sprite_cache" # Pre-scaled piece atlases, one per square size
+
+PIECE_FILES = {
+    'P': 'white-pawn.png', 'N': 'white-knight.png', 'B': 'white-bishop.png',
+    'R': 'white-rook.png', 'Q': 'white-queen.png', 'K': 'white-king.png',
+    'p': 'black-pawn.png', 'n': 'black-knight.png', 'b': 'black-bishop.png',
+    'r': 'black-rook.png', 'q': 'black-queen.png', 'k': 'black-king.png',
+}
+
+# Drawn when a piece image is missing
+UNICODE_PIECES = {'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
+                  'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'}
+
+
+def _sources_key(base_dir, square_size):
+    """Identifies the source PNGs (by modification time and size) and the sprite size."""
+    sources = {}
+    for filename in PIECE_FILES.values():
+        try:
+            st = os.stat(os.path.join(base_dir, "images", filename))
+            sources[filename] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            sources[filename] = None
+    return {"version": 1, "square_size": square_size, "sources": sources}
+
+
+def _load_atlas(atlas_path, key_path, key, square_size):
+    """Cuts the sprites out of a cached atlas with Tk alone. Returns None if the cache is missing or stale."""
+    try:
+        with open(key_path, encoding="utf-8") as f:
+            if json.load(f) != key:
+                return None
+        atlas = tk.PhotoImage(file=atlas_path)
+    except (OSError, ValueError, tk.TclError):
+        return None
+    if atlas.width() != square_size * len(PIECE_FILES) or atlas.height() != square_size:
+        return None
+    images = {}
+    for i, symbol in enumerate(PIECE_FILES):
+        sprite = tk.PhotoImage(width=square_size, height=square_size)
+        sprite.tk.call(sprite, "copy", atlas, "-from", i * square_size, 0, (i + 1) * square_size, square_size)
+        images[symbol] = sprite
+    return images
+
+
+def _build_atlas(base_dir, square_size, atlas_path, key_path, key):
+    """Scales the source PNGs with PIL and, if all of them loaded, saves them as one atlas strip."""
+    from PIL import Image, ImageTk
+
+    # Determine best resampling filter
+    try:
+        resample = Image.Resampling.LANCZOS
+    except AttributeError:
+        try:
+            resample = Image.LANCZOS
+        except AttributeError:
+            resample = Image.BICUBIC
+
+    images = {}
+    scaled = {}
+    missing = []
+    for symbol, filename in PIECE_FILES.items():
+        path = os.path.join(base_dir, "images", filename)
+        if os.path.exists(path):
+            try:
+                scaled[symbol] = Image.open(path).convert("RGBA").resize((square_size, square_size), resample)
+                images[symbol] = ImageTk.PhotoImage(scaled[symbol])
+            except Exception as e:
+                missing.append(f"{filename} (error: {e})")
+        else:
+            missing.append(f"{filename} (not found at {path})")
+    if missing:
+        return images, missing
+
+    atlas = Image.new("RGBA", (square_size * len(PIECE_FILES), square_size))
+    for i, symbol in enumerate(PIECE_FILES):
+        atlas.paste(scaled[symbol], (i * square_size, 0))
+    try:
+        os.makedirs(os.path.dirname(atlas_path), exist_ok=True)
+        atlas.save(atlas_path + ".tmp", format="PNG")
+        os.replace(atlas_path + ".tmp", atlas_path)
+        with open(key_path, "w", encoding="utf-8") as f:
+            json.dump(key, f)
+    except OSError as e:
+        print(f"Could not write sprite cache {atlas_path}: {e}")
+    return images, missing
+
+
+def load_piece_images(base_dir, square_size):
+    """
+    Loads the piece images from base_dir/images, scaled to square_size.
+    Returns (images by symbol, list of failures).
+
+    The scaled sprites are cached as one PNG atlas per square size in
+    base_dir/SPRITE_CACHE_DIR, which Tk can load without PIL. The atlas is
+    rebuilt when a source image changes.
+    """
+    atlas_path = os.path.join(base_dir, SPRITE_CACHE_DIR, f"pieces-{square_size}.png")
+    key_path = os.path.join(base_dir, SPRITE_CACHE_DIR, f"pieces-{square_size}.json")
+    key = _sources_key(base_dir, square_size)
+
+    images = _load_atlas(atlas_path, key_path, key, square_size)
+    if images is not None:
+        startup.mark("piece sprites loaded from cache")
+        return images, []
+    images, missing = _build_atlas(base_dir, square_size, atlas_path, key_path, key)
+    startup.mark("piece sprites scaled from images/")
+    return images, missing
+
+
+class BoardView:
+    """
+    Draws a chess.Board on a Tk canvas, White at the bottom.
+
+    Every canvas item (squares, one piece slot per square, selection,
+    destination dots, mate highlight and the dragged piece) is created once.
+    draw() compares the new position with what is on screen and only
+    reconfigures the squares that changed, and move_drag() moves nothing
+    but the dragged piece.
+
+    Redraw times are kept in frame_times. With TADFISH_FRAME_STATS=1 in the
+    environment each frame also includes Tk's repaint (update_idletasks)
+    and the statistics are printed when the program exits.
+    """
+    def __init__(self, canvas, square_size, piece_images):
+        self.canvas = canvas
+        self.square_size = square_size
+        self.piece_images = piece_images
+        self.frame_times = LatencyStats()
+        self.measure_paint = bool(os.environ.get(FRAME_STATS_ENV))
+        if self.measure_paint:
+            atexit.register(lambda: print(f"Board frames: {self.frame_times}"))
+        self._create_items()
+
+    def square_origin(self, square):
+        """Top-left canvas corner of a square."""
+        return chess.square_file(square) * self.square_size, (7 - chess.square_rank(square)) * self.square_size
+
+    def square_center(self, square):
+        x, y = self.square_origin(square)
+        return x + self.square_size / 2, y + self.square_size / 2
+
+    def square_at(self, x, y):
+        """Square under a canvas point, clamped to the board."""
+        x = min(max(int(x), 0), self.square_size * 8 - 1)
+        y = min(max(int(y), 0), self.square_size * 8 - 1)
+        return chess.square(x // self.square_size, 7 - y // self.square_size)
+
+    def _create_items(self):
+        """Creates all canvas items, hidden where nothing is shown yet. Creation order is the stacking order."""
+        canvas = self.canvas
+        size = self.square_size
+        font = ("Arial", int(size * 0.6))
+        rad = size * 0.1
+        canvas.delete("all")
+
+        for square in chess.SQUARES:
+            x1, y1 = self.square_origin(square)
+            color = LIGHT_SQUARE_COLOR if (chess.square_rank(square) + chess.square_file(square)) % 2 == 0 \
+                else DARK_SQUARE_COLOR
+            canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color, outline="", tags=("square",))
+
+        self.selection_item = canvas.create_rectangle(0, 0, size, size, outline=HIGHLIGHT_COLOR, width=3,
+                                                      state="hidden", tags=("selection",))
+        self.dot_items = []
+        for square in chess.SQUARES:
+            cx, cy = self.square_center(square)
+            self.dot_items.append(canvas.create_oval(cx - rad, cy - rad, cx + rad, cy + rad, fill=HIGHLIGHT_COLOR,
+                                                     outline="", state="hidden", tags=("dot",)))
+
+        # Each square has an image item and a Unicode fallback item; at most one is visible
+        self.piece_items = []
+        for square in chess.SQUARES:
+            cx, cy = self.square_center(square)
+            self.piece_items.append((canvas.create_image(cx, cy, state="hidden", tags=("piece",)),
+                                     canvas.create_text(cx, cy, font=font, state="hidden", tags=("piece",))))
+
+        self.mate_item = canvas.create_rectangle(0, 0, size, size, outline=CHECKMATE_HIGHLIGHT_COLOR, width=4,
+                                                 state="hidden", tags=("mate",))
+        self.drag_items = (canvas.create_image(0, 0, state="hidden", tags=("drag",)),
+                           canvas.create_text(0, 0, font=font, state="hidden", tags=("drag",)))
+
+        # What is currently on screen
+        self.shown_pieces = [None] * 64
+        self.shown_dots = set()
+        self.shown_selected = None
+        self.shown_mate = None
+        self.shown_drag = None
+
+    def _show_symbol(self, items, symbol):
+        """Shows a piece symbol (or nothing) on an (image item, text item) pair."""
+        image_item, text_item = items
+        img = self.piece_images.get(symbol) if symbol else None
+        if img:
+            self.canvas.itemconfigure(image_item, image=img, state="normal")
+            self.canvas.itemconfigure(text_item, state="hidden")
+        elif symbol in UNICODE_PIECES:
+            self.canvas.itemconfigure(text_item, text=UNICODE_PIECES[symbol], state="normal")
+            self.canvas.itemconfigure(image_item, state="hidden")
+        else:
+            self.canvas.itemconfigure(image_item, state="hidden")
+            self.canvas.itemconfigure(text_item, state="hidden")
+
+    def _place_square_outline(self, item, square, inset):
+        """Moves an outline rectangle onto a square, or hides it when square is None."""
+        if square is None:
+            self.canvas.itemconfigure(item, state="hidden")
+            return
+        x1, y1 = self.square_origin(square)
+        size = self.square_size
+        self.canvas.coords(item, x1 + inset, y1 + inset, x1 + size - inset, y1 + size - inset)
+        self.canvas.itemconfigure(item, state="normal")
+
+    def _end_frame(self, start):
+        if self.measure_paint:
+            self.canvas.update_idletasks()
+        self.frame_times.add((time.perf_counter() - start) * 1000)
+
+    def draw(self, board, selected=None, destinations=(), drag_square=None, drag_piece=None, drag_pos=None):
+        """
+        Shows the board and pieces, the selected square, dots on legal
+        destinations and the king in checkmate. While dragging, the piece
+        on drag_square is drawn at drag_pos instead.
+        """
+        start = time.perf_counter()
+        dragging = drag_pos is not None
+
+        # Pieces: only squares whose contents changed are touched
+        symbols = [None] * 64
+        for square, piece in board.piece_map().items():
+            symbols[square] = piece.symbol()
+        if dragging and drag_square is not None:
+            symbols[drag_square] = None
+        for square in chess.SQUARES:
+            if symbols[square] != self.shown_pieces[square]:
+                self._show_symbol(self.piece_items[square], symbols[square])
+                self.shown_pieces[square] = symbols[square]
+
+        # Selected square (hidden while dragging)
+        selected = None if dragging else selected
+        if selected != self.shown_selected:
+            self._place_square_outline(self.selection_item, selected, 0)
+            self.shown_selected = selected
+
+        # Dots for legal destinations
+        dots = set(destinations)
+        for square in self.shown_dots - dots:
+            self.canvas.itemconfigure(self.dot_items[square], state="hidden")
+        for square in dots - self.shown_dots:
+            self.canvas.itemconfigure(self.dot_items[square], state="normal")
+        self.shown_dots = dots
+
+        # Highlight king if in checkmate
+        mate = board.king(board.turn) if board.is_checkmate() else None
+        if mate != self.shown_mate:
+            self._place_square_outline(self.mate_item, mate, 2)
+            self.shown_mate = mate
+
+        # The dragged piece
+        drag_symbol = drag_piece.symbol() if dragging and drag_piece is not None else None
+        if drag_symbol != self.shown_drag:
+            self._show_symbol(self.drag_items, drag_symbol)
+            self.shown_drag = drag_symbol
+        if drag_symbol:
+            for item in self.drag_items:
+                self.canvas.coords(item, *drag_pos)
+
+        self._end_frame(start)
+
+    def move_drag(self, x, y):
+        """Moves only the dragged piece; call draw() first to start the drag."""
+        start = time.perf_counter()
+        for item in self.drag_items:
+            self.canvas.coords(item, x, y)
+        self._end_frame(start)
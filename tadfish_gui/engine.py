@@ -0,0 +1,533 @@
+"""Persistent UCI engine sessions for the GUIs and match scripts.
+
+Each engine is started once, goes through the uci/isready handshake and is
+then reused for every move of the match. Positions are sent as
+"position startpos moves ..." with the game's move list, and bestmove is
+read on a background thread, so a search is a Future the caller can poll.
+
+A search that takes longer than its timeout is stopped, and if the engine
+still does not answer its process is killed. A dead process is restarted
+before the next command. Every client keeps latency statistics for startup,
+isready round trips and searches.
+
+A search can also ponder: the engine searches the position after the reply
+it expects (the "ponder" move of its last bestmove) on the opponent's time.
+If the opponent plays that move, ponderhit() turns it into the real search,
+which usually answers almost at once; otherwise it is stopped and dropped.
+
+TkSearch runs a search for a Tk window: the engine is polled from the event
+loop with root.after and intermediate "info" lines are streamed to the UI.
+
+Try it without Stockfish using the scripted fake engine:
+    python -m tadfish_gui.engine "python test_engines/fake_uci_engine.py" "tadfish.exe uci"
+"""
+import concurrent.futures
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+HANDSHAKE_TIMEOUT = 10 # Seconds to wait for uciok / readyok
+SEARCH_TIMEOUT = 30 # Default seconds a limited search may take
+STOP_GRACE = 2 # Seconds an engine gets to answer "stop" before it is killed
+ENGINE_POLL_MS = 20 # How often TkSearch checks the engine from the Tk event loop
+
+
+class EngineError(Exception):
+    """The engine process died, timed out or broke the protocol."""
+
+
+def parse_info(line):
+    """
+    Parse a UCI "info" line into a dict with any of depth, nodes, nps, time
+    (ints), score_cp or score_mate (side to move) and pv (list of moves).
+    """
+    tokens = line.split()[1:]
+    info = {}
+    i = 0
+    while i < len(tokens):
+        key = tokens[i]
+        if key in ("depth", "seldepth", "nodes", "nps", "time", "multipv") and i + 1 < len(tokens):
+            try:
+                info[key] = int(tokens[i + 1])
+            except ValueError:
+                pass
+            i += 2
+        elif key == "score" and i + 2 < len(tokens):
+            try:
+                info["score_" + tokens[i + 1]] = int(tokens[i + 2])
+            except ValueError:
+                pass
+            i += 3
+        elif key == "pv":
+            info["pv"] = tokens[i + 1:]
+            break
+        elif key == "string":
+            break
+        else:
+            i += 1
+    return info
+
+
+def describe_info(info, white_to_move=True):
+    """Short status text for an info dict, with the score from White's point of view."""
+    parts = []
+    if "depth" in info:
+        parts.append(f"depth {info['depth']}")
+    sign = 1 if white_to_move else -1
+    if "score_mate" in info:
+        parts.append(f"mate {sign * info['score_mate']:+d}")
+    elif "score_cp" in info:
+        parts.append(f"eval {sign * info['score_cp'] / 100:+.2f}")
+    if info.get("pv"):
+        parts.append("pv " + " ".join(info["pv"][:4]))
+    return ", ".join(parts)
+
+
+class LatencyStats:
+    """Count, mean, min and max of one kind of engine call, in milliseconds."""
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def __str__(self):
+        if not self.count:
+            return "no calls"
+        return (f"{self.count} calls, mean {self.mean_ms:.1f} ms, "
+                f"min {self.min_ms:.1f} ms, max {self.max_ms:.1f} ms")
+
+
+class EngineClient:
+    """
+    One UCI engine session, kept alive between searches and restarted if
+    the process dies. `timeout` is the default time limit of a search in
+    seconds (None for no limit).
+    """
+    def __init__(self, command, name=None, timeout=SEARCH_TIMEOUT):
+        self.command = list(command)
+        self.name = name or self.command[0]
+        self.timeout = timeout
+        self.restarts = 0
+        self.metrics = {kind: LatencyStats() for kind in ("startup", "isready", "search", "first_info")}
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.ponder_move = None # Reply the engine expects after its last bestmove
+        self.process = None
+        self._lock = threading.Lock()
+        self._search = None # Future of the running search
+        self._stopped = False # "stop" was sent to the running search
+        self._on_info = None
+        self._search_start = 0.0
+        self._first_info = False
+        self._watchdog = None
+        self._pondering = False # The running search is a ponder search without ponderhit yet
+        self._ponder_timeout = None
+        self._start()
+
+    def _start(self):
+        """Launch the process and complete the uci/isready handshake."""
+        start = time.perf_counter()
+        self._uciok = threading.Event()
+        self._readyok = threading.Event()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        reader = threading.Thread(target=self._read_output, args=(self.process,), daemon=True)
+        reader.start()
+
+        self._send("uci")
+        if not self._uciok.wait(HANDSHAKE_TIMEOUT):
+            self._kill()
+            raise EngineError(f"{self.name} did not answer 'uci'")
+        self.wait_ready()
+        self.metrics["startup"].add((time.perf_counter() - start) * 1000)
+
+    def _send(self, line):
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise EngineError(f"{self.name} is not running: {e}")
+
+    def _kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=STOP_GRACE)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def _finish_search(self, result=None, error=None):
+        """Resolve the running search (if any) with a move or an error."""
+        with self._lock:
+            future, self._search = self._search, None
+            watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.cancel()
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            self.metrics["search"].add((time.perf_counter() - self._search_start) * 1000)
+            future.set_result(result)
+
+    def _read_output(self, process):
+        """Reader thread: dispatch every line the engine prints."""
+        for line in process.stdout:
+            line = line.strip()
+            if line == "uciok":
+                self._uciok.set()
+            elif line == "readyok":
+                self._readyok.set()
+            elif line.startswith("id name "):
+                self.name = line[len("id name "):]
+            elif line.startswith("info"):
+                if not self._first_info and self._search is not None:
+                    self._first_info = True
+                    self.metrics["first_info"].add((time.perf_counter() - self._search_start) * 1000)
+                callback = self._on_info
+                if callback:
+                    callback(line)
+            elif line.startswith("bestmove"):
+                parts = line.split()
+                self.ponder_move = parts[3] if len(parts) > 3 and parts[2] == "ponder" else None
+                self._finish_search(parts[1] if len(parts) > 1 else None)
+
+        # The process closed its output. Reap it first, so `alive` is already
+        # False when the waiting search fails and the next command restarts it
+        try:
+            process.wait(timeout=STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+        # Fail whatever is still waiting on it, unless it has already been
+        # replaced by a restarted one
+        if process is self.process:
+            self._finish_search(error=EngineError(f"{self.name} exited"))
+
+    def _on_timeout(self, future, timeout):
+        """Watchdog: stop an overdue search, then kill an engine that ignores 'stop'."""
+        if future.done():
+            return
+        try:
+            self._send("stop")
+        except EngineError:
+            pass
+        try:
+            future.result(STOP_GRACE)
+            return
+        except concurrent.futures.TimeoutError:
+            pass
+        except Exception:
+            return
+        if self._search is future:
+            self._finish_search(error=EngineError(f"{self.name} did not answer within {timeout} s"))
+            self._kill()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_running(self):
+        """Restart the engine if its process has died."""
+        if self.alive:
+            return
+        self._finish_search(error=EngineError(f"{self.name} exited"))
+        self.restarts += 1
+        self._start()
+
+    def restart(self):
+        """Kill the engine and start a fresh process."""
+        self._kill()
+        self.ensure_running()
+
+    def wait_ready(self, timeout=HANDSHAKE_TIMEOUT):
+        """Round-trip isready/readyok so earlier commands have been handled."""
+        start = time.perf_counter()
+        self._readyok.clear()
+        self._send("isready")
+        if not self._readyok.wait(timeout):
+            raise EngineError(f"{self.name} did not answer 'isready'")
+        self.metrics["isready"].add((time.perf_counter() - start) * 1000)
+
+    @property
+    def busy(self):
+        return self._search is not None
+
+    def new_game(self):
+        """Finish any leftover search and tell the engine a new game starts."""
+        self.ensure_running()
+        future = self._search
+        if future is not None:
+            self._send("stop")
+            try:
+                future.result(HANDSHAKE_TIMEOUT)
+            except Exception:
+                pass
+        self._send("ucinewgame")
+        self.wait_ready()
+
+    def _arm_watchdog(self, future, timeout):
+        watchdog = threading.Timer(timeout, self._on_timeout, args=(future, timeout))
+        watchdog.daemon = True
+        with self._lock:
+            self._watchdog = watchdog
+        watchdog.start()
+
+    def search(self, moves=(), fen=None, depth=None, movetime=None, nodes=None, on_info=None, timeout=None,
+               ponder=False):
+        """
+        Start searching the position reached by `moves` from the start
+        position (or from `fen`). Returns a Future that resolves to the
+        bestmove string. `on_info` receives every info line, on the reader
+        thread. `timeout` overrides the client's default; a search without
+        any limit ("go infinite") has no timeout.
+
+        With ponder=True the last of `moves` is the expected opponent move
+        and the engine searches it as "go ponder": it does not answer until
+        ponderhit() or stop(), and the timeout only starts at ponderhit().
+        """
+        self.ensure_running()
+        previous = self._search
+        if previous is not None and self._stopped:
+            # A stopped search still owes its bestmove, which is due any moment
+            try:
+                previous.result(HANDSHAKE_TIMEOUT)
+            except Exception:
+                pass
+
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._search is not None:
+                raise EngineError(f"{self.name} is already searching")
+            self._search = future
+        self._stopped = False
+        self._on_info = on_info
+        self._pondering = ponder
+
+        position = f"position fen {fen}" if fen else "position startpos"
+        if moves:
+            position += " moves " + " ".join(moves)
+        go = "go ponder" if ponder else "go"
+        if depth:
+            go += f" depth {depth}"
+        if movetime:
+            go += f" movetime {movetime}"
+        if nodes:
+            go += f" nodes {nodes}"
+        if go in ("go", "go ponder"):
+            go += " infinite"
+            timeout = None
+        elif timeout is None:
+            timeout = self.timeout
+        self._ponder_timeout = timeout
+        if timeout and not ponder:
+            self._arm_watchdog(future, timeout)
+
+        self._search_start = time.perf_counter()
+        self._first_info = False
+        try:
+            self._send(position)
+            self._send(go)
+        except EngineError as e:
+            self._finish_search(error=e)
+        return future
+
+    def ponderhit(self):
+        """
+        The opponent played the expected move: the ponder search becomes the
+        real one. Its latency is counted from here, which is what the user
+        waits for.
+        """
+        future = self._search
+        if future is None or not self._pondering:
+            return
+        self._pondering = False
+        self.ponder_hits += 1
+        self._search_start = time.perf_counter()
+        self._send("ponderhit")
+        if self._ponder_timeout:
+            self._arm_watchdog(future, self._ponder_timeout)
+
+    def stop(self):
+        """Ask the engine to finish the current search now."""
+        if self.busy:
+            if self._pondering:
+                self._pondering = False
+                self.ponder_misses += 1
+            self._stopped = True
+            self._send("stop")
+
+    def metrics_summary(self):
+        """One line per kind of call, for logging."""
+        lines = [f"{self.name}: {self.restarts} restarts"]
+        if self.ponder_hits or self.ponder_misses:
+            lines.append(f"  ponder: {self.ponder_hits} hits, {self.ponder_misses} misses")
+        for kind, stats in self.metrics.items():
+            lines.append(f"  {kind}: {stats}")
+        return "\n".join(lines)
+
+    def quit(self):
+        with self._lock:
+            watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.cancel()
+        try:
+            self._send("quit")
+            self.process.wait(timeout=STOP_GRACE)
+        except (EngineError, subprocess.TimeoutExpired):
+            self._kill()
+
+
+class EnginePool:
+    """Named engines that live for the whole match."""
+    def __init__(self):
+        self.engines = {}
+
+    def start(self, key, command, name=None, timeout=SEARCH_TIMEOUT):
+        """Start an engine (once) and return it."""
+        if key not in self.engines:
+            self.engines[key] = EngineClient(command, name, timeout)
+        return self.engines[key]
+
+    def get(self, key):
+        return self.engines[key]
+
+    def new_game(self):
+        for engine in self.engines.values():
+            engine.new_game()
+
+    def stop_all(self):
+        for engine in self.engines.values():
+            engine.stop()
+
+    def metrics_summary(self):
+        return "\n".join(engine.metrics_summary() for engine in self.engines.values())
+
+    def close(self):
+        for engine in self.engines.values():
+            engine.quit()
+        self.engines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TkSearch:
+    """
+    Runs one engine search for a Tk window without blocking its event loop.
+
+    The engine thread only puts info lines on a queue. The Tk thread drains
+    that queue every ENGINE_POLL_MS via root.after and calls the callbacks:
+    on_info(info dict) with the newest info line, then on_done(bestmove) or
+    on_error(EngineError). After cancel() no callback fires anymore.
+
+    A ponder search (ponder=True) keeps polling until ponderhit() or
+    cancel(); on_done then gets the answer to the real move.
+    """
+    def __init__(self, root, engine, moves, on_done, on_error, on_info=None, **limits):
+        self.root = root
+        self.engine = engine
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_info = on_info
+        self.cancelled = False
+        self._infos = queue.Queue()
+        self._after_id = None
+        self.future = engine.search(moves, on_info=self._infos.put, **limits)
+        self._after_id = self.root.after(ENGINE_POLL_MS, self._poll)
+
+    def _poll(self):
+        self._after_id = None
+        if self.cancelled:
+            return
+
+        # Only the newest line is shown, so a fast engine cannot flood the UI
+        latest = None
+        while True:
+            try:
+                latest = self._infos.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None and self.on_info:
+            self.on_info(parse_info(latest))
+
+        if not self.future.done():
+            self._after_id = self.root.after(ENGINE_POLL_MS, self._poll)
+            return
+        try:
+            move = self.future.result()
+        except EngineError as e:
+            self.on_error(e)
+            return
+        self.on_done(move)
+
+    def ponderhit(self):
+        """The expected move was played; the result will arrive through on_done."""
+        try:
+            self.engine.ponderhit()
+        except EngineError:
+            pass # The reader thread reports the dead engine through on_error
+
+    def cancel(self):
+        """Stop the search and drop its result. The engine answers 'stop' in the background."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if not self.future.done():
+            try:
+                self.engine.stop()
+            except EngineError:
+                pass
+
+
+def main():
+    """Play a short game between two engine command lines and print the moves."""
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m tadfish_gui.engine \"<white engine command>\" \"<black engine command>\"")
+    with EnginePool() as pool:
+        white = pool.start("white", shlex.split(sys.argv[1]))
+        black = pool.start("black", shlex.split(sys.argv[2]))
+        pool.new_game()
+        moves = []
+        for ply in range(20):
+            engine = white if ply % 2 == 0 else black
+            move = engine.search(moves, depth=3).result(timeout=60)
+            if not move or move == "0000":
+                break
+            moves.append(move)
+            print(f"{engine.name}: {move}", flush=True)
+        print("position startpos moves " + " ".join(moves))
+        print(pool.metrics_summary())
+
+
+if __name__ == "__main__":
+    main()
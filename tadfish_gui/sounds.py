@@ -0,0 +1,78 @@
+"""Game sounds shared by the GUIs."""
+import os
+import threading
+from . import startup
+
+SOUND_FILES = {
+    "move": "move-self.mp3",
+    "capture": "capture.mp3",
+    "check": "move-check.mp3",
+    "checkmate": "checkmate.mp3",
+    "start": "start.mp3",
+}
+
+
+class SoundBank:
+    """
+    Loads the sounds from base_dir/audio on a background thread, so the
+    window does not wait for pygame's mixer and the MP3 decoding. A sound
+    requested before loading finishes is played once it has (only the
+    latest one). Missing files or audio devices just stay silent.
+    """
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.sounds = {}
+        self.loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = None
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        sounds = {}
+        try:
+            import pygame
+            pygame.mixer.init()
+        except Exception as e:
+            print(f"Audio initialization failed: {e}. Sounds will not play.")
+        else:
+            for key, filename in SOUND_FILES.items():
+                path = os.path.join(self.base_dir, "audio", filename)
+                if not os.path.exists(path):
+                    print(f"Sound file not found: {path}")
+                    continue
+                try:
+                    sounds[key] = pygame.mixer.Sound(path)
+                except pygame.error as e:
+                    print(f"Failed to load sound {filename}: {e}")
+
+        with self._lock:
+            self.sounds = sounds
+            self.loaded.set()
+            pending, self._pending = self._pending, None
+        startup.mark("sounds loaded")
+        if pending:
+            self.play(pending)
+
+    def play(self, key):
+        """Plays one of the SOUND_FILES keys."""
+        with self._lock:
+            if not self.loaded.is_set():
+                self._pending = key
+                return
+        sound = self.sounds.get(key)
+        if sound:
+            try:
+                sound.play()
+            except Exception as e:
+                print(f"Error playing sound: {e}")
+
+    def play_move(self, board, was_capture, gave_check):
+        """Plays the sound for the move just pushed on board."""
+        if board.is_checkmate():
+            self.play("checkmate")
+        elif gave_check:
+            self.play("check")
+        elif was_capture:
+            self.play("capture")
+        else:
+            self.play("move")
@@ -0,0 +1,46 @@
+"""Startup-time measurement for the GUIs.
+
+Run any GUI with TADFISH_STARTUP_TIME=1 to print how long it took until the
+first frame was on screen, and when each startup step that finished before
+it (piece sprites, sounds) was done. The window then closes. Times count
+from the moment the tadfish_gui package was imported.
+"""
+import os
+import threading
+import time
+
+STARTUP_ENV = "TADFISH_STARTUP_TIME"
+
+IMPORT_TIME = time.perf_counter()
+_marks = []
+_lock = threading.Lock()
+
+
+def enabled():
+    return bool(os.environ.get(STARTUP_ENV))
+
+
+def elapsed_ms():
+    return (time.perf_counter() - IMPORT_TIME) * 1000
+
+
+def mark(label):
+    """Record that a startup step finished now."""
+    with _lock:
+        _marks.append((label, elapsed_ms()))
+
+
+def report_first_frame(root):
+    """In measurement mode, report the time to the first drawn frame and close the window."""
+    if not enabled():
+        return
+
+    def first_frame():
+        root.update_idletasks() # Finish pending geometry and drawing
+        mark("first frame")
+        with _lock:
+            for label, ms in _marks:
+                print(f"{ms:8.1f} ms  {label}")
+        root.destroy()
+
+    root.after_idle(first_frame)
@@ -2,19 +2,15 @@ import tkinter as tk
 from tkinter import messagebox
 import chess
 import os
-import subprocess
-import pygame
-from PIL import Image, ImageTk
+from tadfish_gui import EnginePool, EngineError, TkSearch, describe_info, startup
+from tadfish_gui.board_view import BoardView, load_piece_images
+from tadfish_gui.sounds import SoundBank
 
 # IMPORTANT: FOLLOW test_engines/instructions.txt FOR THIS TO WORK!
 
 # Set this variable to control engine search depth globally
 simulation_depth = 5
 
-# Highlight colors for selected squares and checkmate
-HIGHLIGHT_COLOR = "#5C4033"
-CHECKMATE_HIGHLIGHT_COLOR = "#FF0000"
-
 # Determine the base directory for resources
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -22,15 +18,6 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ENGINE_PATH = os.path.join(BASE_DIR, "tadfish.exe")
 STOCKFISH_PATH = os.path.join(BASE_DIR, "test_engines", "stockfish.exe")
 
-# Determine the appropriate resampling filter for PIL Image.resize
-try:
-    RESAMPLE = Image.Resampling.LANCZOS
-except AttributeError:
-    try:
-        RESAMPLE = Image.LANCZOS
-    except AttributeError:
-        RESAMPLE = Image.BICUBIC
-
 class ChessUI:
     """
     Manages the Chess UI, game logic, and engine simulation.
@@ -98,6 +85,11 @@ class ChessUI:
         tk.Label(self.inner_control_frame, textvariable=self.status_var,
                  font='Helvetica 12 bold', fg="#E0E0E0", bg="#3C3F41", pady=5).pack(pady=(0, 10))
 
+        # Live search progress of the engine to move
+        self.info_var = tk.StringVar()
+        tk.Label(self.inner_control_frame, textvariable=self.info_var,
+                 font='Helvetica 10', fg="#B0B0B0", bg="#3C3F41", width=48).pack()
+
         depth_display_container = tk.Frame(self.inner_control_frame, bg="#3C3F41")
         depth_display_container.pack(pady=10)
 
@@ -120,12 +112,8 @@ class ChessUI:
 
         # --- UI Enhancements End ---
 
-        # Initialize Pygame mixer for sounds
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print(f"Audio initialization failed: {e}. Sounds will not play.")
-        self.load_sounds()
+        # Load the game sounds
+        self.sounds = SoundBank(BASE_DIR)
 
         self.board = chess.Board()
 
@@ -145,8 +133,15 @@ class ChessUI:
         self.max_plies = 100
         self.after_id = None
 
-        self.piece_images = {}
-        self.load_piece_images_with_check()
+        # One persistent UCI process per engine, started with the first simulation
+        self.engine_pool = EnginePool()
+        self.engine_search = None # Search currently running in the background
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.piece_images, missing = load_piece_images(BASE_DIR, self.square_size)
+        for failure in missing:
+            print(f"Piece image failed to load: {failure}")
+        self.board_view = BoardView(self.canvas, self.square_size, self.piece_images)
 
         # Bind mouse events (placeholders)
         self.canvas.bind("<ButtonPress-1>", self.on_press)
@@ -156,96 +151,19 @@ class ChessUI:
         # Initial drawing and status update
         self.draw_board()
         self.update_status()
-        self.play_sound(self.sound_start)
-
-    def load_sounds(self):
-        """Loads sound files for game events."""
-        def try_load(name):
-            path = os.path.join(BASE_DIR, "audio", name)
-            if os.path.exists(path):
-                try:
-                    return pygame.mixer.Sound(path)
-                except pygame.error as e:
-                    print(f"Failed to load sound {name}: {e}")
-                    return None
-            else:
-                print(f"Sound file not found: {path}")
-                return None
-
-        self.sound_move = try_load("move-self.mp3")
-        self.sound_capture = try_load("capture.mp3")
-        self.sound_check = try_load("move-check.mp3")
-        self.sound_checkmate = try_load("checkmate.mp3")
-        self.sound_start = try_load("start.mp3")
-
-    def play_sound(self, sound):
-        """Plays a given sound."""
-        if sound:
-            try:
-                sound.play()
-            except pygame.error as e:
-                print(f"Error playing sound: {e}")
-
-    def load_piece_images_with_check(self):
-        """Loads chess piece images, handles missing files."""
-        mapping = {
-            'P': 'white-pawn.png', 'N': 'white-knight.png', 'B': 'white-bishop.png',
-            'R': 'white-rook.png', 'Q': 'white-queen.png', 'K': 'white-king.png',
-            'p': 'black-pawn.png', 'n': 'black-knight.png', 'b': 'black-bishop.png',
-            'r': 'black-rook.png', 'q': 'black-queen.png', 'k': 'black-king.png',
-        }
-        for symbol, filename in mapping.items():
-            path = os.path.join(BASE_DIR, "images", filename)
-            if os.path.exists(path):
-                try:
-                    img = Image.open(path).convert("RGBA").resize((self.square_size, self.square_size), RESAMPLE)
-                    self.piece_images[symbol] = ImageTk.PhotoImage(img)
-                except Exception as e:
-                    print(f"Failed to load image {filename}: {e}")
-            else:
-                print(f"Image file not found: {path}")
+        self.sounds.play("start")
+        startup.report_first_frame(self.root)
 
     def draw_board(self):
         """Draws the chess board, pieces, and highlights."""
-        self.canvas.delete("all")
-
-        # Draw the squares
-        for rank in range(8):
-            for file in range(8):
-                x1 = file * self.square_size
-                y1 = (7 - rank) * self.square_size
-                color = "#F0D9B5" if (rank + file) % 2 == 0 else "#B58863"
-                self.canvas.create_rectangle(x1, y1, x1 + self.square_size, y1 + self.square_size, fill=color, outline="")
-
-        # Draw the pieces
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece:
-                symbol = piece.symbol()
-                img = self.piece_images.get(symbol)
-                if img:
-                    x = chess.square_file(square) * self.square_size + self.square_size / 2
-                    y = (7 - chess.square_rank(square)) * self.square_size + self.square_size / 2
-                    self.canvas.create_image(x, y, image=img)
-
-        # Highlight king if in checkmate
-        if self.board.is_checkmate():
-            sq = self.board.king(self.board.turn)
-            if sq is not None:
-                f = chess.square_file(sq)
-                r = chess.square_rank(sq)
-                x1 = f * self.square_size + 2
-                y1 = (7 - r) * self.square_size + 2
-                x2 = x1 + self.square_size - 4
-                y2 = y1 + self.square_size - 4
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline=CHECKMATE_HIGHLIGHT_COLOR, width=4)
+        self.board_view.draw(self.board)
 
     def update_status(self):
         """Updates the status message displayed to the user."""
         if self.board.is_checkmate():
             winner = "Black" if self.board.turn else "White"
             self.status_var.set(f"Checkmate! {winner} wins.")
-            self.play_sound(self.sound_checkmate)
+            self.sounds.play("checkmate")
             self.stop_simulation()
         elif self.board.is_stalemate():
             self.status_var.set("Stalemate!")
@@ -273,6 +191,15 @@ class ChessUI:
                                                      "Please ensure 'stockfish.exe' is in the 'test_engines' subdirectory.")
             return
 
+        try:
+            self.engine_pool.start("tadfish", [ENGINE_PATH, "uci"])
+            self.engine_pool.start("stockfish", [STOCKFISH_PATH])
+            self.engine_pool.new_game()
+        except (EngineError, OSError) as e:
+            messagebox.showerror("Engine Error", f"Could not start the engines: {e}")
+            self.engine_pool.close()
+            return
+
         moves_each_side = 50 # Fixed value
         global simulation_depth
 
@@ -285,7 +212,7 @@ class ChessUI:
 
         self.draw_board()
         self.update_status()
-        self.play_sound(self.sound_start)
+        self.sounds.play("start")
 
         self.after_id = self.root.after(300, self.simulation_step)
 
@@ -297,8 +224,19 @@ class ChessUI:
         if self.after_id:
             self.root.after_cancel(self.after_id)
             self.after_id = None
+        if self.engine_search:
+            self.engine_search.cancel()
+            self.engine_search = None
+        self.info_var.set("")
         print("Simulation stopped by user or game end.")
 
+    def on_close(self):
+        """Stops the simulation and shuts the engine processes down."""
+        self.stop_simulation()
+        print(self.engine_pool.metrics_summary())
+        self.engine_pool.close()
+        self.root.destroy()
+
     def simulation_step(self):
         """Performs one step of the simulation (one engine move)."""
         if not self.simulating:
@@ -315,74 +253,38 @@ class ChessUI:
             self.stop_simulation()
             return
 
-        fen = self.board.fen()
-        engine_to_use = ""
-
-        if self.board.turn == chess.WHITE:
-            engine_to_use = ENGINE_PATH # Tadfish (your engine) plays as White
-        else:
-            engine_to_use = STOCKFISH_PATH # Stockfish plays as Black
-
-        move_str = ""
-
+        # Tadfish (your engine) plays as White, Stockfish as Black
+        key = "tadfish" if self.board.turn == chess.WHITE else "stockfish"
+        moves = [m.uci() for m in self.board.move_stack]
         try:
-            if engine_to_use == STOCKFISH_PATH:
-                process = subprocess.Popen(
-                    [engine_to_use],
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                process.stdin.write(f"position fen {fen}\n")
-                process.stdin.write(f"go depth {simulation_depth}\n")
-                process.stdin.flush()
-
-                while True:
-                    line = process.stdout.readline().strip()
-                    if not line:
-                        break
-                    if line.startswith("bestmove"):
-                        move_str = line.split(" ")[1]
-                        break
-                process.terminate()
-            else: # For Tadfish (your engine)
-                result = subprocess.run(
-                    [engine_to_use, fen, str(simulation_depth)],
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    timeout=30
-                )
-                output_parts = result.stdout.strip().split()
-                if not output_parts:
-                    raise ValueError("Engine returned empty output.")
-                move_str = output_parts[0]
-
-            print(f"Engine ({'White' if self.board.turn == chess.WHITE else 'Black'}) move: {move_str}")
-            move = chess.Move.from_uci(move_str)
-
-        except FileNotFoundError:
-            messagebox.showerror("Engine Error", f"Engine executable not found at {engine_to_use}.\n"
-                                                 "Please ensure it exists and is executable.")
-            self.stop_simulation()
-            return
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Engine Error", f"Engine returned an error: {e.stderr.strip()}.\n"
-                                                 "Check engine path and arguments.")
-            self.stop_simulation()
-            return
-        except subprocess.TimeoutExpired:
-            messagebox.showerror("Engine Error", "Engine did not respond in time.")
-            self.stop_simulation()
-            return
+            self.engine_search = TkSearch(self.root, self.engine_pool.get(key), moves,
+                                          on_done=self.apply_engine_move,
+                                          on_error=self.on_engine_error,
+                                          on_info=self.show_engine_info,
+                                          depth=simulation_depth)
+        except EngineError as e:
+            self.on_engine_error(e)
+
+    def show_engine_info(self, info):
+        """Shows the latest search progress of the engine to move."""
+        name = "Tadfish" if self.board.turn == chess.WHITE else "Stockfish"
+        self.info_var.set(f"{name}: {describe_info(info, self.board.turn == chess.WHITE)}")
+
+    def on_engine_error(self, error):
+        """Stops the simulation when an engine crashes or times out; it is restarted for the next one."""
+        self.engine_search = None
+        messagebox.showerror("Engine Error", f"Engine stopped responding: {error}")
+        self.stop_simulation()
+
+    def apply_engine_move(self, move_str):
+        """Plays the move the engine answered with and schedules the next step."""
+        self.engine_search = None
+        print(f"Engine ({'White' if self.board.turn == chess.WHITE else 'Black'}) move: {move_str}")
+        try:
+            move = chess.Move.from_uci(move_str or "")
         except ValueError as e:
             messagebox.showerror("Engine Output Error", f"Failed to parse engine output: {e}.\n"
-                                                         f"Output: '{result.stdout.strip() if 'result' in locals() else 'N/A'}'")
-            self.stop_simulation()
-            return
-        except Exception as e:
-            messagebox.showerror("Unexpected Engine Error", f"An unexpected error occurred: {e}")
+                                                         f"Output: '{move_str}'")
             self.stop_simulation()
             return
 
@@ -396,14 +298,7 @@ class ChessUI:
             self.draw_board()
             self.update_status()
 
-            if self.board.is_checkmate():
-                self.play_sound(self.sound_checkmate)
-            elif gives_check:
-                self.play_sound(self.sound_check)
-            elif is_capture:
-                self.play_sound(self.sound_capture)
-            else:
-                self.play_sound(self.sound_move)
+            self.sounds.play_move(self.board, is_capture, gives_check)
 
             self.after_id = self.root.after(300, self.simulation_step)
         else:
@@ -0,0 +1,101 @@
+"""Scripted fake UCI engine for testing tadfish_gui.engine without Stockfish.
+
+Answers the UCI handshake and replies to every "go" with the next move of
+its script. Once the script runs out it plays the first legal move in UCI
+order (this needs python-chess), or "0000" without it.
+
+    python fake_uci_engine.py [--moves e7e5 b8c6 ...] [--delay MS] [--crash-after N]
+
+--delay makes every search take that long unless "stop" arrives first.
+--crash-after exits without answering the N-th "go", to test crash handling.
+"""
+import argparse
+import sys
+import threading
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+output_lock = threading.Lock()
+
+
+def send(line):
+    with output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def first_legal_move(fen, moves):
+    try:
+        import chess
+    except ImportError:
+        return "0000"
+    board = chess.Board(fen)
+    for move in moves:
+        board.push_uci(move)
+    legal = sorted(move.uci() for move in board.legal_moves)
+    return legal[0] if legal else "0000"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", nargs="*", default=[], help="replies, in order")
+    parser.add_argument("--delay", type=int, default=0, help="think time per move in ms")
+    parser.add_argument("--crash-after", type=int, default=0, help="exit on this 'go' (1-based)")
+    args = parser.parse_args()
+
+    script = list(args.moves)
+    fen, moves = START_FEN, []
+    searches = 0
+    timer = None
+    pending = False # a "go" still waiting for its bestmove
+    state_lock = threading.Lock()
+
+    def reply():
+        nonlocal pending
+        with state_lock:
+            if not pending:
+                return
+            pending = False
+        move = script.pop(0) if script else first_legal_move(fen, moves)
+        send(f"info depth 1 score cp 0 nodes 1 pv {move}")
+        send(f"bestmove {move}")
+
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == "uci":
+            send("id name FakeUCI")
+            send("id author tadfish tests")
+            send("uciok")
+        elif command == "isready":
+            send("readyok")
+        elif command == "position":
+            rest = tokens[1:]
+            if rest and rest[0] == "fen":
+                end = rest.index("moves") if "moves" in rest else len(rest)
+                fen, rest = " ".join(rest[1:end]), rest[end:]
+            else:
+                fen, rest = START_FEN, rest[1:]
+            moves = rest[1:] if rest and rest[0] == "moves" else []
+        elif command == "go":
+            searches += 1
+            if args.crash_after and searches >= args.crash_after:
+                sys.exit(1)
+            pending = True
+            if args.delay:
+                timer = threading.Timer(args.delay / 1000, reply)
+                timer.start()
+            else:
+                reply()
+        elif command == "stop":
+            if timer is not None:
+                timer.cancel()
+            reply()
+        elif command == "quit":
+            break
+
+
+if __name__ == "__main__":
+    main()